@@ -0,0 +1,186 @@
+"""
+Alert coalescing for simultaneous whale buys
+Buy alerts (and the multi-buy alerts they trigger) are held per token for
+ALERT_COALESCE_SECONDS, then sent as one message listing every whale and
+tier instead of one message per whale to each chat
+"""
+
+import atexit
+import threading
+from collections import deque
+
+import clock
+from config import ALERT_COALESCE_SECONDS, ALERT_DELAY_SAMPLES
+from detection_latency import get_detection_latency
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class AlertCoalescer:
+    """
+    Pending buy groups per token:
+        token -> {'opened', 'deadline', 'token_info', 'buys': [(whale, balance)],
+                  'detected': [(whale, detected_at)], 'multi': (count, window)}
+    A group is sent once its deadline passes, by the background thread or
+    by flush_due() when the caller drives the clock (replays).
+    """
+
+    def __init__(self, window=ALERT_COALESCE_SECONDS, background=True):
+        self.window = window
+        self.background = background
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.thread = None
+        self.delays = deque(maxlen=ALERT_DELAY_SAMPLES)
+        self.stats = {'buys': 0, 'multi_buys': 0, 'messages': 0}
+
+    # ----------------------------------------------------------------
+    # Intake
+    # ----------------------------------------------------------------
+
+    def add_buy(self, token, whale, token_info, balance, detected=None):
+        """Queue a buy alert (sent at once when coalescing is off); detected times detect -> send"""
+        if self.window <= 0:
+            from features import send_whale_buy_alert
+            with self.cond:
+                self.stats['buys'] += 1
+                self.stats['messages'] += 1
+            send_whale_buy_alert(whale, token_info, balance)
+            self._record_sent([(whale, detected)])
+            return
+
+        with self.cond:
+            self.stats['buys'] += 1
+            group = self.pending.get(token)
+            if group is None:
+                now = clock.now()
+                group = self.pending[token] = {
+                    'opened': now,
+                    'deadline': now + self.window,
+                    'token_info': token_info,
+                    'buys': [],
+                    'detected': [],
+                    'multi': None
+                }
+                self.cond.notify()
+            group['buys'].append((whale, balance))
+            group['detected'].append((whale, detected))
+        self._start()
+
+    def add_multi_buy(self, token, whale_count, symbol, mc, window=None):
+        """Fold a multi-buy level into the token's pending group, or send it if none is open"""
+        with self.cond:
+            self.stats['multi_buys'] += 1
+            group = self.pending.get(token)
+            if group is not None:
+                if not group['multi'] or whale_count >= group['multi'][0]:
+                    group['multi'] = (whale_count, window)
+                return
+            self.stats['messages'] += 1
+
+        from features import send_multi_buy_alert
+        send_multi_buy_alert(token, whale_count, symbol, mc, window)
+
+    # ----------------------------------------------------------------
+    # Sending
+    # ----------------------------------------------------------------
+
+    def flush_due(self, now=None):
+        """Send every group whose window has closed; returns how many were sent"""
+        now = clock.now() if now is None else now
+        with self.cond:
+            due = [token for token, group in self.pending.items() if group['deadline'] <= now]
+            groups = [(token, self.pending.pop(token)) for token in due]
+        for token, group in groups:
+            self._send(token, group, now)
+        return len(groups)
+
+    def flush_all(self):
+        """Send everything pending now (shutdown, end of a replay)"""
+        now = clock.now()
+        with self.cond:
+            groups, self.pending = list(self.pending.items()), {}
+        for token, group in groups:
+            self._send(token, group, now)
+
+    def _send(self, token, group, now):
+        from features import send_whale_buy_alert, send_coalesced_buy_alert
+
+        with self.cond:
+            self.stats['messages'] += 1
+            self.delays.append(now - group['opened'])
+
+        try:
+            if len(group['buys']) == 1 and not group['multi']:
+                whale, balance = group['buys'][0]
+                send_whale_buy_alert(whale, group['token_info'], balance)
+            else:
+                send_coalesced_buy_alert(group['token_info'], group['buys'], group['multi'])
+        except Exception as e:
+            print(f"  ⚠️ Alert send failed for {token[:8]}: {e}")
+            return
+        self._record_sent(group['detected'])
+
+    def _record_sent(self, detected):
+        sent = clock.now()
+        latency = get_detection_latency()
+        for whale, detected_at in detected:
+            if detected_at is not None:
+                latency.observe('detect_to_send', whale.get('tier', 3), whale['chain'], sent - detected_at)
+
+    def _start(self):
+        if not self.background:
+            return
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name='alert-coalescer', daemon=True)
+                self.thread.start()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.pending:
+                        self.cond.wait()
+                        continue
+                    wait = min(group['deadline'] for group in self.pending.values()) - clock.now()
+                    if wait <= 0:
+                        break
+                    self.cond.wait(wait)
+            self.flush_due()
+
+    # ----------------------------------------------------------------
+    # Metrics
+    # ----------------------------------------------------------------
+
+    def report(self):
+        """Alerts in vs messages out, and the delay coalescing added"""
+        with self.cond:
+            stats = dict(self.stats)
+            delays = list(self.delays)
+            stats['pending'] = len(self.pending)
+            held = sum(len(group['buys']) + bool(group['multi']) for group in self.pending.values())
+        stats['window'] = self.window
+        # Alerts that went out inside another message instead of on their own
+        stats['saved'] = stats['buys'] + stats['multi_buys'] - held - stats['messages']
+        if delays:
+            stats['delay_p50'] = _percentile(delays, 50)
+            stats['delay_p95'] = _percentile(delays, 95)
+            stats['delay_max'] = max(delays)
+        return stats
+
+_coalescer = AlertCoalescer()
+
+def get_alert_coalescer():
+    return _coalescer
+
+def set_alert_coalescer(coalescer):
+    """Swap the shared coalescer (replays drive their own); returns the previous one"""
+    global _coalescer
+    previous, _coalescer = _coalescer, coalescer
+    return previous
+
+@atexit.register
+def _flush_on_exit():
+    _coalescer.flush_all()
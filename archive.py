@@ -0,0 +1,166 @@
+"""
+Retention and cold archive for bot_state
+Moves closed or stale records out of the hot state into append-only,
+month-partitioned gzip JSONL files that commands can stream back
+"""
+
+import glob
+import gzip
+import os
+import threading
+from datetime import datetime
+
+import clock
+from config import (
+    ARCHIVE_DIR,
+    ARCHIVE_CLOSED_AFTER_HOURS,
+    ARCHIVE_STALE_POSITION_HOURS,
+    ARCHIVE_KEEP_SELLS
+)
+from codec import dumps, loads
+from state import bot_state, mark_changed, state_lock
+from multibuy_index import get_multi_buy_index
+
+COLLECTIONS = ('tracked_tokens', 'whale_token_balances', 'multi_buys', 'sells_detected')
+
+_write_lock = threading.Lock()
+
+# ============================================================
+# Writer
+# ============================================================
+
+def archive_path(collection, timestamp):
+    month = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m')
+    return os.path.join(ARCHIVE_DIR, collection, f"{month}.jsonl.gz")
+
+def append_records(collection, records):
+    """Append (key, record, event_time) tuples to their monthly partitions"""
+    by_path = {}
+    archived_at = clock.now()
+    for key, record, event_time in records:
+        line = dumps({'key': key, 'archived_at': archived_at, 'record': record})
+        by_path.setdefault(archive_path(collection, event_time or archived_at), []).append(line)
+
+    with _write_lock:
+        for path, lines in by_path.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Each append is a new gzip member; readers see one continuous stream
+            with gzip.open(path, 'ab') as f:
+                f.write(b'\n'.join(lines) + b'\n')
+
+    return len(records)
+
+# ============================================================
+# Retention Pass
+# ============================================================
+
+def bought_after_close(position, token_data):
+    """Whether a position was opened after its token closed (still needs sell detection)"""
+    closed_time = token_data.get('closed_time')
+    return closed_time is not None and position.get('detected_at', 0) > closed_time
+
+def run_retention(now=None):
+    """Move closed/stale records to the archive and return counts per collection"""
+    now = clock.now() if now is None else now
+    counts = {}
+
+    tracked = bot_state.get('tracked_tokens', {})
+    positions = bot_state.get('whale_token_balances', {})
+    with state_lock('whale_token_balances'):
+        rebought = {
+            data['token'] for data in positions.values()
+            if bought_after_close(data, tracked.get(data['token'], {}))
+        }
+
+    # Closed tracked tokens after a grace period, unless a whale bought back in
+    with state_lock('tracked_tokens'):
+        closed = [
+            (addr, data, data.get('closed_time') or data.get('last_check_time'))
+            for addr, data in tracked.items()
+            if data.get('status') != 'active' and addr not in rebought
+            and now - (data.get('closed_time') or data.get('last_check_time') or 0) > ARCHIVE_CLOSED_AFTER_HOURS * 3600
+        ]
+    counts['tracked_tokens'] = append_records('tracked_tokens', closed)
+    with state_lock('tracked_tokens'):
+        for addr, _, _ in closed:
+            # A buy while the file was written may have reactivated it
+            if tracked.get(addr, {}).get('status') != 'active':
+                tracked.pop(addr, None)
+    if closed:
+        mark_changed('tracked')
+
+    # Sell-tracking positions of retired tokens or that have not been checked for a long time
+    with state_lock('whale_token_balances'):
+        stale = [
+            (key, data, data.get('last_check'))
+            for key, data in positions.items()
+            if (tracked.get(data['token'], {}).get('status') != 'active'
+                and not bought_after_close(data, tracked.get(data['token'], {})))
+            or now - data.get('last_check', 0) > ARCHIVE_STALE_POSITION_HOURS * 3600
+        ]
+    counts['whale_token_balances'] = append_records('whale_token_balances', stale)
+    with state_lock('whale_token_balances'):
+        for key, data, _ in stale:
+            # A re-buy replaces the record; keep the new one
+            if positions.get(key) is data:
+                positions.pop(key)
+
+    # Per-token sell history beyond the most recent few
+    old_sells = []
+    with state_lock('tracked_tokens'):
+        for addr, data in tracked.items():
+            sells = data.get('sells_detected', [])
+            if len(sells) > ARCHIVE_KEEP_SELLS:
+                cut = len(sells) - ARCHIVE_KEEP_SELLS
+                old_sells.extend((addr, dict(sell, symbol=data.get('symbol')), sell.get('timestamp')) for sell in sells[:cut])
+                data['sells_detected'] = sells[cut:]
+    counts['sells_detected'] = append_records('sells_detected', old_sells)
+
+    # Multi-buy episodes the sliding-window index has expired
+    expired = get_multi_buy_index().drain_expired()
+    counts['multi_buys'] = append_records('multi_buys', [
+        (token, record, record.get('detected_time')) for token, record in expired
+    ])
+
+    return counts
+
+# ============================================================
+# Streaming Reader
+# ============================================================
+
+def iter_archive(collection, newest_first=True):
+    """Stream archived entries of a collection, one month file at a time"""
+    paths = sorted(glob.glob(os.path.join(ARCHIVE_DIR, collection, '*.jsonl.gz')), reverse=newest_first)
+    for path in paths:
+        try:
+            with gzip.open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        yield loads(line)
+                    except ValueError:
+                        continue
+        except (OSError, EOFError) as e:
+            print(f"  ⚠️ Archive read error in {path}: {e}")
+
+def find_archived_tokens(query, limit=5):
+    """Archived tracked tokens whose symbol or address matches query"""
+    query = query.lower()
+    matches = []
+    for entry in iter_archive('tracked_tokens'):
+        record = entry['record']
+        if entry['key'].lower() == query or str(record.get('symbol', '')).lower() == query:
+            matches.append(entry)
+            if len(matches) >= limit:
+                break
+    return matches
+
+def archive_stats():
+    """File count and compressed size per collection"""
+    stats = {}
+    for collection in COLLECTIONS:
+        paths = glob.glob(os.path.join(ARCHIVE_DIR, collection, '*.jsonl.gz'))
+        stats[collection] = {
+            'files': len(paths),
+            'bytes': sum(os.path.getsize(p) for p in paths)
+        }
+    return stats
@@ -0,0 +1,342 @@
+"""
+Record-and-replay backtesting engine
+Feeds recorded wallet snapshots and DexScreener responses through the
+detection, filter, tracking and tier logic on a simulated clock
+
+Record:  RECORD_DIR=recordings python main.py
+Replay:  python backtest.py --records recordings --filters mc_min=50000 --out run.json
+Compare: python backtest.py --compare baseline.json run.json
+"""
+
+import argparse
+import bisect
+import json
+import time
+
+import clock
+from config import WHALE_LIST_FILE, DEFAULT_FILTERS, PRICE_MILESTONES, TIER_RULES
+from recorder import iter_recorded_events
+from token_scheduler import retirement_reason, retire_token
+from state import bot_state, set_state_file
+from alert_coalescer import AlertCoalescer, set_alert_coalescer
+from detection_latency import DetectionLatency, set_detection_latency
+import utils
+import features
+import tier_manager
+
+# DexScreener is queried right after the wallet snapshot that revealed a token
+TOKEN_INFO_LOOKAHEAD = 30
+TRACKER_INTERVAL = 60
+
+# ============================================================
+# Recorded DexScreener Index
+# ============================================================
+
+class TokenInfoIndex:
+    """Per-token timeline of recorded DexScreener responses"""
+
+    def __init__(self, directory, start=None, end=None):
+        self.timelines = {}
+        for event in iter_recorded_events(directory, kinds=['dexscreener'], start=start, end=end):
+            times, payloads = self.timelines.setdefault(event['key'], ([], []))
+            times.append(event['ts'])
+            payloads.append(event['data'])
+
+    def lookup(self, token_address):
+        """Latest response at or shortly after the simulated time"""
+        timeline = self.timelines.get(token_address)
+        if not timeline:
+            return None
+        times, payloads = timeline
+        index = bisect.bisect_right(times, clock.now() + TOKEN_INFO_LOOKAHEAD) - 1
+        return payloads[index] if index >= 0 else None
+
+class BuyTimeIndex:
+    """Recorded block-time lookups by (chain, whale:token)"""
+
+    def __init__(self, directory, start=None, end=None):
+        self.responses = {
+            (event['chain'], event['key']): event['data']
+            for event in iter_recorded_events(directory, kinds=['buy_time'], start=start, end=end)
+        }
+
+    def lookup(self, chain, key):
+        return self.responses.get((chain, key))
+
+# ============================================================
+# Replay Engine
+# ============================================================
+
+def classify_alert(message):
+    if 'MULTI-WHALE BUY' in message:
+        return 'multi_buy'
+    if 'PRICE MILESTONE' in message:
+        return 'milestone'
+    if 'WHALE EXIT' in message:
+        return 'sell'
+    if 'WHALE BUY' in message:
+        return 'buy'
+    return 'other'
+
+def alert_symbol(message):
+    start = message.find('💎 <b>')
+    if start < 0:
+        return None
+    start += len('💎 <b>')
+    return message[start:message.find('</b>', start)]
+
+def reset_state(filters):
+    """Fresh in-memory state for a replay run"""
+    bot_state.clear()
+    bot_state.update({
+        'paused': False,
+        'filters': filters,
+        'alerts_sent': 0,
+        'tokens_filtered': 0,
+        'last_buys': [],
+        'start_time': clock.now(),
+        'last_update_id': 0,
+        'tracked_tokens': {},
+        'multi_buys': {},
+        'whale_performance': {},
+        'whale_token_balances': {},
+        'tier_changes': []
+    })
+
+def run_replay(records_dir, whales, filters=None, milestones=None, tier_rules=None,
+               tier_interval=3600, start=None, end=None):
+    """Replay a recording and return the alerts, milestone hits and tier changes it produces"""
+    sim = clock.SimulatedClock()
+    alerts = []
+    milestone_hits = []
+    tier_changes = []
+
+    set_state_file(None)
+    clock.set_time_source(sim)
+    # Coalesced alerts go out on simulated time, flushed between events
+    coalescer = AlertCoalescer(background=False)
+    previous_coalescer = set_alert_coalescer(coalescer)
+    latency = DetectionLatency()
+    previous_latency = set_detection_latency(latency)
+    utils.set_alert_sink(lambda message, chat_id: alerts.append({
+        'ts': sim.current,
+        'type': classify_alert(message),
+        'symbol': alert_symbol(message)
+    }))
+
+    try:
+        token_index = TokenInfoIndex(records_dir, start, end)
+        utils.set_token_info_source(token_index.lookup)
+        features.set_buy_time_source(BuyTimeIndex(records_dir, start, end).lookup)
+
+        reset_state(dict(filters or DEFAULT_FILTERS))
+        whales = [dict(w) for w in whales]
+        whales_by_address = {w['address']: w for w in whales}
+        whale_tokens = {}
+        next_tier_check = None
+        events = 0
+        first_ts = None
+        wall_start = time.time()
+
+        for event in iter_recorded_events(records_dir, start=start, end=end):
+            sim.advance_to(event['ts'])
+            coalescer.flush_due()
+            events += 1
+            if first_ts is None:
+                first_ts = event['ts']
+                next_tier_check = first_ts + tier_interval
+
+            if event['kind'] == 'wallet':
+                address = event['key']
+                whale = whales_by_address.get(address) or {'address': address, 'chain': event['chain'], 'tier': 3}
+                parse = features.parse_solana_tokens if event['chain'] == 'solana' else features.parse_base_tokens
+                current_tokens = parse(event['data'])
+
+                is_baseline = address not in whale_tokens
+                features.process_wallet_snapshot(whale, current_tokens, whale_tokens, is_baseline)
+
+                positions = bot_state['whale_token_balances']
+                for balance_key, balance_data in list(positions.items()):
+                    if balance_data['whale'] == address:
+                        features.update_position_balance(balance_key, balance_data, current_tokens)
+
+            elif event['kind'] == 'dexscreener':
+                data = bot_state['tracked_tokens'].get(event['key'])
+                if data and data.get('status') == 'active' and sim.current - data.get('last_check_time', 0) >= TRACKER_INTERVAL:
+                    token_info = utils.parse_token_info(event['data'], data['chain'])
+                    if token_info:
+                        for milestone in features.refresh_tracked_token(event['key'], data, token_info, milestones):
+                            milestone_hits.append({
+                                'ts': sim.current,
+                                'token': event['key'],
+                                'symbol': data['symbol'],
+                                'milestone': milestone,
+                                'gain': data['current_gain']
+                            })
+                        reason = retirement_reason(data)
+                        if reason:
+                            retire_token(event['key'], data, reason)
+
+            if next_tier_check and sim.current >= next_tier_check:
+                tier_changes.extend(tier_manager.apply_tier_updates(whales, tier_rules))
+                next_tier_check = sim.current + tier_interval
+
+        coalescer.flush_all()
+        tier_changes.extend(tier_manager.apply_tier_updates(whales, tier_rules))
+        wall_time = time.time() - wall_start
+        simulated = (sim.current - first_ts) if first_ts else 0
+
+        return {
+            'events': events,
+            'simulated_seconds': simulated,
+            'wall_seconds': wall_time,
+            'speedup': simulated / wall_time if wall_time > 0 else 0,
+            'settings': {
+                'filters': bot_state['filters'],
+                'milestones': milestones or PRICE_MILESTONES,
+                'tier_rules': tier_rules or TIER_RULES
+            },
+            'alerts': alerts,
+            'milestone_hits': milestone_hits,
+            'tier_changes': tier_changes,
+            'tracked_tokens': {
+                addr: {
+                    'symbol': data['symbol'],
+                    'max_gain': data.get('max_gain', 0),
+                    'current_gain': data.get('current_gain', 0),
+                    'whales': len(data.get('whales_bought', [])),
+                    'status': data.get('status'),
+                    'closed_reason': data.get('closed_reason')
+                }
+                for addr, data in bot_state['tracked_tokens'].items()
+            },
+            'tokens_filtered': bot_state.get('tokens_filtered', 0),
+            'detection_latency': latency.report()
+        }
+    finally:
+        set_alert_coalescer(previous_coalescer)
+        set_detection_latency(previous_latency)
+        features.set_buy_time_source(None)
+        utils.set_alert_sink(None)
+        utils.set_token_info_source(None)
+        clock.set_time_source(None)
+
+# ============================================================
+# Reporting
+# ============================================================
+
+def summarize(result):
+    counts = {}
+    for alert in result['alerts']:
+        counts[alert['type']] = counts.get(alert['type'], 0) + 1
+    return {
+        'buy_alerts': counts.get('buy', 0),
+        'multi_buy_alerts': counts.get('multi_buy', 0),
+        'sell_alerts': counts.get('sell', 0),
+        'milestone_hits': len(result['milestone_hits']),
+        'tier_changes': len(result['tier_changes']),
+        'tokens_tracked': len(result['tracked_tokens']),
+        'tokens_filtered': result['tokens_filtered']
+    }
+
+def print_summary(result):
+    print("\n" + "="*60)
+    print("📼 BACKTEST RESULTS")
+    print("="*60)
+    print(f"  Events replayed: {result['events']:,}")
+    print(f"  Simulated: {result['simulated_seconds'] / 3600:.1f}h in {result['wall_seconds']:.1f}s ({result['speedup']:,.0f}x)")
+    for key, value in summarize(result).items():
+        print(f"  {key.replace('_', ' ').title()}: {value}")
+    for chain, tiers in sorted(result.get('detection_latency', {}).get('chain_to_detect', {}).items()):
+        for tier, hist in sorted(tiers.items()):
+            print(f"  Chain → detect (T{tier} {chain}): p50 {hist['p50']:.1f}s | p90 {hist['p90']:.1f}s ({hist['count']} buys)")
+
+    winners = sorted(result['tracked_tokens'].values(), key=lambda t: t['max_gain'], reverse=True)[:10]
+    if winners:
+        print("\n  🏆 Top tracked tokens by max gain:")
+        for token in winners:
+            print(f"    {token['symbol']}: {token['max_gain']:+.1f}% (whales: {token['whales']})")
+    print("="*60)
+
+def print_comparison(a, b, label_a='A', label_b='B'):
+    sa, sb = summarize(a), summarize(b)
+    print("\n" + "="*60)
+    print(f"⚖️  COMPARISON: {label_a} → {label_b}")
+    print("="*60)
+    for key in sa:
+        print(f"  {key.replace('_', ' ').title():<18} {sa[key]:>6} → {sb[key]:<6} ({sb[key] - sa[key]:+d})")
+
+    alerted_a = {x['symbol'] for x in a['alerts'] if x['type'] == 'buy'}
+    alerted_b = {x['symbol'] for x in b['alerts'] if x['type'] == 'buy'}
+    if alerted_b - alerted_a:
+        print(f"\n  ➕ Only in {label_b}: {', '.join(sorted(s for s in alerted_b - alerted_a if s))}")
+    if alerted_a - alerted_b:
+        print(f"  ➖ Only in {label_a}: {', '.join(sorted(s for s in alerted_a - alerted_b if s))}")
+    print("="*60)
+
+# ============================================================
+# CLI
+# ============================================================
+
+def parse_filter_overrides(pairs):
+    filters = dict(DEFAULT_FILTERS)
+    for pair in pairs or []:
+        key, value = pair.split('=', 1)
+        if key not in filters:
+            raise SystemExit(f"❌ Unknown filter: {key}")
+        filters[key] = float(value)
+    return filters
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded responses through the bot logic')
+    parser.add_argument('--records', help='Directory written by the recorder (RECORD_DIR)')
+    parser.add_argument('--whales', default=WHALE_LIST_FILE, help='Whale list used for tiers')
+    parser.add_argument('--filters', nargs='*', help='Filter overrides, e.g. mc_min=50000')
+    parser.add_argument('--milestones', type=float, nargs='*', help='Price milestones (%%)')
+    parser.add_argument('--tier-rules', help='JSON file with a TIER_RULES-style list')
+    parser.add_argument('--tier-interval', type=int, default=3600, help='Simulated seconds between tier re-evaluations')
+    parser.add_argument('--start', type=float, help='Only replay events after this epoch time')
+    parser.add_argument('--end', type=float, help='Only replay events before this epoch time')
+    parser.add_argument('--out', help='Write the full result to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('A', 'B'), help='Compare two saved results')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], 'r') as f:
+            a = json.load(f)
+        with open(args.compare[1], 'r') as f:
+            b = json.load(f)
+        print_comparison(a, b, args.compare[0], args.compare[1])
+        return
+
+    if not args.records:
+        parser.error('--records is required unless --compare is used')
+
+    with open(args.whales, 'r') as f:
+        whales = json.load(f)
+
+    tier_rules = None
+    if args.tier_rules:
+        with open(args.tier_rules, 'r') as f:
+            tier_rules = json.load(f)
+
+    result = run_replay(
+        args.records,
+        whales,
+        filters=parse_filter_overrides(args.filters),
+        milestones=args.milestones,
+        tier_rules=tier_rules,
+        tier_interval=args.tier_interval,
+        start=args.start,
+        end=args.end
+    )
+
+    print_summary(result)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to {args.out}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""
+End-to-end throughput benchmark for Whale Tracker Bot V4
+Runs the real monitoring pipeline against local fake providers
+
+Usage:
+    python benchmark.py --cycles 3 --buys 20 --latency 40 --errors 0.01
+    python benchmark.py --json run.json --compare previous.json
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+
+from fake_providers import start_fake_providers, provider_env, stop_fake_providers
+
+# ============================================================
+# Measurement Helpers
+# ============================================================
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def current_rss_mb():
+    """Resident set size in MB (falls back to peak RSS)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+# ============================================================
+# Pipeline Runner
+# ============================================================
+
+def run_cycle(tier_groups, whale_tokens, is_baseline, throttle):
+    """Run one pass of every tier concurrently, like the tier monitors do"""
+    from features import check_whale_for_new_buys
+
+    def scan(whales):
+        for whale in whales:
+            check_whale_for_new_buys(whale, whale_tokens, is_baseline)
+            if throttle:
+                time.sleep(throttle)
+
+    threads = [threading.Thread(target=scan, args=(whales,), daemon=True) for whales in tier_groups.values()]
+    started = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - started
+
+def run_benchmark(args):
+    """Start the stand-ins, point config at them and drive the pipeline"""
+    world, providers = start_fake_providers(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.errors,
+        fixtures_dir=args.fixtures,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms
+    )
+    world.tokens_per_wallet = args.holdings
+
+    workdir = tempfile.mkdtemp(prefix='whale_bench_')
+    os.environ.update(provider_env(providers))
+    os.environ['BOT_STATE_FILE'] = os.path.join(workdir, 'bot_state.json')
+    os.environ['ALERT_COALESCE_SECONDS'] = str(args.coalesce)
+
+    # Imported only after the environment points at the stand-ins
+    from config import WHALE_LIST_FILE
+    from state import bot_state
+    from alert_coalescer import get_alert_coalescer
+    from rpc import rpc_pool_reports
+    from detection_latency import get_detection_latency
+    from features import wait_for_buy_timings
+
+    with open(WHALE_LIST_FILE, 'r') as f:
+        whales = json.load(f)
+
+    if args.limit:
+        whales = whales[:args.limit]
+
+    tier_groups = {}
+    for whale in whales:
+        tier = whale.get('tier', 3)
+        if args.tiers and tier not in args.tiers:
+            continue
+        tier_groups.setdefault(tier, []).append(whale)
+
+    monitored = [w for group in tier_groups.values() for w in group if w['chain'] in ('solana', 'base')]
+    whale_tokens = {}
+    rng = random.Random(args.seed)
+
+    print(f"🐋 Benchmarking {len(monitored)} whales across tiers {sorted(tier_groups)}")
+    print(f"   Latency: {args.latency}ms (+{args.jitter}ms jitter) | Error rate: {args.errors:.1%}")
+
+    cpu_start = cpu_seconds()
+    baseline_time = run_cycle(tier_groups, whale_tokens, True, args.throttle)
+    print(f"   ✅ Baseline: {baseline_time:.2f}s")
+
+    cycle_times = []
+    for cycle in range(1, args.cycles + 1):
+        for whale in rng.sample(monitored, min(args.buys, len(monitored))):
+            world.inject_buy(whale['address'], whale['chain'])
+
+        elapsed = run_cycle(tier_groups, whale_tokens, False, args.throttle)
+        cycle_times.append(elapsed)
+        print(f"   🔄 Cycle #{cycle}: {elapsed:.2f}s ({len(monitored) / elapsed:.1f} whales/s)")
+
+    # Let open coalescing windows close so their buys count as alerted
+    if args.coalesce:
+        time.sleep(args.coalesce)
+    get_alert_coalescer().flush_all()
+    # Block time lookups run in the background; let them land before reporting
+    wait_for_buy_timings()
+
+    cpu_used = cpu_seconds() - cpu_start
+    latencies = world.detection_latencies()
+    requests_by_provider = {name: dict(p.counts) for name, p in providers.items()}
+    hedging = {chain: report['hedging'] for chain, report in rpc_pool_reports().items()}
+
+    stop_fake_providers(providers)
+
+    avg_cycle = sum(cycle_times) / len(cycle_times) if cycle_times else 0
+    total_wall = baseline_time + sum(cycle_times)
+
+    return {
+        'whales': len(monitored),
+        'cycles': args.cycles,
+        'baseline_time_s': baseline_time,
+        'cycle_time_avg_s': avg_cycle,
+        'cycle_time_max_s': max(cycle_times) if cycle_times else 0,
+        'whales_per_second': len(monitored) / avg_cycle if avg_cycle else 0,
+        'requests': requests_by_provider,
+        'hedging': hedging,
+        'detection_stages': get_detection_latency().report(),
+        'requests_total': sum(p.total_requests() for p in providers.values()),
+        'buys_injected': len(world.buys),
+        'buys_alerted': len(latencies),
+        'alerts_sent': bot_state.get('alerts_sent', 0),
+        'detection_latency_p50_s': percentile(latencies, 50),
+        'detection_latency_p99_s': percentile(latencies, 99),
+        'cpu_seconds': cpu_used,
+        'cpu_utilization': cpu_used / total_wall if total_wall else 0,
+        'rss_mb': current_rss_mb(),
+        'peak_rss_mb': peak_rss_mb(),
+        'settings': {
+            'latency_ms': args.latency,
+            'jitter_ms': args.jitter,
+            'error_rate': args.errors,
+            'holdings': args.holdings,
+            'throttle_s': args.throttle,
+            'buys_per_cycle': args.buys,
+            'tail_rate': args.tail_rate,
+            'tail_ms': args.tail_ms,
+            'coalesce_s': args.coalesce
+        }
+    }
+
+# ============================================================
+# Reporting
+# ============================================================
+
+REPORT_FIELDS = [
+    ('whales_per_second', 'Throughput', '{:.1f} whales/s'),
+    ('cycle_time_avg_s', 'Cycle time (avg)', '{:.2f}s'),
+    ('cycle_time_max_s', 'Cycle time (max)', '{:.2f}s'),
+    ('requests_total', 'Requests', '{:,}'),
+    ('detection_latency_p50_s', 'Detection p50', '{:.2f}s'),
+    ('detection_latency_p99_s', 'Detection p99', '{:.2f}s'),
+    ('cpu_seconds', 'CPU time', '{:.2f}s'),
+    ('cpu_utilization', 'CPU utilization', '{:.0%}'),
+    ('rss_mb', 'RSS', '{:.1f} MB'),
+    ('peak_rss_mb', 'Peak RSS', '{:.1f} MB'),
+]
+
+def print_report(result, previous=None):
+    print("\n" + "="*60)
+    print("📊 BENCHMARK RESULTS")
+    print("="*60)
+
+    for key, label, fmt in REPORT_FIELDS:
+        line = f"  {label:<18} {fmt.format(result[key])}"
+        if previous and previous.get(key):
+            delta = (result[key] - previous[key]) / previous[key] * 100
+            line += f"   ({delta:+.1f}% vs previous)"
+        print(line)
+
+    print(f"  {'Buys alerted':<18} {result['buys_alerted']}/{result['buys_injected']}")
+    print("\n  Requests by provider:")
+    for name, counts in result['requests'].items():
+        detail = ', '.join(f"{k}={v}" for k, v in sorted(counts.items()))
+        print(f"    {name}: {detail or 'none'}")
+
+    for chain, tiers in result.get('hedging', {}).items():
+        for tier, hedge in sorted(tiers.items()):
+            if hedge['requests'] and hedge['p99_ms'] is not None:
+                print(f"\n  Hedging ({chain}, tier {tier}): {hedge['hedged']}/{hedge['requests']} "
+                      f"({hedge['hedge_rate']:.1%}, {hedge['wins']} won)")
+                print(f"    p50 {hedge['p50_ms']:.0f}ms | p90 {hedge['p90_ms']:.0f}ms | p99 {hedge['p99_ms']:.0f}ms"
+                      f"   (unhedged p90 {hedge['unhedged_p90_ms']:.0f}ms | p99 {hedge['unhedged_p99_ms']:.0f}ms)")
+
+    stages = result.get('detection_stages', {})
+    if stages.get('chain_to_detect') or stages.get('detect_to_send'):
+        print("\n  Detection stages (as the bot measured them):")
+    for stage, label in (('chain_to_detect', 'Chain → detect'), ('detect_to_send', 'Detect → send')):
+        for chain, tiers in sorted(stages.get(stage, {}).items()):
+            for tier, hist in sorted(tiers.items()):
+                print(f"    {label} (T{tier} {chain}): p50 {hist['p50']:.2f}s | p99 {hist['p99']:.2f}s ({hist['count']} buys)")
+    print("="*60)
+
+def main():
+    parser = argparse.ArgumentParser(description='Whale tracker throughput benchmark')
+    parser.add_argument('--cycles', type=int, default=3, help='Detection cycles after the baseline')
+    parser.add_argument('--buys', type=int, default=20, help='Buys injected before each cycle')
+    parser.add_argument('--latency', type=float, default=30, help='Provider latency in ms')
+    parser.add_argument('--jitter', type=float, default=20, help='Extra random latency in ms')
+    parser.add_argument('--errors', type=float, default=0.0, help='Provider error rate (0-1)')
+    parser.add_argument('--tail-rate', type=float, default=0.0, help='Share of requests that stall (0-1)')
+    parser.add_argument('--tail-ms', type=float, default=1000, help='Extra latency of a stalled request in ms')
+    parser.add_argument('--holdings', type=int, default=20, help='Tokens held per fake wallet')
+    parser.add_argument('--throttle', type=float, default=0.0, help='Sleep between whales (s)')
+    parser.add_argument('--tiers', type=int, nargs='*', help='Only benchmark these tiers')
+    parser.add_argument('--limit', type=int, default=0, help='Only use the first N whales')
+    parser.add_argument('--fixtures', help='Directory of recorded responses per provider')
+    parser.add_argument('--coalesce', type=float, default=0, help='Alert coalescing window in seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Previous results file to diff against')
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    print_report(result, previous)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Swappable clock for Whale Tracker Bot V4
+Live runs use wall time; the replay engine installs a simulated clock
+"""
+
+import time
+
+_time_source = time.time
+
+def now():
+    """Current time in epoch seconds from the active clock"""
+    return _time_source()
+
+def set_time_source(source):
+    """Install a callable returning epoch seconds (None restores wall time)"""
+    global _time_source
+    _time_source = source or time.time
+
+class SimulatedClock:
+    """Clock that only moves when the replay engine advances it"""
+
+    def __init__(self, start=0.0):
+        self.current = start
+
+    def __call__(self):
+        return self.current
+
+    def advance_to(self, timestamp):
+        if timestamp > self.current:
+            self.current = timestamp
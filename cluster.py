@@ -0,0 +1,426 @@
+"""
+Multi-node cluster mode with lease-based whale ownership
+Nodes share a SQLite coordination file, claim whale partitions through
+time-bounded leases and forward detections to a single alerting leader
+"""
+
+import hashlib
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+
+from config import (
+    CLUSTER_DB,
+    CLUSTER_NODE_ID,
+    CLUSTER_PARTITIONS,
+    CLUSTER_LEASE_SECONDS,
+    CLUSTER_RENEW_SECONDS
+)
+from state import bot_state, flush_bot_state, load_bot_state, set_state_file, suspend_state_writes
+from sharding import ShardWorker, shard_for
+from whale_store import get_whale_store
+import features
+
+LEADER_LEASE = 'leader'
+
+# ============================================================
+# Coordination Store (SQLite on shared disk)
+# ============================================================
+
+class LeaseStore:
+    """Nodes, leases, flags and forwarded events in one SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Rollback journal (not WAL) so the file is safe on network filesystems
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY, heartbeat REAL, started_at REAL, info TEXT
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY, owner TEXT, expires_at REAL, epoch INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS flags (
+                name TEXT PRIMARY KEY, value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL, node_id TEXT, payload TEXT
+            );
+        """)
+
+    def _transaction(self, fn):
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(self.conn)
+                self.conn.execute('COMMIT')
+                return result
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    # Nodes -------------------------------------------------------
+
+    def heartbeat(self, node_id, info):
+        now = time.time()
+        self._transaction(lambda c: c.execute(
+            "INSERT INTO nodes (node_id, heartbeat, started_at, info) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(node_id) DO UPDATE SET heartbeat = excluded.heartbeat, info = excluded.info",
+            (node_id, now, now, json.dumps(info))
+        ))
+
+    def live_nodes(self, ttl):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT node_id, heartbeat, info FROM nodes WHERE heartbeat > ? ORDER BY node_id",
+                (time.time() - ttl,)
+            ).fetchall()
+        return [{'node_id': r[0], 'heartbeat': r[1], 'info': json.loads(r[2] or '{}')} for r in rows]
+
+    def remove_node(self, node_id):
+        self._transaction(lambda c: c.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,)))
+
+    # Leases ------------------------------------------------------
+
+    def acquire(self, name, owner, ttl):
+        """Take or renew a lease; True if owner holds it afterwards"""
+        def txn(c):
+            now = time.time()
+            c.execute("INSERT OR IGNORE INTO leases (name, owner, expires_at, epoch) VALUES (?, NULL, 0, 0)", (name,))
+            current_owner, expires_at = c.execute(
+                "SELECT owner, expires_at FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if current_owner == owner:
+                c.execute("UPDATE leases SET expires_at = ? WHERE name = ?", (now + ttl, name))
+                return True
+            if current_owner is None or expires_at < now:
+                c.execute(
+                    "UPDATE leases SET owner = ?, expires_at = ?, epoch = epoch + 1 WHERE name = ?",
+                    (owner, now + ttl, name)
+                )
+                return True
+            return False
+        return self._transaction(txn)
+
+    def release(self, name, owner):
+        self._transaction(lambda c: c.execute(
+            "UPDATE leases SET owner = NULL, expires_at = 0 WHERE name = ? AND owner = ?", (name, owner)
+        ))
+
+    def leases(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT name, owner, expires_at, epoch FROM leases").fetchall()
+        return {r[0]: {'owner': r[1], 'expires_at': r[2], 'epoch': r[3]} for r in rows}
+
+    # Flags -------------------------------------------------------
+
+    def set_flag(self, name, value):
+        self._transaction(lambda c: c.execute(
+            "INSERT INTO flags (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, json.dumps(value))
+        ))
+
+    def get_flag(self, name, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM flags WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # Events ------------------------------------------------------
+
+    def push_event(self, node_id, payload):
+        self._transaction(lambda c: c.execute(
+            "INSERT INTO events (created_at, node_id, payload) VALUES (?, ?, ?)",
+            (time.time(), node_id, json.dumps(payload))
+        ))
+
+    def pending_events(self, limit=100):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM events ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(r[0], json.loads(r[1])) for r in rows]
+
+    def ack_event(self, event_id):
+        self._transaction(lambda c: c.execute("DELETE FROM events WHERE id = ?", (event_id,)))
+
+    def backlog(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+# ============================================================
+# Partition Assignment
+# ============================================================
+
+def partition_name(partition):
+    return f"partition:{partition}"
+
+def preference(node_id, partition):
+    """Rendezvous hash so each partition has a stable preferred node"""
+    return hashlib.sha1(f"{node_id}:{partition}".encode()).hexdigest()
+
+def plan_partitions(node_id, live_node_ids, partitions):
+    """Partitions this node should own given the live membership"""
+    members = sorted(set(live_node_ids) | {node_id})
+    # Every node computes the same capped rendezvous plan, so shares stay balanced
+    cap = -(-partitions // len(members))
+    counts = {member: 0 for member in members}
+    mine = set()
+    for partition in range(partitions):
+        ranked = sorted(members, key=lambda n: preference(n, partition), reverse=True)
+        owner = next(n for n in ranked if counts[n] < cap)
+        counts[owner] += 1
+        if owner == node_id:
+            mine.add(partition)
+    return mine
+
+# ============================================================
+# Cluster Node
+# ============================================================
+
+class ClusterNode:
+    """Claims partitions, polls their whales and alerts only when leader"""
+
+    def __init__(self, store, node_id, whales, partitions=CLUSTER_PARTITIONS,
+                 lease_seconds=CLUSTER_LEASE_SECONDS, renew_seconds=CLUSTER_RENEW_SECONDS):
+        self.store = store
+        self.node_id = node_id
+        self.partitions = partitions
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.whales = {w['address']: w for w in whales}
+        self.whales_generation = get_whale_store().generation
+        self.owned = set()
+        self.is_leader = False
+        self.leader_until = 0
+        self.state_file = None
+        self.forwarded = 0
+        self.handled = 0
+        self.stop = threading.Event()
+        self.events = queue.Queue()
+        self.worker = ShardWorker(f"node:{node_id}", [], self.events, threading.Event(), self.stop)
+
+    def _partition_of(self, address):
+        return shard_for(address, self.partitions)
+
+    # Leases ------------------------------------------------------
+
+    def rebalance(self):
+        """Renew held leases, give up surplus partitions and claim missing ones"""
+        try:
+            self._rebalance()
+        except Exception:
+            # Without a renewed lease another node may already lead; stop acting as leader now
+            if self.is_leader:
+                print(f"  ⚠️ [CLUSTER] {self.node_id} lost leadership (lease store error)")
+                self._step_down()
+            raise
+
+    def _rebalance(self):
+        self.store.heartbeat(self.node_id, {
+            'partitions': sorted(self.owned),
+            'leader': self.is_leader,
+            'whales': len(self.worker.whales)
+        })
+
+        live = [n['node_id'] for n in self.store.live_nodes(self.lease_seconds)]
+        wanted = plan_partitions(self.node_id, live, self.partitions)
+
+        for partition in sorted(self.owned - wanted):
+            self.store.release(partition_name(partition), self.node_id)
+            self._drop_partition(partition)
+
+        # A partition whose previous owner has not released it yet is retried next tick
+        for partition in sorted(wanted):
+            held = partition in self.owned
+            if self.store.acquire(partition_name(partition), self.node_id, self.lease_seconds):
+                if not held:
+                    self._add_partition(partition)
+            elif held:
+                self._drop_partition(partition)
+
+        was_leader = self.is_leader
+        requested = time.time()
+        if self.store.acquire(LEADER_LEASE, self.node_id, self.lease_seconds):
+            self.is_leader = True
+            self.leader_until = requested + self.lease_seconds
+        elif was_leader:
+            print(f"  ⚠️ [CLUSTER] {self.node_id} lost leadership")
+            self._step_down()
+        elif not self.state_file:
+            # Followers never write bot_state over the leader's file
+            self.state_file = suspend_state_writes()
+        if self.is_leader and not was_leader:
+            print(f"👑 [CLUSTER] {self.node_id} is now the alerting leader")
+            if self.state_file:
+                set_state_file(self.state_file)
+            # Pick up the state the previous leader persisted
+            load_bot_state()
+
+        if self.is_leader:
+            self.store.set_flag('paused', bool(bot_state.get('paused')))
+        elif self.store.get_flag('paused', False):
+            self.worker.paused.set()
+        else:
+            self.worker.paused.clear()
+
+    def _step_down(self):
+        """Stop writing bot_state; only the leader persists it"""
+        self.is_leader = False
+        # Until our lease runs out no other node can have loaded the file, so queued saves are still ours
+        if time.time() < self.leader_until:
+            flush_bot_state()
+        self.state_file = suspend_state_writes() or self.state_file
+
+    def _add_partition(self, partition):
+        self.owned.add(partition)
+        with self.worker.lock:
+            for address, whale in self.whales.items():
+                if self._partition_of(address) == partition:
+                    self.worker.whales[address] = dict(whale)
+        print(f"  ➕ [CLUSTER] {self.node_id} claimed partition {partition}")
+
+    def _drop_partition(self, partition):
+        self.owned.discard(partition)
+        with self.worker.lock:
+            for address in [a for a in self.worker.whales if self._partition_of(a) == partition]:
+                del self.worker.whales[address]
+                self.worker.whale_tokens.pop(address, None)
+        print(f"  ➖ [CLUSTER] {self.node_id} released partition {partition}")
+
+    def refresh_whales(self):
+        """Pick up tier changes and added/removed whales from the shared whale store"""
+        store = get_whale_store()
+        replaced = store.refresh()
+        if not replaced and store.generation == self.whales_generation:
+            return
+        self.whales_generation = store.generation
+
+        self.whales = {w['address']: w for w in store.whales()}
+
+        with self.worker.lock:
+            for address in list(self.worker.whales):
+                if address not in self.whales:
+                    del self.worker.whales[address]
+                    self.worker.whale_tokens.pop(address, None)
+            for address, whale in self.whales.items():
+                if self._partition_of(address) in self.owned:
+                    if address in self.worker.whales:
+                        self.worker.whales[address]['tier'] = whale.get('tier', 3)
+                    else:
+                        self.worker.whales[address] = dict(whale)
+
+    # Event flow --------------------------------------------------
+
+    def forward_loop(self):
+        """Send local detections to the leader (or handle them when leader)"""
+        while not self.stop.is_set():
+            try:
+                event = self.events.get(timeout=1)
+            except queue.Empty:
+                continue
+            if event['type'] != 'buy':
+                continue
+            try:
+                self.store.push_event(self.node_id, event)
+                self.forwarded += 1
+            except Exception as e:
+                print(f"  ⚠️ [CLUSTER] Failed to forward event: {e}")
+
+    def leader_loop(self):
+        """Leader drains the shared event table in order"""
+        while not self.stop.is_set():
+            if not self.is_leader:
+                self.stop.wait(1)
+                continue
+            try:
+                pending = self.store.pending_events()
+            except Exception as e:
+                print(f"  ⚠️ [CLUSTER] Event read error: {e}")
+                self.stop.wait(1)
+                continue
+
+            for event_id, event in pending:
+                if not self.is_leader:
+                    break
+                try:
+                    features.handle_new_buys(event['whale'], event['tokens'], event.get('detected_at'))
+                    self.handled += 1
+                except Exception as e:
+                    print(f"  ⚠️ [CLUSTER] Error handling event {event_id}: {e}")
+                self.store.ack_event(event_id)
+
+            if not pending:
+                self.stop.wait(1)
+
+    def lease_loop(self):
+        while not self.stop.is_set():
+            try:
+                self.rebalance()
+                self.refresh_whales()
+            except Exception as e:
+                print(f"  ⚠️ [CLUSTER] Lease error: {e}")
+            self.stop.wait(self.renew_seconds)
+
+    def start(self):
+        self.rebalance()
+        for target in (self.lease_loop, self.forward_loop, self.leader_loop, self.worker.run):
+            threading.Thread(target=target, daemon=True).start()
+        print(f"✅ Cluster node {self.node_id} started ({len(self.owned)}/{self.partitions} partitions)")
+
+    def shutdown(self):
+        """Hand partitions and leadership back so others take over immediately"""
+        self.stop.set()
+        for partition in list(self.owned):
+            self.store.release(partition_name(partition), self.node_id)
+        if self.is_leader:
+            self.store.release(LEADER_LEASE, self.node_id)
+        self.store.remove_node(self.node_id)
+
+    def status(self):
+        """Cluster overview for the /cluster command"""
+        leases = self.store.leases()
+        nodes = self.store.live_nodes(self.lease_seconds)
+        return {
+            'node_id': self.node_id,
+            'leader': leases.get(LEADER_LEASE, {}).get('owner'),
+            'is_leader': self.is_leader,
+            'nodes': nodes,
+            'owned': sorted(self.owned),
+            'unowned': [
+                p for p in range(self.partitions)
+                if leases.get(partition_name(p), {}).get('expires_at', 0) < time.time()
+            ],
+            'forwarded': self.forwarded,
+            'handled': self.handled,
+            'backlog': self.store.backlog()
+        }
+
+# ============================================================
+# Module API
+# ============================================================
+
+_node = None
+
+def default_node_id():
+    return CLUSTER_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+def start_cluster_node(whales):
+    """Join the cluster described by CLUSTER_DB"""
+    global _node
+    _node = ClusterNode(LeaseStore(CLUSTER_DB), default_node_id(), whales)
+    _node.start()
+    return _node
+
+def get_cluster_node():
+    return _node
+
+def is_alerting_leader():
+    """True when this process should own bot_state (always outside cluster mode)"""
+    return _node is None or _node.is_leader
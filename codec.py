@@ -0,0 +1,174 @@
+"""
+JSON codec
+One place to encode/decode JSON: orjson when it is installed, stdlib json
+otherwise. Both produce and accept bytes so callers never care which runs.
+"""
+
+import json
+import sys
+import time
+
+from config import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ============================================================
+# Backends
+# ============================================================
+
+class StdlibCodec:
+    name = 'json'
+
+    def dumps(self, obj, indent=False):
+        return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+class OrjsonCodec:
+    name = 'orjson'
+
+    def __init__(self):
+        self.fallback = StdlibCodec()
+
+    def dumps(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # Integers past 64 bits and other types orjson refuses; stdlib decides
+            return self.fallback.dumps(obj, indent)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+BACKENDS = {'json': StdlibCodec}
+if orjson is not None:
+    BACKENDS['orjson'] = OrjsonCodec
+
+_backend = None
+
+def set_backend(name='auto'):
+    """Pick a backend by name; 'auto' takes the fastest one installed"""
+    global _backend
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in BACKENDS else 'json'
+    if name not in BACKENDS:
+        print(f"⚠️ JSON codec '{name}' not installed, using stdlib json")
+        name = 'json'
+    _backend = BACKENDS[name]()
+    return _backend.name
+
+def backend_name():
+    return _backend.name
+
+set_backend(JSON_CODEC)
+
+# ============================================================
+# API
+# ============================================================
+
+def dumps(obj, indent=False):
+    """Encode to UTF-8 bytes (indent=True for files people read)"""
+    return _backend.dumps(obj, indent)
+
+def loads(data):
+    """Decode bytes or str (raises ValueError on bad JSON)"""
+    return _backend.loads(data)
+
+def load_file(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def dump_file(obj, path, indent=True):
+    """Write obj to path; returns the number of bytes written"""
+    data = dumps(obj, indent)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+def response_json(response):
+    """Decode a requests response body (replaces response.json())"""
+    return loads(response.content)
+
+# ============================================================
+# Benchmark (our payload shapes under each backend)
+# ============================================================
+
+def _sample_payloads():
+    from fake_providers import FakeWorld, FakeHelius, FakeAlchemy, FakeDexScreener
+    from config import WHALE_LIST_FILE
+
+    world = FakeWorld()
+    solana = 'Wha1e' + '1' * 39
+    base = '0x' + '11' * 20
+    payloads = {
+        'helius wallet': FakeHelius(world).respond('/', {
+            'method': 'getTokenAccountsByOwner',
+            'params': [solana, {}, {'encoding': 'jsonParsed'}]
+        })[1],
+        'alchemy wallet': FakeAlchemy(world).respond('/', {
+            'method': 'alchemy_getTokenBalances', 'params': [base, 'erc20']
+        })[1],
+        'dexscreener pairs': FakeDexScreener(world).respond(
+            '/latest/dex/tokens/' + next(iter(world.wallet(solana, 'solana'))), {})[1],
+    }
+
+    try:
+        payloads['whale file'] = load_file(WHALE_LIST_FILE)
+    except OSError:
+        pass
+
+    # bot_state shaped like a busy day: tracked tokens and their whale positions on
+    # both chains (Base balances are raw uint256 amounts stored as floats)
+    now = time.time()
+    whales = [f"{i:044d}" for i in range(400)]
+    tracked = {}
+    positions = {}
+    for i in range(3000):
+        chain = 'base' if i % 2 else 'solana'
+        token = f"0x{i:040x}" if chain == 'base' else f"T{i:043d}"
+        initial, current = (1_000_000.5, 900_000.25) if chain == 'solana' else (1_000_000.5e18, 900_000.25e18)
+        buyers = whales[i % 397:i % 397 + 3]
+        tracked[token] = {
+            'symbol': f"TKN{i}", 'chain': chain, 'initial_price': 0.0001 * (i + 1),
+            'initial_mc': 250_000.0 + i, 'current_price': 0.00012 * (i + 1), 'highest_price': 0.00015 * (i + 1),
+            'max_gain': 50.0, 'current_gain': 20.0, 'whales_bought': buyers,
+            'whale_balances': {w: initial for w in buyers}, 'first_alert_time': now,
+            'last_check_time': now, 'alerts_sent': {'100': True}, 'status': 'active', 'sells_detected': []
+        }
+        for w in buyers:
+            positions[f"{w}_{token}"] = {
+                'whale': w, 'token': token, 'symbol': f"TKN{i}", 'chain': chain,
+                'initial_balance': initial, 'current_balance': current, 'last_check': now
+            }
+    payloads['bot_state'] = {'tracked_tokens': tracked, 'whale_token_balances': positions,
+                             'multi_buys': {}, 'whale_performance': {}, 'alerts_sent': 12345}
+    return payloads
+
+def run_benchmark(min_seconds=0.2):
+    payloads = _sample_payloads()
+    print(f"🧪 JSON codec benchmark ({', '.join(BACKENDS)})")
+    for label, payload in payloads.items():
+        encoded = StdlibCodec().dumps(payload)
+        print(f"\n  {label} ({len(encoded) / 1024:.1f}KB)")
+        baseline = None
+        for name, cls in BACKENDS.items():
+            codec = cls()
+            timings = []
+            for step in (lambda: codec.dumps(payload), lambda: codec.loads(encoded)):
+                runs = 0
+                started = time.perf_counter()
+                while time.perf_counter() - started < min_seconds:
+                    step()
+                    runs += 1
+                timings.append((time.perf_counter() - started) * 1000 / runs)
+            speedup = f" ({baseline[0] / timings[0]:.1f}x / {baseline[1] / timings[1]:.1f}x)" if baseline else ''
+            baseline = baseline or timings
+            print(f"    {name:<7} encode {timings[0]:8.3f}ms | decode {timings[1]:8.3f}ms{speedup}")
+
+if __name__ == '__main__':
+    run_benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2)
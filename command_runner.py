@@ -0,0 +1,135 @@
+"""
+Concurrent Telegram command execution
+The update listener hands commands to a worker pool and goes straight
+back to polling; workers run the handler, send the reply and record
+per-command latency
+"""
+
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import COMMAND_WORKERS, COMMAND_LATENCY_SAMPLES
+from commands import handle_command, command_name, COMMANDS, SERIAL_COMMANDS
+from state import bot_state
+from utils import send_telegram_message
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class CommandRunner:
+    """Worker pool for commands with latency tracking"""
+
+    def __init__(self, workers=COMMAND_WORKERS, handler=handle_command, sender=send_telegram_message):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='command')
+        self.handler = handler
+        self.sender = sender
+        self.serial_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.latencies = {}
+        self.counts = {}
+        self.errors = {}
+        self.queued = 0
+
+    def submit(self, text, user_id, chat_id):
+        """Queue a command and return immediately"""
+        with self.stats_lock:
+            self.queued += 1
+        return self.pool.submit(self._run, text, user_id, chat_id, time.perf_counter())
+
+    def submit_task(self, fn, *args):
+        """Run other blocking work (e.g. state saves) off the polling thread"""
+        return self.pool.submit(fn, *args)
+
+    def _run(self, text, user_id, chat_id, queued_at):
+        name = command_name(text)
+        if name not in COMMANDS:
+            # One bucket for typos and spam so stats stay bounded
+            name = 'unknown'
+        started = time.perf_counter()
+        failed = False
+
+        try:
+            if name in SERIAL_COMMANDS:
+                with self.serial_lock:
+                    reply = self.handler(text, user_id)
+            else:
+                reply = self.handler(text, user_id)
+
+            if reply:
+                if self.sender(reply, chat_id):
+                    print(f"   ✅ Response sent! ({name})")
+                else:
+                    failed = True
+                    print(f"   ❌ Failed to send ({name})")
+        except Exception as e:
+            failed = True
+            print(f"   ❌ Command error: {e}")
+            traceback.print_exc()
+        finally:
+            finished = time.perf_counter()
+            self._record(name, (finished - queued_at) * 1000, (started - queued_at) * 1000, failed)
+
+    def _record(self, name, total_ms, wait_ms, failed):
+        with self.stats_lock:
+            self.queued -= 1
+            self.latencies.setdefault(name, deque(maxlen=COMMAND_LATENCY_SAMPLES)).append((total_ms, wait_ms))
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def pending(self):
+        with self.stats_lock:
+            return self.queued
+
+    def latency_report(self):
+        """count / p50 / p95 / max (queue wait + handler + send) and errors per command"""
+        with self.stats_lock:
+            report = {}
+            for name, samples in self.latencies.items():
+                totals = [total for total, _ in samples]
+                report[name] = {
+                    'count': self.counts[name],
+                    'errors': self.errors.get(name, 0),
+                    'p50_ms': _percentile(totals, 50),
+                    'p95_ms': _percentile(totals, 95),
+                    'max_ms': max(totals),
+                    'p95_wait_ms': _percentile([wait for _, wait in samples], 95)
+                }
+            return report
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+_runner = None
+_runner_lock = threading.Lock()
+_update_lock = threading.Lock()
+
+def dispatch_update(update, runner=None):
+    """
+    Queue the command in a Telegram update (from getUpdates or the webhook).
+    Returns False for updates already seen, so redelivery is harmless.
+    """
+    with _update_lock:
+        if update.get('update_id', 0) <= bot_state.get('last_update_id', 0):
+            return False
+        bot_state['last_update_id'] = update['update_id']
+
+    message = update.get('message') or {}
+    text = message.get('text')
+
+    if text and text.startswith('/'):
+        print(f"\n💬 COMMAND: {text}")
+        (runner or get_command_runner()).submit(text, message['from']['id'], message['chat']['id'])
+
+    return True
+
+def get_command_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = CommandRunner()
+        return _runner
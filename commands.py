@@ -2,61 +2,52 @@
 All Telegram command handlers - UPGRADED WITH EMOJIS
 """
 
-import json
+import time
 from datetime import datetime
 from config import TIER_CONFIG, DEFAULT_FILTERS, is_admin
-from state import bot_state, save_bot_state
+from state import bot_state, save_bot_state, mark_changed, state_lock, state_metrics
+from codec import backend_name
+from whale_store import get_whale_store
+from views import whale_counts, tracked_ranking, response_cache
+
+# Read-only commands whose rendered reply is cached until these topics change
+CACHED_COMMANDS = {
+    '/stats': ('whales', 'tracked', 'stats'),
+    '/tiers': ('whales',),
+    '/tier1': ('whales',),
+    '/tier2': ('whales',),
+    '/tier3': ('whales',),
+    '/tier4': ('whales',),
+    '/tracked': ('tracked',),
+    '/multibuys': ('multibuys', 'tracked'),
+    '/lastbuys': ('buys',),
+}
+
+def command_name(command_text):
+    """'/stats@MyBot extra' -> '/stats'"""
+    parts = command_text.strip().split()
+    return parts[0].split('@')[0].lower() if parts else ''
 
 def handle_command(command_text, user_id):
     text = command_text.strip()
     if '@' in text:
         text = text.split('@')[0]
 
-    if text == '/start':
-        return cmd_start(None)
-    elif text == '/help':
-        return cmd_help(None)
-    elif text == '/stats':
-        return cmd_stats(None, bot_state)
-    elif text == '/tracked':
-        return cmd_tracked(None, bot_state)
-    elif text == '/topwhales':
-        return cmd_topwhales(None, bot_state)
-    elif text == '/performance':
-        return cmd_performance(None, bot_state)
-    elif text == '/tiers':
-        return cmd_tiers(None, bot_state)
-    elif text == '/tier1':
-        return cmd_tier_detail(None, bot_state, 1)
-    elif text == '/tier2':
-        return cmd_tier_detail(None, bot_state, 2)
-    elif text == '/tier3':
-        return cmd_tier_detail(None, bot_state, 3)
-    elif text == '/tier4':
-        return cmd_tier_detail(None, bot_state, 4)
-    elif text == '/multibuys':
-        return cmd_multibuys(None, bot_state)
-    elif text == '/promotions':
-        return cmd_promotions(None, bot_state)
-    elif text == '/guide':
-        return cmd_guide(None)
-    elif text == '/lastbuys':
-        return cmd_lastbuys(None, bot_state)
-    elif text == '/filters':
-        return cmd_filters(None)
-    elif text == '/pause':
-        return cmd_pause(None, user_id)
-    elif text == '/resume':
-        return cmd_resume(None, user_id)
-    elif text.startswith('/setfilter'):
-        return cmd_setfilter(None, user_id, text)
-    elif text.startswith('/addwhale'):
-        return cmd_addwhale(None, user_id, text)
-    elif text.startswith('/removewhale'):
-        return cmd_removewhale(None, user_id, text)
-    else:
+    name = command_name(text)
+    handler = COMMANDS.get(name)
+
+    if handler is None:
         return "❌ Unknown command. Use /help"
 
+    if name in CACHED_COMMANDS:
+        if name == '/multibuys':
+            # Window expiry is time-driven; run it so it can invalidate the cached reply
+            from multibuy_index import get_multi_buy_index
+            get_multi_buy_index().expire()
+        return response_cache.get(name, CACHED_COMMANDS[name], lambda: handler(text, user_id))
+
+    return handler(text, user_id)
+
 def cmd_start(chat_id):
     msg = "🐋 <b>WHALE TRACKER BOT V4</b>\n\n"
     msg += "Welcome! I monitor elite crypto whales across Solana & Base chains.\n\n"
@@ -75,16 +66,24 @@ def cmd_help(chat_id):
     msg += "      📊 <b>STATISTICS</b>\n"
     msg += "╚══════════════════════════════════╝\n"
     msg += "/stats 📈 - Bot statistics\n"
-    msg += "/tiers 🏆 - Tier information\n\n"
+    msg += "/tiers 🏆 - Tier information\n"
+    msg += "/shards 🧩 - Worker shard health\n"
+    msg += "/cluster 🌐 - Cluster nodes & leases\n"
+    msg += "/cache 🗃️ - Command cache hit rate\n"
+    msg += "/cmdstats ⏱️ - Command latency\n"
+    msg += "/statestats 🔐 - State locks & save timings\n"
+    msg += "/alertstats 📨 - Alert coalescing\n"
+    msg += "/rpcstats 🔌 - RPC endpoint health\n\n"
     msg += "╔══════════════════════════════════╗\n"
     msg += "      🔍 <b>TRACKING</b>\n"
     msg += "╚══════════════════════════════════╝\n"
     msg += "/tracked 💎 - Active tokens\n"
-    msg += "/topwhales 🐋 - Top performers\n"
+    msg += "/topwhales 🐋 - Top performers (24h/7d/30d)\n"
     msg += "/lastbuys 🔥 - Recent buys\n"
     msg += "/multibuys 🎯 - Multi-whale buys\n"
     msg += "/performance 👑 - Whale leaderboard\n"
-    msg += "/promotions ⬆️ - Tier changes\n\n"
+    msg += "/promotions ⬆️ - Tier changes\n"
+    msg += "/history 🗄️ - Token history (incl. archive)\n\n"
     msg += "╔══════════════════════════════════╗\n"
     msg += "      ⚙️ <b>ADMIN CONTROLS</b>\n"
     msg += "╚══════════════════════════════════╝\n"
@@ -93,7 +92,8 @@ def cmd_help(chat_id):
     msg += "/addwhale ➕ - Add whale manually\n"
     msg += "/removewhale ❌ - Remove whale\n"
     msg += "/filters 🎛️ - View filter settings\n"
-    msg += "/setfilter 🔧 - Change filters\n\n"
+    msg += "/setfilter 🔧 - Change filters\n"
+    msg += "/latency ⏱️ - Buy detection latency\n\n"
     msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
     msg += "<b>🚀 FEATURES:</b>\n"
     msg += "✅ Multi-buy detection\n"
@@ -106,20 +106,18 @@ def cmd_help(chat_id):
 
 def cmd_stats(chat_id, bot_state):
     try:
-        with open('whales_tiered_final.json', 'r') as f:
-            whales = json.load(f)
+        counts = whale_counts.get()
 
-        total = len(whales)
-        sol = len([w for w in whales if w.get('chain') == 'solana'])
-        base = len([w for w in whales if w.get('chain') == 'base'])
+        total = counts['total']
+        sol = counts['chains'].get('solana', 0)
+        base = counts['chains'].get('base', 0)
 
-        t1 = len([w for w in whales if w.get('tier') == 1])
-        t2 = len([w for w in whales if w.get('tier') == 2])
-        t3 = len([w for w in whales if w.get('tier') == 3])
-        t4 = len([w for w in whales if w.get('tier') == 4])
+        t1 = counts['tiers'].get(1, 0)
+        t2 = counts['tiers'].get(2, 0)
+        t3 = counts['tiers'].get(3, 0)
+        t4 = counts['tiers'].get(4, 0)
 
-        tracked = bot_state.get('tracked_tokens', {})
-        active = len([t for t in tracked.values() if t.get('status') == 'active'])
+        active = len(tracked_ranking.get())
         alerts = bot_state.get('alerts_sent', 0)
         filtered = bot_state.get('tokens_filtered', 0)
 
@@ -150,13 +148,12 @@ def cmd_stats(chat_id, bot_state):
 
 def cmd_tiers(chat_id, bot_state):
     try:
-        with open('whales_tiered_final.json', 'r') as f:
-            whales = json.load(f)
+        counts = whale_counts.get()['tiers']
 
-        t1 = len([w for w in whales if w.get('tier') == 1])
-        t2 = len([w for w in whales if w.get('tier') == 2])
-        t3 = len([w for w in whales if w.get('tier') == 3])
-        t4 = len([w for w in whales if w.get('tier') == 4])
+        t1 = counts.get(1, 0)
+        t2 = counts.get(2, 0)
+        t3 = counts.get(3, 0)
+        t4 = counts.get(4, 0)
 
         msg = "🏆 <b>TIER SYSTEM</b>\n\n"
         msg += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
@@ -190,23 +187,21 @@ def cmd_tiers(chat_id, bot_state):
 
 def cmd_tier_detail(chat_id, bot_state, tier_num):
     try:
-        with open('whales_tiered_final.json', 'r') as f:
-            whales = json.load(f)
-
-        tier_whales = [w for w in whales if w.get('tier') == tier_num]
+        counts = whale_counts.get()
+        tier_total = counts['tiers'].get(tier_num, 0)
 
-        if not tier_whales:
+        if not tier_total:
             return f"📭 No whales in Tier {tier_num}"
 
-        sol = len([w for w in tier_whales if w.get('chain') == 'solana'])
-        base = len([w for w in tier_whales if w.get('chain') == 'base'])
+        sol = counts['tier_chains'].get((tier_num, 'solana'), 0)
+        base = counts['tier_chains'].get((tier_num, 'base'), 0)
 
         tier_icons = {1: "🔥", 2: "⭐", 3: "💫", 4: "⚪"}
         icon = tier_icons.get(tier_num, "🔹")
 
         msg = f"{icon} <b>TIER {tier_num} DETAILS</b>\n\n"
         msg += "━━━━━━━━━━━━━━━━━━━━\n"
-        msg += f"Total Whales: <b>{len(tier_whales)}</b>\n"
+        msg += f"Total Whales: <b>{tier_total}</b>\n"
         msg += f"🟣 Solana: <b>{sol}</b>\n"
         msg += f"🔵 Base: <b>{base}</b>\n"
         msg += "━━━━━━━━━━━━━━━━━━━━"
@@ -215,14 +210,13 @@ def cmd_tier_detail(chat_id, bot_state, tier_num):
         return f"❌ Error: {str(e)}"
 
 def cmd_tracked(chat_id, bot_state):
-    tracked = bot_state.get('tracked_tokens', {})
-    active = {k: v for k, v in tracked.items() if v.get('status') == 'active'}
+    active = tracked_ranking.get()
 
     if not active:
         return "📭 No tokens being tracked yet"
 
     msg = f"💎 <b>TRACKED TOKENS ({len(active)})</b>\n\n"
-    sorted_tokens = sorted(active.items(), key=lambda x: x[1].get('current_gain', 0), reverse=True)[:15]
+    sorted_tokens = active[:15]
 
     for i, (addr, data) in enumerate(sorted_tokens, 1):
         symbol = data.get('symbol', 'UNKNOWN')
@@ -239,61 +233,91 @@ def cmd_tracked(chat_id, bot_state):
 
     return msg
 
-def cmd_topwhales(chat_id, bot_state):
-    perf = bot_state.get('whale_performance', {})
+def cmd_topwhales(chat_id, bot_state, command_text='/topwhales'):
+    from config import PERFORMANCE_WINDOWS, LEADERBOARD_MIN_CALLS
+    from performance_index import get_performance_index, LIFETIME
+
+    parts = command_text.split()
+    window = parts[1].lower() if len(parts) > 1 else LIFETIME
 
-    if not perf:
+    if window != LIFETIME and window not in PERFORMANCE_WINDOWS:
+        return f"❌ Window must be one of: {', '.join(PERFORMANCE_WINDOWS)} (or none for all-time)"
+
+    if not bot_state.get('whale_performance'):
         return "📭 No performance data yet"
 
-    stats = []
-    for addr, data in perf.items():
-        if data['tokens_tracked'] >= 3:
-            rate = (data['successful_calls'] / data['tokens_tracked']) * 100
-            avg_gain = data['total_gain'] / data['tokens_tracked']
-            stats.append({
-                'addr': addr,
-                'rate': rate,
-                'avg': avg_gain,
-                'best': data['best_call'],
-                'calls': data['tokens_tracked']
-            })
+    stats = get_performance_index().leaderboard(window, 10)
 
     if not stats:
-        return "📊 Need more data (min 3 calls per whale)"
-
-    stats.sort(key=lambda x: x['rate'], reverse=True)
+        return f"📊 Need more data (min {LEADERBOARD_MIN_CALLS} calls per whale)"
 
-    msg = "🐋 <b>TOP PERFORMING WHALES</b>\n\n"
-    for i, s in enumerate(stats[:10], 1):
-        short = f"{s['addr'][:6]}...{s['addr'][-4:]}"
+    label = "ALL-TIME" if window == LIFETIME else window.upper()
+    msg = f"🐋 <b>TOP PERFORMING WHALES ({label})</b>\n\n"
+    for i, s in enumerate(stats, 1):
+        short = f"{s['address'][:6]}...{s['address'][-4:]}"
         msg += f"{i}. <code>{short}</code>\n"
-        msg += f"   Success: <b>{s['rate']:.0f}%</b> | Avg: <b>{s['avg']:+.1f}%</b>\n"
-        msg += f"   Best: <b>{s['best']:.0f}%</b> | Calls: {s['calls']}\n\n"
+        msg += f"   Success: <b>{s['success_rate']:.0f}%</b> | Avg: <b>{s['avg_gain']:+.1f}%</b>\n"
+        msg += f"   Best: <b>{s['best_call']:.0f}%</b> | Calls: {s['calls']}\n\n"
 
     return msg
 
-def cmd_performance(chat_id, bot_state):
-    return cmd_topwhales(chat_id, bot_state)
+def cmd_performance(chat_id, bot_state, command_text='/performance'):
+    return cmd_topwhales(chat_id, bot_state, command_text)
 
 def cmd_multibuys(chat_id, bot_state):
-    multi = bot_state.get('multi_buys', {})
+    from multibuy_index import get_multi_buy_index
+
+    active = get_multi_buy_index().active()
     tracked = bot_state.get('tracked_tokens', {})
 
-    if not multi:
+    if not active:
         return "📭 No multi-buy events detected yet"
 
     msg = "🎯 <b>MULTI-BUY ALERTS</b>\n\n"
     
-    for token_addr in list(multi.keys())[:10]:
-        if token_addr in tracked:
-            data = tracked[token_addr]
-            symbol = data.get('symbol', 'UNKNOWN')
-            whale_count = len(data.get('whales_bought', []))
-            gain = data.get('current_gain', 0)
-            
-            msg += f"🔥 <b>{symbol}</b>\n"
-            msg += f"   Whales: <b>{whale_count}</b> | Gain: <b>{gain:+.1f}%</b>\n"
-            msg += f"   <code>{token_addr[:16]}...</code>\n\n"
+    for row in active[:10]:
+        token_addr = row['token']
+        symbol = row.get('symbol') or tracked.get(token_addr, {}).get('symbol', 'UNKNOWN')
+        gain = tracked.get(token_addr, {}).get('current_gain', 0)
+        fire = "🔥" * min(row['level'], 3)
+        
+        msg += f"{fire} <b>{symbol}</b>\n"
+        msg += f"   Whales: <b>{row['whale_count']}</b> | Gain: <b>{gain:+.1f}%</b>\n"
+        msg += f"   <code>{token_addr[:16]}...</code>\n\n"
+
+    return msg
+
+def cmd_history(chat_id, bot_state, command_text):
+    from archive import find_archived_tokens, archive_stats
+
+    parts = command_text.split()
+    if len(parts) < 2:
+        stats = archive_stats()
+        msg = "🗄️ <b>ARCHIVE</b>\n\n"
+        for collection, info in stats.items():
+            msg += f"• {collection}: <b>{info['files']}</b> files, <b>{info['bytes'] / 1024:.0f} KB</b>\n"
+        msg += "\nUsage: /history SYMBOL or /history ADDRESS"
+        return msg
+
+    query = parts[1].lower()
+    with state_lock('tracked_tokens'):
+        rows = [
+            ('🟢 live', addr, data)
+            for addr, data in bot_state.get('tracked_tokens', {}).items()
+            if addr.lower() == query or str(data.get('symbol', '')).lower() == query
+        ]
+    rows += [('🗄️ archived', entry['key'], entry['record']) for entry in find_archived_tokens(query)]
+
+    if not rows:
+        return f"📭 No history for {parts[1]}"
+
+    msg = f"🗄️ <b>HISTORY: {parts[1]}</b>\n\n"
+    for source, addr, data in rows[:5]:
+        first_alert = datetime.fromtimestamp(data.get('first_alert_time', 0)).strftime('%Y-%m-%d')
+        msg += f"{source} <b>{data.get('symbol', 'UNKNOWN')}</b> ({first_alert})\n"
+        msg += f"   Gain: <b>{data.get('current_gain', 0):+.1f}%</b> | ATH: <b>{data.get('max_gain', 0):.1f}%</b>\n"
+        msg += f"   Whales: <b>{len(data.get('whales_bought', []))}</b> | Status: {data.get('closed_reason') or data.get('status', '?')}\n"
+        msg += f"   <code>{addr[:16]}...</code>\n\n"
 
     return msg
 
@@ -340,6 +364,180 @@ def cmd_promotions(chat_id, bot_state):
 
     return msg
 
+def cmd_shards(chat_id):
+    from sharding import get_coordinator
+
+    coordinator = get_coordinator()
+
+    if not coordinator:
+        return "🧩 Sharding is off - whales are polled by in-process tier threads"
+
+    status_icons = {'healthy': '🟢', 'starting': '🟡', 'stale': '🟠', 'dead': '🔴'}
+
+    msg = f"🧩 <b>SHARD HEALTH ({coordinator.shard_count} workers)</b>\n\n"
+    for row in coordinator.health_report():
+        icon = status_icons.get(row['status'], '⚪')
+        age = f"{row['heartbeat_age']:.0f}s ago" if row['heartbeat_age'] is not None else "never"
+        msg += f"{icon} <b>Shard {row['shard']}</b> ({row['status']}) - pid {row['pid'] or '?'}\n"
+        msg += f"   Whales: <b>{row['whales']}</b> | Checks: <b>{row['checks']:,}</b> | Errors: <b>{row['errors']}</b>\n"
+        msg += f"   Events: <b>{row['events_sent']}</b> | T1 cycle: <b>{row['tier1_cycle_seconds']:.1f}s</b>\n"
+        msg += f"   Heartbeat: {age}\n\n"
+
+    msg += f"📨 Buy events handled: <b>{coordinator.buy_events}</b>\n"
+    msg += f"♻️ Worker restarts: <b>{coordinator.restarts}</b>"
+    return msg
+
+def cmd_cluster(chat_id):
+    from cluster import get_cluster_node
+
+    node = get_cluster_node()
+
+    if not node:
+        return "🌐 Cluster mode is off - this bot runs as a single node"
+
+    status = node.status()
+
+    msg = "🌐 <b>CLUSTER STATUS</b>\n\n"
+    msg += f"👑 Leader: <code>{status['leader'] or 'none'}</code>\n"
+    msg += f"📍 This node: <code>{status['node_id']}</code>\n\n"
+    msg += "━━━━━━━━━━━━━━━━━━━━\n"
+    for member in status['nodes']:
+        info = member['info']
+        crown = "👑 " if info.get('leader') else ""
+        age = time.time() - member['heartbeat']
+        msg += f"{crown}<code>{member['node_id']}</code>\n"
+        msg += f"   Partitions: <b>{len(info.get('partitions', []))}</b> | Whales: <b>{info.get('whales', 0)}</b>\n"
+        msg += f"   Heartbeat: {age:.0f}s ago\n"
+    msg += "━━━━━━━━━━━━━━━━━━━━\n"
+    msg += f"⚠️ Unowned partitions: <b>{len(status['unowned'])}</b>\n"
+    msg += f"📨 Forwarded: <b>{status['forwarded']}</b> | Handled: <b>{status['handled']}</b>\n"
+    msg += f"📥 Event backlog: <b>{status['backlog']}</b>"
+    return msg
+
+def cmd_cache(chat_id):
+    report = response_cache.report()
+
+    if not report:
+        return "🗃️ No cached command replies yet"
+
+    hits = sum(r['hits'] for r in report.values())
+    lookups = hits + sum(r['misses'] for r in report.values())
+
+    msg = "🗃️ <b>RESPONSE CACHE</b>\n\n"
+    for command, stats in sorted(report.items(), key=lambda x: -(x[1]['hits'] + x[1]['misses'])):
+        total = stats['hits'] + stats['misses']
+        msg += f"<code>{command}</code> - <b>{stats['hits'] / total * 100:.0f}%</b> hits ({stats['hits']}/{total})\n"
+    msg += f"\n📊 Overall: <b>{hits / lookups * 100:.0f}%</b> of {lookups} lookups\n"
+    msg += f"♻️ View rebuilds: whales <b>{whale_counts.rebuilds}</b> | tracked <b>{tracked_ranking.rebuilds}</b>"
+    return msg
+
+def cmd_cmdstats(chat_id):
+    from command_runner import get_command_runner
+
+    report = get_command_runner().latency_report()
+
+    if not report:
+        return "⏱️ No commands handled yet"
+
+    msg = "⏱️ <b>COMMAND LATENCY</b>\n\n"
+    for command, stats in sorted(report.items(), key=lambda x: -x[1]['count']):
+        msg += f"<code>{command}</code> ×{stats['count']}"
+        msg += f" - p50 <b>{stats['p50_ms']:.0f}ms</b> | p95 <b>{stats['p95_ms']:.0f}ms</b> | max {stats['max_ms']:.0f}ms\n"
+        if stats['errors']:
+            msg += f"   ❌ Errors: {stats['errors']}\n"
+    msg += f"\n📥 Queued now: <b>{get_command_runner().pending()}</b>"
+    return msg
+
+def cmd_statestats(chat_id):
+    metrics = state_metrics()
+    persistence = metrics['persistence']
+
+    msg = "🔐 <b>STATE LOCKS</b>\n\n"
+    for name, stats in metrics['locks'].items():
+        contended = stats['contended'] / stats['acquisitions'] * 100 if stats['acquisitions'] else 0
+        msg += f"<code>{name}</code> ×{stats['acquisitions']} - contended <b>{contended:.1f}%</b>"
+        msg += f" | wait max <b>{stats['wait_ms_max']:.1f}ms</b> (total {stats['wait_ms_total']:.0f}ms)"
+        msg += f" | hold max {stats['hold_ms_max']:.1f}ms\n"
+
+    msg += "\n💾 <b>PERSISTENCE</b>\n"
+    msg += f"Saves requested: <b>{persistence['requests']}</b> | written: <b>{persistence['writes']}</b>\n"
+    msg += f"Snapshot: <b>{persistence['snapshot_ms_last']:.1f}ms</b> (max {persistence['snapshot_ms_max']:.1f}ms)\n"
+    msg += f"Serialize: <b>{persistence['serialize_ms_last']:.1f}ms</b> (max {persistence['serialize_ms_max']:.1f}ms, {backend_name()})\n"
+    msg += f"File: <b>{persistence['bytes'] / 1024:.0f} KB</b>"
+    if persistence['errors']:
+        msg += f"\n❌ Errors: {persistence['errors']}"
+    return msg
+
+def cmd_alertstats(chat_id):
+    from alert_coalescer import get_alert_coalescer
+
+    report = get_alert_coalescer().report()
+
+    msg = "📨 <b>ALERT COALESCING</b>\n\n"
+    if report['window'] <= 0:
+        msg += "⏸️ Off - every buy is alerted on its own\n\n"
+    else:
+        msg += f"Window: <b>{report['window']:g}s</b>\n\n"
+    msg += f"🐋 Buy alerts: <b>{report['buys']}</b> | 🔥 Multi-buy: <b>{report['multi_buys']}</b>\n"
+    msg += f"📤 Messages sent: <b>{report['messages']}</b>\n"
+    msg += f"♻️ Folded into another message: <b>{report['saved']}</b>\n"
+    if 'delay_p50' in report:
+        msg += f"⏱️ Delay: p50 <b>{report['delay_p50']:.1f}s</b> | p95 <b>{report['delay_p95']:.1f}s</b> | max {report['delay_max']:.1f}s\n"
+    msg += f"📥 Pending now: <b>{report['pending']}</b>"
+    return msg
+
+def cmd_rpcstats(chat_id):
+    from rpc import rpc_pool_reports
+
+    reports = rpc_pool_reports()
+    if not reports:
+        return "🔌 No RPC requests yet"
+
+    state_icons = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+    msg = "🔌 <b>RPC ENDPOINTS</b>\n"
+    for chain, report in sorted(reports.items()):
+        msg += f"\n<b>{chain.upper()}</b> - {report['requests']} requests"
+        msg += f" | failovers {report['failovers']} | failed {report['errors']} | rejected {report['rejected']}\n"
+        for endpoint in report['endpoints']:
+            latency = f"p50 <b>{endpoint['p50_ms']:.0f}ms</b> | p95 <b>{endpoint['p95_ms']:.0f}ms</b>" if endpoint['p50_ms'] is not None else "no samples"
+            msg += f"{state_icons.get(endpoint['state'], '⚪')} <code>{endpoint['name']}</code> - {latency}"
+            msg += f" | errors {endpoint['error_rate'] * 100:.0f}% | trips {endpoint['trips']}\n"
+        for tier, hedge in sorted(report['hedging'].items()):
+            if not hedge['requests']:
+                continue
+            msg += f"🪃 Tier {tier} hedging: <b>{hedge['hedge_rate'] * 100:.1f}%</b> of {hedge['requests']}"
+            msg += f" (budget {hedge['budget'] * 100:.0f}%, {hedge['wins']} won)"
+            if hedge['p99_ms'] is not None:
+                msg += f" | p99 <b>{hedge['p99_ms']:.0f}ms</b> vs {hedge['unhedged_p99_ms']:.0f}ms unhedged"
+            msg += "\n"
+    return msg
+
+def cmd_latency(chat_id, user_id):
+    if not is_admin(user_id):
+        return "🔒 <b>ACCESS DENIED</b> - Admin only"
+
+    from detection_latency import get_detection_latency
+
+    report = get_detection_latency().report()
+    stages = [('chain_to_detect', '⛓️ <b>CHAIN → DETECT</b>'), ('detect_to_send', '📤 <b>DETECT → SEND</b>')]
+    if not any(report[stage] for stage, _ in stages):
+        return "⏱️ No buys timed yet"
+
+    msg = "⏱️ <b>DETECTION LATENCY</b>\n"
+    for stage, title in stages:
+        msg += f"\n{title}\n"
+        for chain, tiers in sorted(report[stage].items()):
+            for tier, hist in sorted(tiers.items()):
+                msg += f"{TIER_CONFIG.get(tier, {}).get('emoji', '📊')} T{tier} {chain}: "
+                msg += f"p50 <b>{hist['p50']:.1f}s</b> | p90 <b>{hist['p90']:.1f}s</b> | p99 {hist['p99']:.1f}s"
+                msg += f" ({hist['count']} buys"
+                if stage == 'chain_to_detect' and tier in TIER_CONFIG:
+                    msg += f", every {TIER_CONFIG[tier]['interval']}s"
+                msg += ")\n"
+    if report['lookups']:
+        msg += f"\n🔎 Block time lookups: {report['lookups']} ({report['lookups_failed']} not found)"
+    return msg
+
 def cmd_guide(chat_id):
     msg = "📖 <b>WHALE TRACKER GUIDE</b>\n\n"
     msg += "━━━━━━━━━━━━━━━━━━━━\n"
@@ -384,6 +582,7 @@ def cmd_pause(chat_id, user_id):
         return "🔒 <b>ACCESS DENIED</b> - Admin only"
 
     bot_state['paused'] = True
+    mark_changed('stats')
     save_bot_state()
     return "⏸️ <b>BOT PAUSED</b>\n\nMonitoring stopped. Use /resume to restart."
 
@@ -392,6 +591,7 @@ def cmd_resume(chat_id, user_id):
         return "🔒 <b>ACCESS DENIED</b> - Admin only"
 
     bot_state['paused'] = False
+    mark_changed('stats')
     save_bot_state()
     return "▶️ <b>BOT RESUMED</b>\n\nMonitoring active!"
 
@@ -410,10 +610,11 @@ def cmd_setfilter(chat_id, user_id, command_text):
     except:
         return "❌ Invalid value - must be a number"
 
-    if 'filters' not in bot_state:
-        bot_state['filters'] = DEFAULT_FILTERS.copy()
+    with state_lock('filters'):
+        if 'filters' not in bot_state:
+            bot_state['filters'] = DEFAULT_FILTERS.copy()
 
-    bot_state['filters'][setting] = value
+        bot_state['filters'][setting] = value
     save_bot_state()
 
     return f"✅ <b>Filter Updated!</b>\n\n{setting} = ${value:,.0f}"
@@ -425,7 +626,9 @@ def cmd_addwhale(chat_id, user_id, command_text):
     parts = command_text.strip().split()
 
     if len(parts) < 3:
-        return "❌ Usage: /addwhale [address] [chain]\n\nExample: /addwhale ABC123... solana"
+        return ("❌ Usage: /addwhale [address] [chain] [wins] [win rate]\n\n"
+                "Example: /addwhale ABC123... solana\n"
+                "With wins/win rate the whale is tiered like the rest of the list (default Tier 1)")
 
     address = parts[1]
     chain = parts[2].lower()
@@ -434,27 +637,39 @@ def cmd_addwhale(chat_id, user_id, command_text):
         return "❌ Chain must be 'solana' or 'base'"
 
     try:
-        with open('whales_tiered_final.json', 'r') as f:
-            whales = json.load(f)
+        win_count = int(parts[3]) if len(parts) > 3 else 0
+        win_rate = float(parts[4]) if len(parts) > 4 else 0
+    except ValueError:
+        return "❌ Wins and win rate must be numbers"
 
-        if any(w['address'] == address for w in whales):
-            return "❌ Wallet already tracked"
+    try:
+        store = get_whale_store()
 
         whale = {
             'address': address,
             'chain': chain,
             'tier': 1,
-            'win_count': 0,
-            'win_rate': 0,
+            'check_interval': TIER_CONFIG[1]['interval'],
+            'win_count': win_count,
+            'win_rate': win_rate,
             'total_calls': 0,
             'source': 'manual',
             'added_date': datetime.now().strftime('%Y-%m-%d')
         }
 
-        whales.append(whale)
+        if address in store:
+            return "❌ Wallet already tracked"
+
+        # Place the whale against the cached tier cut points instead of reclassifying everyone
+        if len(parts) > 3:
+            from whale_classifier import get_classifier
+            get_classifier().insert(whale)
+
+        if not store.add(whale):
+            return "❌ Wallet already tracked"
 
-        with open('whales_tiered_final.json', 'w') as f:
-            json.dump(whales, f, indent=2)
+        tier = whale['tier']
+        interval = whale['check_interval']
 
         chain_icon = "🟣" if chain == "solana" else "🔵"
         
@@ -463,9 +678,9 @@ def cmd_addwhale(chat_id, user_id, command_text):
         msg += f"{chain_icon} <code>{address[:16]}...</code>\n"
         msg += f"━━━━━━━━━━━━━━━━━━━━\n"
         msg += f"Chain: <b>{chain.upper()}</b>\n"
-        msg += f"Tier: <b>1 (Elite)</b>\n"
-        msg += f"Check Interval: <b>30 seconds</b>\n\n"
-        msg += f"🐋 Now tracking <b>{len(whales)}</b> whales"
+        msg += f"Tier: <b>{tier} ({TIER_CONFIG[tier]['name']})</b>\n"
+        msg += f"Check Interval: <b>{interval:,} seconds</b>\n\n"
+        msg += f"🐋 Now tracking <b>{len(store)}</b> whales"
         
         return msg
     except Exception as e:
@@ -483,22 +698,56 @@ def cmd_removewhale(chat_id, user_id, command_text):
     address = parts[1]
 
     try:
-        with open('whales_tiered_final.json', 'r') as f:
-            whales = json.load(f)
-
-        original = len(whales)
-        whales = [w for w in whales if w['address'] != address]
+        store = get_whale_store()
 
-        if len(whales) == original:
+        if not store.remove(address):
             return "❌ Wallet not found in tracking list"
 
-        with open('whales_tiered_final.json', 'w') as f:
-            json.dump(whales, f, indent=2)
-
         msg = "✅ <b>Whale Removed!</b>\n\n"
         msg += f"<code>{address[:16]}...</code>\n\n"
-        msg += f"🐋 Now tracking <b>{len(whales)}</b> whales"
+        msg += f"🐋 Now tracking <b>{len(store)}</b> whales"
         
         return msg
     except Exception as e:
         return f"❌ Error: {str(e)}"
+
+# ============================================================
+# Dispatch Table
+# ============================================================
+
+# Command name -> handler(command_text, user_id)
+COMMANDS = {
+    '/start': lambda text, user_id: cmd_start(None),
+    '/help': lambda text, user_id: cmd_help(None),
+    '/stats': lambda text, user_id: cmd_stats(None, bot_state),
+    '/tracked': lambda text, user_id: cmd_tracked(None, bot_state),
+    '/topwhales': lambda text, user_id: cmd_topwhales(None, bot_state, text),
+    '/performance': lambda text, user_id: cmd_performance(None, bot_state, text),
+    '/tiers': lambda text, user_id: cmd_tiers(None, bot_state),
+    '/tier1': lambda text, user_id: cmd_tier_detail(None, bot_state, 1),
+    '/tier2': lambda text, user_id: cmd_tier_detail(None, bot_state, 2),
+    '/tier3': lambda text, user_id: cmd_tier_detail(None, bot_state, 3),
+    '/tier4': lambda text, user_id: cmd_tier_detail(None, bot_state, 4),
+    '/multibuys': lambda text, user_id: cmd_multibuys(None, bot_state),
+    '/promotions': lambda text, user_id: cmd_promotions(None, bot_state),
+    '/shards': lambda text, user_id: cmd_shards(None),
+    '/cluster': lambda text, user_id: cmd_cluster(None),
+    '/cache': lambda text, user_id: cmd_cache(None),
+    '/cmdstats': lambda text, user_id: cmd_cmdstats(None),
+    '/statestats': lambda text, user_id: cmd_statestats(None),
+    '/alertstats': lambda text, user_id: cmd_alertstats(None),
+    '/rpcstats': lambda text, user_id: cmd_rpcstats(None),
+    '/guide': lambda text, user_id: cmd_guide(None),
+    '/lastbuys': lambda text, user_id: cmd_lastbuys(None, bot_state),
+    '/filters': lambda text, user_id: cmd_filters(None),
+    '/pause': lambda text, user_id: cmd_pause(None, user_id),
+    '/resume': lambda text, user_id: cmd_resume(None, user_id),
+    '/history': lambda text, user_id: cmd_history(None, bot_state, text),
+    '/setfilter': lambda text, user_id: cmd_setfilter(None, user_id, text),
+    '/addwhale': lambda text, user_id: cmd_addwhale(None, user_id, text),
+    '/removewhale': lambda text, user_id: cmd_removewhale(None, user_id, text),
+    '/latency': lambda text, user_id: cmd_latency(None, user_id),
+}
+
+# Commands that change state run one at a time even with a worker pool
+SERIAL_COMMANDS = {'/pause', '/resume', '/setfilter', '/addwhale', '/removewhale'}
@@ -19,24 +19,112 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 TELEGRAM_GROUP_ID = os.getenv('TELEGRAM_GROUP_ID')
 
+# ============================================================
+# API Endpoints (override to point at local stand-ins)
+# ============================================================
+
+HELIUS_RPC_URL = os.getenv('HELIUS_RPC_URL', f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}")
+ALCHEMY_RPC_URL = os.getenv('ALCHEMY_RPC_URL', f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}")
+DEXSCREENER_API_URL = os.getenv('DEXSCREENER_API_URL', 'https://api.dexscreener.com')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# ============================================================
+# RPC Endpoint Pools
+# ============================================================
+
+def _url_list(name):
+    return [url.strip() for url in os.getenv(name, '').split(',') if url.strip()]
+
+# Extra endpoints per chain (comma separated), used when the primary degrades.
+# Base endpoints must also serve alchemy_getTokenBalances (e.g. more Alchemy apps).
+RPC_ENDPOINTS = {
+    'solana': [HELIUS_RPC_URL] + _url_list('SOLANA_RPC_URLS'),
+    'base': [ALCHEMY_RPC_URL] + _url_list('BASE_RPC_URLS'),
+}
+# Per-request timeout: 4x the endpoint's rolling p95, kept between these bounds
+RPC_TIMEOUT = 10
+RPC_MIN_TIMEOUT = 2
+RPC_LATENCY_SAMPLES = 100
+# A breaker opens after this many failures in a row, or when this share of the
+# last RPC_LATENCY_SAMPLES requests failed; it lets one probe through after the cooldown
+RPC_BREAKER_FAILURES = 5
+RPC_BREAKER_ERROR_RATE = 0.5
+RPC_BREAKER_COOLDOWN = 30
+
+# Hedged wallet fetches: a request still unanswered after its endpoint's rolling p90
+# is sent again to the next-best endpoint, first answer wins. The budget is the
+# share of a tier's requests that may be hedged (0 = never); a p90 trigger fires on
+# ~10% of requests, so the budget needs headroom above that to reach the real stalls.
+HEDGE_BUDGET = {
+    1: float(os.getenv('HEDGE_TIER1_BUDGET', '0.2')),
+    2: float(os.getenv('HEDGE_TIER2_BUDGET', '0')),
+}
+# Unused budget carried over, in hedges
+HEDGE_BURST = 5
+HEDGE_MIN_DELAY = 0.05
+HEDGE_WORKERS = 16
+
 # ============================================================
 # File Paths
 # ============================================================
 
-WHALE_LIST_FILE = 'whales_tiered_final.json'
-BOT_STATE_FILE = 'bot_state.json'
+WHALE_LIST_FILE = os.getenv('WHALE_LIST_FILE', 'whales_tiered_final.json')
+# Binary memory-mapped copy of the whale list used at runtime (built from WHALE_LIST_FILE if missing)
+WHALE_STORE_FILE = os.getenv('WHALE_STORE_FILE', 'whales.bin')
+BOT_STATE_FILE = os.getenv('BOT_STATE_FILE', 'bot_state.json')
+
+# Set to a directory to record raw wallet and DexScreener responses for backtesting
+RECORD_DIR = os.getenv('RECORD_DIR')
+
+# Cold storage for closed/stale state records (monthly gzip JSONL)
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
 
 # ============================================================
 # Tier Configuration
 # ============================================================
 
 TIER_CONFIG = {
-    1: {'interval': 30, 'name': 'Elite', 'emoji': '🔥'},
-    2: {'interval': 180, 'name': 'Active', 'emoji': '⭐'},
-    3: {'interval': 600, 'name': 'Semi-Active', 'emoji': '📊'},
-    4: {'interval': 86400, 'name': 'Dormant', 'emoji': '💤'}
+    1: {'interval': 30, 'name': 'Elite', 'emoji': '🔥', 'throttle': 0.2, 'start_delay': 0},
+    2: {'interval': 180, 'name': 'Active', 'emoji': '⭐', 'throttle': 0.3, 'start_delay': 60},
+    3: {'interval': 600, 'name': 'Semi-Active', 'emoji': '📊', 'throttle': 0.5, 'start_delay': 120},
+    4: {'interval': 86400, 'name': 'Dormant', 'emoji': '💤', 'throttle': 1, 'start_delay': 300}
 }
 
+# Performance rules for auto promotion/demotion (checked top to bottom)
+TIER_RULES = [
+    {'tier': 1, 'min_success_rate': 60, 'min_avg_gain': 50, 'min_calls': 10},
+    {'tier': 2, 'min_success_rate': 50, 'min_avg_gain': 30, 'min_calls': 5},
+    {'tier': 3, 'min_success_rate': 40, 'min_avg_gain': 10, 'min_calls': 5},
+]
+TIER_FALLBACK = 4
+TIER_MIN_CALLS = 5
+# Seconds between re-evaluations of whales whose performance changed
+TIER_EVAL_INTERVAL = 300
+
+# Initial classification: share of whales (by win score) in tiers 1-3, rest go to tier 4
+TIER_FRACTIONS = (0.10, 0.20, 0.50)
+
+# ============================================================
+# Sharded Monitoring (multi-process)
+# ============================================================
+
+# 0 or 1 keeps the classic threaded monitors; N > 1 polls whales in N worker processes
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))
+SHARD_HEARTBEAT_SECONDS = 30
+SHARD_REFRESH_SECONDS = 5      # how often workers check the whale store for changes
+SHARD_STALE_SECONDS = 120
+
+# ============================================================
+# Cluster Mode (multi-node)
+# ============================================================
+
+# Path to a SQLite file on shared disk; setting it enables cluster mode
+CLUSTER_DB = os.getenv('CLUSTER_DB')
+CLUSTER_NODE_ID = os.getenv('CLUSTER_NODE_ID')
+CLUSTER_PARTITIONS = int(os.getenv('CLUSTER_PARTITIONS', '16'))
+CLUSTER_LEASE_SECONDS = 30
+CLUSTER_RENEW_SECONDS = 10
+
 # ============================================================
 # Filter Defaults
 # ============================================================
@@ -67,12 +155,153 @@ BLACKLIST_TOKENS = {
     '0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb',  # DAI (Base)
 }
 
+# ============================================================
+# Multi-Buy Levels (escalating alerts)
+# ============================================================
+
+# A level fires once when `whales` distinct whales bought a token within `window` seconds
+MULTI_BUY_LEVELS = [
+    {'whales': 2, 'window': 3600},
+    {'whales': 3, 'window': 3600},
+    {'whales': 5, 'window': 6 * 3600},
+]
+
+# ============================================================
+# Alert Coalescing
+# ============================================================
+
+# Buy alerts for a token are held this long, then sent as one message listing
+# every whale that bought it (0 = send each buy alert at once)
+ALERT_COALESCE_SECONDS = float(os.getenv('ALERT_COALESCE_SECONDS', '8'))
+# Coalescing delays kept for /alertstats percentiles
+ALERT_DELAY_SAMPLES = 500
+
+# ============================================================
+# Detection Latency
+# ============================================================
+
+# Look up the on-chain time of each alerted buy (one extra RPC per buy) to time
+# chain -> detect; detect -> send is always timed (0 = skip the lookup)
+DETECTION_LATENCY = os.getenv('DETECTION_LATENCY', '1') == '1'
+# Threads for those lookups, so they never hold up a monitor loop
+BUY_TIME_WORKERS = 4
+# Histogram bucket upper bounds in seconds (the last bucket is open-ended)
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+# Recent samples kept per tier/chain/stage for percentiles
+LATENCY_SAMPLES = 500
+
+# ============================================================
+# Whale Leaderboards
+# ============================================================
+
+# Rolling windows kept next to lifetime totals (name -> seconds)
+PERFORMANCE_WINDOWS = {
+    '24h': 86400,
+    '7d': 7 * 86400,
+    '30d': 30 * 86400,
+}
+# Calls a whale needs in a window to be ranked
+LEADERBOARD_MIN_CALLS = 3
+
 # ============================================================
 # Price Alert Milestones (%)
 # ============================================================
 
 PRICE_MILESTONES = [10, 25, 50, 100, 200, 500, 1000]
 
+# ============================================================
+# On-Chain Price Oracle
+# ============================================================
+
+# Price tracked tokens from their pool's reserves over RPC (0 = DexScreener only)
+ORACLE_ENABLED = os.getenv('PRICE_ORACLE', '1') == '1'
+# Retry pool discovery for tokens whose pool could not be read after this long
+ORACLE_REDISCOVER_SECONDS = 6 * 3600
+
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+# aggregate3 batches are sized so gas per call x calls stays under this eth_call gas budget
+# (nodes cap eth_call gas; 30M fits the common 50M default)
+MULTICALL_GAS_LIMIT = 30_000_000
+MULTICALL_CALL_GAS = 100_000
+# balanceOf is a cold SLOAD plus call overhead; 40k leaves room for proxied tokens
+BALANCE_OF_GAS = 40_000
+# Fetch Solana wallets as base64 mint + amount slices instead of jsonParsed (0 = jsonParsed)
+SOLANA_SLICED_ACCOUNTS = os.getenv('SOLANA_SLICED_ACCOUNTS', '1') == '1'
+
+# Quotes priced at $1, and the native quote per chain priced from a reference pool
+STABLE_QUOTES = {
+    'EPjFWdd5AufqSSqewy3WZaNW1pF3Q8dTMm24FYzJR8o',  # USDC (Solana)
+    'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB',  # USDT (Solana)
+    '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913',  # USDC (Base)
+    '0xd9aAEc86B65D86f6A7B5B1b0c42FFA531710b6CA',  # USDbC (Base)
+    '0x50c5725949A6F0c72E6C4a641F24049A917DB0Cb',  # DAI (Base)
+}
+NATIVE_QUOTES = {
+    'solana': 'So11111111111111111111111111111111111111112',
+    'base': '0x4200000000000000000000000000000000000006',
+}
+ORACLE_REFERENCE_POOLS = {
+    # Raydium AMM v4 SOL/USDC
+    'solana': {'address': os.getenv('ORACLE_SOL_USD_POOL', '58oQChx4yWmvKdwLLZzBi4ChoCc2fqCUWBkwMihLYQo2'),
+               'kind': 'raydium_amm', 'token': NATIVE_QUOTES['solana']},
+    # Uniswap v3 WETH/USDC 0.05%
+    'base': {'address': os.getenv('ORACLE_ETH_USD_POOL', '0xd0b53D9277642d899DF5C87A3966A349A798F224'),
+             'kind': 'v3', 'token': NATIVE_QUOTES['base'], 'quote': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913'},
+}
+
+# ============================================================
+# JSON Codec
+# ============================================================
+
+# 'auto' uses orjson when installed, 'json' forces the stdlib
+JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+
+# ============================================================
+# Tracked Token Lifecycle
+# ============================================================
+
+# (max token age in seconds, refresh interval in seconds); older tokens use TRACKER_MAX_INTERVAL
+TRACKER_CADENCE = [
+    (3600, 60),
+    (6 * 3600, 120),
+    (24 * 3600, 300),
+    (72 * 3600, 900),
+]
+TRACKER_MIN_INTERVAL = 60
+TRACKER_MAX_INTERVAL = 1800
+
+# Retire tracked tokens after this age, after this % drop from their peak, or once every whale fully exited
+TRACKING_MAX_AGE_HOURS = 14 * 24
+TRACKING_MAX_DRAWDOWN = 90
+
+# Retention: archive closed tokens after this grace period, positions unchecked this long,
+# and keep only the newest N sells per token in bot_state
+ARCHIVE_CLOSED_AFTER_HOURS = 24
+ARCHIVE_STALE_POSITION_HOURS = 7 * 24
+ARCHIVE_KEEP_SELLS = 20
+
+# ============================================================
+# Command Handling
+# ============================================================
+
+# Worker threads running Telegram commands (polling never waits on them)
+COMMAND_WORKERS = int(os.getenv('COMMAND_WORKERS', '4'))
+# Recent latencies kept per command for percentiles
+COMMAND_LATENCY_SAMPLES = 200
+
+# Webhook intake: set TELEGRAM_WEBHOOK_URL to the public https URL Telegram should post to
+# (it must reach WEBHOOK_PORT here); unset keeps long polling
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+# Serve HTTPS directly when both are set (otherwise terminate TLS in front of the bot)
+WEBHOOK_CERT_FILE = os.getenv('WEBHOOK_CERT_FILE')
+WEBHOOK_KEY_FILE = os.getenv('WEBHOOK_KEY_FILE')
+# How often webhook health is checked, and how long to poll before retrying the webhook
+WEBHOOK_HEALTH_SECONDS = 60
+WEBHOOK_RETRY_SECONDS = 3600
+
 # ============================================================
 # Admin Configuration
 # ============================================================
@@ -0,0 +1,93 @@
+"""
+End-to-end buy detection latency
+Every alerted buy is timed in two stages, per tier and chain:
+    chain_to_detect  block time of the buy -> the wallet read that revealed it
+    detect_to_send   that wallet read -> its alert going out (lookups, filters, coalescing)
+"""
+
+import bisect
+import threading
+from collections import deque
+
+from config import LATENCY_BUCKETS, LATENCY_SAMPLES
+
+STAGES = ('chain_to_detect', 'detect_to_send')
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class LatencyHistogram:
+    """Bucket counts since start, plus recent samples for percentiles"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.samples.append(seconds)
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def report(self):
+        report = {
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else None,
+            'max': self.max,
+            'buckets': {f"<={bound:g}s": count for bound, count in zip(self.buckets, self.counts)}
+        }
+        report['buckets'][f">{self.buckets[-1]:g}s"] = self.counts[-1]
+        for pct in (50, 90, 99):
+            report[f"p{pct}"] = _percentile(self.samples, pct) if self.samples else None
+        return report
+
+class DetectionLatency:
+    """Histograms keyed by (stage, tier, chain)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.stats = {'lookups': 0, 'lookups_failed': 0}
+
+    def observe(self, stage, tier, chain, seconds):
+        # Block times are whole seconds, so a fresh buy can land slightly "before" its block
+        seconds = max(0.0, seconds)
+        with self.lock:
+            key = (stage, tier, chain)
+            if key not in self.histograms:
+                self.histograms[key] = LatencyHistogram()
+            self.histograms[key].observe(seconds)
+
+    def lookup(self, ok):
+        """Count an on-chain time lookup"""
+        with self.lock:
+            self.stats['lookups'] += 1
+            if not ok:
+                self.stats['lookups_failed'] += 1
+
+    def report(self):
+        """{stage: {chain: {tier: histogram}}} plus lookup counts"""
+        with self.lock:
+            report = dict(self.stats)
+            for stage in STAGES:
+                report[stage] = {}
+            for (stage, tier, chain), histogram in self.histograms.items():
+                report[stage].setdefault(chain, {})[tier] = histogram.report()
+        return report
+
+_latency = DetectionLatency()
+
+def get_detection_latency():
+    return _latency
+
+def set_detection_latency(latency):
+    """Swap the shared tracker (replays keep their own); returns the previous one"""
+    global _latency
+    previous, _latency = _latency, latency
+    return previous
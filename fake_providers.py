@@ -0,0 +1,1028 @@
+"""
+Local stand-in servers for Helius, Alchemy, DexScreener and Telegram
+Serve recorded-style responses with injectable latency and error rates
+"""
+
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+TOKEN_PROGRAM_ID = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+RAYDIUM_AMM_PROGRAM_ID = '675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8'
+
+SOL_MINT = 'So11111111111111111111111111111111111111112'
+SOL_USDC_MINT = 'EPjFWdd5AufqSSqewy3WZaNW1pF3Q8dTMm24FYzJR8o'
+WETH_ADDRESS = '0x4200000000000000000000000000000000000006'
+BASE_USDC_ADDRESS = '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913'
+
+# Native quote (SOL / WETH) price in USD across the fake world
+NATIVE_USD = 150
+
+# Fake token decimals: Solana amounts are served with uiAmount = amount / 1e6,
+# Base balances as raw uint256 (amount * 1e18, past 64 bits like real ERC-20s)
+SOLANA_TOKEN_DECIMALS = 6
+BASE_TOKEN_DECIMALS = 18
+
+MULTICALL3_ADDRESS = '0xca11bde05977b3631167028862be2a173976ca11'
+
+# Anchors for slot / block numbers derived from fake block times
+SOLANA_GENESIS_SLOT, SOLANA_GENESIS_TIME = 300_000_000, 1_729_000_000
+BASE_GENESIS_BLOCK, BASE_GENESIS_TIME = 21_000_000, 1_729_000_000
+POOL_AUTHORITY = '5Q544fKrFoe6tsEbD7S8EmxGTJYAKtTVhAW5Q5pge4j1'
+
+def b58encode(raw):
+    num = int.from_bytes(raw, 'big')
+    encoded = ''
+    while num:
+        num, rem = divmod(num, 58)
+        encoded = BASE58_ALPHABET[rem] + encoded
+    return '1' * (len(raw) - len(raw.lstrip(b'\0'))) + encoded
+
+def b58decode(text):
+    num = 0
+    for char in text:
+        num = num * 58 + BASE58_ALPHABET.index(char)
+    body = num.to_bytes((num.bit_length() + 7) // 8, 'big') if num else b''
+    return b'\0' * (len(text) - len(text.lstrip('1'))) + body
+
+# ============================================================
+# Fake World (shared wallet holdings and injected buys)
+# ============================================================
+
+class FakeWorld:
+    """Holdings and token metadata shared by all fake providers"""
+
+    def __init__(self, seed=42, tokens_per_wallet=20):
+        self.seed = seed
+        self.tokens_per_wallet = tokens_per_wallet
+        # Per-wallet holdings counts (synthetic fleets); others hold tokens_per_wallet
+        self.wallet_sizes = {}
+        self.lock = threading.Lock()
+        self.holdings = {}
+        self.tokens = {}
+        self.buys = {}
+        # (owner, token) -> block time of the buy, for getSignaturesForAddress / getAssetTransfers
+        self.acquired = {}
+        self.alerts = []
+        self.buy_counter = 0
+        self.pools = {}
+        self.pool_index = {}
+        self.token_accounts = {}
+        self.mints = {SOL_MINT: 9, SOL_USDC_MINT: 6}
+        self.price_moves = {}
+        # Seconds before DexScreener reflects an on-chain price move
+        self.index_lag = 0
+        # Native/USD reference pools the price oracle reads (see provider_env)
+        self.references = {
+            'base': self._add_pool({
+                'chain': 'base', 'kind': 'v3',
+                'address': '0x' + self._rng('ref:base').randbytes(20).hex(),
+                'token': WETH_ADDRESS, 'quote': BASE_USDC_ADDRESS,
+                'token_reserve': 10_000, 'price_native': NATIVE_USD,
+                'token_decimals': 18, 'quote_decimals': 6
+            })['address'],
+            'solana': self._add_pool({
+                'chain': 'solana', 'kind': 'raydium_amm',
+                'address': b58encode(self._rng('ref:solana').randbytes(32)),
+                'vaults': [b58encode(self._rng('ref:solana:0').randbytes(32)),
+                           b58encode(self._rng('ref:solana:1').randbytes(32))],
+                'token': SOL_MINT, 'quote': SOL_USDC_MINT,
+                'token_reserve': 100_000, 'price_native': NATIVE_USD,
+                'token_decimals': 9, 'quote_decimals': 6
+            })['address']
+        }
+
+    def _rng(self, key):
+        return random.Random(f"{self.seed}:{key}")
+
+    def _make_address(self, chain, rng):
+        if chain == 'base':
+            return '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+        # Real 32-byte keys so pool and token accounts can embed them
+        return b58encode(rng.randbytes(32))
+
+    def wallet(self, address, chain):
+        """Get (and lazily create) the holdings of a wallet"""
+        with self.lock:
+            if address not in self.holdings:
+                rng = self._rng(address)
+                self.holdings[address] = {
+                    self._make_address(chain, rng): rng.randint(1_000, 50_000_000)
+                    for _ in range(self.wallet_sizes.get(address, self.tokens_per_wallet))
+                }
+                if chain == 'solana':
+                    self.mints.update(dict.fromkeys(self.holdings[address], SOLANA_TOKEN_DECIMALS))
+            return self.holdings[address]
+
+    def inject_buy(self, address, chain):
+        """Add a fresh, filter-passing token to a wallet and return its symbol"""
+        with self.lock:
+            self.buy_counter += 1
+            symbol = f"BUY{self.buy_counter:05d}"
+        token = self._make_address(chain, self._rng(symbol))
+        now = self.add_holding(address, chain, token, 1_000_000, symbol)
+        with self.lock:
+            self.buys[symbol] = {'token': token, 'whale': address, 'injected_at': now}
+        return symbol
+
+    def add_holding(self, address, chain, token, amount, symbol=None):
+        """Give a wallet a token (filter-passing when symbol is set); returns the buy time"""
+        self.wallet(address, chain)
+        with self.lock:
+            now = time.time()
+            self.holdings[address][token] = amount
+            self.acquired[(address, token)] = now
+            if symbol:
+                self.tokens[token] = {'symbol': symbol, 'chain': chain, 'passing': True}
+            if chain == 'solana':
+                self.mints[token] = SOLANA_TOKEN_DECIMALS
+        return now
+
+    def bought_at(self, owner, token):
+        """Block time of the transfer that gave owner the token (seeded holdings are days old)"""
+        with self.lock:
+            if (owner, token) in self.acquired:
+                return self.acquired[(owner, token)]
+        return time.time() - self._rng(f"bought:{owner}:{token}").uniform(1, 30) * 86400
+
+    def sell(self, address, token, fraction=1.0):
+        """Reduce (or remove) a wallet position"""
+        with self.lock:
+            holdings = self.holdings.get(address, {})
+            if token not in holdings:
+                return
+            remaining = int(holdings[token] * (1 - fraction))
+            if remaining <= 0:
+                del holdings[token]
+            else:
+                holdings[token] = remaining
+
+    def market(self, token):
+        """Deterministic DexScreener-style stats for a token (price at the listing level)"""
+        meta = self.tokens.get(token)
+        rng = random.Random(token)
+
+        if meta and meta.get('passing'):
+            market_cap = rng.uniform(300_000, 5_000_000)
+            liquidity = market_cap * rng.uniform(0.08, 0.2)
+            buys = rng.randint(200, 800)
+            market = {
+                'symbol': meta['symbol'],
+                'chain': meta['chain'],
+                'market_cap': market_cap,
+                'liquidity': liquidity,
+                'buys': buys,
+                'sells': int(buys * rng.uniform(0.6, 1.4)),
+                'created': (time.time() - rng.uniform(2, 48) * 3600) * 1000
+            }
+        else:
+            market_cap = rng.uniform(10_000, 50_000_000)
+            market = {
+                'symbol': f"HOLD{token[-4:]}",
+                'chain': 'base' if token.startswith('0x') else 'solana',
+                'market_cap': market_cap,
+                'liquidity': market_cap * rng.uniform(0.01, 0.2),
+                'buys': rng.randint(0, 500),
+                'sells': rng.randint(0, 500),
+                'created': (time.time() - rng.uniform(0.1, 400) * 3600) * 1000
+            }
+        market['rng'] = rng
+        return market
+
+    def move_price(self, token, factor):
+        """Move a token's on-chain price to factor x its listing price"""
+        with self.lock:
+            self.price_moves.setdefault(token, []).append((time.time(), factor))
+
+    def price_factor(self, token, indexed=False):
+        """Current on-chain price factor, or the one DexScreener has indexed so far"""
+        cutoff = time.time() - self.index_lag if indexed else float('inf')
+        factor = 1.0
+        with self.lock:
+            for moved_at, move in self.price_moves.get(token, []):
+                if moved_at <= cutoff:
+                    factor = move
+        return factor
+
+    def pool(self, token):
+        """Main pool of a token: Uniswap v2 pair vs WETH on Base, Raydium AMM v4 vs SOL on Solana"""
+        with self.lock:
+            if token in self.pools:
+                return self.pools[token]
+        chain = self.market(token)['chain']
+        return self.add_pool(token, 'v2' if chain == 'base' else 'raydium_amm')
+
+    def add_pool(self, token, kind, token_first=True, complete=False):
+        """
+        Give a token a main pool of any layout the price oracle reads.
+        On Base the token's side follows address order, as in real pairs;
+        on Solana token_first picks the mint order of CLMM / Whirlpool
+        accounts, and complete marks a pump curve as migrated.
+        """
+        market = self.market(token)
+        rng = self._rng(f"pool:{token}")
+        price_native = market['market_cap'] / 1_000_000_000 / NATIVE_USD
+        # Token side of the pool holds half the liquidity
+        token_reserve = market['liquidity'] / 2 / (market['market_cap'] / 1_000_000_000)
+
+        if market['chain'] == 'base':
+            pool = {
+                'chain': 'base',
+                'kind': kind,
+                'address': '0x' + rng.randbytes(20).hex(),
+                'token': token,
+                'quote': WETH_ADDRESS,
+                'token_reserve': token_reserve,
+                'price_native': price_native,
+                'token_decimals': BASE_TOKEN_DECIMALS,
+                'quote_decimals': 18
+            }
+        else:
+            pool = {
+                'chain': 'solana',
+                'kind': kind,
+                'address': b58encode(rng.randbytes(32)),
+                'token': token,
+                'quote': SOL_MINT,
+                'token_reserve': token_reserve,
+                'price_native': price_native,
+                'token_decimals': SOLANA_TOKEN_DECIMALS,
+                'quote_decimals': 9,
+                'token_first': token_first,
+                'complete': complete
+            }
+            if kind == 'raydium_amm':
+                pool['vaults'] = [b58encode(rng.randbytes(32)), b58encode(rng.randbytes(32))]
+            with self.lock:
+                self.mints[token] = SOLANA_TOKEN_DECIMALS
+
+        return self._add_pool(pool)
+
+    def _add_pool(self, pool):
+        with self.lock:
+            pool = self.pools.setdefault(pool['token'], pool)
+            self.pool_index[pool['address'].lower() if pool['chain'] == 'base' else pool['address']] = pool
+            for vault in pool.get('vaults', []):
+                self.pool_index[vault] = pool
+        return pool
+
+    def reserves(self, pool):
+        """Raw (token, quote) reserves at the current on-chain price"""
+        token_reserve = pool['token_reserve']
+        quote_reserve = token_reserve * pool['price_native'] * self.price_factor(pool['token'])
+        return int(token_reserve * 10 ** pool['token_decimals']), int(quote_reserve * 10 ** pool['quote_decimals'])
+
+    def token_account_address(self, owner, mint):
+        """Deterministic token account of owner for mint (stands in for the ATA)"""
+        address = b58encode(self._rng(f"ata:{owner}:{mint}").randbytes(32))
+        with self.lock:
+            self.token_accounts[address] = (owner, mint)
+        return address
+
+    def solana_account(self, pubkey):
+        """Raw data of a mint, wallet token account, pool or vault (None if it does not exist)"""
+        if pubkey in self.mints:
+            return mint_account(self.mints[pubkey])
+
+        if pubkey in self.token_accounts:
+            owner, mint = self.token_accounts[pubkey]
+            with self.lock:
+                amount = self.holdings.get(owner, {}).get(mint)
+            # Selling everything closes the account
+            return token_account(mint, owner, amount) if amount else None
+
+        pool = self.pool_index.get(pubkey)
+        if pool is None or pool['chain'] != 'solana':
+            return None
+        if pubkey == pool['address']:
+            return POOL_ACCOUNTS[pool['kind']](pool, *self.reserves(pool))
+        side = pool['vaults'].index(pubkey)
+        return token_account([pool['token'], pool['quote']][side], POOL_AUTHORITY, self.reserves(pool)[side])
+
+    def evm_call(self, target, data):
+        """Return data of a view call on Base, or None when it would revert"""
+        selector = data[:4].hex()
+        pool = self.pool_index.get(target.lower())
+
+        if pool is not None:
+            token_first = pool['token'].lower() < pool['quote'].lower()
+            if selector == '0dfe1681':  # token0()
+                return evm_word(int(pool['token'] if token_first else pool['quote'], 16))
+            token_reserve, quote_reserve = self.reserves(pool)
+            if selector == '0902f1ac' and pool['kind'] == 'v2':  # getReserves()
+                reserves = (token_reserve, quote_reserve) if token_first else (quote_reserve, token_reserve)
+                return evm_word(reserves[0]) + evm_word(reserves[1]) + evm_word(int(time.time()))
+            if selector == '3850c7bd' and pool['kind'] == 'v3':  # slot0()
+                price = quote_reserve / token_reserve if token_first else token_reserve / quote_reserve
+                return evm_word(int(price ** 0.5 * 2 ** 96)) + bytes(32 * 6)
+            return None
+
+        if selector == '313ce567':  # decimals()
+            return evm_word(6 if target.lower() == BASE_USDC_ADDRESS else BASE_TOKEN_DECIMALS)
+        if selector == '70a08231':  # balanceOf(address)
+            owner = '0x' + data[16:36].hex()
+            with self.lock:
+                holdings = self.holdings.get(owner, {})
+                amount = next((amount for token, amount in holdings.items() if token.lower() == target.lower()), 0)
+                return evm_word(amount * 10 ** BASE_TOKEN_DECIMALS)
+        return None
+
+    def record_alert(self, chat_id, text):
+        """Store a Telegram message and match it against injected buys"""
+        received = time.time()
+        with self.lock:
+            self.alerts.append({'chat_id': chat_id, 'text': text, 'received_at': received})
+            for symbol in re.findall(r'BUY\d{5}', text or ''):
+                buy = self.buys.get(symbol)
+                if buy and 'alerted_at' not in buy:
+                    buy['alerted_at'] = received
+
+    def detection_latencies(self):
+        """Seconds between each buy injection and its first alert"""
+        with self.lock:
+            return [b['alerted_at'] - b['injected_at'] for b in self.buys.values() if 'alerted_at' in b]
+
+# ============================================================
+# Activity Simulator (background buys and sells)
+# ============================================================
+
+class ActivitySimulator:
+    """
+    Injects buys and sells across a whale fleet as two Poisson processes.
+    Sells hit earlier injected buys: half the position or all of it.
+    """
+
+    def __init__(self, world, whales, buys_per_second, sells_per_second, seed=42):
+        self.world = world
+        self.whales = [w for w in whales if w['chain'] in ('solana', 'base')]
+        self.buys_per_second = buys_per_second
+        self.sells_per_second = sells_per_second
+        self.rng = random.Random(f"{seed}:activity")
+        self.held = []
+        self.counts = {'buys': 0, 'sells': 0}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def step(self):
+        """Inject one event, a buy or a sell in proportion to their rates"""
+        total = self.buys_per_second + self.sells_per_second
+        if self.held and self.rng.random() < self.sells_per_second / total:
+            address, token = self.held.pop(self.rng.randrange(len(self.held)))
+            fraction = self.rng.choice((0.5, 1.0))
+            self.world.sell(address, token, fraction)
+            if fraction < 1.0:
+                self.held.append((address, token))
+            self.counts['sells'] += 1
+        else:
+            whale = self.rng.choice(self.whales)
+            symbol = self.world.inject_buy(whale['address'], whale['chain'])
+            self.held.append((whale['address'], self.world.buys[symbol]['token']))
+            self.counts['buys'] += 1
+
+    def _loop(self):
+        total = self.buys_per_second + self.sells_per_second
+        while not self.stop_event.wait(self.rng.expovariate(total)):
+            self.step()
+
+    def start(self):
+        if self.whales and self.buys_per_second + self.sells_per_second > 0:
+            self.thread = threading.Thread(target=self._loop, name='fake-activity', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+# ============================================================
+# On-Chain Encodings
+# ============================================================
+
+def evm_word(value):
+    return value.to_bytes(32, 'big')
+
+def token_account(mint, owner, amount):
+    """165-byte SPL token account: mint, owner, amount, ..., state=initialized"""
+    raw = bytearray(165)
+    raw[0:32] = b58decode(mint)
+    raw[32:64] = b58decode(owner)
+    raw[64:72] = amount.to_bytes(8, 'little')
+    raw[108] = 1
+    return bytes(raw)
+
+def mint_account(decimals):
+    """82-byte SPL mint: no authority, supply, decimals, initialized"""
+    raw = bytearray(82)
+    raw[36:44] = (10 ** 15).to_bytes(8, 'little')
+    raw[44] = decimals
+    raw[45] = 1
+    return bytes(raw)
+
+def amm_account(pool, token_reserve, quote_reserve):
+    """Raydium AMM v4 pool state with the fields the price oracle reads (reserves live in the vaults)"""
+    raw = bytearray(752)
+    raw[32:40] = pool['token_decimals'].to_bytes(8, 'little')
+    raw[40:48] = pool['quote_decimals'].to_bytes(8, 'little')
+    raw[336:368] = b58decode(pool['vaults'][0])
+    raw[368:400] = b58decode(pool['vaults'][1])
+    raw[400:432] = b58decode(pool['token'])
+    raw[432:464] = b58decode(pool['quote'])
+    return bytes(raw)
+
+def _sqrt_price_x64(pool, token_reserve, quote_reserve):
+    """Q64.64 sqrt(mint1 / mint0) in raw units, for the pool's mint order"""
+    price = quote_reserve / token_reserve if pool['token_first'] else token_reserve / quote_reserve
+    return int(price ** 0.5 * 2 ** 64)
+
+def _ordered(pool, token_value, quote_value):
+    return (token_value, quote_value) if pool['token_first'] else (quote_value, token_value)
+
+def clmm_account(pool, token_reserve, quote_reserve):
+    """Raydium CLMM pool state: mints, decimals and sqrt_price_x64"""
+    raw = bytearray(1544)
+    mint0, mint1 = _ordered(pool, pool['token'], pool['quote'])
+    decimals0, decimals1 = _ordered(pool, pool['token_decimals'], pool['quote_decimals'])
+    raw[73:105] = b58decode(mint0)
+    raw[105:137] = b58decode(mint1)
+    raw[233] = decimals0
+    raw[234] = decimals1
+    raw[253:269] = _sqrt_price_x64(pool, token_reserve, quote_reserve).to_bytes(16, 'little')
+    return bytes(raw)
+
+def whirlpool_account(pool, token_reserve, quote_reserve):
+    """Orca Whirlpool state: sqrt_price and mints (decimals live on the mint accounts)"""
+    raw = bytearray(653)
+    mint_a, mint_b = _ordered(pool, pool['token'], pool['quote'])
+    raw[65:81] = _sqrt_price_x64(pool, token_reserve, quote_reserve).to_bytes(16, 'little')
+    raw[101:133] = b58decode(mint_a)
+    raw[181:213] = b58decode(mint_b)
+    return bytes(raw)
+
+def pump_curve_account(pool, token_reserve, quote_reserve):
+    """pump.fun bonding curve: virtual token / SOL reserves, then the complete flag"""
+    raw = bytearray(49)
+    raw[8:16] = token_reserve.to_bytes(8, 'little')
+    raw[16:24] = quote_reserve.to_bytes(8, 'little')
+    raw[48] = 1 if pool['complete'] else 0
+    return bytes(raw)
+
+POOL_ACCOUNTS = {
+    'raydium_amm': amm_account,
+    'raydium_clmm': clmm_account,
+    'whirlpool': whirlpool_account,
+    'pump_curve': pump_curve_account,
+}
+
+def decode_aggregate3_calls(data):
+    """[(target, calldata)] from Multicall3 aggregate3 input"""
+    body = data[4:]
+    word = lambda at: int.from_bytes(body[at:at + 32], 'big')
+    start = word(0) + 32
+    calls = []
+    for i in range(word(start - 32)):
+        element = start + word(start + 32 * i)
+        data_at = element + word(element + 64)
+        length = word(data_at)
+        calls.append(('0x' + body[element + 12:element + 32].hex(), body[data_at + 32:data_at + 32 + length]))
+    return calls
+
+def encode_aggregate3_results(results):
+    """ABI-encode (bool success, bytes returnData)[]"""
+    elements = []
+    for data in results:
+        data = data or b''
+        padded = data + bytes(-len(data) % 32)
+        elements.append(evm_word(1 if data else 0) + evm_word(0x40) + evm_word(len(data)) + padded)
+
+    offsets = []
+    position = 32 * len(elements)
+    for element in elements:
+        offsets.append(evm_word(position))
+        position += len(element)
+    return evm_word(0x20) + evm_word(len(elements)) + b''.join(offsets) + b''.join(elements)
+
+# ============================================================
+# Base Handler (latency, errors, request counting)
+# ============================================================
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """Shared plumbing for every fake provider"""
+
+    protocol_version = 'HTTP/1.1'
+    provider = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        provider = self.provider
+        body = self._read_body() if method == 'POST' else {}
+        label = provider.label_for(self.path, body)
+        provider.count(label)
+
+        delay = provider.latency_ms + random.uniform(0, provider.jitter_ms)
+        if provider.tail_rate and random.random() < provider.tail_rate:
+            delay += provider.tail_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if provider.error_rate and random.random() < provider.error_rate:
+            provider.count('errors')
+            self._send_json(429, {'error': {'code': 429, 'message': 'Too many requests'}})
+            return
+
+        status, payload = provider.respond(self.path, body)
+        self._send_json(status, payload)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+class FakeProvider:
+    """One stand-in HTTP server running on a background thread"""
+
+    name = 'provider'
+
+    def __init__(self, world, latency_ms=0, jitter_ms=0, error_rate=0.0, fixtures_dir=None,
+                 tail_rate=0.0, tail_ms=0):
+        self.world = world
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # A tail_rate share of requests stalls an extra tail_ms (slow backend, GC pause)
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.fixtures = load_fixtures(fixtures_dir, self.name)
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def count(self, label):
+        with self.counts_lock:
+            self.counts[label] = self.counts.get(label, 0) + 1
+
+    def total_requests(self):
+        with self.counts_lock:
+            return sum(v for k, v in self.counts.items() if k != 'errors')
+
+    def label_for(self, path, body):
+        if isinstance(body, dict) and body.get('method'):
+            return body['method']
+        return urlparse(path).path.rsplit('/', 1)[-1] or 'root'
+
+    def respond(self, path, body):
+        raise NotImplementedError
+
+    def start(self, host='127.0.0.1', port=0):
+        handler = type(f"{self.name}Handler", (FakeProviderHandler,), {'provider': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+def load_fixtures(fixtures_dir, provider_name):
+    """Load recorded responses from <fixtures_dir>/<provider>/<method>.json"""
+    fixtures = {}
+    if not fixtures_dir:
+        return fixtures
+
+    folder = os.path.join(fixtures_dir, provider_name)
+    if not os.path.isdir(folder):
+        return fixtures
+
+    for filename in os.listdir(folder):
+        if filename.endswith('.json'):
+            with open(os.path.join(folder, filename), 'r') as f:
+                fixtures[filename[:-5]] = json.load(f)
+    return fixtures
+
+# ============================================================
+# Helius (Solana JSON-RPC)
+# ============================================================
+
+class FakeHelius(FakeProvider):
+    """
+    Serves getTokenAccountsByOwner (jsonParsed or sliced base64), getMultipleAccounts
+    in base64 and getSignaturesForAddress for wallet token accounts
+    """
+
+    name = 'helius'
+
+    def respond(self, path, body):
+        method = body.get('method')
+        request_id = body.get('id', 1)
+
+        if method in self.fixtures:
+            return 200, dict(self.fixtures[method], id=request_id)
+
+        if method == 'getMultipleAccounts':
+            return 200, self.multiple_accounts(request_id, *body['params'])
+
+        if method == 'getSignaturesForAddress':
+            return 200, self.signatures(request_id, *body['params'])
+
+        if method != 'getTokenAccountsByOwner':
+            return 200, {'jsonrpc': '2.0', 'id': request_id,
+                         'error': {'code': -32601, 'message': 'Method not found'}}
+
+        owner = body['params'][0]
+        holdings = dict(self.world.wallet(owner, 'solana'))
+        config = body['params'][2] if len(body['params']) > 2 else {}
+        accounts = []
+        for mint, amount in holdings.items():
+            if config.get('encoding') == 'base64':
+                accounts.append({
+                    'account': self.account_value(token_account(mint, owner, amount), config.get('dataSlice')),
+                    'pubkey': self.world.token_account_address(owner, mint)
+                })
+                continue
+            ui_amount = amount / 1_000_000
+            accounts.append({
+                'account': {
+                    'data': {
+                        'parsed': {
+                            'info': {
+                                'isNative': False,
+                                'mint': mint,
+                                'owner': owner,
+                                'state': 'initialized',
+                                'tokenAmount': {
+                                    'amount': str(amount),
+                                    'decimals': 6,
+                                    'uiAmount': ui_amount,
+                                    'uiAmountString': str(ui_amount)
+                                }
+                            },
+                            'type': 'account'
+                        },
+                        'program': 'spl-token',
+                        'space': 165
+                    },
+                    'executable': False,
+                    'lamports': 2039280,
+                    'owner': TOKEN_PROGRAM_ID,
+                    'rentEpoch': 18446744073709551615,
+                    'space': 165
+                },
+                'pubkey': self.world.token_account_address(owner, mint)
+            })
+
+        return 200, {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'result': {'context': {'apiVersion': '2.0.15', 'slot': 300000000}, 'value': accounts}
+        }
+
+    def multiple_accounts(self, request_id, pubkeys, config=None):
+        config = config or {}
+        if len(pubkeys) > 100:
+            return {'jsonrpc': '2.0', 'id': request_id,
+                    'error': {'code': -32602, 'message': 'Too many inputs provided; max 100'}}
+
+        data_slice = config.get('dataSlice')
+        values = []
+        for pubkey in pubkeys:
+            raw = self.world.solana_account(pubkey)
+            values.append(None if raw is None else self.account_value(raw, data_slice))
+
+        return {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'result': {'context': {'apiVersion': '2.0.15', 'slot': 300000000}, 'value': values}
+        }
+
+    def signatures(self, request_id, address, config=None):
+        """Newest signature of a wallet token account: the transfer that funded it"""
+        signatures = []
+        if address in self.world.token_accounts:
+            owner, mint = self.world.token_accounts[address]
+            block_time = self.world.bought_at(owner, mint)
+            signatures.append({
+                'signature': b58encode(self.world._rng(f"sig:{address}:{block_time}").randbytes(64)),
+                # Block times are whole seconds, as on mainnet
+                'slot': SOLANA_GENESIS_SLOT + int((block_time - SOLANA_GENESIS_TIME) / 0.4),
+                'blockTime': int(block_time),
+                'err': None,
+                'memo': None,
+                'confirmationStatus': 'finalized'
+            })
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': signatures}
+
+    def account_value(self, raw, data_slice=None):
+        """base64 account info as RPC returns it, cut to the requested slice"""
+        space = len(raw)
+        if data_slice:
+            raw = raw[data_slice['offset']:data_slice['offset'] + data_slice['length']]
+        return {
+            'data': [base64.b64encode(raw).decode(), 'base64'],
+            'executable': False,
+            'lamports': 2039280,
+            'owner': RAYDIUM_AMM_PROGRAM_ID if space == 752 else TOKEN_PROGRAM_ID,
+            'rentEpoch': 18446744073709551615,
+            'space': space
+        }
+
+# ============================================================
+# Alchemy (Base JSON-RPC)
+# ============================================================
+
+class FakeAlchemy(FakeProvider):
+    """Serves alchemy_getTokenBalances, alchemy_getAssetTransfers and eth_call (directly or through Multicall3)"""
+
+    name = 'alchemy'
+
+    def respond(self, path, body):
+        method = body.get('method')
+        request_id = body.get('id', 1)
+
+        if method in self.fixtures:
+            return 200, dict(self.fixtures[method], id=request_id)
+
+        if method == 'eth_call':
+            call = body['params'][0]
+            data = bytes.fromhex(call['data'][2:])
+            if call['to'].lower() == MULTICALL3_ADDRESS:
+                result = encode_aggregate3_results([
+                    self.world.evm_call(target, calldata)
+                    for target, calldata in decode_aggregate3_calls(data)
+                ])
+            else:
+                result = self.world.evm_call(call['to'], data)
+                if result is None:
+                    return 200, {'jsonrpc': '2.0', 'id': request_id,
+                                 'error': {'code': 3, 'message': 'execution reverted'}}
+            return 200, {'jsonrpc': '2.0', 'id': request_id, 'result': '0x' + result.hex()}
+
+        if method == 'alchemy_getAssetTransfers':
+            return 200, self.asset_transfers(request_id, body['params'][0])
+
+        if method != 'alchemy_getTokenBalances':
+            return 200, {'jsonrpc': '2.0', 'id': request_id,
+                         'error': {'code': -32601, 'message': 'Method not found'}}
+
+        owner = body['params'][0]
+        holdings = dict(self.world.wallet(owner, 'base'))
+        balances = [
+            {'contractAddress': token, 'tokenBalance': hex(amount * 10 ** BASE_TOKEN_DECIMALS)}
+            for token, amount in holdings.items()
+        ]
+
+        return 200, {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'result': {'address': owner, 'tokenBalances': balances}
+        }
+
+    def asset_transfers(self, request_id, query):
+        """Newest incoming ERC-20 transfer of the queried token (maxCount 1, desc)"""
+        owner = query['toAddress']
+        holdings = self.world.wallet(owner, 'base')
+        transfers = []
+        for token in query.get('contractAddresses', []):
+            match = next((t for t in holdings if t.lower() == token.lower()), None)
+            if match is None:
+                continue
+            block_time = int(self.world.bought_at(owner, match))
+            transfers.append({
+                'blockNum': hex(BASE_GENESIS_BLOCK + (block_time - BASE_GENESIS_TIME) // 2),
+                'hash': '0x' + self.world._rng(f"tx:{owner}:{match}:{block_time}").randbytes(32).hex(),
+                'from': '0x' + '00' * 20,
+                'to': owner,
+                'asset': self.world.tokens.get(match, {}).get('symbol'),
+                'category': 'erc20',
+                'rawContract': {'address': match, 'value': hex(holdings[match] * 10 ** BASE_TOKEN_DECIMALS), 'decimal': hex(BASE_TOKEN_DECIMALS)},
+                'metadata': {'blockTimestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(block_time))}
+            })
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': {'transfers': transfers[:1]}}
+
+# ============================================================
+# DexScreener
+# ============================================================
+
+# DexScreener dexId and labels per pool layout
+PAIR_LABELS = {
+    'v2': ('uniswap', ['v2']),
+    'v3': ('uniswap', ['v3']),
+    'raydium_amm': ('raydium', []),
+    'raydium_clmm': ('raydium', ['CLMM']),
+    'whirlpool': ('orca', []),
+    'pump_curve': ('pumpfun', []),
+}
+
+class FakeDexScreener(FakeProvider):
+    """Serves /latest/dex/tokens/<address> pair lists"""
+
+    name = 'dexscreener'
+
+    def label_for(self, path, body):
+        return 'tokens'
+
+    def respond(self, path, body):
+        if 'tokens' in self.fixtures:
+            return 200, self.fixtures['tokens']
+
+        token = urlparse(path).path.rstrip('/').rsplit('/', 1)[-1]
+        market = self.world.market(token)
+        rng = market['rng']
+        symbol = market['symbol']
+        chain = market['chain']
+        liquidity = market['liquidity']
+        pool = self.world.pool(token)
+
+        # DexScreener trails the chain by world.index_lag
+        market_cap = market['market_cap'] * self.world.price_factor(token, indexed=True)
+        price = market_cap / 1_000_000_000
+        dex, labels = PAIR_LABELS[pool['kind']]
+        pair = {
+            'chainId': chain,
+            'dexId': dex,
+            'url': f"https://dexscreener.com/{chain}/{token.lower()}",
+            'pairAddress': pool['address'],
+            'labels': labels,
+            'baseToken': {'address': token, 'name': symbol.title(), 'symbol': symbol},
+            'quoteToken': {'address': pool['quote'], 'name': 'Wrapped', 'symbol': 'WETH' if chain == 'base' else 'SOL'},
+            'priceNative': f"{price / NATIVE_USD:.12f}",
+            'priceUsd': f"{price:.12f}",
+            'txns': {'m5': {'buys': 5, 'sells': 3}, 'h1': {'buys': 40, 'sells': 30},
+                     'h6': {'buys': 150, 'sells': 120}, 'h24': {'buys': market['buys'], 'sells': market['sells']}},
+            'volume': {'h24': liquidity * rng.uniform(0.5, 10), 'h6': 0, 'h1': 0, 'm5': 0},
+            'priceChange': {'m5': rng.uniform(-5, 5), 'h1': rng.uniform(-20, 20), 'h24': rng.uniform(-50, 50)},
+            'liquidity': {'usd': liquidity, 'base': 0, 'quote': 0},
+            'fdv': market_cap,
+            'marketCap': market_cap,
+            'pairCreatedAt': int(market['created'])
+        }
+
+        return 200, {'schemaVersion': '1.0.0', 'pairs': [pair]}
+
+# ============================================================
+# Telegram Bot API
+# ============================================================
+
+class FakeTelegram(FakeProvider):
+    """Accepts sendMessage, records every alert and delivers updates by polling or webhook"""
+
+    name = 'telegram'
+
+    def __init__(self, world, **kwargs):
+        super().__init__(world, **kwargs)
+        self.message_id = 0
+        self.update_id = 0
+        self.pending_updates = []
+        self.webhook = None
+        self.webhook_error = None
+        self.webhook_lock = threading.Lock()
+
+    def respond(self, path, body):
+        method = urlparse(path).path.rsplit('/', 1)[-1]
+
+        if method == 'sendMessage':
+            self.world.record_alert(body.get('chat_id'), body.get('text'))
+            self.message_id += 1
+            return 200, {'ok': True, 'result': {'message_id': self.message_id,
+                                                'chat': {'id': body.get('chat_id')},
+                                                'date': int(time.time()),
+                                                'text': body.get('text')}}
+
+        if method == 'getUpdates':
+            if self.webhook:
+                return 409, {'ok': False, 'error_code': 409,
+                             'description': "Conflict: can't use getUpdates method while webhook is active"}
+            updates, self.pending_updates = self.pending_updates, []
+            return 200, {'ok': True, 'result': updates}
+
+        if method == 'setWebhook':
+            self.webhook = {'url': body.get('url'), 'secret': body.get('secret_token', '')}
+            self.webhook_error = None
+            return 200, {'ok': True, 'result': True, 'description': 'Webhook was set'}
+
+        if method == 'deleteWebhook':
+            self.webhook = None
+            if body.get('drop_pending_updates'):
+                self.pending_updates = []
+            return 200, {'ok': True, 'result': True, 'description': 'Webhook was deleted'}
+
+        if method == 'getWebhookInfo':
+            info = {'url': self.webhook['url'] if self.webhook else '',
+                    'pending_update_count': len(self.pending_updates)}
+            if self.webhook_error:
+                info.update(self.webhook_error)
+            return 200, {'ok': True, 'result': info}
+
+        return 200, {'ok': True, 'result': True}
+
+    def push_command(self, text, user_id=1, chat_id=1):
+        """Queue a command message as a user would send it; returns the update"""
+        self.update_id += 1
+        update = {
+            'update_id': self.update_id,
+            'message': {'message_id': self.update_id, 'date': int(time.time()), 'text': text,
+                        'from': {'id': user_id}, 'chat': {'id': chat_id}}
+        }
+        self.pending_updates.append(update)
+        if self.webhook:
+            self.deliver_webhook()
+        return update
+
+    def deliver_webhook(self):
+        """POST pending updates to the registered webhook like Telegram does"""
+        with self.webhook_lock:
+            while self.webhook and self.pending_updates:
+                status = post_update(self.webhook['url'], self.pending_updates[0], self.webhook['secret'])
+                if status != 200:
+                    self.webhook_error = {'last_error_date': int(time.time()),
+                                          'last_error_message': f"Wrong response from the webhook: {status}"}
+                    return False
+                self.pending_updates.pop(0)
+        return True
+
+def post_update(url, update, secret=''):
+    """Post one update payload to a webhook receiver; returns the HTTP status (0 if unreachable)"""
+    request = urllib.request.Request(url, data=json.dumps(update).encode(), method='POST', headers={
+        'Content-Type': 'application/json',
+        'X-Telegram-Bot-Api-Secret-Token': secret
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def start_fake_providers(world=None, latency_ms=0, jitter_ms=0, error_rate=0.0, fixtures_dir=None,
+                         tail_rate=0.0, tail_ms=0):
+    """Start all four stand-ins and return them keyed by name"""
+    world = world or FakeWorld()
+    providers = {}
+    for cls in (FakeHelius, FakeAlchemy, FakeDexScreener, FakeTelegram):
+        # Telegram stays fast and reliable so it does not skew detection latency
+        if cls is FakeTelegram:
+            provider = cls(world, fixtures_dir=fixtures_dir)
+        else:
+            provider = cls(world, latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate,
+                           fixtures_dir=fixtures_dir, tail_rate=tail_rate, tail_ms=tail_ms)
+        providers[cls.name] = provider.start()
+    return world, providers
+
+def provider_env(providers):
+    """Environment overrides that point config.py at the stand-ins"""
+    return {
+        'HELIUS_RPC_URL': providers['helius'].url + '/',
+        'ALCHEMY_RPC_URL': providers['alchemy'].url + '/v2/fake',
+        'DEXSCREENER_API_URL': providers['dexscreener'].url,
+        'TELEGRAM_API_URL': providers['telegram'].url,
+        'TELEGRAM_BOT_TOKEN': 'fake-token',
+        'TELEGRAM_CHAT_ID': '1001',
+        'TELEGRAM_GROUP_ID': '-1002',
+        'ORACLE_ETH_USD_POOL': providers['alchemy'].world.references['base'],
+        'ORACLE_SOL_USD_POOL': providers['helius'].world.references['solana'],
+    }
+
+def stop_fake_providers(providers):
+    for provider in providers.values():
+        provider.stop()
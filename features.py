@@ -3,14 +3,32 @@ Whale tracking features and functions
 Contains all logic for checking whales, sending alerts, tracking performance
 """
 
-import time
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 
 # Import from other modules
-from config import BLACKLIST_TOKENS, PRICE_MILESTONES, HELIUS_API_KEY, ALCHEMY_API_KEY, TELEGRAM_BOT_TOKEN
-from state import bot_state, save_bot_state
+from config import (
+    BLACKLIST_TOKENS,
+    PRICE_MILESTONES,
+    TELEGRAM_BOT_TOKEN,
+    BALANCE_OF_GAS,
+    SOLANA_SLICED_ACCOUNTS,
+    DETECTION_LATENCY,
+    BUY_TIME_WORKERS
+)
+from state import bot_state, save_bot_state, mark_changed, state_lock
 from utils import send_telegram_alert, send_telegram_message, get_token_info, passes_filters
+from recorder import record_response
+from multibuy_index import get_multi_buy_index
+from token_scheduler import get_token_scheduler, reactivate_token
+from tier_manager import mark_whale_dirty
+from performance_index import get_performance_index
+from rpc import RpcError, calldata, decode_words, multicall, get_multiple_accounts, get_rpc_pool
+from token_accounts import account_request, decode_accounts, holdings_from_accounts, get_mint_decimals
+from alert_coalescer import get_alert_coalescer
+from detection_latency import get_detection_latency
+import clock
 
 # ============================================================
 # Main Whale Checking Function
@@ -27,62 +45,111 @@ def check_whale_for_new_buys(whale, whale_tokens, is_baseline=False):
     """
     
     whale_address = whale['address']
-    chain = whale['chain']
     
     try:
-        # Get current tokens
-        if chain == 'solana':
-            current_tokens = get_solana_tokens(whale_address)
-        elif chain == 'base':
-            current_tokens = get_base_tokens(whale_address)
-        else:
+        current_tokens = fetch_wallet_tokens(whale)
+        
+        if current_tokens is None:
             return
         
-        # Get known tokens for this whale
-        known_tokens = whale_tokens.get(whale_address, set())
+        process_wallet_snapshot(whale, current_tokens, whale_tokens, is_baseline)
+    
+    except RpcError as e:
+        # Skipped, not diffed as an empty wallet; the next cycle retries
+        print(f"  ⚠️ Could not read {whale_address[:8]}: {e}")
+    except Exception as e:
+        print(f"  ⚠️ Error checking {whale_address[:8]}: {e}")
+
+def fetch_wallet_tokens(whale):
+    """
+    Fetch a whale's current holdings (None for unsupported chains).
+    Raises RpcError when the wallet could not be read, so a failed fetch
+    is never mistaken for an empty wallet.
+    """
+    
+    # The tier decides whether a slow fetch may be hedged
+    if whale['chain'] == 'solana':
+        return get_solana_tokens(whale['address'], whale.get('tier'))
+    elif whale['chain'] == 'base':
+        return get_base_tokens(whale['address'], whale.get('tier'))
+    
+    return None
+
+def process_wallet_snapshot(whale, current_tokens, whale_tokens, is_baseline=False):
+    """Diff a holdings snapshot against known tokens and handle new buys"""
+    
+    # A whale never seen before (e.g. added with /addwhale) only gets a baseline
+    is_baseline = is_baseline or whale['address'] not in whale_tokens
+    new_tokens = diff_wallet_snapshot(whale, current_tokens, whale_tokens)
+    
+    # If baseline scan, just track tokens
+    if is_baseline:
+        return
+    
+    handle_new_buys(whale, new_tokens)
+
+def diff_wallet_snapshot(whale, current_tokens, whale_tokens):
+    """Return tokens not seen before for this whale and remember them"""
+    
+    # Get known tokens for this whale
+    known_tokens = whale_tokens.setdefault(whale['address'], set())
+    
+    # Find new tokens
+    new_tokens = []
+    for token in current_tokens:
+        token_addr = token['address']
         
-        # Find new tokens
-        new_tokens = []
-        for token in current_tokens:
-            token_addr = token['address']
-            
-            if token_addr not in known_tokens:
-                new_tokens.append(token)
-                whale_tokens[whale_address].add(token_addr)
+        if token_addr not in known_tokens:
+            new_tokens.append(token)
+            known_tokens.add(token_addr)
+    
+    return new_tokens
+
+def handle_new_buys(whale, new_tokens, detected=None):
+    """Look up, filter, alert and track newly bought tokens (detected: when the wallet read finished)"""
+    
+    whale_address = whale['address']
+    chain = whale['chain']
+    # Workers that queue their detections pass the read time; in-process checks just finished it
+    if detected is None:
+        detected = clock.now()
+    
+    # Process new token buys
+    for token in new_tokens:
+        token_addr = token['address']
+        balance = token.get('balance', 0)
         
-        # If baseline scan, just track tokens
-        if is_baseline:
-            return
+        # Get token info from DexScreener
+        token_info = get_token_info(token_addr, chain)
         
-        # Process new token buys
-        for token in new_tokens:
-            token_addr = token['address']
-            balance = token.get('balance', 0)
-            
-            # Get token info from DexScreener
-            token_info = get_token_info(token_addr, chain)
+        if not token_info:
+            continue
+        
+        # Check if passes filters
+        passes, reason = passes_filters(token_info)
+        
+        if passes:
+            # Alert (held briefly so whales buying together share one message)
+            get_alert_coalescer().add_buy(token_addr, whale, token_info, balance, detected)
             
-            if not token_info:
-                continue
+            # Track token
+            track_token_buy(
+                token_addr, 
+                whale_address, 
+                token_info['price'],
+                token_info['market_cap'],
+                token_info['symbol'],
+                chain,
+                balance,
+                token_account=token.get('account'),
+                decimals=token.get('decimals'),
+                detected_at=detected
+            )
             
-            # Check if passes filters
-            passes, reason = passes_filters(token_info)
+            # Block time lookup runs in the background and fills in bought_at
+            queue_buy_timing(whale, token, detected)
             
-            if passes:
-                # Send alert
-                send_whale_buy_alert(whale, token_info, balance)
-                
-                # Track token
-                track_token_buy(
-                    token_addr, 
-                    whale_address, 
-                    token_info['price'],
-                    token_info['market_cap'],
-                    token_info['symbol'],
-                    chain,
-                    balance
-                )
-                
+            with state_lock('last_buys'):
                 bot_state['alerts_sent'] = bot_state.get('alerts_sent', 0) + 1
                 
                 # Add to last buys
@@ -93,26 +160,34 @@ def check_whale_for_new_buys(whale, whale_tokens, is_baseline=False):
                     'symbol': token_info['symbol'],
                     'token': token_addr,
                     'mc': token_info['market_cap'],
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M')
+                    'timestamp': datetime.fromtimestamp(clock.now()).strftime('%Y-%m-%d %H:%M')
                 })
                 
                 # Keep only last 30 buys
                 bot_state['last_buys'] = bot_state['last_buys'][-30:]
-                
-                save_bot_state()
-            else:
+            mark_changed('buys', 'stats')
+            
+            save_bot_state()
+        else:
+            with state_lock('tokens_filtered'):
                 bot_state['tokens_filtered'] = bot_state.get('tokens_filtered', 0) + 1
-    
-    except Exception as e:
-        print(f"  ⚠️ Error checking {whale_address[:8]}: {e}")
+            mark_changed('stats')
 
 # ============================================================
 # Token Fetching Functions
 # ============================================================
 
-def get_solana_tokens(wallet_address):
-    """Get all tokens held by a Solana wallet"""
-    url = f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
+def get_solana_tokens(wallet_address, tier=None):
+    """Get all tokens held by a Solana wallet (raises RpcError when it cannot be read)"""
+    if SOLANA_SLICED_ACCOUNTS:
+        try:
+            return get_solana_tokens_sliced(wallet_address, tier)
+        except RpcError:
+            raise
+        except Exception as e:
+            # jsonParsed carries decimals inline, so it still works when decoding fails
+            print(f"  ⚠️ Sliced token accounts failed for {wallet_address[:8]}: {e}")
+    
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
@@ -124,56 +199,221 @@ def get_solana_tokens(wallet_address):
         ]
     }
     
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        data = response.json()
-        
-        tokens = []
-        if 'result' in data and 'value' in data['result']:
-            for account in data['result']['value']:
-                token_data = account['account']['data']['parsed']['info']
-                mint = token_data['mint']
-                balance = float(token_data['tokenAmount']['uiAmount'] or 0)
-                
-                if balance > 0 and mint not in BLACKLIST_TOKENS:
-                    tokens.append({'address': mint, 'balance': balance})
-        
-        return tokens
-    except Exception as e:
-        return []
+    data = get_rpc_pool('solana').post(payload, tier)
+    record_response('wallet', 'solana', wallet_address, data)
+    
+    return parse_solana_tokens(data)
+
+def get_solana_tokens_sliced(wallet_address, tier=None):
+    """
+    Holdings from 72-byte base64 slices (mint + amount) of each token account,
+    scaled by cached mint decimals. Raises on any failure.
+    """
+    data = get_rpc_pool('solana').post(account_request(wallet_address), tier)
+    accounts = decode_accounts(data['result']['value'])
+    
+    # Stored with the response so recordings replay without RPC access
+    data['mint_decimals'] = get_mint_decimals().get_many([mint for _, mint, amount in accounts if amount])
+    record_response('wallet', 'solana', wallet_address, data)
+    
+    return holdings_from_accounts(accounts, data['mint_decimals'])
+
+def parse_solana_tokens(data):
+    """Extract non-zero, non-blacklisted holdings from getTokenAccountsByOwner"""
+    if 'mint_decimals' in data:
+        return holdings_from_accounts(decode_accounts(data['result']['value']), data['mint_decimals'])
+    
+    tokens = []
+    if 'result' in data and 'value' in data['result']:
+        for account in data['result']['value']:
+            token_data = account['account']['data']['parsed']['info']
+            mint = token_data['mint']
+            balance = float(token_data['tokenAmount']['uiAmount'] or 0)
+            
+            if balance > 0 and mint not in BLACKLIST_TOKENS:
+                # The token account lets sell checks read just this balance later
+                tokens.append({
+                    'address': mint,
+                    'balance': balance,
+                    'account': account.get('pubkey'),
+                    'decimals': token_data['tokenAmount'].get('decimals')
+                })
+    
+    return tokens
 
-def get_base_tokens(wallet_address):
-    """Get all tokens held by a Base wallet"""
-    url = f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
+def get_base_tokens(wallet_address, tier=None):
+    """Get all tokens held by a Base wallet (raises RpcError when it cannot be read)"""
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
         "method": "alchemy_getTokenBalances",
         "params": [wallet_address, "erc20"]
     }
-    headers = {"accept": "application/json", "content-type": "application/json"}
     
+    data = get_rpc_pool('base').post(payload, tier)
+    record_response('wallet', 'base', wallet_address, data)
+    
+    return parse_base_tokens(data)
+
+def parse_base_tokens(data):
+    """Extract non-zero, non-blacklisted holdings from alchemy_getTokenBalances"""
+    tokens = []
+    if 'result' in data and 'tokenBalances' in data['result']:
+        for token in data['result']['tokenBalances']:
+            token_address = token['contractAddress']
+            balance_hex = token.get('tokenBalance', '0x0')
+            
+            try:
+                # Raw uint256 amounts pass 64 bits; as floats they stay JSON-safe in every codec
+                balance = float(int(balance_hex, 16))
+            except:
+                balance = 0
+            
+            if balance > 0 and token_address not in BLACKLIST_TOKENS:
+                tokens.append({'address': token_address, 'balance': balance})
+    
+    return tokens
+
+def get_base_balances(positions):
+    """
+    balanceOf(whale) for each (whale, token) through Multicall3, as many
+    per eth_call as the gas budget allows. None where a call reverted.
+    Raises RpcError when the sweep itself fails.
+    """
+    results = multicall(
+        [(token, calldata('balanceOf', whale)) for whale, token in positions],
+        gas_per_call=BALANCE_OF_GAS
+    )
+    # Floats like parse_base_tokens, so positions compare and serialize the same way
+    return [float(decode_words(result)[0]) if result and len(result) >= 32 else None for result in results]
+
+def get_solana_account_balances(token_accounts):
+    """
+    Raw amount of each SPL token account (0 once the account is closed),
+    reading only the 8-byte amount field, 100 accounts per request.
+    Raises RpcError when a request fails.
+    """
+    accounts = get_multiple_accounts(token_accounts, offset=64, length=8)
+    return [int.from_bytes(raw, 'little') if raw else 0 for raw in accounts]
+
+# ============================================================
+# Buy Timing (chain -> detect latency)
+# ============================================================
+
+# Replays serve recorded lookups instead of calling RPC (None = live)
+_buy_time_source = None
+
+def set_buy_time_source(source):
+    """Serve raw buy-time responses from source(chain, key) instead of RPC"""
+    global _buy_time_source
+    _buy_time_source = source
+
+_buy_timer = None
+_buy_timer_lock = threading.Lock()
+_buy_timings = set()
+
+def queue_buy_timing(whale, token, detected):
+    """Time a buy off the monitor thread (inline during replays, which read recorded lookups)"""
+    if not DETECTION_LATENCY:
+        return
+    if _buy_time_source is not None:
+        time_buy(whale, token, detected)
+        return
+    
+    global _buy_timer
+    with _buy_timer_lock:
+        if _buy_timer is None:
+            _buy_timer = ThreadPoolExecutor(max_workers=BUY_TIME_WORKERS, thread_name_prefix='buy-time')
+        future = _buy_timer.submit(time_buy, whale, token, detected)
+        _buy_timings.add(future)
+    future.add_done_callback(_buy_timing_done)
+
+def _buy_timing_done(future):
+    with _buy_timer_lock:
+        _buy_timings.discard(future)
+
+def wait_for_buy_timings(timeout=30):
+    """Block until queued lookups finish (benchmarks report after this)"""
+    with _buy_timer_lock:
+        pending = list(_buy_timings)
+    wait(pending, timeout=timeout)
+
+def time_buy(whale, token, detected):
+    """
+    Look up a buy's block time, record chain -> detect and store it on the
+    position as bought_at; returns the block time or None
+    """
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=10)
-        data = response.json()
-        
-        tokens = []
-        if 'result' in data and 'tokenBalances' in data['result']:
-            for token in data['result']['tokenBalances']:
-                token_address = token['contractAddress']
-                balance_hex = token.get('tokenBalance', '0x0')
-                
-                try:
-                    balance = int(balance_hex, 16)
-                except:
-                    balance = 0
-                
-                if balance > 0 and token_address not in BLACKLIST_TOKENS:
-                    tokens.append({'address': token_address, 'balance': balance})
-        
-        return tokens
-    except Exception as e:
-        return []
+        bought_at = get_buy_block_time(whale, token)
+    except Exception:
+        bought_at = None
+    
+    latency = get_detection_latency()
+    latency.lookup(bought_at is not None)
+    if bought_at is None:
+        return None
+    
+    latency.observe('chain_to_detect', whale.get('tier', 3), whale['chain'], detected - bought_at)
+    with state_lock('whale_token_balances'):
+        position = bot_state.get('whale_token_balances', {}).get(f"{whale['address']}_{token['address']}")
+        if position is not None:
+            position['bought_at'] = bought_at
+    return bought_at
+
+def get_buy_block_time(whale, token):
+    """
+    Unix block time of the transfer that gave the whale this token (None when
+    it cannot be found). Raises RpcError when the lookup fails.
+    """
+    chain = whale['chain']
+    key = f"{whale['address']}:{token['address']}"
+    
+    if _buy_time_source is not None:
+        data = _buy_time_source(chain, key)
+        if data is None:
+            return None
+    elif chain == 'solana':
+        if not token.get('account'):
+            return None
+        # A token account that just appeared has the buy as its newest signature
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getSignaturesForAddress",
+            "params": [token['account'], {"limit": 1}]
+        }
+        data = get_rpc_pool('solana').post(payload)
+        record_response('buy_time', chain, key, data)
+    elif chain == 'base':
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "alchemy_getAssetTransfers",
+            "params": [{
+                "toAddress": whale['address'],
+                "contractAddresses": [token['address']],
+                "category": ["erc20"],
+                "order": "desc",
+                "maxCount": "0x1",
+                "withMetadata": True
+            }]
+        }
+        data = get_rpc_pool('base').post(payload)
+        record_response('buy_time', chain, key, data)
+    else:
+        return None
+    
+    return parse_buy_time(chain, data)
+
+def parse_buy_time(chain, data):
+    """Block time from getSignaturesForAddress (Solana) or alchemy_getAssetTransfers (Base)"""
+    if chain == 'solana':
+        signatures = data.get('result') or []
+        return signatures[0].get('blockTime') if signatures else None
+    
+    transfers = (data.get('result') or {}).get('transfers') or []
+    stamp = transfers[0].get('metadata', {}).get('blockTimestamp') if transfers else None
+    return datetime.fromisoformat(stamp.replace('Z', '+00:00')).timestamp() if stamp else None
 
 # ============================================================
 # Alert Functions
@@ -220,14 +460,17 @@ DEX: {token_info.get('dex', 'Unknown')}
     
     print(f"  ✅ {tier_emoji} Alert: {token_info['symbol']} (${token_info['market_cap']:,.0f})")
 
-def send_multi_buy_alert(token_address, whale_count, symbol, mc):
+def send_multi_buy_alert(token_address, whale_count, symbol, mc, window=None):
     """Send alert when multiple whales buy same token"""
     
+    fire = "🔥" * min(max(whale_count + 1, 3), 6)
+    window_text = f" within <b>{window / 3600:g}h</b>" if window else ""
+    
     message = f"""
-🔥🔥🔥 <b>MULTI-WHALE BUY!</b> 🔥🔥🔥
+{fire} <b>MULTI-WHALE BUY!</b> {fire}
 
 💎 <b>{symbol}</b>
-<b>{whale_count} WHALES</b> bought this token!
+<b>{whale_count} WHALES</b> bought this token{window_text}!
 
 📊 MC: <b>${mc:,.0f}</b>
 
@@ -239,68 +482,136 @@ def send_multi_buy_alert(token_address, whale_count, symbol, mc):
     send_telegram_alert(message)
     print(f"  🔥🔥🔥 MULTI-BUY: {symbol} ({whale_count} whales)")
 
+def send_coalesced_buy_alert(token_info, buys, multi=None):
+    """One alert for every whale that bought a token inside the coalescing window"""
+    
+    tier_emojis = {1: '🔥', 2: '⭐', 3: '📊', 4: '💤'}
+    
+    if multi:
+        whale_count, window = multi
+        # Whales in this group past the last level crossed still count
+        whale_count = max(whale_count, len(buys))
+        fire = "🔥" * min(max(whale_count + 1, 3), 6)
+        window_text = f" within <b>{window / 3600:g}h</b>" if window else ""
+        headline = f"{fire} <b>MULTI-WHALE BUY!</b> {fire}"
+        summary = f"<b>{whale_count} WHALES</b> bought this token{window_text}!"
+    else:
+        headline = f"🚨 <b>{len(buys)} WHALE BUYS!</b>"
+        summary = f"<b>{len(buys)} whales</b> bought within seconds"
+    
+    whale_lines = "\n".join(
+        f"{tier_emojis.get(whale.get('tier', 3), '📊')} T{whale.get('tier', 3)} "
+        f"<code>{whale['address'][:16]}...</code> - <b>{balance:,.0f}</b>"
+        for whale, balance in buys
+    )
+    chain = buys[0][0]['chain'].upper()
+    
+    message = f"""
+{headline}
+
+💎 <b>{token_info['symbol']}</b>
+{summary}
+📊 MC: <b>${token_info['market_cap']:,.0f}</b>
+💧 Liq: <b>${token_info['liquidity']:,.0f}</b>
+
+━━━━━━━━━━━━━━━━━━━━
+🐋 <b>WHALES</b> ({chain})
+━━━━━━━━━━━━━━━━━━━━
+{whale_lines}
+
+━━━━━━━━━━━━━━━━━━━━
+📈 <b>DETAILS</b>
+━━━━━━━━━━━━━━━━━━━━
+Price: ${token_info['price']:.8f}
+5m: <b>{token_info.get('price_change_5m', 0):+.1f}%</b>
+1h: <b>{token_info.get('price_change_1h', 0):+.1f}%</b>
+
+DEX: {token_info.get('dex', 'Unknown')}
+
+🔗 <a href="{token_info['url']}">View Chart</a>
+📝 <code>{token_info['symbol']}</code>
+━━━━━━━━━━━━━━━━━━━━
+"""
+    
+    send_telegram_alert(message)
+    print(f"  ✅ 🐋x{len(buys)} Alert: {token_info['symbol']} (${token_info['market_cap']:,.0f})")
+
 # ============================================================
 # Token Tracking Functions
 # ============================================================
 
-def track_token_buy(token_address, whale_address, initial_price, mc, symbol, chain, balance):
+def track_token_buy(token_address, whale_address, initial_price, mc, symbol, chain, balance,
+                    token_account=None, decimals=None, bought_at=None, detected_at=None):
     """Start tracking a token after whale buy"""
     
-    if 'tracked_tokens' not in bot_state:
-        bot_state['tracked_tokens'] = {}
+    with state_lock('tracked_tokens'):
+        if 'tracked_tokens' not in bot_state:
+            bot_state['tracked_tokens'] = {}
+        
+        mark_changed('tracked')
+        
+        if token_address not in bot_state['tracked_tokens']:
+            bot_state['tracked_tokens'][token_address] = {
+                'symbol': symbol,
+                'chain': chain,
+                'initial_price': initial_price,
+                'initial_mc': mc,
+                'current_price': initial_price,
+                'highest_price': initial_price,
+                'max_gain': 0,
+                'current_gain': 0,
+                'whales_bought': [whale_address],
+                'whale_balances': {whale_address: balance},
+                'first_alert_time': clock.now(),
+                'last_check_time': clock.now(),
+                'alerts_sent': {},
+                'status': 'active',
+                'sells_detected': []
+            }
+            get_token_scheduler().reschedule(token_address, bot_state['tracked_tokens'][token_address])
+        else:
+            # Another whale bought same token (whale_balances doubles as an O(1) membership set)
+            data = bot_state['tracked_tokens'][token_address]
+            whale_balances = data.setdefault('whale_balances', {})
+            if whale_address not in whale_balances:
+                data['whales_bought'].append(whale_address)
+                whale_balances[whale_address] = balance
+            # A whale that sold out and bought back is holding again
+            if whale_address in data.get('exited_whales', []):
+                data['exited_whales'].remove(whale_address)
+            if data.get('status') != 'active':
+                reactivate_token(token_address, data)
+                get_token_scheduler().reschedule(token_address, data)
+    
+    # Multi-buy alert when the windowed whale count crosses a new level
+    index = get_multi_buy_index()
+    level = index.record_buy(token_address, whale_address, symbol)
+    if level:
+        get_alert_coalescer().add_multi_buy(
+            token_address, index.whale_count(token_address, level['window']), symbol, mc, level['window'])
     
-    if token_address not in bot_state['tracked_tokens']:
-        bot_state['tracked_tokens'][token_address] = {
+    # NEW: Track whale balance for sell detection
+    balance_key = f"{whale_address}_{token_address}"
+    with state_lock('whale_token_balances'):
+        if 'whale_token_balances' not in bot_state:
+            bot_state['whale_token_balances'] = {}
+        
+        bot_state['whale_token_balances'][balance_key] = {
+            'whale': whale_address,
+            'token': token_address,
             'symbol': symbol,
             'chain': chain,
-            'initial_price': initial_price,
-            'initial_mc': mc,
-            'current_price': initial_price,
-            'highest_price': initial_price,
-            'max_gain': 0,
-            'current_gain': 0,
-            'whales_bought': [whale_address],
-            'whale_balances': {whale_address: balance},
-            'first_alert_time': time.time(),
-            'last_check_time': time.time(),
-            'alerts_sent': {},
-            'status': 'active',
-            'sells_detected': []
+            'initial_balance': balance,
+            'current_balance': balance,
+            'last_check': clock.now()
         }
-    else:
-        # Another whale bought same token
-        if whale_address not in bot_state['tracked_tokens'][token_address]['whales_bought']:
-            bot_state['tracked_tokens'][token_address]['whales_bought'].append(whale_address)
-            bot_state['tracked_tokens'][token_address]['whale_balances'][whale_address] = balance
-            
-            # Multi-buy alert
-            whale_count = len(bot_state['tracked_tokens'][token_address]['whales_bought'])
-            if whale_count >= 2:
-                # Track multi-buys
-                if 'multi_buys' not in bot_state:
-                    bot_state['multi_buys'] = {}
-                
-                if token_address not in bot_state['multi_buys']:
-                    bot_state['multi_buys'][token_address] = {
-                        'whale_count': whale_count,
-                        'detected_time': time.time()
-                    }
-                    send_multi_buy_alert(token_address, whale_count, symbol, mc)
-    
-    # NEW: Track whale balance for sell detection
-    if 'whale_token_balances' not in bot_state:
-        bot_state['whale_token_balances'] = {}
-    
-    balance_key = f"{whale_address}_{token_address}"
-    bot_state['whale_token_balances'][balance_key] = {
-        'whale': whale_address,
-        'token': token_address,
-        'symbol': symbol,
-        'chain': chain,
-        'initial_balance': balance,
-        'current_balance': balance,
-        'last_check': time.time()
-    }
+        if token_account and decimals is not None:
+            bot_state['whale_token_balances'][balance_key].update(token_account=token_account, decimals=decimals)
+        # On-chain time of the buy and when we saw it
+        if bought_at is not None:
+            bot_state['whale_token_balances'][balance_key]['bought_at'] = bought_at
+        if detected_at is not None:
+            bot_state['whale_token_balances'][balance_key]['detected_at'] = detected_at
     
     save_bot_state()
 
@@ -309,34 +620,82 @@ def track_token_buy(token_address, whale_address, initial_price, mc, symbol, cha
 # ============================================================
 
 def update_whale_performance(whale_address, gain_pct):
-    """Update whale performance stats"""
-    
-    if 'whale_performance' not in bot_state:
-        bot_state['whale_performance'] = {}
-    
-    if whale_address not in bot_state['whale_performance']:
-        bot_state['whale_performance'][whale_address] = {
-            'tokens_tracked': 0,
-            'successful_calls': 0,
-            'total_gain': 0,
-            'best_call': 0,
-            'worst_call': 0
-        }
+    """Update whale performance stats (lifetime and rolling windows)"""
     
-    stats = bot_state['whale_performance'][whale_address]
-    stats['tokens_tracked'] += 1
-    stats['total_gain'] += gain_pct
+    get_performance_index().record(whale_address, gain_pct)
+    mark_whale_dirty(whale_address)
     
-    if gain_pct >= 100:
-        stats['successful_calls'] += 1
+    save_bot_state()
+
+# ============================================================
+# Price Milestone Tracking
+# ============================================================
+
+def refresh_tracked_token(token_addr, data, token_info, milestones=None):
+    """Apply a fresh price to a tracked token, send milestone alerts and return the milestones hit"""
     
-    if gain_pct > stats['best_call']:
-        stats['best_call'] = gain_pct
+    current_price = token_info['price']
+    initial_price = data['initial_price']
     
-    if stats['worst_call'] == 0 or gain_pct < stats['worst_call']:
-        stats['worst_call'] = gain_pct
+    current_gain = ((current_price - initial_price) / initial_price) * 100
     
-    save_bot_state()
+    with state_lock('tracked_tokens'):
+        # Smoothed size of recent moves drives the refresh cadence
+        move = abs(current_gain - data.get('current_gain', 0))
+        data['volatility'] = 0.5 * data.get('volatility', move) + 0.5 * move
+        
+        data['current_price'] = current_price
+        data['current_gain'] = current_gain
+        data['last_check_time'] = clock.now()
+        
+        if current_gain > data.get('max_gain', 0):
+            data['max_gain'] = current_gain
+            data['highest_price'] = current_price
+    mark_changed('tracked')
+    
+    hit = []
+    
+    # Send milestone alerts
+    for milestone in (milestones or PRICE_MILESTONES):
+        if current_gain >= milestone and not data.get('alerts_sent', {}).get(str(milestone)):
+            
+            whale_count = len(data.get('whales_bought', []))
+            multi_icon = "🔥🔥🔥" if whale_count >= 3 else "🔥" if whale_count >= 2 else ""
+            
+            time_since = (clock.now() - data.get('first_alert_time', clock.now())) / 3600
+            
+            message = f"""
+🚀 <b>PRICE MILESTONE {multi_icon}</b>
+
+💎 <b>{data['symbol']}</b> is UP <b>{current_gain:.1f}%</b>!
+
+━━━━━━━━━━━━━━━━━━━━
+📊 Initial MC: <b>${data['initial_mc']:,.0f}</b>
+📊 Current MC: <b>${token_info['market_cap']:,.0f}</b>
+
+💰 Entry: ${initial_price:.8f}
+💰 Current: ${current_price:.8f}
+📈 Gain: <b>+{current_gain:.1f}%</b>
+
+🐋 Whales: <b>{whale_count}</b>
+⏰ Time: {time_since:.1f}h ago
+
+━━━━━━━━━━━━━━━━━━━━
+🔗 <a href="{token_info['url']}">View Chart</a>
+📝 <code>{token_addr}</code>
+━━━━━━━━━━━━━━━━━━━━
+"""
+            send_telegram_alert(message)
+            
+            with state_lock('tracked_tokens'):
+                data.setdefault('alerts_sent', {})[str(milestone)] = True
+            hit.append(milestone)
+            
+            # Update whale performance
+            for whale_addr in data.get('whales_bought', []):
+                update_whale_performance(whale_addr, current_gain)
+    
+    return hit
 
 # ============================================================
 # SELL DETECTION FUNCTIONS (NEW!)
@@ -352,15 +711,36 @@ def check_whale_sells():
     
     print(f"  🔍 Checking {len(whale_balances)} positions for sells...")
     
-    for balance_key, balance_data in list(whale_balances.items()):
+    with state_lock('whale_token_balances'):
+        # Skip positions checked recently
+        positions = [
+            (balance_key, balance_data) for balance_key, balance_data in whale_balances.items()
+            if clock.now() - balance_data.get('last_check', 0) >= 120
+        ]
+    
+    # Batched reads: one balanceOf sweep on Base, token accounts on Solana
+    sweeps = [
+        ('Base balance sweep', get_base_position_balances,
+         [p for p in positions if p[1]['chain'] == 'base']),
+        ('Solana token account read', get_solana_position_balances,
+         [p for p in positions if p[1]['chain'] == 'solana' and p[1].get('token_account')]),
+    ]
+    swept = set()
+    for label, fetch, batch in sweeps:
+        if not batch:
+            continue
+        try:
+            apply_position_balances(batch, fetch(batch))
+            swept.update(balance_key for balance_key, _ in batch)
+        except RpcError as e:
+            print(f"  ⚠️ {label} failed, checking wallets one by one: {e}")
+    
+    # Positions without a batched path (or whose batch failed) download the wallet
+    positions = [p for p in positions if p[0] not in swept]
+    
+    for balance_key, balance_data in positions:
         try:
-            # Skip if checked recently
-            if time.time() - balance_data.get('last_check', 0) < 120:
-                continue
-            
             whale_address = balance_data['whale']
-            token_address = balance_data['token']
-            initial_balance = balance_data['initial_balance']
             chain = balance_data['chain']
             
             # Get current balance
@@ -369,27 +749,7 @@ def check_whale_sells():
             else:
                 current_tokens = get_base_tokens(whale_address)
             
-            current_balance = 0
-            for token in current_tokens:
-                if token['address'].lower() == token_address.lower():
-                    current_balance = token['balance']
-                    break
-            
-            # Update tracking
-            balance_data['current_balance'] = current_balance
-            balance_data['last_check'] = time.time()
-            
-            # Calculate balance change
-            if initial_balance > 0:
-                balance_change_pct = ((current_balance - initial_balance) / initial_balance) * 100
-                
-                # SELL DETECTED: Sold 30%+ of position
-                if balance_change_pct < -30:
-                    send_sell_alert(balance_data, balance_change_pct)
-                    
-                    # Remove from tracking if fully sold
-                    if current_balance == 0:
-                        del bot_state['whale_token_balances'][balance_key]
+            update_position_balance(balance_key, balance_data, current_tokens)
             
             save_bot_state()
             
@@ -397,6 +757,66 @@ def check_whale_sells():
             print(f"  ⚠️ Error checking sell for {balance_key[:16]}: {e}")
             continue
 
+def get_base_position_balances(positions):
+    return get_base_balances([(data['whale'], data['token']) for _, data in positions])
+
+def get_solana_position_balances(positions):
+    amounts = get_solana_account_balances([data['token_account'] for _, data in positions])
+    return [amount / 10 ** data['decimals'] for (_, data), amount in zip(positions, amounts)]
+
+def apply_position_balances(positions, balances):
+    """Run sell detection for positions refreshed by a batched read"""
+    for (balance_key, balance_data), balance in zip(positions, balances):
+        # A reverted call says nothing about the position; never treat it as a sell
+        if balance is None:
+            continue
+        try:
+            current = [{'address': balance_data['token'], 'balance': balance}] if balance > 0 else []
+            update_position_balance(balance_key, balance_data, current)
+        except Exception as e:
+            print(f"  ⚠️ Error checking sell for {balance_key[:16]}: {e}")
+    
+    save_bot_state()
+
+def update_position_balance(balance_key, balance_data, current_tokens):
+    """Compare a tracked position against a holdings snapshot and alert on sells"""
+    
+    token_address = balance_data['token']
+    initial_balance = balance_data['initial_balance']
+    
+    current_balance = 0
+    for token in current_tokens:
+        if token['address'].lower() == token_address.lower():
+            current_balance = token['balance']
+            # Positions tracked before token accounts were kept pick theirs up here
+            if token.get('account') and token.get('decimals') is not None and 'token_account' not in balance_data:
+                with state_lock('whale_token_balances'):
+                    balance_data.update(token_account=token['account'], decimals=token['decimals'])
+            break
+    
+    # Update tracking
+    with state_lock('whale_token_balances'):
+        balance_data['current_balance'] = current_balance
+        balance_data['last_check'] = clock.now()
+    
+    # Calculate balance change
+    if initial_balance > 0:
+        balance_change_pct = ((current_balance - initial_balance) / initial_balance) * 100
+        
+        # SELL DETECTED: Sold 30%+ of position
+        if balance_change_pct < -30:
+            send_sell_alert(balance_data, balance_change_pct)
+            
+            # Remove from tracking if fully sold
+            if current_balance == 0:
+                with state_lock('whale_token_balances'):
+                    bot_state['whale_token_balances'].pop(balance_key, None)
+                
+                with state_lock('tracked_tokens'):
+                    tracked = bot_state.get('tracked_tokens', {}).get(token_address)
+                    if tracked is not None and balance_data['whale'] not in tracked.setdefault('exited_whales', []):
+                        tracked['exited_whales'].append(balance_data['whale'])
+
 
 def send_sell_alert(balance_data, sold_pct):
     """Send Telegram alert when whale sells"""
@@ -469,16 +889,17 @@ Consider {'taking profits' if price_gain > 0 else 'cutting losses'} if holding.
     update_whale_performance(whale_addr, price_gain)
     
     # Mark sell in tracked tokens
-    if token_addr in bot_state.get('tracked_tokens', {}):
-        if 'sells_detected' not in bot_state['tracked_tokens'][token_addr]:
-            bot_state['tracked_tokens'][token_addr]['sells_detected'] = []
-        
-        bot_state['tracked_tokens'][token_addr]['sells_detected'].append({
-            'whale': whale_addr,
-            'sold_pct': sold_pct_abs,
-            'profit_pct': price_gain,
-            'timestamp': time.time()
-        })
+    with state_lock('tracked_tokens'):
+        if token_addr in bot_state.get('tracked_tokens', {}):
+            if 'sells_detected' not in bot_state['tracked_tokens'][token_addr]:
+                bot_state['tracked_tokens'][token_addr]['sells_detected'] = []
+            
+            bot_state['tracked_tokens'][token_addr]['sells_detected'].append({
+                'whale': whale_addr,
+                'sold_pct': sold_pct_abs,
+                'profit_pct': price_gain,
+                'timestamp': clock.now()
+            })
     
     print(f"  🚨 SELL ALERT: {symbol} by {whale_addr[:8]}... ({price_gain:+.1f}%)")
 
@@ -0,0 +1,463 @@
+"""
+Fleet scaling test for Whale Tracker Bot V4
+Synthesizes whale fleets of growing size with the tier/chain mix of the real
+list, runs the monitoring pipeline against the fake providers while they
+simulate buys and sells, and reports how tier scheduling, whale_tokens
+memory and bot_state persistence scale
+
+Usage:
+    python loadtest.py --sizes 2000 5000 10000 20000 --json curves.json
+    python loadtest.py --generate 20000 --out whales_20k.json
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_providers import (
+    FakeWorld, ActivitySimulator, b58encode,
+    start_fake_providers, provider_env, stop_fake_providers
+)
+from benchmark import percentile, current_rss_mb
+
+SUPPORTED_CHAINS = ('solana', 'base')
+# Wallets past this many tokens are dust collectors; the tail is cut here
+HOLDINGS_MAX = 2000
+
+# ============================================================
+# Fleet Generator
+# ============================================================
+
+def fleet_mix(whales):
+    """Share of each (tier, chain) in a whale list"""
+    counts = {}
+    for whale in whales:
+        if whale.get('chain') in SUPPORTED_CHAINS:
+            key = (whale.get('tier', 3), whale['chain'])
+            counts[key] = counts.get(key, 0) + 1
+    total = sum(counts.values())
+    return {key: count / total for key, count in sorted(counts.items())}
+
+def synthetic_address(chain, rng):
+    if chain == 'base':
+        return '0x' + rng.randbytes(20).hex()
+    return b58encode(rng.randbytes(32))
+
+def generate_fleet(count, template, seed=42):
+    """
+    count whales drawn with the tier/chain mix of template, each copying the
+    stats of a random template whale from the same tier and chain
+    """
+    rng = random.Random(f"{seed}:fleet:{count}")
+    mix = fleet_mix(template)
+    keys = list(mix)
+    models = {key: [w for w in template if (w.get('tier', 3), w.get('chain')) == key] for key in keys}
+
+    fleet = []
+    for tier, chain in rng.choices(keys, [mix[key] for key in keys], k=count):
+        model = rng.choice(models[(tier, chain)])
+        fleet.append(dict(
+            model,
+            address=synthetic_address(chain, rng),
+            winning_tokens=list(model.get('winning_tokens', [])),
+            source='synthetic'
+        ))
+    return fleet
+
+def holdings_sizes(fleet, median=20, sigma=1.0, seed=42):
+    """Tokens held per wallet, log-normal so a few wallets hold hundreds"""
+    rng = random.Random(f"{seed}:holdings")
+    return {
+        whale['address']: max(1, min(HOLDINGS_MAX, int(rng.lognormvariate(math.log(median), sigma))))
+        for whale in fleet
+    }
+
+# ============================================================
+# Measurement Helpers
+# ============================================================
+
+def deep_size(obj):
+    """Bytes held by nested dicts/sets/lists and their contents (shared objects once)"""
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (set, frozenset, list, tuple)):
+            stack.extend(item)
+    return size
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+# ============================================================
+# Pipeline Phases
+# ============================================================
+
+def preload_history(world, fleet, hours, buys_per_day, shared, seed):
+    """
+    Alerted buys from `hours` of past activity, tracked through track_token_buy
+    on a simulated clock so bot_state is as big as a bot that has been running.
+    A `shared` share of buys pile into a token another whale bought recently.
+    """
+    import clock
+    import utils
+    from alert_coalescer import AlertCoalescer, set_alert_coalescer
+    from features import track_token_buy
+
+    rng = random.Random(f"{seed}:history:{len(fleet)}")
+    count = int(len(fleet) * buys_per_day * hours / 24)
+    if not count:
+        return 0
+
+    start = time.time() - hours * 3600
+    sim = clock.SimulatedClock(start)
+    clock.set_time_source(sim)
+    previous_coalescer = set_alert_coalescer(AlertCoalescer(background=False))
+    utils.set_alert_sink(lambda message, chat_id: None)
+    recent = {chain: [] for chain in SUPPORTED_CHAINS}
+
+    try:
+        for i in range(count):
+            sim.advance_to(start + (i + 1) * hours * 3600 / count)
+            whale = rng.choice(fleet)
+            chain = whale['chain']
+
+            if recent[chain] and rng.random() < shared:
+                token, symbol = rng.choice(recent[chain])
+            else:
+                token, symbol = synthetic_address(chain, rng), f"HIST{i:06d}"
+                recent[chain] = (recent[chain] + [(token, symbol)])[-50:]
+
+            amount = rng.randint(10_000, 50_000_000)
+            world.add_holding(whale['address'], chain, token, amount, symbol)
+            market = world.market(token)
+
+            if chain == 'solana':
+                balance = amount / 1_000_000
+                account = world.token_account_address(whale['address'], token)
+                decimals = 6
+            else:
+                # Raw uint256 as a float, the way parse_base_tokens stores it
+                balance, account, decimals = float(amount * 10 ** 18), None, None
+
+            track_token_buy(token, whale['address'], market['market_cap'] / 1_000_000_000, market['market_cap'],
+                            symbol, chain, balance, token_account=account, decimals=decimals)
+    finally:
+        clock.set_time_source(None)
+        set_alert_coalescer(previous_coalescer)
+        utils.set_alert_sink(None)
+    return count
+
+def scan_fleet(fleet, whale_tokens, is_baseline, workers):
+    """Check every whale once across a worker pool; returns check seconds by tier"""
+    from features import check_whale_for_new_buys
+
+    def check(whale):
+        started = time.perf_counter()
+        check_whale_for_new_buys(whale, whale_tokens, is_baseline)
+        return whale.get('tier', 3), time.perf_counter() - started
+
+    durations = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for tier, seconds in pool.map(check, fleet):
+            durations.setdefault(tier, []).append(seconds)
+    return durations
+
+def schedule_report(fleet, durations):
+    """
+    Per tier: a monitor thread checks its whales one after another with a
+    throttle between them, so a cycle takes whales x (check + throttle).
+    Utilization past 1.0 means the tier can no longer keep its interval.
+    """
+    from config import TIER_CONFIG
+
+    report = {}
+    for tier, config in sorted(TIER_CONFIG.items()):
+        whales = sum(1 for w in fleet if w.get('tier', 3) == tier)
+        checks = durations.get(tier, [])
+        if not whales or not checks:
+            continue
+        per_whale = sum(checks) / len(checks) + config['throttle']
+        cycle = whales * per_whale
+        report[tier] = {
+            'whales': whales,
+            'check_ms_p50': percentile(checks, 50) * 1000,
+            'check_ms_p99': percentile(checks, 99) * 1000,
+            'cycle_s': cycle,
+            'interval_s': config['interval'],
+            'utilization': cycle / config['interval'],
+            'capacity': int(config['interval'] / per_whale)
+        }
+    return report
+
+def persistence_report(path, repeats=3):
+    """Explicit full saves of the current bot_state, then a reload"""
+    from state import flush_bot_state, state_metrics
+    from codec import load_file
+
+    snapshots, serializes = [], []
+    for _ in range(repeats):
+        flush_bot_state()
+        persistence = state_metrics()['persistence']
+        snapshots.append(persistence['snapshot_ms_last'])
+        serializes.append(persistence['serialize_ms_last'])
+
+    _, load_seconds = timed(load_file, path)
+    return {
+        'bytes': os.path.getsize(path),
+        'snapshot_ms': percentile(snapshots, 50),
+        'serialize_ms': percentile(serializes, 50),
+        'load_ms': load_seconds * 1000
+    }
+
+def token_scheduler_report():
+    """Rebuild cost of the due-time heap (every state reload) and one full pop"""
+    from state import bot_state
+    from token_scheduler import TokenScheduler
+
+    tracked = bot_state.get('tracked_tokens', {})
+    scheduler, build_seconds = timed(TokenScheduler, tracked)
+    active = len(scheduler)
+    _, pop_seconds = timed(scheduler.pop_due, time.time() + 7 * 86400)
+    return {
+        'active': active,
+        'build_ms': build_seconds * 1000,
+        'pop_all_ms': pop_seconds * 1000
+    }
+
+# ============================================================
+# Test Mode
+# ============================================================
+
+def run_size(size, template, providers, state_path, args):
+    """One fleet size from empty state: history, baseline, live cycles with activity, sell sweep"""
+    from config import DEFAULT_FILTERS
+    from state import bot_state, set_state_file
+    from backtest import reset_state
+    from features import check_whale_sells
+
+    fleet = [w for w in generate_fleet(size, template, args.seed) if w['chain'] in SUPPORTED_CHAINS]
+    world = FakeWorld(seed=args.seed)
+    world.wallet_sizes = holdings_sizes(fleet, args.holdings, args.holdings_sigma, args.seed)
+    for provider in providers.values():
+        provider.world = world
+        provider.counts = {}
+
+    # Persistence stays off while history is replayed in bulk
+    set_state_file(None)
+    reset_state(dict(DEFAULT_FILTERS))
+    history_buys, history_seconds = timed(
+        preload_history, world, fleet, args.history_hours, args.buys_per_day, args.shared, args.seed)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    set_state_file(state_path)
+
+    whale_tokens = {}
+    _, baseline_seconds = timed(scan_fleet, fleet, whale_tokens, True, args.workers)
+
+    # Live: daily rates sped up so a short run still sees activity
+    activity = ActivitySimulator(
+        world, fleet,
+        buys_per_second=len(fleet) * args.buys_per_day / 86400 * args.speedup,
+        sells_per_second=len(fleet) * args.sells_per_day / 86400 * args.speedup,
+        seed=args.seed
+    )
+    live_started = time.time()
+    durations = {}
+    activity.start()
+    while True:
+        # Last pass runs with activity stopped, so every injected buy can be seen
+        last = time.time() - live_started >= args.live_seconds
+        if last:
+            activity.stop()
+        for tier, checks in scan_fleet(fleet, whale_tokens, False, args.workers).items():
+            durations.setdefault(tier, []).extend(checks)
+        if last:
+            break
+    live_seconds = time.time() - live_started
+
+    positions = len(bot_state.get('whale_token_balances', {}))
+    _, sweep_seconds = timed(check_whale_sells)
+
+    live_buys = [b for b in world.buys.values() if b['injected_at'] >= live_started]
+    tokens_held = sum(len(tokens) for tokens in whale_tokens.values())
+    whale_tokens_bytes = deep_size(whale_tokens)
+
+    return {
+        'whales': len(fleet),
+        'tokens_held': tokens_held,
+        'history_buys': history_buys,
+        'history_s': history_seconds,
+        'baseline_s': baseline_seconds,
+        'live_s': live_seconds,
+        'requests': sum(p.total_requests() for p in providers.values()),
+        'scheduler': schedule_report(fleet, durations),
+        'token_scheduler': token_scheduler_report(),
+        'whale_tokens_mb': whale_tokens_bytes / (1024 * 1024),
+        'whale_tokens_bytes_per_whale': whale_tokens_bytes / len(fleet),
+        'tracked_tokens': len(bot_state.get('tracked_tokens', {})),
+        'positions': positions,
+        'sell_sweep_s': sweep_seconds,
+        'persistence': persistence_report(state_path),
+        'activity': dict(activity.counts),
+        'buys_alerted': sum(1 for b in live_buys if 'alerted_at' in b),
+        'buys_injected': len(live_buys),
+        # Buys sold off before a scan reached the wallet can never be alerted
+        'buys_still_held': sum(1 for b in live_buys if b['token'] in world.holdings.get(b['whale'], {})),
+        'rss_mb': current_rss_mb()
+    }
+
+def run_loadtest(args):
+    world, providers = start_fake_providers(latency_ms=args.latency, jitter_ms=args.jitter)
+    workdir = tempfile.mkdtemp(prefix='whale_load_')
+    os.environ.update(provider_env(providers))
+    os.environ['BOT_STATE_FILE'] = os.path.join(workdir, 'bot_state.json')
+    os.environ['ALERT_COALESCE_SECONDS'] = '0'
+
+    # Imported only after the environment points at the stand-ins
+    from config import WHALE_LIST_FILE
+
+    with open(args.template or WHALE_LIST_FILE, 'r') as f:
+        template = json.load(f)
+
+    print(f"🐋 Load test: fleets of {', '.join(f'{s:,}' for s in args.sizes)} whales")
+    print("   Mix: " + ', '.join(f"T{tier} {chain} {share:.0%}" for (tier, chain), share in fleet_mix(template).items()))
+    print(f"   Holdings: median {args.holdings} (sigma {args.holdings_sigma}) | "
+          f"{args.buys_per_day}/{args.sells_per_day} buys/sells per whale per day | {args.history_hours}h history")
+
+    results = []
+    output = None if args.verbose else open(os.devnull, 'w')
+    try:
+        for size in args.sizes:
+            started = time.time()
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                result = run_size(size, template, providers, os.environ['BOT_STATE_FILE'], args)
+            results.append(result)
+            print(f"   ✅ {size:,} whales in {time.time() - started:.1f}s "
+                  f"({result['requests']:,} requests, {result['buys_alerted']}/{result['buys_injected']} live buys alerted, "
+                  f"{result['buys_still_held']} still held)")
+    finally:
+        if output:
+            output.close()
+        stop_fake_providers(providers)
+
+    return {
+        'runs': results,
+        'settings': {
+            'sizes': args.sizes,
+            'holdings_median': args.holdings,
+            'holdings_sigma': args.holdings_sigma,
+            'buys_per_day': args.buys_per_day,
+            'sells_per_day': args.sells_per_day,
+            'history_hours': args.history_hours,
+            'shared': args.shared,
+            'speedup': args.speedup,
+            'live_seconds': args.live_seconds,
+            'workers': args.workers,
+            'latency_ms': args.latency,
+            'jitter_ms': args.jitter
+        }
+    }
+
+# ============================================================
+# Reporting
+# ============================================================
+
+def print_curves(result):
+    runs = result['runs']
+    tiers = sorted({tier for run in runs for tier in run['scheduler']})
+
+    print("\n" + "="*60)
+    print("📈 SCALING CURVES")
+    print("="*60)
+
+    print("\n  Tier scheduling (projected cycle / interval):")
+    print(f"    {'whales':>8}" + ''.join(f"{'T' + str(t):>18}" for t in tiers))
+    for run in runs:
+        cells = []
+        for tier in tiers:
+            s = run['scheduler'].get(tier)
+            cells.append(f"{s['cycle_s']:>8.0f}s {s['utilization']:>6.0%}{'⚠️' if s['utilization'] > 1 else '  '}" if s else f"{'-':>18}")
+        print(f"    {run['whales']:>8,}" + ''.join(f"{c:>18}" for c in cells))
+
+    print("\n  Memory and persistence:")
+    print(f"    {'whales':>8} {'tokens':>10} {'whale_tokens':>13} {'B/whale':>8} {'tracked':>8} "
+          f"{'state':>9} {'snapshot':>9} {'write':>8} {'load':>8} {'sweep':>7} {'heap':>8} {'RSS':>8}")
+    for run in runs:
+        p = run['persistence']
+        print(f"    {run['whales']:>8,} {run['tokens_held']:>10,} {run['whale_tokens_mb']:>11.1f}MB "
+              f"{run['whale_tokens_bytes_per_whale']:>8,.0f} {run['tracked_tokens']:>8,} "
+              f"{p['bytes'] / (1024 * 1024):>7.1f}MB {p['snapshot_ms']:>7.0f}ms {p['serialize_ms']:>6.0f}ms "
+              f"{p['load_ms']:>6.0f}ms {run['sell_sweep_s']:>6.1f}s {run['token_scheduler']['build_ms']:>6.0f}ms "
+              f"{run['rss_mb']:>6.0f}MB")
+
+    # Where each tier runs out of interval at the largest size's cost per check
+    largest = runs[-1]
+    print("\n  Tier capacity at the largest run's cost per check:")
+    for tier, s in sorted(largest['scheduler'].items()):
+        share = s['whales'] / largest['whales']
+        fleet_limit = int(s['capacity'] / share) if share else 0
+        print(f"    T{tier}: {s['capacity']:,} whales per {s['interval_s']}s cycle "
+              f"(p50 check {s['check_ms_p50']:.0f}ms) -> ~{fleet_limit:,} whale fleet at this mix")
+    print("="*60)
+
+def main():
+    parser = argparse.ArgumentParser(description='Whale fleet scaling test')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 5000, 10000, 20000], help='Fleet sizes to run')
+    parser.add_argument('--generate', type=int, help='Only write a synthetic whale list of this size (see --out)')
+    parser.add_argument('--out', help='Whale list path for --generate')
+    parser.add_argument('--template', help='Whale list whose mix and stats are copied (default WHALE_LIST_FILE)')
+    parser.add_argument('--holdings', type=int, default=20, help='Median tokens held per wallet')
+    parser.add_argument('--holdings-sigma', type=float, default=1.0, help='Log-normal spread of holdings')
+    parser.add_argument('--buys-per-day', type=float, default=0.5, help='Alerted buys per whale per day')
+    parser.add_argument('--sells-per-day', type=float, default=0.3, help='Sells per whale per day')
+    parser.add_argument('--history-hours', type=float, default=24, help='Hours of past buys already in bot_state')
+    parser.add_argument('--shared', type=float, default=0.2, help='Share of past buys into a token another whale bought')
+    parser.add_argument('--speedup', type=float, default=60, help='Live activity runs this many times faster than the daily rates')
+    parser.add_argument('--live-seconds', type=float, default=20, help='Keep scanning with activity running this long')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent wallet checks (4 = one per tier monitor)')
+    parser.add_argument('--latency', type=float, default=0, help='Provider latency in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='Extra random latency in ms')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help='Show the bot output')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    if args.generate:
+        from config import WHALE_LIST_FILE
+        if not args.out:
+            parser.error('--generate needs --out')
+        with open(args.template or WHALE_LIST_FILE, 'r') as f:
+            fleet = generate_fleet(args.generate, json.load(f), args.seed)
+        with open(args.out, 'w') as f:
+            json.dump(fleet, f, indent=2)
+        print(f"💾 {len(fleet):,} synthetic whales saved to {args.out}")
+        return
+
+    result = run_loadtest(args)
+    print_curves(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to {args.json}")
+
+if __name__ == '__main__':
+    main()
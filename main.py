@@ -3,19 +3,21 @@ Whale Tracker Bot V4 - Multi-Tier System
 Monitors 4 tiers of whales with different check intervals
 """
 
-import json
 import threading
 import time
 import requests
-import traceback
 from datetime import datetime
 
 # Import modular components
 from config import *
 from state import bot_state, save_bot_state, load_bot_state
 from utils import *
-from commands import handle_command
-from features import check_whale_for_new_buys
+from command_runner import get_command_runner, dispatch_update
+from features import check_whale_for_new_buys, refresh_tracked_token
+from cluster import is_alerting_leader
+from token_scheduler import get_token_scheduler, retirement_reason, retire_token
+from whale_store import get_whale_store
+from price_oracle import get_price_oracle
 
 # Load bot state
 load_bot_state()
@@ -28,8 +30,7 @@ print("="*60)
 # Load ALL whales across ALL tiers
 # ============================================================
 
-with open(WHALE_LIST_FILE, 'r') as f:
-    all_whales = json.load(f)
+all_whales = get_whale_store().whales()
 
 # Separate by tier
 tier1_whales = [w for w in all_whales if w.get('tier', 3) == 1]
@@ -58,10 +59,8 @@ print(f"  💤 Tier 4: {len(tier4_whales)} (Base: {len(tier4_base)}, Sol: {len(t
 print(f"  ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
 print(f"  📊 TOTAL: {len(all_whales)} whales")
 
-# Track known tokens per whale
+# Track known tokens per whale (filled by each whale's first check, which is its baseline)
 whale_tokens = {}
-for whale in all_whales:
-    whale_tokens[whale['address']] = set()
 
 print(f"\n📱 Telegram Configuration:")
 print(f"  Bot Token: {'✅ Set' if TELEGRAM_BOT_TOKEN else '❌ Missing'}")
@@ -80,6 +79,10 @@ print(f"  Market Cap: ${DEFAULT_FILTERS['mc_min']:,} - ${DEFAULT_FILTERS['mc_max
 print(f"  Min Liquidity: ${DEFAULT_FILTERS['liq_min']:,}")
 
 print(f"\n🚀 Starting 8 monitoring threads...")
+if CLUSTER_DB:
+    print(f"  🌐 Cluster mode: {CLUSTER_PARTITIONS} partitions via {CLUSTER_DB}")
+elif SHARD_COUNT > 1:
+    print(f"  🧩 Sharded mode: {SHARD_COUNT} worker processes")
 print(f"  🔥 Tier 1: Check every 30 seconds")
 print(f"  ⭐ Tier 2: Check every 3 minutes")
 print(f"  📊 Tier 3: Check every 10 minutes")
@@ -111,11 +114,8 @@ def tier1_monitor():
             
             print(f"\n🔥 [TIER 1] Cycle #{cycle} - {datetime.now().strftime('%H:%M:%S')}")
             
-            # Reload whales to get updated tiers
-            with open(WHALE_LIST_FILE, 'r') as f:
-                whales = json.load(f)
-            
-            tier1 = [w for w in whales if w.get('tier') == 1]
+            # Re-read tiers from the store (updated in place)
+            tier1 = get_whale_store().whales(tier=1)
             
             for whale in tier1:
                 check_whale_for_new_buys(whale, whale_tokens, first_run)
@@ -155,10 +155,7 @@ def tier2_monitor():
             
             print(f"\n⭐ [TIER 2] Cycle #{cycle} - {datetime.now().strftime('%H:%M:%S')}")
             
-            with open(WHALE_LIST_FILE, 'r') as f:
-                whales = json.load(f)
-            
-            tier2 = [w for w in whales if w.get('tier') == 2]
+            tier2 = get_whale_store().whales(tier=2)
             
             for whale in tier2:
                 check_whale_for_new_buys(whale, whale_tokens, first_run)
@@ -197,10 +194,7 @@ def tier3_monitor():
             
             print(f"\n📊 [TIER 3] Cycle #{cycle} - {datetime.now().strftime('%H:%M:%S')}")
             
-            with open(WHALE_LIST_FILE, 'r') as f:
-                whales = json.load(f)
-            
-            tier3 = [w for w in whales if w.get('tier') == 3]
+            tier3 = get_whale_store().whales(tier=3)
             
             for whale in tier3:
                 check_whale_for_new_buys(whale, whale_tokens, first_run)
@@ -239,10 +233,7 @@ def tier4_monitor():
             
             print(f"\n💤 [TIER 4] Cycle #{cycle} - {datetime.now().strftime('%H:%M:%S')}")
             
-            with open(WHALE_LIST_FILE, 'r') as f:
-                whales = json.load(f)
-            
-            tier4 = [w for w in whales if w.get('tier') == 4]
+            tier4 = get_whale_store().whales(tier=4)
             
             for whale in tier4:
                 check_whale_for_new_buys(whale, whale_tokens, first_run)
@@ -268,23 +259,30 @@ def tier_promotion_monitor():
     # Wait 10 minutes before first check
     time.sleep(600)
     
+    # Dirty sets are per process, so sweep everything on start and after taking over
+    full = True
+    
     while True:
         try:
-            print(f"\n🎯 [AUTO-TIER] Checking whale performance...")
+            if not is_alerting_leader():
+                full = True
+                time.sleep(60)
+                continue
             
             from tier_manager import update_whale_tiers
             
-            changes = update_whale_tiers()
+            changes = update_whale_tiers(full=full)
+            full = False
             
             if changes > 0:
-                print(f"   ✅ Updated {changes} whale tiers")
+                print(f"\n🎯 [AUTO-TIER] Updated {changes} whale tiers")
             
-            # Check every hour
-            time.sleep(3600)
+            # Only whales with new results are evaluated, so this can run often
+            time.sleep(TIER_EVAL_INTERVAL)
         
         except Exception as e:
             print(f"Tier promotion error: {e}")
-            time.sleep(3600)
+            time.sleep(TIER_EVAL_INTERVAL)
 
 # ============================================================
 # Command Listener Thread
@@ -294,13 +292,38 @@ def command_listener():
     """Listen for Telegram commands"""
     print("✅ Command listener started")
     
+    webhook = None
+    webhook_retry_at = 0
+    
     while True:
         try:
-            if not TELEGRAM_BOT_TOKEN:
+            # Only one node may long-poll getUpdates
+            if not TELEGRAM_BOT_TOKEN or not is_alerting_leader():
+                if webhook:
+                    # The new leader re-registers the webhook for itself
+                    webhook.stop(unregister=False)
+                    webhook = None
                 time.sleep(10)
                 continue
             
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+            # Webhook mode when configured; long polling below is the fallback
+            if TELEGRAM_WEBHOOK_URL and webhook is None and time.time() >= webhook_retry_at:
+                from webhook import start_webhook
+                webhook = start_webhook()
+                if webhook is None:
+                    print("  ↩️ Webhook unavailable - using long polling")
+                    webhook_retry_at = time.time() + WEBHOOK_RETRY_SECONDS
+            
+            if webhook:
+                time.sleep(WEBHOOK_HEALTH_SECONDS)
+                if not webhook.healthy():
+                    print("  ↩️ Webhook unhealthy - falling back to long polling")
+                    webhook.stop()
+                    webhook = None
+                    webhook_retry_at = time.time() + WEBHOOK_RETRY_SECONDS
+                continue
+            
+            url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
             params = {
                 'offset': bot_state.get('last_update_id', 0) + 1,
                 'timeout': 10
@@ -319,31 +342,11 @@ def command_listener():
                 continue
             
             if data.get('result'):
+                runner = get_command_runner()
+                
                 for update in data['result']:
-                    bot_state['last_update_id'] = update['update_id']
-                    
-                    if 'message' in update and 'text' in update['message']:
-                        text = update['message']['text']
-                        user_id = update['message']['from']['id']
-                        chat_id = update['message']['chat']['id']
-                        
-                        if text.startswith('/'):
-                            print(f"\n💬 COMMAND: {text}")
-                            
-                            try:
-                                reply = handle_command(text, user_id)
-                                
-                                if reply:
-                                    success = send_telegram_message(reply, chat_id)
-                                    
-                                    if success:
-                                        print(f"   ✅ Response sent!\n")
-                                    else:
-                                        print(f"   ❌ Failed to send\n")
-                            
-                            except Exception as e:
-                                print(f"   ❌ Command error: {e}\n")
-                                traceback.print_exc()
+                    # Workers run the command and reply; go straight back to polling
+                    dispatch_update(update, runner)
                 
                 save_bot_state()
         
@@ -362,79 +365,50 @@ def performance_tracker():
     
     while True:
         try:
-            time.sleep(60)  # Check every minute
+            scheduler = get_token_scheduler()
             
-            tracked = bot_state.get('tracked_tokens', {})
+            # Sleep until the next token is due (re-check at least every minute)
+            time.sleep(max(1, scheduler.seconds_until_next_due(60)))
             
-            for token_addr, data in list(tracked.items()):
-                if data.get('status') != 'active':
-                    continue
-                
-                if time.time() - data.get('last_check_time', 0) < 60:
-                    continue
-                
-                # Update token performance
-                token_info = get_token_info(token_addr, data['chain'])
-                
-                if token_info:
-                    current_price = token_info['price']
-                    initial_price = data['initial_price']
-                    
-                    current_gain = ((current_price - initial_price) / initial_price) * 100
-                    
-                    data['current_price'] = current_price
-                    data['current_gain'] = current_gain
-                    data['last_check_time'] = time.time()
+            if not is_alerting_leader():
+                continue
+            
+            tracked = bot_state.get('tracked_tokens', {})
+            due = scheduler.pop_due()
+            
+            live = [(addr, tracked[addr]) for addr in due if tracked.get(addr, {}).get('status') == 'active']
+            
+            # Pool reserves for every due token in a few batched RPC reads, DexScreener for the rest
+            try:
+                prices = get_price_oracle().fetch_prices(live) if live else {}
+            except Exception as e:
+                # Still reschedule everything below
+                print(f"  ⚠️ Price refresh failed: {e}")
+                prices = {}
+            
+            for token_addr, data in live:
+                reason = None
+                try:
+                    # Update token performance
+                    token_info = prices.get(token_addr)
                     
-                    if current_gain > data.get('max_gain', 0):
-                        data['max_gain'] = current_gain
-                        data['highest_price'] = current_price
+                    if token_info:
+                        refresh_tracked_token(token_addr, data, token_info)
                     
-                    # Send milestone alerts
-                    milestones = [10, 25, 50, 100, 200, 500, 1000]
-                    for milestone in milestones:
-                        if current_gain >= milestone and not data.get('alerts_sent', {}).get(str(milestone)):
-                            
-                            whale_count = len(data.get('whales_bought', []))
-                            multi_icon = "🔥🔥🔥" if whale_count >= 3 else "🔥" if whale_count >= 2 else ""
-                            
-                            time_since = (time.time() - data.get('first_alert_time', time.time())) / 3600
-                            
-                            message = f"""
-🚀 <b>PRICE MILESTONE {multi_icon}</b>
-
-💎 <b>{data['symbol']}</b> is UP <b>{current_gain:.1f}%</b>!
-
-━━━━━━━━━━━━━━━━━━━━
-📊 Initial MC: <b>${data['initial_mc']:,.0f}</b>
-📊 Current MC: <b>${token_info['market_cap']:,.0f}</b>
-
-💰 Entry: ${initial_price:.8f}
-💰 Current: ${current_price:.8f}
-📈 Gain: <b>+{current_gain:.1f}%</b>
-
-🐋 Whales: <b>{whale_count}</b>
-⏰ Time: {time_since:.1f}h ago
-
-━━━━━━━━━━━━━━━━━━━━
-🔗 <a href="{token_info['url']}">View Chart</a>
-📝 <code>{token_addr}</code>
-━━━━━━━━━━━━━━━━━━━━
-"""
-                            send_telegram_alert(message)
-                            
-                            if 'alerts_sent' not in data:
-                                data['alerts_sent'] = {}
-                            data['alerts_sent'][str(milestone)] = True
-                            
-                            # Update whale performance
-                            from features import update_whale_performance
-                            for whale_addr in data.get('whales_bought', []):
-                                update_whale_performance(whale_addr, current_gain)
-                    
-                    save_bot_state()
+                    reason = retirement_reason(data)
+                    if reason:
+                        retire_token(token_addr, data, reason)
+                except Exception as e:
+                    print(f"  ⚠️ Error refreshing {token_addr[:8]}: {e}")
+                finally:
+                    if not reason:
+                        scheduler.reschedule(token_addr, data)
+            
+            if due:
+                save_bot_state()
         
         except Exception as e:
+            print(f"Performance tracker error: {e}")
             time.sleep(60)
 
 # ============================================================
@@ -451,6 +425,9 @@ def sell_detector():
         try:
             time.sleep(120)  # Check every 2 minutes
             
+            if not is_alerting_leader():
+                continue
+            
             # Check for whale sells
             from features import check_whale_sells
             check_whale_sells()
@@ -459,31 +436,71 @@ def sell_detector():
             print(f"Sell detector error: {e}")
             time.sleep(120)
 
+# ============================================================
+# Retention Thread
+# ============================================================
+
+def retention_monitor():
+    """Move closed and stale records out of bot_state into the archive"""
+    print("✅ Retention archiver started")
+    
+    time.sleep(900)  # Wait 15 min before first pass
+    
+    while True:
+        try:
+            if is_alerting_leader():
+                from archive import run_retention
+                
+                counts = run_retention()
+                moved = sum(counts.values())
+                
+                if moved > 0:
+                    save_bot_state()
+                    detail = ', '.join(f"{k}: {v}" for k, v in counts.items() if v)
+                    print(f"\n🗄️ [RETENTION] Archived {moved} records ({detail})")
+            
+            time.sleep(3600)
+        
+        except Exception as e:
+            print(f"Retention error: {e}")
+            time.sleep(3600)
+
 # ============================================================
 # Start all threads
 # ============================================================
 
-# Tier monitors
-t1_thread = threading.Thread(target=tier1_monitor, daemon=True)
-t2_thread = threading.Thread(target=tier2_monitor, daemon=True)
-t3_thread = threading.Thread(target=tier3_monitor, daemon=True)
-t4_thread = threading.Thread(target=tier4_monitor, daemon=True)
+# Tier monitors (or cluster node / sharded worker processes)
+if CLUSTER_DB:
+    from cluster import start_cluster_node
+    start_cluster_node(all_whales)
+elif SHARD_COUNT > 1:
+    # The shard supervisor is forked before any other thread starts
+    from sharding import start_sharded_monitoring
+    start_sharded_monitoring(all_whales, SHARD_COUNT)
+else:
+    t1_thread = threading.Thread(target=tier1_monitor, daemon=True)
+    t2_thread = threading.Thread(target=tier2_monitor, daemon=True)
+    t3_thread = threading.Thread(target=tier3_monitor, daemon=True)
+    t4_thread = threading.Thread(target=tier4_monitor, daemon=True)
+    
+    t1_thread.start()
+    t2_thread.start()
+    t3_thread.start()
+    t4_thread.start()
 
 # Support threads
 promotion_thread = threading.Thread(target=tier_promotion_monitor, daemon=True)
 command_thread = threading.Thread(target=command_listener, daemon=True)
 perf_thread = threading.Thread(target=performance_tracker, daemon=True)
 sell_thread = threading.Thread(target=sell_detector, daemon=True)
+retention_thread = threading.Thread(target=retention_monitor, daemon=True)
 
 # Start all threads
-t1_thread.start()
-t2_thread.start()
-t3_thread.start()
-t4_thread.start()
 promotion_thread.start()
 command_thread.start()
 perf_thread.start()
 sell_thread.start()
+retention_thread.start()
 
 print("\n" + "="*60)
 print("✅ ALL 8 SYSTEMS ONLINE!")
@@ -0,0 +1,166 @@
+"""
+Sliding-window multi-buy index
+Token → (whale, timestamp) membership per configured window with
+automatic expiry and escalating alert levels
+"""
+
+import threading
+from collections import deque
+
+import clock
+from config import MULTI_BUY_LEVELS
+from state import bot_state, mark_changed, state_lock
+
+# ============================================================
+# Index
+# ============================================================
+
+class MultiBuyIndex:
+    """
+    Tracks which whales bought each token inside every configured window.
+
+    records (persisted as bot_state['multi_buys']) holds the widest window:
+        token -> {'whales': {whale: ts}, 'symbol', 'level', 'detected_time', 'whale_count'}
+    Narrower windows keep their own in-memory membership. Each window has a
+    deque of (ts, token, whale) in arrival order, so updates and expiry are
+    O(1) amortised per window.
+    """
+
+    def __init__(self, records, levels=None):
+        self.levels = sorted(levels or MULTI_BUY_LEVELS, key=lambda l: (l['whales'], l['window']))
+        self.windows = sorted({level['window'] for level in self.levels})
+        self.widest = self.windows[-1]
+        # Shared with state snapshots so records are never copied mid-update
+        self.lock = state_lock('multi_buys')
+        self.records = records
+        self.members = {window: {} for window in self.windows}
+        self.queues = {window: deque() for window in self.windows}
+        self.expired = []
+        self._rebuild()
+
+    def _rebuild(self):
+        """Load persisted records, dropping legacy entries without whale timestamps"""
+        for token in [t for t, r in self.records.items() if 'whales' not in r]:
+            del self.records[token]
+
+        events = sorted(
+            (ts, token, whale)
+            for token, record in self.records.items()
+            for whale, ts in record['whales'].items()
+        )
+        for ts, token, whale in events:
+            for window in self.windows:
+                self.members[window].setdefault(token, {})[whale] = ts
+                self.queues[window].append((ts, token, whale))
+        for token, record in self.records.items():
+            record['whales'] = self.members[self.widest].setdefault(token, {})
+        self.expire()
+
+    def expire(self, now=None):
+        """Drop entries that fell out of each window"""
+        now = clock.now() if now is None else now
+        with self.lock:
+            for window in self.windows:
+                members = self.members[window]
+                queue = self.queues[window]
+                cutoff = now - window
+                while queue and queue[0][0] < cutoff:
+                    ts, token, whale = queue.popleft()
+                    token_members = members.get(token)
+                    # A newer buy by the same whale refreshed the entry
+                    if token_members is None or token_members.get(whale) != ts:
+                        continue
+                    del token_members[whale]
+                    if window == self.widest:
+                        mark_changed('multibuys')
+                    if not token_members:
+                        del members[token]
+                        if window == self.widest:
+                            record = self.records.pop(token, None)
+                            if record and record.get('level', 0) > 0:
+                                summary = {k: v for k, v in record.items() if k != 'whales'}
+                                summary['last_buy_time'] = ts
+                                self.expired.append((token, summary))
+
+    def record_buy(self, token, whale, symbol=None, now=None):
+        """
+        Add a buy and return the newly reached level (or None).
+
+        A level fires once per episode; the episode ends when every buy of
+        the token has aged out of the widest window.
+        """
+        now = clock.now() if now is None else now
+        with self.lock:
+            self.expire(now)
+
+            for window in self.windows:
+                self.members[window].setdefault(token, {})[whale] = now
+                self.queues[window].append((now, token, whale))
+
+            mark_changed('multibuys')
+            record = self.records.setdefault(token, {'whales': {}, 'symbol': symbol, 'level': 0})
+            record['whales'] = self.members[self.widest][token]
+            record['whale_count'] = len(record['whales'])
+            if symbol:
+                record['symbol'] = symbol
+
+            reached = 0
+            for index, level in enumerate(self.levels, 1):
+                if len(self.members[level['window']].get(token, {})) >= level['whales']:
+                    reached = index
+
+            if reached > record.get('level', 0):
+                record['level'] = reached
+                record.setdefault('detected_time', now)
+                record['last_alert_time'] = now
+                return self.levels[reached - 1]
+
+            return None
+
+    def drain_expired(self):
+        """Hand over expired multi-buy episodes (for archiving)"""
+        with self.lock:
+            self.expire()
+            expired, self.expired = self.expired, []
+        return expired
+
+    def whale_count(self, token, window=None):
+        """Distinct whales that bought token inside window (default: widest)"""
+        with self.lock:
+            self.expire()
+            return len(self.members[window or self.widest].get(token, {}))
+
+    def active(self, now=None):
+        """Tokens currently at a multi-buy level, strongest first"""
+        with self.lock:
+            self.expire(now)
+            rows = [
+                {
+                    'token': token,
+                    'symbol': record.get('symbol'),
+                    'level': record['level'],
+                    'whale_count': len(record['whales']),
+                    'detected_time': record.get('detected_time'),
+                    'last_buy_time': max(record['whales'].values())
+                }
+                for token, record in self.records.items()
+                if record.get('level', 0) > 0
+            ]
+        rows.sort(key=lambda r: (r['level'], r['whale_count'], r['last_buy_time']), reverse=True)
+        return rows
+
+# ============================================================
+# Shared Instance
+# ============================================================
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_multi_buy_index():
+    """Index bound to the current bot_state['multi_buys'] (rebinds after a state reload)"""
+    global _index
+    with _index_lock:
+        records = bot_state.setdefault('multi_buys', {})
+        if _index is None or _index.records is not records:
+            _index = MultiBuyIndex(records)
+        return _index
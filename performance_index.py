@@ -0,0 +1,215 @@
+"""
+Streaming whale performance aggregates
+Lifetime totals plus rolling windows of calls, successes and gain per
+whale, each with an incrementally maintained leaderboard
+"""
+
+import bisect
+import threading
+from collections import deque
+
+import clock
+from config import PERFORMANCE_WINDOWS, LEADERBOARD_MIN_CALLS
+from state import bot_state, state_lock
+
+LIFETIME = 'all'
+
+# A call counts as successful at +100% or more
+SUCCESS_GAIN = 100
+
+# ============================================================
+# Index
+# ============================================================
+
+class PerformanceIndex:
+    """
+    Per-whale aggregates with O(1) amortised updates.
+
+    lifetime (persisted as bot_state['whale_performance']):
+        whale -> {'tokens_tracked', 'successful_calls', 'total_gain', 'best_call', 'worst_call'}
+    events (persisted as bot_state['performance_events']) holds [ts, whale, gain]
+    for the widest window; each window keeps a deque of the same events plus
+    running sums, so expiry subtracts instead of rescanning, and a monotonic
+    deque per whale whose head is that whale's best call in the window. Every window
+    (and lifetime) has a sorted ranking that is re-keyed only for the whale
+    that changed.
+    """
+
+    def __init__(self, lifetime, events, windows=None):
+        self.windows = dict(windows or PERFORMANCE_WINDOWS)
+        self.widest = max(self.windows.values())
+        # Shared with state snapshots so lifetime/events are never copied mid-update
+        self.lock = state_lock('whale_performance')
+        self.lifetime = lifetime
+        self.events = events
+        self.queues = {name: deque() for name in self.windows}
+        self.sums = {name: {} for name in self.windows}
+        self.peaks = {name: {} for name in self.windows}
+        self.rankings = {name: [] for name in [LIFETIME] + list(self.windows)}
+        self.keys = {name: {} for name in self.rankings}
+        self._rebuild()
+
+    def _rebuild(self):
+        for whale in self.lifetime:
+            self._rerank(LIFETIME, whale)
+
+        for ts, whale, gain in self.events:
+            for name in self.windows:
+                self._add(name, ts, whale, gain)
+        self.expire()
+
+    # Aggregates --------------------------------------------------
+
+    def _add(self, name, ts, whale, gain):
+        event = (ts, whale, gain)
+        self.queues[name].append(event)
+        # Calls that can no longer be the window's best are dropped from the back
+        peaks = self.peaks[name].setdefault(whale, deque())
+        while peaks and peaks[-1][2] <= gain:
+            peaks.pop()
+        peaks.append(event)
+        sums = self.sums[name].setdefault(whale, {'calls': 0, 'successes': 0, 'total_gain': 0})
+        sums['calls'] += 1
+        sums['successes'] += gain >= SUCCESS_GAIN
+        sums['total_gain'] += gain
+        self._rerank(name, whale)
+
+    def _summary(self, name, whale):
+        if name == LIFETIME:
+            stats = self.lifetime.get(whale)
+            if not stats:
+                return None
+            calls, successes, total_gain = stats['tokens_tracked'], stats['successful_calls'], stats['total_gain']
+            best_call = stats.get('best_call', 0)
+        else:
+            stats = self.sums[name].get(whale)
+            if not stats:
+                return None
+            calls, successes, total_gain = stats['calls'], stats['successes'], stats['total_gain']
+            best_call = self.peaks[name][whale][0][2]
+
+        if calls == 0:
+            return None
+        return {
+            'calls': calls,
+            'success_rate': successes / calls * 100,
+            'avg_gain': total_gain / calls,
+            'best_call': best_call
+        }
+
+    def _rerank(self, name, whale):
+        ranking = self.rankings[name]
+        keys = self.keys[name]
+
+        old_key = keys.pop(whale, None)
+        if old_key is not None:
+            del ranking[bisect.bisect_left(ranking, old_key)]
+
+        summary = self._summary(name, whale)
+        if summary and summary['calls'] >= LEADERBOARD_MIN_CALLS:
+            key = (-summary['success_rate'], -summary['avg_gain'], whale)
+            bisect.insort(ranking, key)
+            keys[whale] = key
+
+    def expire(self, now=None):
+        """Subtract events that aged out of each window"""
+        now = clock.now() if now is None else now
+        with self.lock:
+            for name, seconds in self.windows.items():
+                queue = self.queues[name]
+                cutoff = now - seconds
+                while queue and queue[0][0] < cutoff:
+                    event = queue.popleft()
+                    _, whale, gain = event
+                    peaks = self.peaks[name][whale]
+                    if peaks and peaks[0] is event:
+                        peaks.popleft()
+                    sums = self.sums[name][whale]
+                    sums['calls'] -= 1
+                    sums['successes'] -= gain >= SUCCESS_GAIN
+                    sums['total_gain'] -= gain
+                    if sums['calls'] == 0:
+                        del self.sums[name][whale]
+                        del self.peaks[name][whale]
+                    self._rerank(name, whale)
+
+            # Persisted events only need to cover the widest window
+            cutoff = now - self.widest
+            stale = 0
+            while stale < len(self.events) and self.events[stale][0] < cutoff:
+                stale += 1
+            if stale:
+                del self.events[:stale]
+
+    # Updates -----------------------------------------------------
+
+    def record(self, whale, gain, now=None):
+        """Add one call result for a whale"""
+        now = clock.now() if now is None else now
+        with self.lock:
+            self.expire(now)
+
+            stats = self.lifetime.setdefault(whale, {
+                'tokens_tracked': 0,
+                'successful_calls': 0,
+                'total_gain': 0,
+                'best_call': 0,
+                'worst_call': 0
+            })
+            stats['tokens_tracked'] += 1
+            stats['total_gain'] += gain
+
+            if gain >= SUCCESS_GAIN:
+                stats['successful_calls'] += 1
+
+            if gain > stats['best_call']:
+                stats['best_call'] = gain
+
+            if stats['worst_call'] == 0 or gain < stats['worst_call']:
+                stats['worst_call'] = gain
+
+            self._rerank(LIFETIME, whale)
+
+            self.events.append([now, whale, gain])
+            for name in self.windows:
+                self._add(name, now, whale, gain)
+
+    # Reads -------------------------------------------------------
+
+    def stats(self, whale, window=LIFETIME):
+        """calls / success_rate / avg_gain / best_call for one whale (None without calls)"""
+        with self.lock:
+            if window != LIFETIME:
+                self.expire()
+            return self._summary(window, whale)
+
+    def leaderboard(self, window=LIFETIME, k=10):
+        """Top k whales by success rate then average gain"""
+        with self.lock:
+            if window != LIFETIME:
+                self.expire()
+            return [
+                dict(self._summary(window, whale), address=whale)
+                for _, _, whale in self.rankings[window][:k]
+            ]
+
+    def ranked_count(self, window=LIFETIME):
+        with self.lock:
+            return len(self.rankings[window])
+
+# ============================================================
+# Shared Instance
+# ============================================================
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_performance_index():
+    """Index bound to the current bot_state performance data (rebuilt after a state reload)"""
+    global _index
+    with _index_lock:
+        lifetime = bot_state.setdefault('whale_performance', {})
+        events = bot_state.setdefault('performance_events', [])
+        if _index is None or _index.lifetime is not lifetime or _index.events is not events:
+            _index = PerformanceIndex(lifetime, events)
+        return _index
@@ -0,0 +1,360 @@
+"""
+On-chain price oracle for tracked tokens
+Prices each token from its main pool's reserves / sqrt price read over RPC
+(Multicall3 on Base, getMultipleAccounts on Solana). DexScreener is only
+used to discover the pool and as a fallback when a pool cannot be read.
+"""
+
+import threading
+from collections import defaultdict
+
+import clock
+from config import (
+    ORACLE_ENABLED,
+    ORACLE_REFERENCE_POOLS,
+    ORACLE_REDISCOVER_SECONDS,
+    NATIVE_QUOTES,
+    STABLE_QUOTES
+)
+from state import state_lock
+from utils import get_token_info
+from rpc import (
+    RpcError,
+    b58encode,
+    calldata,
+    decode_address,
+    decode_words,
+    get_multiple_accounts,
+    multicall
+)
+
+PUMP_TOKEN_DECIMALS = 6
+SOL_DECIMALS = 9
+
+# ============================================================
+# Pool Kinds
+# ============================================================
+
+def pool_kind(chain, dex, labels):
+    """Which pool layout a DexScreener pair uses (None when we cannot read it)"""
+    labels = {label.lower() for label in labels or []}
+    if chain == 'base':
+        # v4 pairs are pool ids inside the singleton, stable pools do not price by reserve ratio
+        if labels & {'v4', 'stable'}:
+            return None
+        return 'v3' if labels & {'v3', 'cl'} else 'v2'
+    if chain == 'solana':
+        if dex == 'pumpfun':
+            return 'pump_curve'
+        if dex == 'raydium':
+            if 'clmm' in labels:
+                return 'raydium_clmm'
+            return None if labels & {'cpmm', 'launchlab'} else 'raydium_amm'
+        if dex == 'orca':
+            return 'whirlpool'
+    return None
+
+def same_address(a, b):
+    # EVM addresses compare case-insensitively, base58 does not
+    return a == b or (a.startswith('0x') and a.lower() == b.lower())
+
+def _u64(raw, offset):
+    return int.from_bytes(raw[offset:offset + 8], 'little')
+
+def _u128(raw, offset):
+    return int.from_bytes(raw[offset:offset + 16], 'little')
+
+# ============================================================
+# Discovery (layout details read once per pool)
+# ============================================================
+
+def _discover_base(pool, token):
+    token0, token_decimals, quote_decimals = multicall([
+        (pool['address'], calldata('token0')),
+        (token, calldata('decimals')),
+        (pool['quote'], calldata('decimals'))
+    ])
+    if token0 is None or token_decimals is None or quote_decimals is None:
+        return None
+    pool['token_first'] = same_address(decode_address(token0), token)
+    pool['token_decimals'] = decode_words(token_decimals)[0]
+    pool['quote_decimals'] = decode_words(quote_decimals)[0]
+    return pool
+
+def _discover_solana(pool, token):
+    kind = pool['kind']
+    if kind == 'pump_curve':
+        pool.update(token_first=True, token_decimals=PUMP_TOKEN_DECIMALS, quote_decimals=SOL_DECIMALS)
+        return pool
+
+    raw = get_multiple_accounts([pool['address']])[0]
+    if raw is None:
+        return None
+
+    if kind == 'raydium_amm':
+        # AMM v4: base/quote decimals (u64), then vaults and mints
+        mints = [b58encode(raw[400:432]), b58encode(raw[432:464])]
+        decimals = [_u64(raw, 32), _u64(raw, 40)]
+        vaults = [b58encode(raw[336:368]), b58encode(raw[368:400])]
+    elif kind == 'raydium_clmm':
+        mints = [b58encode(raw[73:105]), b58encode(raw[105:137])]
+        decimals = [raw[233], raw[234]]
+        vaults = None
+    else:
+        mints = [b58encode(raw[101:133]), b58encode(raw[181:213])]
+        # Whirlpools do not store decimals; read them from the mint accounts
+        mint_accounts = get_multiple_accounts(mints, offset=44, length=1)
+        if None in mint_accounts:
+            return None
+        decimals = [mint_accounts[0][0], mint_accounts[1][0]]
+        vaults = None
+
+    if token not in mints:
+        return None
+    side = mints.index(token)
+    pool['quote'] = mints[1 - side]
+    pool['token_first'] = side == 0
+    pool['token_decimals'] = decimals[side]
+    pool['quote_decimals'] = decimals[1 - side]
+    if vaults:
+        # Token vault first, quote vault second
+        pool['vaults'] = [vaults[side], vaults[1 - side]]
+    return pool
+
+def describe_pool(chain, token, token_info):
+    """Pool descriptor for a token from its DexScreener pair (kind None = not readable)"""
+    pool = {
+        'address': token_info.get('pair_address'),
+        'dex': token_info.get('dex'),
+        'kind': pool_kind(chain, token_info.get('dex'), token_info.get('pair_labels')),
+        'quote': token_info.get('quote_address'),
+        'url': token_info.get('url', ''),
+        'discovered': clock.now()
+    }
+    if not pool['address'] or not pool['kind'] or not token_info.get('price'):
+        pool['kind'] = None
+        return pool
+
+    discover = _discover_base if chain == 'base' else _discover_solana
+    try:
+        described = discover(pool, token)
+    except (RpcError, ValueError, IndexError) as e:
+        print(f"  ⚠️ Pool discovery failed for {token[:8]}: {e}")
+        described = None
+
+    if described is None:
+        pool['kind'] = None
+        return pool
+
+    # Market cap scales with price; supply is implied by DexScreener's numbers
+    pool['supply'] = token_info.get('market_cap', 0) / token_info['price']
+    return pool
+
+# ============================================================
+# Reading Pool State
+# ============================================================
+
+# Solana account bytes each kind needs per refresh: (account, offset, length)
+SOLANA_READS = {
+    'raydium_amm': lambda pool: [(vault, 64, 8) for vault in pool['vaults']],
+    'raydium_clmm': lambda pool: [(pool['address'], 253, 16)],
+    'whirlpool': lambda pool: [(pool['address'], 65, 16)],
+    # virtual token reserves, virtual SOL reserves ... complete flag
+    'pump_curve': lambda pool: [(pool['address'], 8, 41)],
+}
+
+def _raw_price(pool, values):
+    """Quote units per token unit before decimals, from decoded pool values"""
+    kind = pool['kind']
+    if kind == 'v2' or kind == 'raydium_amm' or kind == 'pump_curve':
+        token_reserve, quote_reserve = values
+        if kind == 'v2' and not pool['token_first']:
+            token_reserve, quote_reserve = quote_reserve, token_reserve
+        return quote_reserve / token_reserve if token_reserve else None
+
+    # Concentrated liquidity: sqrt(token1 / token0) in fixed point
+    sqrt_price, shift = values
+    if not sqrt_price:
+        return None
+    price = (sqrt_price / 2 ** shift) ** 2
+    return price if pool['token_first'] else 1 / price
+
+def price_in_quote(pool, raw):
+    if raw is None:
+        return None
+    return raw * 10 ** (pool['token_decimals'] - pool['quote_decimals'])
+
+def read_base_pools(pools):
+    """Quote price per pool, all pools in one Multicall3 pass (None where a call failed)"""
+    results = multicall([
+        (pool['address'], calldata('getReserves' if pool['kind'] == 'v2' else 'slot0'))
+        for pool in pools
+    ])
+
+    prices = []
+    for pool, result in zip(pools, results):
+        if result is None:
+            prices.append(None)
+            continue
+        words = decode_words(result)
+        values = (words[0], words[1]) if pool['kind'] == 'v2' else (words[0], 96)
+        prices.append(price_in_quote(pool, _raw_price(pool, values)))
+    return prices
+
+def read_solana_pools(pools):
+    """Quote price per pool; one getMultipleAccounts per distinct data slice"""
+    reads = [SOLANA_READS[pool['kind']](pool) for pool in pools]
+
+    by_slice = defaultdict(list)
+    for pool_reads in reads:
+        for account, offset, length in pool_reads:
+            by_slice[(offset, length)].append(account)
+
+    data = {}
+    for (offset, length), accounts in by_slice.items():
+        unique = list(dict.fromkeys(accounts))
+        for account, raw in zip(unique, get_multiple_accounts(unique, offset, length)):
+            data[(account, offset)] = raw
+
+    prices = []
+    for pool, pool_reads in zip(pools, reads):
+        blobs = [data.get((account, offset)) for account, offset, _ in pool_reads]
+        if None in blobs:
+            prices.append(None)
+            continue
+
+        kind = pool['kind']
+        if kind == 'raydium_amm':
+            values = (_u64(blobs[0], 0), _u64(blobs[1], 0))
+        elif kind == 'pump_curve':
+            if blobs[0][40]:
+                # Curve completed: liquidity migrated, rediscover the new pool
+                pool['stale'] = True
+                prices.append(None)
+                continue
+            values = (_u64(blobs[0], 0), _u64(blobs[0], 8))
+        else:
+            values = (_u128(blobs[0], 0), 64)
+        prices.append(price_in_quote(pool, _raw_price(pool, values)))
+    return prices
+
+CHAIN_READERS = {'base': read_base_pools, 'solana': read_solana_pools}
+
+# ============================================================
+# Oracle
+# ============================================================
+
+class PriceOracle:
+    """Batched on-chain pricing of tracked tokens with a DexScreener fallback"""
+
+    def __init__(self, references=ORACLE_REFERENCE_POOLS):
+        self.references = {chain: dict(pool) for chain, pool in references.items()}
+        self.lock = threading.Lock()
+        self.stats = {'chain': 0, 'fallback': 0, 'discovered': 0, 'unreadable': 0, 'rpc_errors': 0}
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _reference(self, chain):
+        """Native/USD reference pool for a chain, discovered on first use"""
+        reference = self.references.get(chain)
+        if reference and 'token_decimals' not in reference:
+            discover = _discover_base if chain == 'base' else _discover_solana
+            reference = discover(dict(reference), reference['token'])
+            if reference is None:
+                return None
+            self.references[chain] = reference
+        return reference
+
+    def _quote_usd(self, chain, quote, native_usd):
+        if any(same_address(quote, stable) for stable in STABLE_QUOTES):
+            return 1.0
+        if same_address(quote, NATIVE_QUOTES[chain]):
+            return native_usd
+        return None
+
+    def read_chain(self, chain, tokens):
+        """{token: token_info} for tokens on one chain whose pool could be read"""
+        pools = [data['pool'] for _, data in tokens]
+        reference = self._reference(chain)
+        if reference:
+            pools.append(reference)
+
+        prices = CHAIN_READERS[chain](pools)
+        native_usd = prices.pop() if reference else None
+
+        infos = {}
+        for (token, data), pool, price in zip(tokens, pools, prices):
+            quote_usd = self._quote_usd(chain, pool['quote'], native_usd)
+            if price is None or not quote_usd:
+                continue
+            usd = price * quote_usd
+            infos[token] = {
+                'symbol': data.get('symbol'),
+                'price': usd,
+                'market_cap': usd * pool.get('supply', 0),
+                'url': pool.get('url', ''),
+                'source': 'chain'
+            }
+        return infos
+
+    def token_infos(self, tokens):
+        """On-chain token_info for every (token, data) whose pool is readable"""
+        by_chain = defaultdict(list)
+        for token, data in tokens:
+            pool = data.get('pool')
+            if pool and pool.get('kind') and not pool.get('stale') and data.get('chain') in CHAIN_READERS:
+                by_chain[data['chain']].append((token, data))
+
+        infos = {}
+        for chain, chain_tokens in by_chain.items():
+            try:
+                infos.update(self.read_chain(chain, chain_tokens))
+            except (RpcError, ValueError, IndexError) as e:
+                self._count('rpc_errors')
+                print(f"  ⚠️ Price oracle read failed on {chain}: {e}")
+        return infos
+
+    def needs_discovery(self, data):
+        pool = data.get('pool')
+        if not pool or pool.get('stale'):
+            return True
+        return not pool.get('kind') and clock.now() - pool.get('discovered', 0) > ORACLE_REDISCOVER_SECONDS
+
+    def discover(self, token, data, token_info):
+        pool = describe_pool(data['chain'], token, token_info)
+        with state_lock('tracked_tokens'):
+            data['pool'] = pool
+        self._count('discovered' if pool['kind'] else 'unreadable')
+        return pool
+
+    def fetch_prices(self, tokens):
+        """
+        token_info per (token, data): pool reads first, DexScreener for the rest.
+        A DexScreener answer also (re)discovers the token's pool when needed.
+        """
+        infos = self.token_infos(tokens) if ORACLE_ENABLED else {}
+        self._count('chain', len(infos))
+
+        for token, data in tokens:
+            if token in infos:
+                continue
+            token_info = get_token_info(token, data['chain'])
+            if not token_info:
+                continue
+            self._count('fallback')
+            infos[token] = token_info
+            if ORACLE_ENABLED and self.needs_discovery(data):
+                self.discover(token, data, token_info)
+        return infos
+
+_oracle = None
+_oracle_lock = threading.Lock()
+
+def get_price_oracle():
+    global _oracle
+    with _oracle_lock:
+        if _oracle is None:
+            _oracle = PriceOracle()
+        return _oracle
@@ -0,0 +1,108 @@
+"""
+Raw response recorder for backtesting
+Writes wallet snapshots and DexScreener responses to hourly gzip JSONL files
+"""
+
+import glob
+import gzip
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import RECORD_DIR
+from codec import dumps, loads
+
+# ============================================================
+# Recorder
+# ============================================================
+
+class ResponseRecorder:
+    """Append-only, hour-partitioned, gzip-compressed event log"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.handles = {}
+        self.events_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind, ts):
+        hour = datetime.utcfromtimestamp(ts).strftime('%Y%m%d-%H')
+        return os.path.join(self.directory, f"{hour}.{kind}.jsonl.gz")
+
+    def _handle(self, kind, ts):
+        path = self._path(kind, ts)
+        handle = self.handles.get(kind)
+        if handle and handle.name == path:
+            return handle
+        if handle:
+            handle.close()
+        # Append mode adds a new gzip member, which gzip.open reads transparently
+        handle = gzip.open(path, 'ab')
+        self.handles[kind] = handle
+        return handle
+
+    def record(self, kind, chain, key, data):
+        ts = time.time()
+        line = dumps({'ts': ts, 'kind': kind, 'chain': chain, 'key': key, 'data': data})
+        with self.lock:
+            handle = self._handle(kind, ts)
+            handle.write(line + b'\n')
+            handle.flush()
+            self.events_written += 1
+
+    def close(self):
+        with self.lock:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles = {}
+
+_recorder = ResponseRecorder(RECORD_DIR) if RECORD_DIR else None
+
+def record_response(kind, chain, key, data):
+    """Record a raw provider response when RECORD_DIR is configured"""
+    if _recorder is None:
+        return
+    try:
+        _recorder.record(kind, chain, key, data)
+    except Exception as e:
+        print(f"  ⚠️ Recorder error: {e}")
+
+# ============================================================
+# Reader
+# ============================================================
+
+def _iter_file(path):
+    try:
+        with gzip.open(path, 'rb') as f:
+            for line in f:
+                try:
+                    yield loads(line)
+                except ValueError:
+                    # Truncated final line from an unclean shutdown
+                    continue
+    except EOFError:
+        return
+
+def iter_recorded_events(directory, kinds=None, start=None, end=None):
+    """Stream recorded events from all files in timestamp order"""
+    streams = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.jsonl.gz'))):
+        kind = os.path.basename(path).split('.')[1]
+        if kinds and kind not in kinds:
+            continue
+        streams.setdefault(kind, []).append(path)
+
+    def iter_kind(paths):
+        for path in paths:
+            yield from _iter_file(path)
+
+    merged = heapq.merge(*(iter_kind(paths) for paths in streams.values()), key=lambda e: e['ts'])
+    for event in merged:
+        if start and event['ts'] < start:
+            continue
+        if end and event['ts'] > end:
+            break
+        yield event
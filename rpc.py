@@ -0,0 +1,513 @@
+"""
+JSON-RPC helpers for Solana and Base
+Endpoint pools with circuit breakers, batched account reads
+(getMultipleAccounts) and Multicall3 aggregate3 calls, so many on-chain
+values cost one request instead of one each
+"""
+
+import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+from urllib.parse import urlparse
+
+import requests
+
+from config import (
+    RPC_ENDPOINTS,
+    RPC_TIMEOUT,
+    RPC_MIN_TIMEOUT,
+    RPC_LATENCY_SAMPLES,
+    RPC_BREAKER_FAILURES,
+    RPC_BREAKER_ERROR_RATE,
+    RPC_BREAKER_COOLDOWN,
+    HEDGE_BUDGET,
+    HEDGE_BURST,
+    HEDGE_MIN_DELAY,
+    HEDGE_WORKERS,
+    MULTICALL3_ADDRESS,
+    MULTICALL_GAS_LIMIT,
+    MULTICALL_CALL_GAS
+)
+from codec import response_json
+
+# getMultipleAccounts accepts at most 100 pubkeys per call
+SOLANA_MAX_ACCOUNTS = 100
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+class RpcError(Exception):
+    """Transport failure or JSON-RPC error response"""
+
+# ============================================================
+# Transport
+# ============================================================
+
+def rpc_call(url, method, params, timeout=10):
+    """Send one JSON-RPC request and return its result (raises RpcError)"""
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    try:
+        response = requests.post(url, json=payload, timeout=timeout)
+        data = response_json(response)
+    except (requests.RequestException, ValueError) as e:
+        raise RpcError(f"{method}: {e}")
+
+    if 'error' in data:
+        raise RpcError(f"{method}: {data['error'].get('message', data['error'])}")
+    if response.status_code != 200 or 'result' not in data:
+        raise RpcError(f"{method}: HTTP {response.status_code}")
+    return data['result']
+
+# ============================================================
+# Endpoint Pools (circuit breakers, latency-ranked routing)
+# ============================================================
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class RpcEndpoint:
+    """One RPC URL with rolling latency/error samples and a circuit breaker"""
+
+    def __init__(self, url):
+        self.url = url
+        # Hostname only: URLs carry API keys
+        self.name = urlparse(url).netloc or url
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=RPC_LATENCY_SAMPLES)
+        self.consecutive_failures = 0
+        self.state = 'closed'
+        self.opened_at = 0
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+        self.trips = 0
+        self.last_error = None
+
+    def available(self, now):
+        """Closed, or open past its cooldown with no probe in flight"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            return not self.probing and now - self.opened_at >= RPC_BREAKER_COOLDOWN
+
+    def acquire(self, now):
+        """Claim the request slot; an open breaker past its cooldown lets exactly one probe through"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.probing or now - self.opened_at < RPC_BREAKER_COOLDOWN:
+                return False
+            self.state = 'half_open'
+            self.probing = True
+            return True
+
+    def latencies(self):
+        with self.lock:
+            return [latency for latency, ok in self.samples if ok]
+
+    def latency(self, pct):
+        latencies = self.latencies()
+        return _percentile(latencies, pct) if latencies else None
+
+    def error_rate(self):
+        with self.lock:
+            return sum(1 for _, ok in self.samples if not ok) / len(self.samples) if self.samples else 0
+
+    def hedge_delay(self):
+        """Rolling p90, once there are enough samples to trust it (None before)"""
+        latencies = self.latencies()
+        if len(latencies) < 20:
+            return None
+        return max(HEDGE_MIN_DELAY, _percentile(latencies, 90))
+
+    def timeout(self):
+        p95 = self.latency(95)
+        if p95 is None or len(self.samples) < 20:
+            return RPC_TIMEOUT
+        return min(RPC_TIMEOUT, max(RPC_MIN_TIMEOUT, p95 * 4))
+
+    def score(self):
+        """Lower is healthier: typical latency inflated by recent errors"""
+        p50 = self.latency(50)
+        return (p50 if p50 is not None else 0) * (1 + 4 * self.error_rate())
+
+    def record(self, ok, latency, error=None):
+        with self.lock:
+            self.requests += 1
+            self.samples.append((latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+                self.state = 'closed'
+                self.probing = False
+                return
+
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            failed = sum(1 for _, sample_ok in self.samples if not sample_ok)
+            if (self.state == 'half_open'
+                    or self.consecutive_failures >= RPC_BREAKER_FAILURES
+                    or (len(self.samples) >= 20 and failed / len(self.samples) >= RPC_BREAKER_ERROR_RATE)):
+                if self.state != 'open':
+                    self.trips += 1
+                    print(f"  🔌 RPC breaker open: {self.name} ({error})")
+                self.state = 'open'
+                self.opened_at = time.time()
+                self.probing = False
+
+    def snapshot(self):
+        latencies = self.latencies()
+        with self.lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'requests': self.requests,
+                'failures': self.failures,
+                'trips': self.trips,
+                'error_rate': sum(1 for _, ok in self.samples if not ok) / len(self.samples) if self.samples else 0,
+                'p50_ms': _percentile(latencies, 50) * 1000 if latencies else None,
+                'p95_ms': _percentile(latencies, 95) * 1000 if latencies else None,
+                'last_error': self.last_error
+            }
+
+class _EndpointFailure(Exception):
+    """Endpoints failed (transport, HTTP status, bad body); the pool fails over to the rest"""
+
+    def __init__(self, message, tried):
+        super().__init__(message)
+        self.tried = tried
+
+class HedgeBudget:
+    """
+    Token bucket capping a tier's hedges: each request earns `ratio` of a
+    hedge, each hedge spends one. Also keeps (answered, unhedged) latency
+    pairs, where unhedged is when the first request alone would have answered.
+    """
+
+    def __init__(self, ratio):
+        self.ratio = ratio
+        self.tokens = 0.0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self.samples = deque(maxlen=RPC_LATENCY_SAMPLES * 10)
+
+    def earn(self):
+        with self.lock:
+            self.requests += 1
+            self.tokens = min(HEDGE_BURST, self.tokens + self.ratio)
+
+    def take(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.hedged += 1
+            return True
+
+    def record(self, answered, unhedged, won=False):
+        with self.lock:
+            self.samples.append((answered, unhedged))
+            if won:
+                self.wins += 1
+
+    def report(self):
+        with self.lock:
+            samples = list(self.samples)
+            report = {'budget': self.ratio, 'requests': self.requests, 'hedged': self.hedged, 'wins': self.wins}
+        report['hedge_rate'] = report['hedged'] / report['requests'] if report['requests'] else 0
+        for pct in (50, 90, 99):
+            report[f"p{pct}_ms"] = _percentile([a for a, _ in samples], pct) * 1000 if samples else None
+            report[f"unhedged_p{pct}_ms"] = _percentile([u for _, u in samples], pct) * 1000 if samples else None
+        return report
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+def _hedge_pool():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='rpc-hedge')
+        return _hedge_executor
+
+class RpcPool:
+    """A chain's endpoints; each request goes to the healthiest one and fails over on errors"""
+
+    def __init__(self, chain, urls):
+        self.chain = chain
+        self.endpoints = [RpcEndpoint(url) for url in dict.fromkeys(urls)]
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'failovers': 0, 'rejected': 0, 'errors': 0}
+        self.hedges = {tier: HedgeBudget(ratio) for tier, ratio in HEDGE_BUDGET.items() if ratio > 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def ranked(self):
+        """Endpoints that may take a request now, healthiest first"""
+        now = time.time()
+        candidates = [e for e in self.endpoints if e.available(now)]
+        return sorted(candidates, key=lambda e: (e.state != 'closed', e.score()))
+
+    def _send(self, endpoint, payload):
+        """One attempt against one endpoint; the decoded response or _EndpointFailure"""
+        started = time.perf_counter()
+        try:
+            response = requests.post(endpoint.url, json=payload, timeout=endpoint.timeout())
+            data = response_json(response)
+            if response.status_code != 200:
+                raise RpcError(f"HTTP {response.status_code}")
+        except (requests.RequestException, ValueError, RpcError) as e:
+            endpoint.record(False, time.perf_counter() - started, str(e))
+            raise _EndpointFailure(f"{endpoint.name}: {e}", [endpoint])
+
+        # The endpoint answered; a JSON-RPC error is about the request, not its health
+        endpoint.record(True, time.perf_counter() - started)
+        return data
+
+    def _hedged(self, payload, budget, primary, backup):
+        """
+        Send to primary; if it has not answered within its rolling p90 and the
+        tier's budget allows, send the same request to backup. First answer wins.
+        """
+        started = time.perf_counter()
+        budget.earn()
+        first = _hedge_pool().submit(self._send, primary, payload)
+        try:
+            data = first.result(timeout=primary.hedge_delay())
+            elapsed = time.perf_counter() - started
+            budget.record(elapsed, elapsed)
+            return data
+        except FutureTimeout:
+            pass
+
+        if not budget.take():
+            data = first.result()
+            elapsed = time.perf_counter() - started
+            budget.record(elapsed, elapsed)
+            return data
+
+        second = _hedge_pool().submit(self._send, backup, payload)
+        errors = []
+        tried = []
+        for future in as_completed([first, second]):
+            try:
+                data = future.result()
+            except _EndpointFailure as e:
+                errors.append(str(e))
+                tried.extend(e.tried)
+                continue
+
+            answered = time.perf_counter() - started
+            if future is first:
+                budget.record(answered, answered)
+            else:
+                # The unhedged latency is known once the first request finishes too
+                first.add_done_callback(
+                    lambda _, answered=answered: budget.record(answered, time.perf_counter() - started, won=True))
+            return data
+        raise _EndpointFailure('; '.join(errors), tried)
+
+    def post(self, payload, tier=None):
+        """
+        Send a JSON-RPC payload and return the decoded response.
+        Requests tagged with a tier that has a hedge budget may be hedged.
+        Raises RpcError when every usable endpoint failed, or none is usable.
+        """
+        self._count('requests')
+        candidates = self.ranked()
+        errors = []
+
+        budget = self.hedges.get(tier)
+        if budget and candidates and candidates[0].state == 'closed' and candidates[0].hedge_delay():
+            # A single-endpoint pool hedges onto the same URL; its balancer picks another backend
+            primary = candidates[0]
+            closed = [endpoint for endpoint in candidates[1:] if endpoint.state == 'closed']
+            backup = closed[0] if closed else primary
+            try:
+                data = self._hedged(payload, budget, primary, backup)
+                return self._result(payload, data)
+            except _EndpointFailure as e:
+                errors.append(str(e))
+                candidates = [endpoint for endpoint in candidates if endpoint not in e.tried]
+
+        for attempt in candidates:
+            if not attempt.acquire(time.time()):
+                continue
+            if errors:
+                self._count('failovers')
+            try:
+                data = self._send(attempt, payload)
+            except _EndpointFailure as e:
+                errors.append(str(e))
+                continue
+            return self._result(payload, data)
+
+        if not errors:
+            self._count('rejected')
+            raise RpcError(f"{payload.get('method')}: all {self.chain} RPC endpoints are open")
+        self._count('errors')
+        raise RpcError(f"{payload.get('method')}: " + '; '.join(errors))
+
+    def _result(self, payload, data):
+        if 'error' in data:
+            error = data['error']
+            raise RpcError(f"{payload.get('method')}: {error.get('message', error) if isinstance(error, dict) else error}")
+        if 'result' not in data:
+            raise RpcError(f"{payload.get('method')}: no result")
+        return data
+
+    def call(self, method, params):
+        """JSON-RPC result of method(params) (raises RpcError)"""
+        return self.post({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})['result']
+
+    def report(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['endpoints'] = [endpoint.snapshot() for endpoint in self.endpoints]
+        stats['hedging'] = {tier: budget.report() for tier, budget in self.hedges.items()}
+        return stats
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_rpc_pool(chain):
+    with _pools_lock:
+        if chain not in _pools:
+            _pools[chain] = RpcPool(chain, RPC_ENDPOINTS[chain])
+        return _pools[chain]
+
+def rpc_pool_reports():
+    """report() of every pool created so far, by chain"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {chain: pool.report() for chain, pool in pools.items()}
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# ============================================================
+# Solana
+# ============================================================
+
+def b58encode(raw):
+    num = int.from_bytes(raw, 'big')
+    encoded = ''
+    while num:
+        num, rem = divmod(num, 58)
+        encoded = BASE58_ALPHABET[rem] + encoded
+    return '1' * (len(raw) - len(raw.lstrip(b'\0'))) + encoded
+
+def b58decode(text):
+    num = 0
+    for char in text:
+        num = num * 58 + BASE58_ALPHABET.index(char)
+    body = num.to_bytes((num.bit_length() + 7) // 8, 'big') if num else b''
+    return b'\0' * (len(text) - len(text.lstrip('1'))) + body
+
+def get_multiple_accounts(pubkeys, offset=None, length=None, url=None):
+    """
+    Raw account data for each pubkey (None for accounts that do not exist),
+    optionally only `length` bytes from `offset`. Batches 100 keys per request.
+    """
+    config = {'encoding': 'base64', 'commitment': 'confirmed'}
+    if offset is not None:
+        config['dataSlice'] = {'offset': offset, 'length': length}
+
+    accounts = []
+    for batch in chunks(list(pubkeys), SOLANA_MAX_ACCOUNTS):
+        if url:
+            result = rpc_call(url, 'getMultipleAccounts', [batch, config])
+        else:
+            result = get_rpc_pool('solana').call('getMultipleAccounts', [batch, config])
+        for value in result['value']:
+            accounts.append(base64.b64decode(value['data'][0]) if value else None)
+    return accounts
+
+# ============================================================
+# Base (EVM)
+# ============================================================
+
+SELECTORS = {
+    'aggregate3': bytes.fromhex('82ad56cb'),
+    'balanceOf': bytes.fromhex('70a08231'),
+    'decimals': bytes.fromhex('313ce567'),
+    'token0': bytes.fromhex('0dfe1681'),
+    'getReserves': bytes.fromhex('0902f1ac'),
+    'slot0': bytes.fromhex('3850c7bd'),
+}
+
+def word(value):
+    return value.to_bytes(32, 'big')
+
+def address_word(address):
+    return bytes(12) + bytes.fromhex(address[2:])
+
+def calldata(function, *addresses):
+    """Selector plus address arguments (all the views we call take none or addresses)"""
+    return SELECTORS[function] + b''.join(address_word(a) for a in addresses)
+
+def decode_words(raw):
+    return [int.from_bytes(raw[i:i + 32], 'big') for i in range(0, len(raw) - len(raw) % 32, 32)]
+
+def decode_address(raw):
+    return '0x' + raw[12:32].hex()
+
+def encode_aggregate3(calls):
+    """aggregate3((address target, bool allowFailure, bytes callData)[]) with every call allowed to fail"""
+    elements = []
+    for target, data in calls:
+        padded = data + bytes(-len(data) % 32)
+        elements.append(address_word(target) + word(1) + word(0x60) + word(len(data)) + padded)
+
+    offsets = []
+    position = 32 * len(elements)
+    for element in elements:
+        offsets.append(word(position))
+        position += len(element)
+
+    return SELECTORS['aggregate3'] + word(0x20) + word(len(elements)) + b''.join(offsets) + b''.join(elements)
+
+def decode_aggregate3(raw):
+    """[(success, returnData)] from an aggregate3 result"""
+    base = int.from_bytes(raw[:32], 'big')
+    count = int.from_bytes(raw[base:base + 32], 'big')
+    start = base + 32
+
+    results = []
+    for i in range(count):
+        element = start + int.from_bytes(raw[start + 32 * i:start + 32 * (i + 1)], 'big')
+        success = int.from_bytes(raw[element:element + 32], 'big') != 0
+        data_at = element + int.from_bytes(raw[element + 32:element + 64], 'big')
+        length = int.from_bytes(raw[data_at:data_at + 32], 'big')
+        results.append((success, raw[data_at + 32:data_at + 32 + length]))
+    return results
+
+def eth_call(to, data, url=None, block='latest', gas=None):
+    call = {'to': to, 'data': '0x' + data.hex()}
+    if gas:
+        call['gas'] = hex(gas)
+    if url:
+        result = rpc_call(url, 'eth_call', [call, block])
+    else:
+        result = get_rpc_pool('base').call('eth_call', [call, block])
+    return bytes.fromhex(result[2:])
+
+def multicall(calls, url=None, gas_per_call=MULTICALL_CALL_GAS):
+    """
+    Run (target, calldata) view calls through Multicall3, as many per eth_call
+    as fit MULTICALL_GAS_LIMIT at gas_per_call each.
+    Returns returnData per call, or None where that call reverted.
+    """
+    batch_size = max(1, MULTICALL_GAS_LIMIT // gas_per_call)
+    results = []
+    for batch in chunks(list(calls), batch_size):
+        raw = eth_call(MULTICALL3_ADDRESS, encode_aggregate3(batch), url, gas=MULTICALL_GAS_LIMIT)
+        results.extend(data if success else None for success, data in decode_aggregate3(raw))
+    return results
@@ -0,0 +1,391 @@
+"""
+Multi-process sharded monitoring
+Worker processes poll a hash-partitioned slice of the whale store and send
+detection events to a coordinator that owns bot_state and Telegram sends.
+Workers are forked by a single-threaded supervisor process, so a restart
+never forks the multi-threaded bot process.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+
+from config import (TIER_CONFIG, WHALE_STORE_FILE,
+                    SHARD_HEARTBEAT_SECONDS, SHARD_REFRESH_SECONDS, SHARD_STALE_SECONDS)
+from state import bot_state
+from whale_store import WhaleStore
+import features
+
+# ============================================================
+# Partitioning
+# ============================================================
+
+def shard_for(address, shard_count):
+    """Stable shard index for a whale address (same on every process and host)"""
+    return zlib.crc32(address.lower().encode()) % shard_count
+
+def partition_whales(whales, shard_count):
+    """Split a whale list into shard_count lists by address hash"""
+    shards = [[] for _ in range(shard_count)]
+    for whale in whales:
+        shards[shard_for(whale['address'], shard_count)].append(whale)
+    return shards
+
+# ============================================================
+# Shard Worker (runs in a child process)
+# ============================================================
+
+class ShardWorker:
+    """Polls one shard with a thread per tier and reports new buys"""
+
+    def __init__(self, shard_id, whales, event_queue, paused, stop):
+        self.shard_id = shard_id
+        self.whales = {w['address']: dict(w) for w in whales}
+        self.whale_tokens = {}
+        self.event_queue = event_queue
+        self.paused = paused
+        self.stop = stop
+        self.lock = threading.Lock()
+        self.events_sent = 0
+        self.stats = {
+            tier: {'checks': 0, 'errors': 0, 'cycles': 0, 'last_cycle_seconds': 0, 'last_cycle_at': 0}
+            for tier in TIER_CONFIG
+        }
+
+    def whales_in_tier(self, tier):
+        with self.lock:
+            return [w for w in self.whales.values() if w.get('tier', 3) == tier]
+
+    def check(self, whale, first_run):
+        stats = self.stats[whale.get('tier', 3)]
+        try:
+            current_tokens = features.fetch_wallet_tokens(whale)
+            if current_tokens is None:
+                return
+
+            # Whales that just moved into this tier still need a baseline
+            is_baseline = first_run or whale['address'] not in self.whale_tokens
+            new_tokens = features.diff_wallet_snapshot(whale, current_tokens, self.whale_tokens)
+            stats['checks'] += 1
+
+            if new_tokens and not is_baseline:
+                self.event_queue.put({
+                    'type': 'buy',
+                    'shard': self.shard_id,
+                    'whale': whale,
+                    'tokens': new_tokens,
+                    'detected_at': time.time()
+                })
+                self.events_sent += 1
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"  ⚠️ [SHARD {self.shard_id}] Error checking {whale['address'][:8]}: {e}")
+
+    def tier_loop(self, tier):
+        config = TIER_CONFIG[tier]
+        first_run = True
+
+        if self.stop.wait(config['start_delay']):
+            return
+
+        while not self.stop.is_set():
+            if self.paused.is_set():
+                self.stop.wait(min(config['interval'], 60))
+                continue
+
+            started = time.time()
+            for whale in self.whales_in_tier(tier):
+                if self.stop.is_set():
+                    return
+                self.check(whale, first_run)
+                self.stop.wait(config['throttle'])
+
+            first_run = False
+            stats = self.stats[tier]
+            stats['cycles'] += 1
+            stats['last_cycle_seconds'] = time.time() - started
+            stats['last_cycle_at'] = time.time()
+
+            self.stop.wait(config['interval'])
+
+    def heartbeat(self):
+        with self.lock:
+            whale_count = len(self.whales)
+            tiers = {tier: dict(stats) for tier, stats in self.stats.items()}
+        self.event_queue.put({
+            'type': 'health',
+            'shard': self.shard_id,
+            'pid': os.getpid(),
+            'whales': whale_count,
+            'events_sent': self.events_sent,
+            'tiers': tiers,
+            'sent_at': time.time()
+        })
+
+    def tick(self):
+        """Called between heartbeats; subclasses sync their whale list here"""
+
+    def run(self):
+        for tier in TIER_CONFIG:
+            threading.Thread(target=self.tier_loop, args=(tier,), daemon=True).start()
+
+        print(f"✅ Shard {self.shard_id} started (pid {os.getpid()}, {len(self.whales)} whales)")
+
+        last_heartbeat = 0
+        while not self.stop.is_set():
+            self.tick()
+            if time.time() - last_heartbeat >= SHARD_HEARTBEAT_SECONDS:
+                self.heartbeat()
+                last_heartbeat = time.time()
+            self.stop.wait(SHARD_REFRESH_SECONDS)
+
+class StoreShardWorker(ShardWorker):
+    """Shard worker that follows its hash slice of the shared whale store"""
+
+    def __init__(self, shard_id, shard_count, event_queue, paused, stop):
+        # Threads wait on a local event: a process killed inside a shared Event.wait()
+        # leaves that Event a waker short, and the coordinator's next set() would hang
+        super().__init__(shard_id, [], event_queue, paused, threading.Event())
+        self.shared_stop = stop
+        self.shard_count = shard_count
+        self.parent = None
+        self.store = None
+        self.whales_generation = None
+
+    def refresh_whales(self):
+        """Pick up tier changes and added/removed whales from the shared whale store"""
+        replaced = self.store.refresh()
+        if not replaced and self.store.generation == self.whales_generation:
+            return
+        self.whales_generation = self.store.generation
+
+        owned = {
+            w['address']: w for w in self.store.whales()
+            if shard_for(w['address'], self.shard_count) == self.shard_id
+        }
+
+        with self.lock:
+            for address in list(self.whales):
+                if address not in owned:
+                    del self.whales[address]
+                    self.whale_tokens.pop(address, None)
+            for address, whale in owned.items():
+                if address in self.whales:
+                    self.whales[address]['tier'] = whale.get('tier', 3)
+                else:
+                    self.whales[address] = dict(whale)
+
+    def tick(self):
+        # Stop with the supervisor, even if it was killed without setting shared_stop
+        if self.shared_stop.is_set() or os.getppid() != self.parent:
+            self.stop.set()
+            return
+        try:
+            self.refresh_whales()
+        except Exception as e:
+            print(f"  ⚠️ [SHARD {self.shard_id}] Whale refresh error: {e}")
+
+    def run(self):
+        self.parent = os.getppid()
+        # Own mapping of the store (the inherited one's lock may have been held at fork);
+        # a restarted worker therefore starts from the current list, not the startup one
+        self.store = WhaleStore(WHALE_STORE_FILE)
+        self.refresh_whales()
+        super().run()
+
+def run_shard_worker(shard_id, shard_count, event_queue, paused, stop):
+    """Process entry point for one shard"""
+    try:
+        StoreShardWorker(shard_id, shard_count, event_queue, paused, stop).run()
+    except KeyboardInterrupt:
+        pass
+
+# ============================================================
+# Supervisor (single-threaded child process)
+# ============================================================
+
+def run_shard_supervisor(shard_count, event_queue, lifecycle, paused, stop):
+    """
+    Process entry point that forks the workers and restarts any that die.
+    It never starts a thread (lifecycle is a SimpleQueue, which writes without
+    a feeder thread), so forking a replacement can't copy a held lock.
+    """
+    context = multiprocessing.get_context('fork')
+    parent = os.getppid()
+    processes = {}
+
+    def launch(shard_id):
+        process = context.Process(
+            target=run_shard_worker,
+            args=(shard_id, shard_count, event_queue, paused, stop),
+            name=f"whale-shard-{shard_id}",
+            daemon=True
+        )
+        process.start()
+        processes[shard_id] = process
+        lifecycle.put({'type': 'started', 'shard': shard_id, 'pid': process.pid})
+
+    try:
+        for shard_id in range(shard_count):
+            launch(shard_id)
+
+        # Stop with the bot, even if it was killed without running shutdown();
+        # polls rather than stop.wait() for the same reason as StoreShardWorker
+        while not stop.is_set() and os.getppid() == parent:
+            for shard_id, process in processes.items():
+                if not process.is_alive():
+                    print(f"  ⚠️ Shard {shard_id} died (exit {process.exitcode}), restarting...")
+                    lifecycle.put({'type': 'restart', 'shard': shard_id, 'exitcode': process.exitcode})
+                    launch(shard_id)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for process in processes.values():
+            process.join(timeout=5)
+
+# ============================================================
+# Coordinator (runs in the main process)
+# ============================================================
+
+class ShardCoordinator:
+    """Starts the shard supervisor, consumes worker events and tracks their health"""
+
+    def __init__(self, whales, shard_count):
+        # Fork so workers inherit loaded modules without re-running main.py
+        self.context = multiprocessing.get_context('fork')
+        self.shard_count = shard_count
+        self.event_queue = self.context.Queue()
+        self.lifecycle = self.context.SimpleQueue()
+        self.paused = self.context.Event()
+        self.stop = self.context.Event()
+        self.supervisor = None
+        self.health = {}
+        self.buy_events = 0
+        self.restarts = 0
+        # Startup sizes only; each worker reports its live count in heartbeats
+        self.shards = {
+            shard_id: {'whales': len(shard_whales), 'pid': None, 'alive': False}
+            for shard_id, shard_whales in enumerate(partition_whales(whales, shard_count))
+        }
+
+    def start(self):
+        """Fork the supervisor, then start the event and pause threads (call before other threads)"""
+        # Not a daemon: daemonic processes can't have children
+        self.supervisor = self.context.Process(
+            target=run_shard_supervisor,
+            args=(self.shard_count, self.event_queue, self.lifecycle, self.paused, self.stop),
+            name="whale-shard-supervisor"
+        )
+        self.supervisor.start()
+        atexit.register(self.shutdown)
+
+        threading.Thread(target=self.event_loop, daemon=True).start()
+        threading.Thread(target=self.supervise, daemon=True).start()
+        print(f"✅ Shard coordinator started ({self.shard_count} worker processes)")
+
+    def event_loop(self):
+        """Apply worker events to bot_state (the only consumer, so no races)"""
+        while not self.stop.is_set():
+            self.drain_lifecycle()
+            try:
+                event = self.event_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            try:
+                if event['type'] == 'buy':
+                    self.buy_events += 1
+                    features.handle_new_buys(event['whale'], event['tokens'], event.get('detected_at'))
+                elif event['type'] == 'health':
+                    event['received_at'] = time.time()
+                    self.health[event['shard']] = event
+            except Exception as e:
+                print(f"  ⚠️ Coordinator error handling {event.get('type')}: {e}")
+
+    def drain_lifecycle(self):
+        """Apply worker start/restart notices from the supervisor"""
+        while not self.lifecycle.empty():
+            event = self.lifecycle.get()
+            shard = self.shards[event['shard']]
+            if event['type'] == 'started':
+                shard.update(pid=event['pid'], alive=True)
+                if self.health.get(event['shard'], {}).get('pid') != event['pid']:
+                    self.health.pop(event['shard'], None)
+            elif event['type'] == 'restart':
+                self.restarts += 1
+                shard['alive'] = False
+
+    def supervise(self):
+        """Propagate pause state (whale and tier changes reach workers via the store)"""
+        while not self.stop.is_set():
+            if bot_state.get('paused'):
+                self.paused.set()
+            else:
+                self.paused.clear()
+
+            if self.supervisor is not None and not self.supervisor.is_alive():
+                print(f"  ⚠️ Shard supervisor died (exit {self.supervisor.exitcode}) - workers are no longer restarted")
+                self.stop.wait(60)
+                continue
+
+            self.stop.wait(5)
+
+    def shutdown(self):
+        self.stop.set()
+        if self.supervisor is not None:
+            self.supervisor.join(timeout=10)
+
+    # ------------------------------------------------------------
+    # Health
+    # ------------------------------------------------------------
+
+    def health_report(self):
+        """Per-shard status rows for the /shards command"""
+        now = time.time()
+        report = []
+        supervisor_alive = self.supervisor is not None and self.supervisor.is_alive()
+        for shard_id, shard in self.shards.items():
+            health = self.health.get(shard_id, {})
+            age = now - health['received_at'] if health else None
+            tiers = health.get('tiers', {})
+
+            if not supervisor_alive or not shard['alive']:
+                status = 'dead'
+            elif age is None:
+                status = 'starting'
+            elif age > SHARD_STALE_SECONDS:
+                status = 'stale'
+            else:
+                status = 'healthy'
+
+            report.append({
+                'shard': shard_id,
+                'status': status,
+                'pid': health.get('pid', shard['pid']),
+                'whales': health.get('whales', shard['whales']),
+                'checks': sum(t['checks'] for t in tiers.values()),
+                'errors': sum(t['errors'] for t in tiers.values()),
+                'events_sent': health.get('events_sent', 0),
+                'tier1_cycle_seconds': tiers.get(1, {}).get('last_cycle_seconds', 0),
+                'heartbeat_age': age
+            })
+        return report
+
+_coordinator = None
+
+def start_sharded_monitoring(whales, shard_count):
+    """Create and start the global coordinator"""
+    global _coordinator
+    _coordinator = ShardCoordinator(whales, shard_count)
+    _coordinator.start()
+    return _coordinator
+
+def get_coordinator():
+    """The running coordinator, or None in threaded mode"""
+    return _coordinator
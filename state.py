@@ -1,11 +1,16 @@
 """
 Bot state management
-Handles saving/loading bot state
+Handles saving/loading bot state. Collections are guarded by their own
+locks; saves snapshot them under those locks and serialize off-thread.
 """
 
-import json
+import atexit
+import marshal
+import os
+import threading
 import time
 from config import DEFAULT_FILTERS, BOT_STATE_FILE
+from codec import dump_file, load_file
 
 # ============================================================
 # BOT STATE
@@ -22,23 +27,249 @@ bot_state = {
     'tracked_tokens': {},
     'multi_buys': {},
     'whale_performance': {},
+    'performance_events': [],
     'whale_token_balances': {}
 }
 
+# Where state is persisted (None disables saving, e.g. during replays)
+_state_file = BOT_STATE_FILE
+
+# Change counters per topic ('tracked', 'buys', 'stats', 'multibuys');
+# materialized views and cached command responses are keyed on them
+_versions = {}
+# Bumps come from many threads; a lost increment would leave a cached reply stale
+_versions_lock = threading.Lock()
+
+def mark_changed(*topics):
+    """Record that state behind these topics was mutated"""
+    with _versions_lock:
+        for topic in topics:
+            _versions[topic] = _versions.get(topic, 0) + 1
+
+def state_version(topics):
+    """Version tuple for a set of topics (a state reload changes every version)"""
+    return (_versions.get('*', 0),) + tuple(_versions.get(topic, 0) for topic in topics)
+
+# ============================================================
+# Locks
+# ============================================================
+
+class StateLock:
+    """Re-entrant lock that records acquisitions, time spent waiting for it and hold times"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.RLock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_max = 0.0
+        self._depth = 0
+        self._held_since = 0.0
+
+    def acquire(self):
+        if not self._lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self._lock.acquire()
+            waited = time.perf_counter() - started
+            # Safe to update: we hold the lock now
+            self.contended += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        self.acquisitions += 1
+        self._depth += 1
+        if self._depth == 1:
+            self._held_since = time.perf_counter()
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self.hold_max = max(self.hold_max, time.perf_counter() - self._held_since)
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        return {
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'wait_ms_total': self.wait_total * 1000,
+            'wait_ms_max': self.wait_max * 1000,
+            'hold_ms_max': self.hold_max * 1000
+        }
+
+# Collection -> lock group; keys not listed share the 'general' lock
+LOCK_GROUPS = {
+    'tracked_tokens': 'tracked',
+    'whale_token_balances': 'positions',
+    'multi_buys': 'multibuys',
+    'whale_performance': 'performance',
+    'performance_events': 'performance'
+}
+
+_locks = {name: StateLock(name) for name in set(LOCK_GROUPS.values()) | {'general'}}
+
+def state_lock(key):
+    """Lock guarding bot_state[key]; hold it to add/remove entries or iterate the collection"""
+    return _locks[LOCK_GROUPS.get(key, 'general')]
+
+class _AllLocks:
+    """Every state lock, taken in a fixed order (for reloads that swap collections)"""
+
+    def __enter__(self):
+        for name in sorted(_locks):
+            _locks[name].acquire()
+
+    def __exit__(self, *exc):
+        for name in sorted(_locks, reverse=True):
+            _locks[name].release()
+
+all_state_locks = _AllLocks()
+
+# ============================================================
+# Snapshots
+# ============================================================
+
+def snapshot_state():
+    """
+    Copy of bot_state where each lock group is consistent with itself.
+    A group's lock is held only for a C-level marshal.dumps of its
+    collections (several times faster than a Python deep copy); rebuilding
+    the objects happens after the lock is released.
+    """
+    groups = {}
+    for key in list(bot_state):
+        groups.setdefault(LOCK_GROUPS.get(key, 'general'), []).append(key)
+
+    frozen = {}
+    for name, keys in groups.items():
+        with _locks[name]:
+            for key in keys:
+                if key in bot_state:
+                    frozen[key] = marshal.dumps(bot_state[key])
+    return {key: marshal.loads(data) for key, data in frozen.items()}
+
+# ============================================================
+# Persistence
+# ============================================================
+
+_save_requested = threading.Event()
+_write_lock = threading.Lock()
+_writer = None
+_writer_start_lock = threading.Lock()
+
+_persist_stats = {
+    'requests': 0,
+    'writes': 0,
+    'errors': 0,
+    'snapshot_ms_last': 0.0,
+    'snapshot_ms_max': 0.0,
+    'serialize_ms_last': 0.0,
+    'serialize_ms_max': 0.0,
+    'bytes': 0
+}
+
+def set_state_file(path):
+    """Change the state file path (None turns persistence off)"""
+    global _state_file
+    _state_file = path
+
+def suspend_state_writes():
+    """Turn persistence off and drop queued saves; returns the path to resume with"""
+    global _state_file
+    # Waits out a write in progress, so nothing lands on disk after this returns
+    with _write_lock:
+        path, _state_file = _state_file, None
+        _save_requested.clear()
+    return path
+
+def _write_state():
+    """Snapshot under the collection locks, then serialize outside them"""
+    with _write_lock:
+        path = _state_file
+        if path is None:
+            return
+
+        started = time.perf_counter()
+        snapshot = snapshot_state()
+        snapshotted = time.perf_counter()
+
+        try:
+            tmp_path = f"{path}.tmp"
+            size = dump_file(snapshot, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            _persist_stats['errors'] += 1
+            print(f"❌ Error saving state: {e}")
+            return
+
+        finished = time.perf_counter()
+        stats = _persist_stats
+        stats['writes'] += 1
+        stats['bytes'] = size
+        stats['snapshot_ms_last'] = (snapshotted - started) * 1000
+        stats['snapshot_ms_max'] = max(stats['snapshot_ms_max'], stats['snapshot_ms_last'])
+        stats['serialize_ms_last'] = (finished - snapshotted) * 1000
+        stats['serialize_ms_max'] = max(stats['serialize_ms_max'], stats['serialize_ms_last'])
+
+def _writer_loop():
+    while True:
+        _save_requested.wait()
+        # Requests arriving while we write trigger one more pass, not one each
+        _save_requested.clear()
+        _write_state()
+
+def _start_writer():
+    global _writer
+    with _writer_start_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name='state-writer', daemon=True)
+            _writer.start()
+
 def save_bot_state():
-    """Save bot state to file"""
-    try:
-        with open(BOT_STATE_FILE, 'w') as f:
-            json.dump(bot_state, f, indent=2)
-    except Exception as e:
-        print(f"❌ Error saving state: {e}")
+    """Queue a save; the state writer thread snapshots and writes it"""
+    if _state_file is None:
+        return
+
+    _persist_stats['requests'] += 1
+    _start_writer()
+    _save_requested.set()
+
+def flush_bot_state():
+    """Write state now on the calling thread (shutdown, replays, tools)"""
+    _save_requested.clear()
+    _write_state()
+
+@atexit.register
+def _flush_pending():
+    # Waits out a write in progress so the daemon writer is never cut off mid-file
+    with _write_lock:
+        pending = _save_requested.is_set()
+    if pending:
+        flush_bot_state()
+
+def state_metrics():
+    """Lock contention per group plus snapshot/serialize timings"""
+    return {
+        'locks': {name: lock.stats() for name, lock in sorted(_locks.items())},
+        'persistence': dict(_persist_stats)
+    }
 
 def load_bot_state():
     """Load bot state from file"""
     global bot_state
+    if _state_file is None:
+        return
+    
     try:
-        with open(BOT_STATE_FILE, 'r') as f:
-            loaded = json.load(f)
+        loaded = load_file(_state_file)
+        with all_state_locks:
             bot_state.update(loaded)
             bot_state['start_time'] = time.time()
             
@@ -51,11 +282,12 @@ def load_bot_state():
                 bot_state['whale_performance'] = {}
             if 'whale_token_balances' not in bot_state:
                 bot_state['whale_token_balances'] = {}
+            mark_changed('*')
     except FileNotFoundError:
-        save_bot_state()
+        flush_bot_state()
     except Exception as e:
         print(f"❌ Error loading state: {e}")
-        save_bot_state()
+        flush_bot_state()
 
 def get_state():
     """Get current bot state"""
@@ -63,5 +295,6 @@ def get_state():
 
 def update_state(key, value):
     """Update specific state value"""
-    bot_state[key] = value
+    with state_lock(key):
+        bot_state[key] = value
     save_bot_state()
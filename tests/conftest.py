@@ -0,0 +1,42 @@
+"""
+Shared test setup
+config reads the environment at import, so the fake providers are started and
+the environment pointed at them before any bot module is imported.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_providers import start_fake_providers, provider_env, stop_fake_providers
+
+WORKDIR = tempfile.mkdtemp(prefix='whale-tests-')
+WORLD, PROVIDERS = start_fake_providers()
+
+os.environ.update(provider_env(PROVIDERS))
+os.environ['BOT_STATE_FILE'] = os.path.join(WORKDIR, 'bot_state.json')
+os.environ['WHALE_STORE_FILE'] = os.path.join(WORKDIR, 'whales.bin')
+os.environ['ARCHIVE_DIR'] = os.path.join(WORKDIR, 'archive')
+
+def pytest_sessionfinish(session, exitstatus):
+    stop_fake_providers(PROVIDERS)
+
+@pytest.fixture
+def world():
+    return WORLD
+
+@pytest.fixture
+def providers():
+    return PROVIDERS
+
+@pytest.fixture(autouse=True)
+def no_state_saves():
+    """Keep tests from writing bot_state.json"""
+    from state import set_state_file, BOT_STATE_FILE
+    set_state_file(None)
+    yield
+    set_state_file(BOT_STATE_FILE)
@@ -0,0 +1,98 @@
+"""
+Alert coalescing: buys into one token inside the window go out as one message
+"""
+
+import pytest
+
+import clock
+import features
+from alert_coalescer import AlertCoalescer
+
+START = 1_700_000_000.0
+TOKEN = 'CoalesceToken111111111111111111111111111111'
+TOKEN_INFO = {'symbol': 'COAL', 'price': 0.001, 'market_cap': 1_000_000, 'liquidity': 100_000,
+              'url': 'https://dexscreener.com/solana/coal'}
+
+def whale(i, tier=1):
+    return {'address': f"CoalesceWhale{i:030d}", 'chain': 'solana', 'tier': tier}
+
+@pytest.fixture
+def sim():
+    sim = clock.SimulatedClock(START)
+    clock.set_time_source(sim)
+    yield sim
+    clock.set_time_source(None)
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Messages as they would leave: ('buy', whale) / ('group', whales, multi) / ('multi', count)"""
+    sent = []
+    monkeypatch.setattr(features, 'send_whale_buy_alert',
+                        lambda w, info, balance: sent.append(('buy', w['address'])))
+    monkeypatch.setattr(features, 'send_coalesced_buy_alert',
+                        lambda info, buys, multi=None: sent.append(('group', [w['address'] for w, _ in buys], multi)))
+    monkeypatch.setattr(features, 'send_multi_buy_alert',
+                        lambda token, count, symbol, mc, window=None: sent.append(('multi', count)))
+    return sent
+
+def test_buys_inside_the_window_go_out_together(sim, sent):
+    coalescer = AlertCoalescer(window=5, background=False)
+    coalescer.add_buy(TOKEN, whale(1), TOKEN_INFO, 100)
+    sim.advance_to(START + 2)
+    coalescer.add_buy(TOKEN, whale(2, tier=2), TOKEN_INFO, 200)
+
+    assert coalescer.flush_due() == 0
+    sim.advance_to(START + 5)
+    assert coalescer.flush_due() == 1
+
+    assert sent == [('group', [whale(1)['address'], whale(2)['address']], None)]
+    report = coalescer.report()
+    assert report['buys'] == 2 and report['messages'] == 1 and report['saved'] == 1
+    assert report['delay_max'] == 5
+
+def test_lone_buy_keeps_the_single_whale_alert(sim, sent):
+    coalescer = AlertCoalescer(window=5, background=False)
+    coalescer.add_buy(TOKEN, whale(1), TOKEN_INFO, 100)
+    sim.advance_to(START + 5)
+    coalescer.flush_due()
+
+    assert sent == [('buy', whale(1)['address'])]
+
+def test_multi_buy_folds_into_the_pending_group(sim, sent):
+    coalescer = AlertCoalescer(window=5, background=False)
+    coalescer.add_buy(TOKEN, whale(1), TOKEN_INFO, 100)
+    coalescer.add_multi_buy(TOKEN, 2, 'COAL', 1_000_000, 3600)
+    coalescer.add_multi_buy(TOKEN, 3, 'COAL', 1_000_000, 3600)
+    coalescer.flush_all()
+
+    assert sent == [('group', [whale(1)['address']], (3, 3600))]
+    assert coalescer.report()['saved'] == 2
+
+def test_multi_buy_without_a_group_is_sent_at_once(sim, sent):
+    coalescer = AlertCoalescer(window=5, background=False)
+    coalescer.add_multi_buy(TOKEN, 2, 'COAL', 1_000_000)
+
+    assert sent == [('multi', 2)]
+
+def test_zero_window_sends_immediately(sim, sent):
+    coalescer = AlertCoalescer(window=0, background=False)
+    coalescer.add_buy(TOKEN, whale(1), TOKEN_INFO, 100)
+
+    assert sent == [('buy', whale(1)['address'])]
+    assert coalescer.report()['pending'] == 0
+
+def test_tokens_are_coalesced_separately(sim, sent):
+    coalescer = AlertCoalescer(window=5, background=False)
+    coalescer.add_buy(TOKEN, whale(1), TOKEN_INFO, 100)
+    coalescer.add_buy('OtherToken', whale(2), TOKEN_INFO, 100)
+    coalescer.flush_all()
+
+    assert sorted(sent) == sorted([('buy', whale(1)['address']), ('buy', whale(2)['address'])])
+
+def test_coalesced_message_reaches_telegram(world):
+    before = len(world.alerts)
+
+    features.send_coalesced_buy_alert(TOKEN_INFO, [(whale(1), 100), (whale(2, tier=2), 200)])
+
+    texts = [alert['text'] for alert in world.alerts[before:]]
+    assert texts and all('2 WHALE BUYS' in text and 'T1' in text and 'T2' in text for text in texts)
@@ -0,0 +1,96 @@
+"""
+Retention pass and cold archive: what leaves the hot state and what must stay
+"""
+
+import pytest
+
+import archive
+from archive import archive_stats, find_archived_tokens, iter_archive, run_retention
+from config import ARCHIVE_CLOSED_AFTER_HOURS, ARCHIVE_KEEP_SELLS, ARCHIVE_STALE_POSITION_HOURS
+from state import bot_state
+
+NOW = 1_700_000_000.0
+CLOSED = NOW - ARCHIVE_CLOSED_AFTER_HOURS * 3600 - 60
+
+@pytest.fixture
+def hot_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, 'ARCHIVE_DIR', str(tmp_path))
+    tracked = bot_state['tracked_tokens']
+    positions = bot_state['whale_token_balances']
+    before = (set(tracked), set(positions))
+    yield tracked, positions
+    for token in set(tracked) - before[0]:
+        tracked.pop(token)
+    for key in set(positions) - before[1]:
+        positions.pop(key)
+
+def add_token(tracked, token, status='active', closed_time=None, **fields):
+    tracked[token] = dict({'symbol': token.upper(), 'status': status, 'last_check_time': NOW,
+                           'sells_detected': []}, **fields)
+    if closed_time is not None:
+        tracked[token].update(closed_time=closed_time, closed_reason='drawdown')
+
+def add_position(positions, whale, token, detected_at, last_check=NOW):
+    positions[f"{whale}_{token}"] = {'whale': whale, 'token': token, 'chain': 'solana',
+                                     'initial_balance': 10.0, 'current_balance': 10.0,
+                                     'last_check': last_check, 'detected_at': detected_at}
+
+def test_closed_token_and_its_positions_are_archived(hot_state):
+    tracked, positions = hot_state
+    add_token(tracked, 'gone', 'closed', closed_time=CLOSED)
+    add_position(positions, 'w1', 'gone', detected_at=CLOSED - 3600)
+
+    counts = run_retention(now=NOW)
+
+    assert counts['tracked_tokens'] == 1 and counts['whale_token_balances'] == 1
+    assert 'gone' not in tracked and 'w1_gone' not in positions
+    [entry] = list(iter_archive('whale_token_balances'))
+    assert entry['key'] == 'w1_gone'
+    assert find_archived_tokens('GONE')[0]['record']['closed_reason'] == 'drawdown'
+
+def test_buy_after_close_keeps_position_and_token(hot_state):
+    tracked, positions = hot_state
+    add_token(tracked, 'back', 'closed', closed_time=CLOSED)
+    add_position(positions, 'w1', 'back', detected_at=CLOSED - 3600)
+    add_position(positions, 'w2', 'back', detected_at=CLOSED + 60)
+
+    counts = run_retention(now=NOW)
+
+    # The old holder goes, the whale that bought back in is still watched for sells
+    assert 'w1_back' not in positions
+    assert 'w2_back' in positions
+    assert 'back' in tracked
+    assert counts['tracked_tokens'] == 0 and counts['whale_token_balances'] == 1
+
+def test_active_and_recent_records_stay(hot_state):
+    tracked, positions = hot_state
+    add_token(tracked, 'live')
+    add_token(tracked, 'grace', 'closed', closed_time=NOW - 60)
+    add_position(positions, 'w1', 'live', detected_at=NOW - 60)
+
+    counts = run_retention(now=NOW)
+
+    assert 'live' in tracked and 'grace' in tracked and 'w1_live' in positions
+    assert counts['tracked_tokens'] == 0 and counts['whale_token_balances'] == 0
+
+def test_unchecked_position_of_active_token_is_archived(hot_state):
+    tracked, positions = hot_state
+    add_token(tracked, 'live')
+    add_position(positions, 'w1', 'live', detected_at=NOW - 30 * 24 * 3600,
+                 last_check=NOW - ARCHIVE_STALE_POSITION_HOURS * 3600 - 60)
+
+    run_retention(now=NOW)
+
+    assert 'w1_live' not in positions
+
+def test_old_sells_move_to_the_archive(hot_state):
+    tracked, _ = hot_state
+    sells = [{'whale': 'w1', 'timestamp': NOW - i} for i in range(ARCHIVE_KEEP_SELLS + 3)]
+    add_token(tracked, 'busy', sells_detected=sells)
+
+    counts = run_retention(now=NOW)
+
+    assert counts['sells_detected'] == 3
+    assert tracked['busy']['sells_detected'] == sells[3:]
+    assert {e['record']['symbol'] for e in iter_archive('sells_detected')} == {'BUSY'}
+    assert archive_stats()['sells_detected']['files'] == 1
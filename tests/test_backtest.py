@@ -0,0 +1,75 @@
+"""
+Record-and-replay: a live recording against the fake providers replays
+into the same buy alerts, deterministically, and honours filter overrides
+"""
+
+import copy
+
+import pytest
+
+import features
+import recorder
+import utils
+from backtest import parse_filter_overrides, run_replay, summarize
+from config import DEFAULT_FILTERS
+from recorder import ResponseRecorder, iter_recorded_events
+from state import bot_state
+
+WHALE = {'address': '0x' + 'ba' * 20, 'chain': 'base', 'tier': 1}
+
+@pytest.fixture
+def recording(world, tmp_path, monkeypatch):
+    """Baseline snapshot, one injected buy, its DexScreener lookup and block time"""
+    monkeypatch.setattr(recorder, '_recorder', ResponseRecorder(str(tmp_path)))
+    features.get_base_tokens(WHALE['address'])
+    symbol = world.inject_buy(WHALE['address'], 'base')
+    token = world.buys[symbol]['token']
+    features.get_base_tokens(WHALE['address'])
+    utils.get_token_info(token, 'base')
+    features.get_buy_block_time(WHALE, {'address': token})
+    recorder._recorder.close()
+    return str(tmp_path), symbol, token
+
+@pytest.fixture
+def isolated_state():
+    """Replays reset bot_state in place; put the test session's state back afterwards"""
+    saved = copy.deepcopy(bot_state)
+    yield
+    bot_state.clear()
+    bot_state.update(saved)
+
+def test_recording_streams_in_time_order(recording):
+    directory, _, _ = recording
+    events = list(iter_recorded_events(directory))
+
+    assert [e['kind'] for e in events] == ['wallet', 'wallet', 'dexscreener', 'buy_time']
+    assert [e['ts'] for e in events] == sorted(e['ts'] for e in events)
+    assert [e['kind'] for e in iter_recorded_events(directory, kinds=['wallet'])] == ['wallet', 'wallet']
+
+def test_replay_alerts_only_the_new_buy(world, recording, isolated_state):
+    directory, symbol, token = recording
+
+    result = run_replay(directory, [WHALE])
+
+    assert [(a['type'], a['symbol']) for a in result['alerts']] == [('buy', symbol)]
+    assert result['tracked_tokens'][token]['symbol'] == symbol
+    assert result['detection_latency']['chain_to_detect']['base'][1]['count'] == 1
+    assert summarize(result)['buy_alerts'] == 1
+
+def test_replay_is_deterministic(recording, isolated_state):
+    directory, _, _ = recording
+
+    first = run_replay(directory, [WHALE])
+    second = run_replay(directory, [WHALE])
+
+    assert first['alerts'] == second['alerts']
+    assert first['tracked_tokens'] == second['tracked_tokens']
+
+def test_filter_overrides_change_the_outcome(recording, isolated_state):
+    directory, _, _ = recording
+    filters = dict(DEFAULT_FILTERS, **parse_filter_overrides(['mc_min=1e12']))
+
+    result = run_replay(directory, [WHALE], filters=filters)
+
+    assert result['alerts'] == []
+    assert result['tokens_filtered'] == 1
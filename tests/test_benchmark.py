@@ -0,0 +1,61 @@
+"""
+Benchmark harness: percentiles and one baseline + detection cycle through the real pipeline
+"""
+
+import pytest
+
+from alert_coalescer import AlertCoalescer, set_alert_coalescer
+from benchmark import percentile, print_report, run_cycle
+from fake_providers import b58encode
+from features import wait_for_buy_timings
+from state import bot_state
+
+def test_percentile_is_nearest_rank():
+    values = [4, 1, 3, 2]
+    assert percentile(values, 50) == 2
+    assert percentile(values, 99) == 4
+    assert percentile(values, 1) == 1
+    assert percentile([], 50) == 0.0
+
+@pytest.fixture
+def instant_alerts():
+    previous = set_alert_coalescer(AlertCoalescer(window=0, background=False))
+    yield
+    set_alert_coalescer(previous)
+
+def test_injected_buys_are_detected_and_alerted(world, instant_alerts):
+    whales = [
+        {'address': b58encode(b'bench-whale'.ljust(32, b'\0')), 'chain': 'solana', 'tier': 1},
+        {'address': '0x' + 'be' * 20, 'chain': 'base', 'tier': 2},
+    ]
+    tier_groups = {1: whales[:1], 2: whales[1:]}
+    whale_tokens = {}
+
+    run_cycle(tier_groups, whale_tokens, True, 0)
+    symbols = [world.inject_buy(w['address'], w['chain']) for w in whales]
+    tokens = [world.buys[s]['token'] for s in symbols]
+    try:
+        run_cycle(tier_groups, whale_tokens, False, 0)
+        wait_for_buy_timings()
+
+        assert all('alerted_at' in world.buys[s] for s in symbols)
+        for whale, token in zip(whales, tokens):
+            assert whale['address'] in bot_state['tracked_tokens'][token]['whales_bought']
+            assert bot_state['whale_token_balances'][f"{whale['address']}_{token}"]['bought_at'] == \
+                pytest.approx(world.bought_at(whale['address'], token), abs=1)
+    finally:
+        for whale, token in zip(whales, tokens):
+            bot_state['tracked_tokens'].pop(token, None)
+            bot_state['whale_token_balances'].pop(f"{whale['address']}_{token}", None)
+
+def test_report_compares_against_previous(capsys):
+    result = {key: 1.0 for key in ('whales_per_second', 'cycle_time_avg_s', 'cycle_time_max_s',
+                                   'detection_latency_p50_s', 'detection_latency_p99_s', 'cpu_seconds',
+                                   'cpu_utilization', 'rss_mb', 'peak_rss_mb')}
+    result.update(requests_total=100, buys_alerted=2, buys_injected=2, requests={'helius': {'getBalance': 3}})
+
+    print_report(result, dict(result, whales_per_second=0.5))
+
+    out = capsys.readouterr().out
+    assert '(+100.0% vs previous)' in out
+    assert 'helius: getBalance=3' in out
@@ -0,0 +1,151 @@
+"""
+Cluster mode: partition plans, leases, and leadership that fails safe
+"""
+
+import sqlite3
+
+import pytest
+
+import state
+from cluster import LEADER_LEASE, ClusterNode, LeaseStore, plan_partitions
+from state import bot_state, save_bot_state, set_state_file
+
+PARTITIONS = 4
+WHALES = [{'address': f"ClusterWhale{i:032d}", 'chain': 'solana', 'tier': 1} for i in range(40)]
+
+@pytest.fixture
+def store(tmp_path):
+    return LeaseStore(str(tmp_path / 'cluster.db'))
+
+def node(store, node_id, lease_seconds=30):
+    return ClusterNode(store, node_id, WHALES, partitions=PARTITIONS, lease_seconds=lease_seconds)
+
+# ============================================================
+# Partition Plans and Leases
+# ============================================================
+
+def test_plans_cover_every_partition_once():
+    members = ['a', 'b', 'c']
+    plans = [plan_partitions(m, members, 16) for m in members]
+
+    assert set().union(*plans) == set(range(16))
+    assert sum(len(p) for p in plans) == 16
+    # Capped at ceil(16 / 3) per node
+    assert max(len(p) for p in plans) <= 6
+
+def test_lease_is_exclusive_until_it_expires(store):
+    assert store.acquire('x', 'a', ttl=30)
+    assert not store.acquire('x', 'b', ttl=30)
+    assert store.acquire('x', 'a', ttl=30)
+
+    store.release('x', 'a')
+    assert store.acquire('x', 'b', ttl=30)
+    assert store.leases()['x']['owner'] == 'b'
+    assert store.leases()['x']['epoch'] == 2
+
+    # An expired lease can be taken over
+    store.acquire('y', 'a', ttl=-1)
+    assert store.acquire('y', 'b', ttl=30)
+
+def test_two_nodes_split_partitions_and_elect_one_leader(store):
+    first, second = node(store, 'node-a'), node(store, 'node-b')
+    first.rebalance()
+    second.rebalance()
+    # The first node releases the surplus, the second claims it next tick
+    first.rebalance()
+    second.rebalance()
+
+    assert first.owned | second.owned == set(range(PARTITIONS))
+    assert not first.owned & second.owned
+    assert first.is_leader and not second.is_leader
+    assert len(first.worker.whales) + len(second.worker.whales) == len(WHALES)
+
+    # A clean shutdown hands everything over on the next tick
+    first.shutdown()
+    second.rebalance()
+    assert second.is_leader and second.owned == set(range(PARTITIONS))
+
+# ============================================================
+# Losing Leadership
+# ============================================================
+
+class FailingStore(LeaseStore):
+    """Lease store whose leader renewals start failing on demand"""
+
+    fail = False
+
+    def acquire(self, name, owner, ttl):
+        if self.fail and name == LEADER_LEASE:
+            raise sqlite3.OperationalError('database is locked')
+        return super().acquire(name, owner, ttl)
+
+@pytest.fixture
+def failing_store(tmp_path):
+    return FailingStore(str(tmp_path / 'cluster.db'))
+
+@pytest.fixture
+def state_file(tmp_path):
+    path = str(tmp_path / 'bot_state.json')
+    set_state_file(path)
+    return path
+
+def test_lease_error_drops_leadership_and_stops_saves(failing_store, state_file):
+    leader = node(failing_store, 'node-a')
+    leader.rebalance()
+    assert leader.is_leader
+
+    failing_store.fail = True
+    with pytest.raises(sqlite3.OperationalError):
+        leader.rebalance()
+
+    assert not leader.is_leader
+    requests = state.state_metrics()['persistence']['requests']
+    save_bot_state()
+    assert state.state_metrics()['persistence']['requests'] == requests
+
+def test_step_down_flushes_while_the_lease_is_still_ours(failing_store, state_file):
+    leader = node(failing_store, 'node-a')
+    leader.rebalance()
+    bot_state['alerts_sent'] += 1
+    writes = state.state_metrics()['persistence']['writes']
+
+    failing_store.fail = True
+    with pytest.raises(sqlite3.OperationalError):
+        leader.rebalance()
+
+    assert state.state_metrics()['persistence']['writes'] == writes + 1
+
+def test_step_down_after_expiry_drops_queued_saves(failing_store, state_file):
+    leader = node(failing_store, 'node-a')
+    leader.rebalance()
+    leader.leader_until = 0
+    writes = state.state_metrics()['persistence']['writes']
+
+    failing_store.fail = True
+    with pytest.raises(sqlite3.OperationalError):
+        leader.rebalance()
+
+    # Another node may have loaded the file by now; ours must not overwrite it
+    assert state.state_metrics()['persistence']['writes'] == writes
+
+def test_regaining_leadership_resumes_saves(failing_store, state_file):
+    leader = node(failing_store, 'node-a')
+    leader.rebalance()
+    failing_store.fail = True
+    with pytest.raises(sqlite3.OperationalError):
+        leader.rebalance()
+
+    failing_store.fail = False
+    leader.rebalance()
+
+    assert leader.is_leader
+    assert state._state_file == state_file
+
+def test_follower_does_not_persist(store, state_file):
+    node(store, 'node-a').rebalance()
+    follower = node(store, 'node-b')
+    follower.rebalance()
+
+    assert not follower.is_leader
+    assert state._state_file is None
+    assert follower.state_file == state_file
@@ -0,0 +1,88 @@
+"""
+JSON codec backends, and Base balances staying inside what orjson can encode
+"""
+
+import pytest
+
+import codec
+from features import get_base_balances, parse_base_tokens
+from fake_providers import BASE_TOKEN_DECIMALS
+
+BACKENDS = sorted(codec.BACKENDS)
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = codec.backend_name()
+    codec.set_backend(request.param)
+    yield request.param
+    codec.set_backend(previous)
+
+def test_round_trip(backend):
+    payload = {'tracked_tokens': {'T1': {'price': 0.000123, 'whales': ['a', 'b'], 'status': 'active'}},
+               'alerts_sent': 7, 'symbol': 'ÉMOJI🐋', 'balance': 1.5e24}
+
+    encoded = codec.dumps(payload)
+
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == payload
+    assert codec.loads(encoded.decode()) == payload
+
+def test_indent_is_readable(backend):
+    assert b'\n  "a": 1' in codec.dumps({'a': 1}, indent=True)
+
+def test_bad_json_raises_value_error(backend):
+    with pytest.raises(ValueError):
+        codec.loads(b'{not json')
+
+def test_file_round_trip(backend, tmp_path):
+    path = str(tmp_path / 'state.json')
+    size = codec.dump_file({'a': [1, 2, 3]}, path)
+
+    assert size == (tmp_path / 'state.json').stat().st_size
+    assert codec.load_file(path) == {'a': [1, 2, 3]}
+
+def test_unknown_backend_falls_back_to_stdlib():
+    previous = codec.backend_name()
+    try:
+        assert codec.set_backend('simdjson-nope') == 'json'
+    finally:
+        codec.set_backend(previous)
+
+@pytest.mark.skipif('orjson' not in codec.BACKENDS, reason='orjson not installed')
+def test_orjson_encodes_big_ints_through_stdlib():
+    # Still encodable (slowly); orjson would decode it back as a float, hence floats in state
+    assert codec.OrjsonCodec().dumps({'raw': 10 ** 24}) == b'{"raw": 1000000000000000000000000}'
+
+def test_base_wallet_balances_are_floats():
+    raw = 1_234_567 * 10 ** BASE_TOKEN_DECIMALS
+    tokens = parse_base_tokens({'result': {'tokenBalances': [
+        {'contractAddress': '0x' + 'a' * 40, 'tokenBalance': hex(raw)},
+        {'contractAddress': '0x' + 'b' * 40, 'tokenBalance': '0x0'},
+    ]}})
+
+    assert tokens == [{'address': '0x' + 'a' * 40, 'balance': float(raw)}]
+    assert isinstance(tokens[0]['balance'], float)
+
+def test_base_balance_sweep_returns_floats(world):
+    whale = '0x' + '5' * 40
+    token = '0x' + '6' * 40
+    world.add_holding(whale, 'base', token, 2_000_000)
+
+    [balance, missing] = get_base_balances([(whale, token), (whale, '0x' + '7' * 40)])
+
+    assert balance == float(2_000_000 * 10 ** BASE_TOKEN_DECIMALS)
+    assert missing == 0.0
+
+@pytest.mark.skipif('orjson' not in codec.BACKENDS, reason='orjson not installed')
+def test_base_positions_encode_with_orjson_directly(world):
+    import orjson
+
+    whale = '0x' + '8' * 40
+    token = '0x' + '9' * 40
+    world.add_holding(whale, 'base', token, 5_000_000)
+    [balance] = get_base_balances([(whale, token)])
+    position = {'whale': whale, 'token': token, 'chain': 'base',
+                'initial_balance': balance, 'current_balance': balance}
+
+    # No TypeError, so saves never take the slow stdlib fallback
+    assert orjson.loads(orjson.dumps(position)) == position
@@ -0,0 +1,106 @@
+"""
+Command worker pool: slow commands don't block others, state-changing
+commands run one at a time, and every run is counted
+"""
+
+import threading
+import time
+
+import pytest
+
+from command_runner import CommandRunner, dispatch_update
+from commands import command_name, handle_command
+from state import bot_state
+
+class Recorder:
+    """Handler and sender stand-ins"""
+
+    def __init__(self):
+        self.sent = []
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def handler(self, text, user_id):
+        name = command_name(text)
+        if name == '/tracked':
+            self.release.wait(5)
+        elif name == '/history':
+            raise RuntimeError('handler failed')
+        elif name in ('/pause', '/resume'):
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+        return f"reply to {name}"
+
+    def sender(self, reply, chat_id):
+        self.sent.append((reply, chat_id))
+        return chat_id != 'unreachable'
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+@pytest.fixture
+def runner(recorder):
+    runner = CommandRunner(workers=4, handler=recorder.handler, sender=recorder.sender)
+    yield runner
+    recorder.release.set()
+    runner.shutdown()
+
+def test_slow_command_does_not_block_others(runner, recorder):
+    slow = runner.submit('/tracked', 1, 'chat')
+    runner.submit('/stats', 1, 'chat').result(timeout=5)
+
+    assert recorder.sent == [('reply to /stats', 'chat')]
+    assert runner.pending() == 1
+
+    recorder.release.set()
+    slow.result(timeout=5)
+    assert runner.pending() == 0
+
+def test_serial_commands_never_overlap(runner, recorder):
+    futures = [runner.submit(text, 1, 'chat') for text in ('/pause', '/resume', '/pause', '/resume')]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert recorder.max_running == 1
+
+def test_failures_and_unknown_commands_are_counted(runner):
+    for text, chat in (('/history', 'chat'), ('/stats', 'unreachable'), ('/nonsense', 'chat'), ('/spam@bot', 'chat')):
+        runner.submit(text, 1, chat).result(timeout=5)
+
+    report = runner.latency_report()
+    assert report['unknown']['count'] == 2
+    assert report['/history']['errors'] == 1
+    assert report['/stats']['errors'] == 1
+    assert report['/stats']['p95_ms'] >= report['/stats']['p50_ms'] >= 0
+
+class QueueOnly:
+    def __init__(self):
+        self.commands = []
+
+    def submit(self, text, user_id, chat_id):
+        self.commands.append((text, user_id, chat_id))
+
+def test_dispatch_skips_seen_updates_and_plain_messages():
+    runner = QueueOnly()
+    first = bot_state.get('last_update_id', 0) + 1
+    command = {'update_id': first, 'message': {'text': '/stats', 'from': {'id': 7}, 'chat': {'id': 9}}}
+    chatter = {'update_id': first + 1, 'message': {'text': 'gm', 'from': {'id': 7}, 'chat': {'id': 9}}}
+
+    assert dispatch_update(command, runner)
+    assert not dispatch_update(command, runner)
+    assert dispatch_update(chatter, runner)
+
+    assert runner.commands == [('/stats', 7, 9)]
+    assert bot_state['last_update_id'] == first + 1
+
+def test_command_names_and_unknown_reply():
+    assert command_name('/Stats@WhaleBot extra') == '/stats'
+    assert command_name('   ') == ''
+    assert handle_command('/nope', 1).startswith('❌ Unknown command')
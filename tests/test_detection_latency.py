@@ -0,0 +1,144 @@
+"""
+Detection latency: histograms, and buy timing that stays off the monitor thread
+"""
+
+import threading
+import time
+
+import pytest
+
+import features
+from alert_coalescer import AlertCoalescer, set_alert_coalescer
+from detection_latency import DetectionLatency, LatencyHistogram, set_detection_latency
+from state import bot_state
+
+WHALE = {'address': 'LatencyWhale1111111111111111111111111111111', 'chain': 'solana', 'tier': 1}
+TOKEN_INFO = {'symbol': 'LAT', 'price': 0.001, 'market_cap': 1_000_000, 'liquidity': 100_000, 'url': ''}
+
+@pytest.fixture
+def latency():
+    latency = DetectionLatency()
+    previous = set_detection_latency(latency)
+    yield latency
+    set_detection_latency(previous)
+
+@pytest.fixture
+def instant_alerts(monkeypatch):
+    previous = set_alert_coalescer(AlertCoalescer(window=0, background=False))
+    monkeypatch.setattr(features, 'get_token_info', lambda token, chain: dict(TOKEN_INFO))
+    monkeypatch.setattr(features, 'passes_filters', lambda token_info: (True, None))
+    monkeypatch.setattr(features, 'send_whale_buy_alert', lambda whale, token_info, balance: True)
+    yield
+    set_alert_coalescer(previous)
+
+def position(token):
+    return bot_state['whale_token_balances'].get(f"{WHALE['address']}_{token}")
+
+# ============================================================
+# Histograms
+# ============================================================
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram(buckets=(1, 5, 10))
+    for seconds in (0.5, 2, 3, 4, 7, 30):
+        histogram.observe(seconds)
+
+    report = histogram.report()
+    assert report['count'] == 6
+    assert report['buckets'] == {'<=1s': 1, '<=5s': 3, '<=10s': 1, '>10s': 1}
+    assert report['max'] == 30
+    assert report['p50'] == 4
+    assert report['mean'] == pytest.approx(46.5 / 6)
+
+def test_empty_histogram_reports_none():
+    report = LatencyHistogram().report()
+    assert report['count'] == 0 and report['mean'] is None and report['p99'] is None
+
+def test_report_is_keyed_by_stage_chain_tier(latency):
+    latency.observe('chain_to_detect', 1, 'base', 3.0)
+    latency.observe('detect_to_send', 2, 'solana', 0.2)
+    # Whole-second block times can put a buy just "after" its detection
+    latency.observe('chain_to_detect', 1, 'base', -0.4)
+    latency.lookup(True)
+    latency.lookup(False)
+
+    report = latency.report()
+    assert report['lookups'] == 2 and report['lookups_failed'] == 1
+    assert report['chain_to_detect']['base'][1]['count'] == 2
+    assert report['chain_to_detect']['base'][1]['buckets']['<=1s'] == 1
+    assert report['detect_to_send']['solana'][2]['count'] == 1
+
+# ============================================================
+# Buy Timing
+# ============================================================
+
+def test_slow_block_time_lookup_does_not_hold_up_the_buy(latency, instant_alerts, monkeypatch):
+    token = 'LatencyToken1111111111111111111111111111111'
+    release = threading.Event()
+    bought_at = 1_700_000_000.0
+
+    def slow_lookup(whale, token):
+        release.wait(5)
+        return bought_at
+
+    monkeypatch.setattr(features, 'get_buy_block_time', slow_lookup)
+    try:
+        started = time.perf_counter()
+        features.handle_new_buys(WHALE, [{'address': token, 'balance': 10.0}], detected=bought_at + 4)
+        assert time.perf_counter() - started < 1
+
+        # Tracked and alerted before the lookup has answered
+        assert position(token) is not None and 'bought_at' not in position(token)
+        assert latency.report()['detect_to_send']['solana'][1]['count'] == 1
+
+        release.set()
+        features.wait_for_buy_timings()
+        assert position(token)['bought_at'] == bought_at
+        assert latency.report()['chain_to_detect']['solana'][1]['p50'] == pytest.approx(4)
+    finally:
+        release.set()
+        bot_state['whale_token_balances'].pop(f"{WHALE['address']}_{token}", None)
+        bot_state['tracked_tokens'].pop(token, None)
+
+def test_failed_lookup_counts_without_a_sample(latency, instant_alerts, monkeypatch):
+    token = 'LatencyToken2222222222222222222222222222222'
+
+    def failing_lookup(whale, token):
+        raise features.RpcError('unreachable')
+
+    monkeypatch.setattr(features, 'get_buy_block_time', failing_lookup)
+    try:
+        features.handle_new_buys(WHALE, [{'address': token, 'balance': 10.0}])
+        features.wait_for_buy_timings()
+
+        report = latency.report()
+        assert report['lookups'] == 1 and report['lookups_failed'] == 1
+        assert report['chain_to_detect'] == {}
+        assert 'bought_at' not in position(token)
+    finally:
+        bot_state['whale_token_balances'].pop(f"{WHALE['address']}_{token}", None)
+        bot_state['tracked_tokens'].pop(token, None)
+
+def test_replays_time_buys_inline(latency, instant_alerts):
+    token = 'LatencyToken3333333333333333333333333333333'
+    recorded = {'result': [{'blockTime': 1_700_000_100}]}
+    features.set_buy_time_source(lambda chain, key: recorded)
+    try:
+        features.handle_new_buys(WHALE, [{'address': token, 'balance': 10.0, 'account': 'acct'}],
+                                 detected=1_700_000_110)
+        # No waiting: recorded lookups run on the calling thread
+        assert position(token)['bought_at'] == 1_700_000_100
+        assert latency.report()['chain_to_detect']['solana'][1]['p50'] == pytest.approx(10)
+    finally:
+        features.set_buy_time_source(None)
+        bot_state['whale_token_balances'].pop(f"{WHALE['address']}_{token}", None)
+        bot_state['tracked_tokens'].pop(token, None)
+
+def test_live_lookup_reads_the_fake_chain(world):
+    whale = {'address': '0x' + '3' * 40, 'chain': 'base', 'tier': 1}
+    token = '0x' + '4' * 40
+    world.add_holding(whale['address'], 'base', token, 1_000)
+
+    bought_at = features.get_buy_block_time(whale, {'address': token})
+
+    assert bought_at == pytest.approx(world.bought_at(whale['address'], token), abs=1)
@@ -0,0 +1,104 @@
+"""
+Hedged RPC requests: a second copy to the next endpoint once the first runs
+past its p90, paid for out of a per-tier token bucket
+"""
+
+import time
+
+import pytest
+
+from config import HEDGE_BURST, HEDGE_MIN_DELAY
+from fake_providers import FakeHelius
+from rpc import HedgeBudget, RpcPool
+
+EMPTY_READ = {"jsonrpc": "2.0", "id": 1, "method": "getMultipleAccounts", "params": [[]]}
+
+@pytest.fixture
+def stalled(world):
+    """A Helius stand-in that takes 500ms to answer"""
+    provider = FakeHelius(world, latency_ms=500).start()
+    yield provider
+    provider.stop()
+
+def warmed_pool(providers, stalled, budget):
+    """Stalled endpoint ranked first on a fast history, healthy endpoint as the backup"""
+    pool = RpcPool('solana', [stalled.url, providers['helius'].url])
+    primary, backup = pool.endpoints
+    for _ in range(20):
+        primary.record(True, 0.01)
+        backup.record(True, 0.2)
+    pool.hedges[1] = budget
+    return pool
+
+# ============================================================
+# Budget
+# ============================================================
+
+def test_budget_earns_a_fraction_of_a_hedge_per_request():
+    budget = HedgeBudget(0.5)
+    budget.earn()
+    assert not budget.take()
+
+    budget.earn()
+    assert budget.take() and not budget.take()
+    assert budget.report()['hedge_rate'] == 0.5
+
+def test_budget_is_capped_at_the_burst():
+    budget = HedgeBudget(1.0)
+    for _ in range(HEDGE_BURST * 3):
+        budget.earn()
+
+    assert sum(budget.take() for _ in range(HEDGE_BURST * 3)) == HEDGE_BURST
+
+def test_hedge_delay_waits_for_enough_samples(providers):
+    pool = RpcPool('solana', [providers['helius'].url])
+    endpoint = pool.endpoints[0]
+    for _ in range(19):
+        endpoint.record(True, 0.001)
+    assert endpoint.hedge_delay() is None
+
+    endpoint.record(True, 0.001)
+    assert endpoint.hedge_delay() == HEDGE_MIN_DELAY
+
+# ============================================================
+# Hedged Requests
+# ============================================================
+
+def test_stalled_request_is_won_by_the_hedge(providers, stalled):
+    budget = HedgeBudget(1.0)
+    budget.tokens = 1
+    pool = warmed_pool(providers, stalled, budget)
+
+    started = time.perf_counter()
+    data = pool.post(EMPTY_READ, tier=1)
+
+    assert data['result']['value'] == []
+    assert time.perf_counter() - started < 0.4
+    assert budget.hedged == 1
+    # The loser still finishes and reports what the request would have cost alone
+    deadline = time.time() + 2
+    while budget.wins == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    report = budget.report()
+    assert report['wins'] == 1 and report['unhedged_p50_ms'] >= 450
+
+def test_empty_budget_waits_for_the_first_request(providers, stalled):
+    budget = HedgeBudget(0)
+    pool = warmed_pool(providers, stalled, budget)
+    before = providers['helius'].counts.get('getMultipleAccounts', 0)
+
+    started = time.perf_counter()
+    pool.post(EMPTY_READ, tier=1)
+
+    assert time.perf_counter() - started >= 0.45
+    assert budget.hedged == 0
+    assert providers['helius'].counts.get('getMultipleAccounts', 0) == before
+
+def test_untiered_requests_are_never_hedged(providers, stalled):
+    budget = HedgeBudget(1.0)
+    budget.tokens = HEDGE_BURST
+    pool = warmed_pool(providers, stalled, budget)
+
+    pool.post(EMPTY_READ)
+
+    assert budget.requests == 0 and budget.hedged == 0
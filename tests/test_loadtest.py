@@ -0,0 +1,107 @@
+"""
+Fleet scaling test helpers: synthetic fleets, holdings sizes, measurements
+and history preloading against the fake providers
+"""
+
+import copy
+import time
+
+import pytest
+
+import clock
+from alert_coalescer import get_alert_coalescer
+from config import TIER_CONFIG
+from fake_providers import b58decode
+from loadtest import (
+    HOLDINGS_MAX, deep_size, fleet_mix, generate_fleet, holdings_sizes, preload_history, schedule_report
+)
+from state import bot_state
+from token_scheduler import get_token_scheduler
+
+TEMPLATE = (
+    [{'address': f"T1Sol{i}", 'chain': 'solana', 'tier': 1, 'winning_tokens': ['w']} for i in range(2)]
+    + [{'address': f"T3Base{i}", 'chain': 'base', 'tier': 3} for i in range(6)]
+    + [{'address': 'Eth', 'chain': 'ethereum', 'tier': 1}]
+)
+
+def test_fleet_mix_ignores_unsupported_chains():
+    assert fleet_mix(TEMPLATE) == {(1, 'solana'): 0.25, (3, 'base'): 0.75}
+
+def test_generated_fleet_keeps_the_template_mix():
+    fleet = generate_fleet(2000, TEMPLATE)
+
+    assert fleet == generate_fleet(2000, TEMPLATE)
+    assert len({w['address'] for w in fleet}) == 2000
+    assert all(w['source'] == 'synthetic' for w in fleet)
+    mix = fleet_mix(fleet)
+    assert set(mix) == {(1, 'solana'), (3, 'base')}
+    assert mix[(1, 'solana')] == pytest.approx(0.25, abs=0.03)
+
+def test_generated_addresses_are_valid_for_their_chain():
+    for whale in generate_fleet(50, TEMPLATE):
+        if whale['chain'] == 'base':
+            assert whale['address'].startswith('0x') and len(whale['address']) == 42
+        else:
+            assert len(b58decode(whale['address'])) == 32
+
+def test_fleet_copies_do_not_share_lists():
+    fleet = generate_fleet(20, TEMPLATE)
+    solana = [w for w in fleet if w['chain'] == 'solana']
+    solana[0]['winning_tokens'].append('x')
+
+    assert TEMPLATE[0]['winning_tokens'] == ['w']
+
+def test_holdings_sizes_are_bounded_and_skewed():
+    sizes = holdings_sizes(generate_fleet(2000, TEMPLATE), median=20, sigma=1.5)
+
+    assert all(1 <= n <= HOLDINGS_MAX for n in sizes.values())
+    assert sorted(sizes.values())[len(sizes) // 2] == pytest.approx(20, rel=0.25)
+    assert max(sizes.values()) > 200
+
+def test_deep_size_counts_shared_objects_once():
+    shared = ['x' * 1000]
+    assert deep_size({'a': shared, 'b': shared}) < deep_size({'a': ['x' * 1000], 'b': ['y' * 1000]})
+
+def test_schedule_report_flags_an_overrun_tier():
+    fleet = [{'tier': 1}] * 200 + [{'tier': 2}] * 10
+    durations = {1: [0.05] * 10, 2: [0.05] * 10}
+
+    report = schedule_report(fleet, durations)
+
+    tier1 = report[1]
+    assert tier1['cycle_s'] == pytest.approx(200 * (0.05 + TIER_CONFIG[1]['throttle']))
+    assert tier1['utilization'] > 1
+    assert tier1['capacity'] == int(TIER_CONFIG[1]['interval'] / (0.05 + TIER_CONFIG[1]['throttle']))
+    assert report[2]['utilization'] < 1
+
+# ============================================================
+# History Preload
+# ============================================================
+
+@pytest.fixture
+def isolated_state():
+    saved = copy.deepcopy(bot_state)
+    yield
+    for token in set(bot_state['tracked_tokens']) - set(saved['tracked_tokens']):
+        get_token_scheduler().unschedule(token)
+    bot_state.clear()
+    bot_state.update(saved)
+
+def test_preload_history_tracks_buys_on_a_simulated_clock(world, isolated_state):
+    fleet = generate_fleet(20, TEMPLATE, seed=7)
+    coalescer = get_alert_coalescer()
+    positions = len(bot_state['whale_token_balances'])
+
+    count = preload_history(world, fleet, hours=24, buys_per_day=2, shared=0.5, seed=7)
+
+    assert count == 40
+    assert len(bot_state['whale_token_balances']) > positions
+    # Shared buys pile into fewer tokens than there were buys
+    history = [t for t in bot_state['tracked_tokens'].values() if t.get('symbol', '').startswith('HIST')]
+    assert 0 < len(history) < count
+    solana = [p for p in bot_state['whale_token_balances'].values()
+              if p['chain'] == 'solana' and p['symbol'].startswith('HIST')]
+    assert solana and all(p['token_account'] and p['decimals'] == 6 for p in solana)
+    # The real clock and shared coalescer are back in place
+    assert clock.now() == pytest.approx(time.time(), abs=5)
+    assert get_alert_coalescer() is coalescer
@@ -0,0 +1,85 @@
+"""
+Sliding-window multi-buy index: levels, once-per-episode alerts, expiry and rebuilds
+"""
+
+import pytest
+
+import clock
+from multibuy_index import MultiBuyIndex
+
+NOW = 1_700_000_000.0
+LEVELS = [
+    {'whales': 2, 'window': 600},
+    {'whales': 3, 'window': 3600},
+]
+
+@pytest.fixture
+def sim():
+    sim = clock.SimulatedClock(NOW)
+    clock.set_time_source(sim)
+    yield sim
+    clock.set_time_source(None)
+
+@pytest.fixture
+def index(sim):
+    return MultiBuyIndex({}, LEVELS)
+
+def test_levels_fire_once_as_whales_join(index, sim):
+    assert index.record_buy('T', 'w1', 'TKN') is None
+    sim.advance_to(NOW + 60)
+    assert index.record_buy('T', 'w2') == LEVELS[0]
+    # The same whale again, or a level already reached, stays quiet
+    assert index.record_buy('T', 'w2') is None
+
+    sim.advance_to(NOW + 1200)
+    assert index.record_buy('T', 'w3') == LEVELS[1]
+
+    record = index.records['T']
+    assert record['level'] == 2 and record['whale_count'] == 3
+    assert record['detected_time'] == NOW + 60 and record['symbol'] == 'TKN'
+
+def test_narrow_window_needs_buys_close_together(index, sim):
+    index.record_buy('T', 'w1')
+    sim.advance_to(NOW + 601)
+
+    assert index.record_buy('T', 'w2') is None
+    assert index.whale_count('T', 600) == 1
+    assert index.whale_count('T') == 2
+
+def test_episode_expires_into_the_archive_queue(index, sim):
+    index.record_buy('T', 'w1')
+    index.record_buy('T', 'w2')
+    index.record_buy('Q', 'w1')
+
+    sim.advance_to(NOW + 3601)
+    expired = index.drain_expired()
+
+    # Only episodes that reached a level are worth archiving
+    assert [token for token, _ in expired] == ['T']
+    assert expired[0][1]['last_buy_time'] == NOW
+    assert 'whales' not in expired[0][1]
+    assert index.records == {}
+    assert index.drain_expired() == []
+
+def test_rebuy_refreshes_membership(index, sim):
+    index.record_buy('T', 'w1')
+    sim.advance_to(NOW + 3000)
+    index.record_buy('T', 'w1')
+
+    sim.advance_to(NOW + 3700)
+    assert index.whale_count('T') == 1
+
+def test_rebuild_from_persisted_records(index, sim):
+    index.record_buy('T', 'w1', 'TKN')
+    sim.advance_to(NOW + 30)
+    index.record_buy('T', 'w2')
+
+    rebuilt = MultiBuyIndex(index.records, LEVELS)
+
+    assert rebuilt.whale_count('T', 600) == 2
+    assert rebuilt.active() == index.active()
+    assert rebuilt.record_buy('T', 'w3') == LEVELS[1]
+
+def test_legacy_records_are_dropped(sim):
+    index = MultiBuyIndex({'OLD': {'whale_count': 4, 'symbol': 'OLD'}}, LEVELS)
+    assert index.records == {}
@@ -0,0 +1,98 @@
+"""
+Multicall3 balanceOf sweeps: ABI round trip, gas-sized batches, and sell
+detection for Base positions that never treats a revert as a sell
+"""
+
+import pytest
+
+import features
+import rpc
+from fake_providers import BASE_TOKEN_DECIMALS, decode_aggregate3_calls, encode_aggregate3_results
+from rpc import calldata, decode_aggregate3, encode_aggregate3, multicall
+
+WHALE = '0x' + 'a7' * 20
+
+def token(i):
+    return '0x' + f"{0xb0000 + i:040x}"
+
+def test_aggregate3_round_trip():
+    calls = [(token(1), calldata('balanceOf', WHALE)), (token(2), calldata('decimals'))]
+
+    assert decode_aggregate3_calls(encode_aggregate3(calls)) == calls
+    raw = encode_aggregate3_results([b'\x01' * 32, None])
+    assert decode_aggregate3(raw) == [(True, b'\x01' * 32), (False, b'')]
+
+def test_batches_are_sized_by_gas(world, providers, monkeypatch):
+    for i in range(5):
+        world.add_holding(WHALE, 'base', token(i), 100 + i)
+    monkeypatch.setattr(rpc, 'MULTICALL_GAS_LIMIT', 100_000)
+    before = providers['alchemy'].counts.get('eth_call', 0)
+
+    results = multicall([(token(i), calldata('balanceOf', WHALE)) for i in range(5)], gas_per_call=40_000)
+
+    # Two calls fit each 100k budget
+    assert providers['alchemy'].counts['eth_call'] - before == 3
+    assert [rpc.decode_words(r)[0] for r in results] == [(100 + i) * 10 ** BASE_TOKEN_DECIMALS for i in range(5)]
+
+def position(tok, amount):
+    raw = float(amount * 10 ** BASE_TOKEN_DECIMALS)
+    return {'whale': WHALE, 'token': tok, 'symbol': 'SWP', 'chain': 'base',
+            'initial_balance': raw, 'current_balance': raw, 'last_check': 0}
+
+@pytest.fixture
+def sells(monkeypatch):
+    sent = []
+    monkeypatch.setattr(features, 'send_sell_alert', lambda data, pct: sent.append((data['token'], round(pct))))
+    return sent
+
+def test_sweep_detects_sells_and_ignores_trims(world, providers, monkeypatch, sells):
+    full, half, trim = token(10), token(11), token(12)
+    positions = {}
+    for tok in (full, half, trim):
+        world.add_holding(WHALE, 'base', tok, 1_000)
+        positions[f"{WHALE}_{tok}"] = position(tok, 1_000)
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+    world.sell(WHALE, full)
+    world.sell(WHALE, half, 0.5)
+    world.sell(WHALE, trim, 0.1)
+    before = dict(providers['alchemy'].counts)
+
+    features.check_whale_sells()
+
+    assert sorted(sells) == sorted([(full, -100), (half, -50)])
+    assert f"{WHALE}_{full}" not in positions
+    assert positions[f"{WHALE}_{trim}"]['current_balance'] == pytest.approx(900 * 10 ** BASE_TOKEN_DECIMALS)
+    # One eth_call for the sweep, no wallet downloads
+    assert providers['alchemy'].counts['eth_call'] - before.get('eth_call', 0) == 1
+    assert providers['alchemy'].counts.get('alchemy_getTokenBalances', 0) == before.get('alchemy_getTokenBalances', 0)
+
+def test_reverted_balance_of_is_not_a_sell(world, monkeypatch, sells):
+    # Pool contracts in the fake world revert on balanceOf
+    pool_token = token(20)
+    world.add_pool(pool_token, 'v2')
+    reverting = world.pool(pool_token)['address']
+    positions = {f"{WHALE}_{reverting}": position(reverting, 1_000)}
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+
+    features.check_whale_sells()
+
+    assert sells == []
+    assert positions[f"{WHALE}_{reverting}"]['last_check'] == 0
+
+def test_failed_sweep_falls_back_to_wallet_reads(world, providers, monkeypatch, sells):
+    tok = token(30)
+    world.add_holding(WHALE, 'base', tok, 1_000)
+    positions = {f"{WHALE}_{tok}": position(tok, 1_000)}
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+    world.sell(WHALE, tok, 0.6)
+
+    def failing_sweep(pairs):
+        raise rpc.RpcError('multicall unavailable')
+
+    monkeypatch.setattr(features, 'get_base_balances', failing_sweep)
+    before = providers['alchemy'].counts.get('alchemy_getTokenBalances', 0)
+
+    features.check_whale_sells()
+
+    assert sells == [(tok, -60)]
+    assert providers['alchemy'].counts['alchemy_getTokenBalances'] == before + 1
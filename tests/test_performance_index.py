@@ -0,0 +1,73 @@
+"""
+Streaming performance index: window expiry, per-window best calls and rankings
+"""
+
+import pytest
+
+import clock
+from performance_index import LIFETIME, PerformanceIndex
+
+NOW = 1_700_000_000.0
+WINDOWS = {'1h': 3600, '1d': 86400}
+
+@pytest.fixture
+def sim():
+    sim = clock.SimulatedClock(NOW)
+    clock.set_time_source(sim)
+    yield sim
+    clock.set_time_source(None)
+
+@pytest.fixture
+def index(sim):
+    return PerformanceIndex({}, [], WINDOWS)
+
+def record(index, sim, whale, gains, start, step=60):
+    for i, gain in enumerate(gains):
+        sim.advance_to(start + i * step)
+        index.record(whale, gain)
+
+def test_windows_forget_expired_calls(index, sim):
+    record(index, sim, 'w1', [200, 10], NOW)
+    record(index, sim, 'w1', [50], NOW + 2 * 3600)
+
+    assert index.stats('w1', '1h')['calls'] == 1
+    assert index.stats('w1', '1d')['calls'] == 3
+    assert index.stats('w1')['avg_gain'] == pytest.approx(260 / 3)
+
+    sim.advance_to(NOW + 3 * 3600 + 1)
+    assert index.stats('w1', '1h') is None
+    assert index.stats('w1', '1d')['calls'] == 3
+
+def test_best_call_is_per_window(index, sim):
+    record(index, sim, 'w1', [500], NOW)
+    record(index, sim, 'w1', [30, 80, 40], NOW + 2 * 3600)
+
+    assert index.stats('w1', '1h')['best_call'] == 80
+    assert index.stats('w1', '1d')['best_call'] == 500
+    assert index.stats('w1', LIFETIME)['best_call'] == 500
+
+    # Once the 80% call ages out, the best call still in the window takes over
+    sim.advance_to(NOW + 3 * 3600 + 61)
+    assert index.stats('w1', '1h')['best_call'] == 40
+
+def test_rebuild_from_persisted_events_matches(index, sim):
+    record(index, sim, 'w1', [120, 5, 90], NOW)
+    record(index, sim, 'w2', [300, 20, 250], NOW + 3600)
+
+    rebuilt = PerformanceIndex(index.lifetime, index.events, WINDOWS)
+
+    for window in ['1h', '1d', LIFETIME]:
+        for whale in ('w1', 'w2'):
+            assert rebuilt.stats(whale, window) == index.stats(whale, window)
+
+def test_leaderboard_ranks_by_success_then_gain(index, sim):
+    record(index, sim, 'steady', [100, 120, 110], NOW)
+    record(index, sim, 'lucky', [900, 5, 5], NOW)
+    record(index, sim, 'few', [1000], NOW)
+
+    board = index.leaderboard('1h')
+
+    # Whales below the minimum call count are not ranked
+    assert [row['address'] for row in board] == ['steady', 'lucky']
+    assert board[1]['best_call'] == 900
+    assert index.ranked_count(LIFETIME) == 2
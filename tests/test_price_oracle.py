@@ -0,0 +1,158 @@
+"""
+Price oracle pool reads against the fake Base / Solana pools: every layout,
+both token sides, migrated pump curves and the DexScreener fallback
+"""
+
+import random
+
+import pytest
+
+import price_oracle
+from fake_providers import NATIVE_USD, b58encode
+from price_oracle import PriceOracle, describe_pool, read_base_pools, read_solana_pools
+from rpc import RpcError
+from utils import get_token_info
+
+def solana_token(seed):
+    return b58encode(random.Random(f"oracle-test:{seed}").randbytes(32))
+
+def discovered(world, token, kind, **pool_options):
+    """Give token a pool of this kind and describe it the way the oracle does"""
+    chain = 'base' if token.startswith('0x') else 'solana'
+    world.add_pool(token, kind, **pool_options)
+    pool = describe_pool(chain, token, get_token_info(token, chain))
+    assert pool['kind'] == kind
+    return pool
+
+def listing_usd(world, token):
+    return world.market(token)['market_cap'] / 1_000_000_000
+
+# ============================================================
+# Pool Reads
+# ============================================================
+
+# WETH is 0x4200..., so these sort before and after it in the pair
+@pytest.mark.parametrize('token, token_first', [
+    ('0x' + '1' * 40, True),
+    ('0x' + 'f' * 40, False),
+])
+@pytest.mark.parametrize('kind', ['v2', 'v3'])
+def test_base_pool_on_either_side(world, kind, token, token_first):
+    token = token[:-2] + ('02' if kind == 'v2' else '03')
+    pool = discovered(world, token, kind)
+
+    assert pool['token_first'] is token_first
+    [price] = read_base_pools([pool])
+    assert price == pytest.approx(world.pool(token)['price_native'], rel=1e-6)
+
+@pytest.mark.parametrize('kind, token_first', [
+    ('raydium_amm', True),
+    ('raydium_clmm', True),
+    ('raydium_clmm', False),
+    ('whirlpool', True),
+    ('whirlpool', False),
+    ('pump_curve', True),
+])
+def test_solana_pool_layouts(world, kind, token_first):
+    token = solana_token(f"{kind}:{token_first}")
+    pool = discovered(world, token, kind, token_first=token_first)
+
+    assert pool['token_first'] is token_first
+    assert pool['token_decimals'] == 6 and pool['quote_decimals'] == 9
+    [price] = read_solana_pools([pool])
+    assert price == pytest.approx(world.pool(token)['price_native'], rel=1e-6)
+
+def test_solana_reads_are_batched_per_slice(world):
+    tokens = [solana_token(f"batch:{i}") for i in range(3)]
+    pools = [discovered(world, token, 'whirlpool') for token in tokens]
+
+    prices = read_solana_pools(pools)
+    assert prices == pytest.approx([world.pool(t)['price_native'] for t in tokens], rel=1e-6)
+
+def test_completed_pump_curve_is_stale(world):
+    token = solana_token('migrated')
+    pool = discovered(world, token, 'pump_curve', complete=True)
+
+    assert read_solana_pools([pool]) == [None]
+    assert pool['stale'] is True
+
+# ============================================================
+# Oracle
+# ============================================================
+
+def test_oracle_discovers_then_reads_on_chain(world):
+    token = solana_token('oracle:clmm')
+    world.add_pool(token, 'raydium_clmm', token_first=False)
+    data = {'chain': 'solana', 'symbol': 'CLMM'}
+    oracle = PriceOracle()
+
+    first = oracle.fetch_prices([(token, data)])[token]
+    assert first.get('source') != 'chain'
+    assert data['pool']['kind'] == 'raydium_clmm'
+
+    second = oracle.fetch_prices([(token, data)])[token]
+    assert second['source'] == 'chain'
+    assert second['price'] == pytest.approx(listing_usd(world, token), rel=1e-6)
+    assert oracle.stats['chain'] == 1 and oracle.stats['fallback'] == 1
+
+    # Pool reads see a move before DexScreener indexes it
+    world.index_lag = 3600
+    world.move_price(token, 2.0)
+    try:
+        moved = oracle.fetch_prices([(token, data)])[token]
+    finally:
+        world.index_lag = 0
+    assert moved['price'] == pytest.approx(2 * listing_usd(world, token), rel=1e-6)
+
+def test_base_oracle_price_in_usd(world):
+    token = '0x' + 'e' * 38 + '01'
+    data = {'chain': 'base', 'symbol': 'V3'}
+    world.add_pool(token, 'v3')
+    oracle = PriceOracle()
+    oracle.fetch_prices([(token, data)])
+
+    info = oracle.fetch_prices([(token, data)])[token]
+    assert info['source'] == 'chain'
+    assert info['price'] == pytest.approx(listing_usd(world, token), rel=1e-6)
+    assert info['price'] / NATIVE_USD == pytest.approx(world.pool(token)['price_native'], rel=1e-6)
+
+def test_completed_pump_curve_falls_back_and_rediscovers(world):
+    token = solana_token('oracle:migrated')
+    data = {'chain': 'solana', 'symbol': 'PUMP', 'pool': discovered(world, token, 'pump_curve', complete=True)}
+    oracle = PriceOracle()
+
+    info = oracle.fetch_prices([(token, data)])[token]
+
+    assert info.get('source') != 'chain'
+    assert info['price'] == pytest.approx(listing_usd(world, token), rel=1e-6)
+    assert oracle.stats['fallback'] == 1 and oracle.stats['discovered'] == 1
+    # The stale pool was replaced by a fresh discovery
+    assert not data['pool'].get('stale')
+
+def test_unreadable_pool_falls_back_to_dexscreener(world):
+    token = solana_token('oracle:gone')
+    pool = discovered(world, token, 'whirlpool')
+    pool['address'] = solana_token('oracle:closed-account')
+    data = {'chain': 'solana', 'symbol': 'GONE', 'pool': pool}
+    oracle = PriceOracle()
+
+    info = oracle.fetch_prices([(token, data)])[token]
+
+    assert info.get('source') != 'chain'
+    assert info['price'] == pytest.approx(listing_usd(world, token), rel=1e-6)
+    assert oracle.stats['chain'] == 0 and oracle.stats['fallback'] == 1
+
+def test_rpc_error_falls_back_to_dexscreener(world, monkeypatch):
+    token = '0x' + 'd' * 38 + '02'
+    data = {'chain': 'base', 'symbol': 'ERR', 'pool': discovered(world, token, 'v2')}
+    oracle = PriceOracle()
+
+    def failing_multicall(calls):
+        raise RpcError('endpoint unavailable')
+
+    monkeypatch.setattr(price_oracle, 'multicall', failing_multicall)
+    info = oracle.fetch_prices([(token, data)])[token]
+
+    assert info.get('source') != 'chain'
+    assert info['price'] == pytest.approx(listing_usd(world, token), rel=1e-6)
+    assert oracle.stats['rpc_errors'] == 1 and oracle.stats['fallback'] == 1
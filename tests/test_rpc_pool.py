@@ -0,0 +1,126 @@
+"""
+RPC endpoint pools: circuit breakers, failover and latency-ranked routing
+"""
+
+import pytest
+
+import rpc
+from config import RPC_BREAKER_COOLDOWN, RPC_BREAKER_FAILURES
+from fake_providers import FakeHelius
+from rpc import RpcEndpoint, RpcError, RpcPool
+
+EMPTY_READ = {"jsonrpc": "2.0", "id": 1, "method": "getMultipleAccounts", "params": [[]]}
+
+@pytest.fixture
+def failing(world):
+    """A Helius stand-in that answers every request with HTTP 429"""
+    provider = FakeHelius(world, error_rate=1.0).start()
+    yield provider
+    provider.stop()
+
+# ============================================================
+# Circuit Breakers
+# ============================================================
+
+def test_breaker_opens_after_consecutive_failures():
+    endpoint = RpcEndpoint('http://rpc.example/?api-key=secret')
+    for _ in range(RPC_BREAKER_FAILURES - 1):
+        endpoint.record(False, 0.1, 'HTTP 429')
+    assert endpoint.state == 'closed'
+
+    endpoint.record(False, 0.1, 'HTTP 429')
+
+    assert endpoint.state == 'open' and endpoint.trips == 1
+    assert not endpoint.available(endpoint.opened_at + 1)
+    # Reports name the host, never the key in the URL
+    assert endpoint.snapshot()['name'] == 'rpc.example'
+
+def test_open_breaker_lets_one_probe_through_after_cooldown():
+    endpoint = RpcEndpoint('http://rpc.example')
+    for _ in range(RPC_BREAKER_FAILURES):
+        endpoint.record(False, 0.1, 'timeout')
+    later = endpoint.opened_at + RPC_BREAKER_COOLDOWN
+
+    assert endpoint.acquire(later) and endpoint.state == 'half_open'
+    assert not endpoint.acquire(later)
+
+    endpoint.record(True, 0.05)
+    assert endpoint.state == 'closed' and endpoint.acquire(later)
+
+def test_failed_probe_reopens_the_breaker():
+    endpoint = RpcEndpoint('http://rpc.example')
+    for _ in range(RPC_BREAKER_FAILURES):
+        endpoint.record(False, 0.1, 'timeout')
+    opened_at = endpoint.opened_at
+    endpoint.acquire(opened_at + RPC_BREAKER_COOLDOWN)
+
+    endpoint.record(False, 0.1, 'timeout')
+
+    assert endpoint.state == 'open' and not endpoint.probing
+    # A fresh cooldown starts from the failed probe
+    assert endpoint.opened_at >= opened_at and endpoint.trips == 2
+
+# ============================================================
+# Routing and Failover
+# ============================================================
+
+def test_failing_endpoint_fails_over_to_the_next(providers, failing):
+    pool = RpcPool('solana', [failing.url, providers['helius'].url])
+
+    data = pool.post(EMPTY_READ)
+
+    assert data['result']['value'] == []
+    assert pool.stats['failovers'] == 1
+    bad, good = pool.endpoints
+    assert bad.failures == 1 and good.failures == 0
+
+def test_open_endpoints_are_skipped(providers, failing):
+    pool = RpcPool('solana', [failing.url, providers['helius'].url])
+    for _ in range(RPC_BREAKER_FAILURES):
+        pool.post(EMPTY_READ)
+    requests = failing.total_requests()
+
+    pool.post(EMPTY_READ)
+
+    assert pool.endpoints[0].state == 'open'
+    assert failing.total_requests() == requests
+
+def test_every_endpoint_open_is_rejected_without_a_request(failing):
+    pool = RpcPool('solana', [failing.url])
+    for _ in range(RPC_BREAKER_FAILURES):
+        with pytest.raises(RpcError):
+            pool.post(EMPTY_READ)
+    requests = failing.total_requests()
+
+    with pytest.raises(RpcError, match='are open'):
+        pool.post(EMPTY_READ)
+
+    assert pool.stats['rejected'] == 1
+    assert failing.total_requests() == requests
+
+def test_json_rpc_error_does_not_count_against_the_endpoint(providers):
+    pool = RpcPool('solana', [providers['helius'].url])
+
+    with pytest.raises(RpcError, match='Method not found'):
+        pool.call('getNothing', [])
+
+    assert pool.endpoints[0].failures == 0 and pool.endpoints[0].state == 'closed'
+
+def test_healthier_endpoint_is_ranked_first():
+    pool = RpcPool('solana', ['http://slow.example', 'http://fast.example', 'http://flaky.example'])
+    slow, fast, flaky = pool.endpoints
+    for _ in range(10):
+        slow.record(True, 0.5)
+        fast.record(True, 0.1)
+        flaky.record(True, 0.1)
+    flaky.record(False, 0.1, 'HTTP 502')
+    flaky.record(False, 0.1, 'HTTP 502')
+
+    assert pool.ranked() == [fast, flaky, slow]
+
+def test_pool_reports_are_keyed_by_chain(providers):
+    pool = rpc.get_rpc_pool('solana')
+
+    assert rpc.get_rpc_pool('solana') is pool
+    assert 'solana' in rpc.rpc_pool_reports()
+    assert {'requests', 'failovers', 'endpoints', 'hedging'} <= set(pool.report())
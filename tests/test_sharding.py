@@ -0,0 +1,127 @@
+"""
+Sharded monitoring: hash partitioning, worker detection and store sync,
+and the supervisor restarting a worker that died
+"""
+
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+import sharding
+from sharding import ShardCoordinator, ShardWorker, StoreShardWorker, partition_whales, shard_for
+from whale_store import WhaleStore, write_store
+
+SHARDS = 4
+WHALES = [{'address': '0x' + f"{i:040x}", 'chain': 'base', 'tier': 1 + i % 3} for i in range(60)]
+
+# ============================================================
+# Partitioning
+# ============================================================
+
+def test_partitions_are_stable_and_complete():
+    shards = partition_whales(WHALES, SHARDS)
+
+    assert sorted(w['address'] for shard in shards for w in shard) == sorted(w['address'] for w in WHALES)
+    for shard_id, shard in enumerate(shards):
+        assert all(shard_for(w['address'], SHARDS) == shard_id for w in shard)
+    assert all(shards)
+
+def test_shard_ignores_address_case():
+    assert shard_for('0xABCDEF' + '0' * 34, SHARDS) == shard_for('0xabcdef' + '0' * 34, SHARDS)
+
+# ============================================================
+# Workers
+# ============================================================
+
+def test_worker_reports_buys_after_the_baseline(world):
+    whale = {'address': '0x' + 'c1' * 20, 'chain': 'base', 'tier': 1}
+    events = queue.Queue()
+    worker = ShardWorker(0, [whale], events, threading.Event(), threading.Event())
+
+    worker.check(whale, first_run=True)
+    assert events.empty()
+
+    symbol = world.inject_buy(whale['address'], 'base')
+    worker.check(whale, first_run=False)
+
+    event = events.get_nowait()
+    assert event['type'] == 'buy' and event['shard'] == 0
+    assert [t['address'] for t in event['tokens']] == [world.buys[symbol]['token']]
+    assert event['detected_at'] == pytest.approx(time.time(), abs=5)
+    assert worker.stats[1]['checks'] == 2
+
+def test_whale_new_to_the_shard_gets_a_baseline(world):
+    whale = {'address': '0x' + 'c2' * 20, 'chain': 'base', 'tier': 2}
+    events = queue.Queue()
+    worker = ShardWorker(0, [], events, threading.Event(), threading.Event())
+
+    # Not first run for the tier, but the whale itself has never been read
+    worker.check(whale, first_run=False)
+
+    assert events.empty()
+    assert whale['address'] in worker.whale_tokens
+
+@pytest.fixture
+def store_worker(tmp_path):
+    path = str(tmp_path / 'whales.bin')
+    write_store(WHALES, path)
+    worker = StoreShardWorker(1, SHARDS, queue.Queue(), threading.Event(), threading.Event())
+    worker.store = WhaleStore(path)
+    worker.refresh_whales()
+    yield worker
+    worker.store.close()
+
+def test_store_worker_owns_its_slice(store_worker):
+    expected = {w['address'] for w in partition_whales(WHALES, SHARDS)[1]}
+    assert set(store_worker.whales) == expected
+
+def test_store_worker_follows_tier_changes_and_removals(store_worker, tmp_path):
+    mine = sorted(store_worker.whales)
+    # Another process edits the shared file
+    other = WhaleStore(str(tmp_path / 'whales.bin'))
+    try:
+        other.set_tier(mine[0], 3 if store_worker.whales[mine[0]]['tier'] != 3 else 1)
+        changed_tier = other.tier_of(mine[0])
+        store_worker.whale_tokens[mine[1]] = {'token'}
+        other.remove(mine[1])
+    finally:
+        other.close()
+
+    store_worker.refresh_whales()
+
+    assert store_worker.whales[mine[0]]['tier'] == changed_tier
+    assert mine[1] not in store_worker.whales
+    assert mine[1] not in store_worker.whale_tokens
+
+# ============================================================
+# Supervisor
+# ============================================================
+
+def crash_once_worker(shard_id, shard_count, event_queue, paused, stop):
+    """Stands in for run_shard_worker: the first launch exits, the restart stays up"""
+    marker = os.path.join(os.environ['SHARD_TEST_DIR'], f"shard-{shard_id}")
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(3)
+    while not stop.is_set():
+        time.sleep(0.05)
+
+def test_supervisor_restarts_a_dead_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv('SHARD_TEST_DIR', str(tmp_path))
+    monkeypatch.setattr(sharding, 'run_shard_worker', crash_once_worker)
+    coordinator = ShardCoordinator(WHALES, 1)
+    coordinator.start()
+    try:
+        deadline = time.time() + 15
+        while time.time() < deadline and not (coordinator.restarts and coordinator.shards[0]['alive']):
+            time.sleep(0.1)
+
+        assert coordinator.restarts == 1
+        assert coordinator.shards[0]['alive']
+        assert coordinator.health_report()[0]['status'] == 'starting'
+    finally:
+        coordinator.shutdown()
+    assert not coordinator.supervisor.is_alive()
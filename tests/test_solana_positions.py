@@ -0,0 +1,92 @@
+"""
+Solana sell checks that read each position's token account instead of the wallet
+"""
+
+import pytest
+
+import features
+from fake_providers import SOLANA_TOKEN_DECIMALS, b58encode
+from features import get_solana_account_balances, get_solana_tokens
+
+WHALE = b58encode(bytes([0x43]) * 32)
+
+def mint(i):
+    return b58encode(bytes([0x60 + i]) * 32)
+
+def position(tok, amount):
+    [held] = [t for t in get_solana_tokens(WHALE) if t['address'] == tok]
+    balance = amount / 10 ** SOLANA_TOKEN_DECIMALS
+    return {'whale': WHALE, 'token': tok, 'symbol': 'ACCT', 'chain': 'solana',
+            'initial_balance': balance, 'current_balance': balance, 'last_check': 0,
+            'token_account': held['account'], 'decimals': held['decimals']}
+
+@pytest.fixture
+def sells(monkeypatch):
+    sent = []
+    monkeypatch.setattr(features, 'send_sell_alert', lambda data, pct: sent.append((data['token'], round(pct))))
+    return sent
+
+def test_account_reads_return_raw_amounts_and_zero_once_closed(world):
+    held, sold = mint(1), mint(2)
+    world.add_holding(WHALE, 'solana', held, 1_234_567)
+    world.add_holding(WHALE, 'solana', sold, 5_000)
+    accounts = [world.token_account_address(WHALE, held), world.token_account_address(WHALE, sold)]
+    world.sell(WHALE, sold)
+
+    assert get_solana_account_balances(accounts) == [1_234_567, 0]
+
+def test_account_reads_detect_sells_without_wallet_downloads(world, providers, monkeypatch, sells):
+    full, half, trim = mint(3), mint(4), mint(5)
+    positions = {}
+    for tok in (full, half, trim):
+        world.add_holding(WHALE, 'solana', tok, 1_000_000)
+    for tok in (full, half, trim):
+        positions[f"{WHALE}_{tok}"] = position(tok, 1_000_000)
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+    world.sell(WHALE, full)
+    world.sell(WHALE, half, 0.5)
+    world.sell(WHALE, trim, 0.1)
+    before = dict(providers['helius'].counts)
+
+    features.check_whale_sells()
+
+    assert sorted(sells) == sorted([(full, -100), (half, -50)])
+    assert f"{WHALE}_{full}" not in positions
+    assert positions[f"{WHALE}_{trim}"]['current_balance'] == pytest.approx(0.9)
+    # One getMultipleAccounts for all three, no wallet downloads
+    assert providers['helius'].counts['getMultipleAccounts'] - before.get('getMultipleAccounts', 0) == 1
+    assert providers['helius'].counts.get('getTokenAccountsByOwner', 0) == before.get('getTokenAccountsByOwner', 0)
+
+def test_position_without_an_account_picks_it_up_from_a_wallet_read(world, providers, monkeypatch, sells):
+    tok = mint(6)
+    world.add_holding(WHALE, 'solana', tok, 1_000_000)
+    legacy = position(tok, 1_000_000)
+    account = legacy.pop('token_account')
+    legacy.pop('decimals')
+    positions = {f"{WHALE}_{tok}": legacy}
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+    before = providers['helius'].counts.get('getTokenAccountsByOwner', 0)
+
+    features.check_whale_sells()
+
+    assert sells == []
+    assert providers['helius'].counts['getTokenAccountsByOwner'] == before + 1
+    assert legacy['token_account'] == account and legacy['decimals'] == SOLANA_TOKEN_DECIMALS
+
+def test_failed_account_read_falls_back_to_wallet_reads(world, providers, monkeypatch, sells):
+    tok = mint(7)
+    world.add_holding(WHALE, 'solana', tok, 1_000_000)
+    positions = {f"{WHALE}_{tok}": position(tok, 1_000_000)}
+    monkeypatch.setitem(features.bot_state, 'whale_token_balances', positions)
+    world.sell(WHALE, tok, 0.6)
+
+    def failing_read(accounts):
+        raise features.RpcError('getMultipleAccounts unavailable')
+
+    monkeypatch.setattr(features, 'get_solana_account_balances', failing_read)
+    before = providers['helius'].counts.get('getTokenAccountsByOwner', 0)
+
+    features.check_whale_sells()
+
+    assert sells == [(tok, -60)]
+    assert providers['helius'].counts['getTokenAccountsByOwner'] == before + 1
@@ -0,0 +1,110 @@
+"""
+State layer: version counters, instrumented locks, snapshots and saves
+"""
+
+import os
+import sys
+import threading
+import time
+
+import state
+from codec import load_file
+from state import (
+    StateLock, bot_state, flush_bot_state, mark_changed, set_state_file,
+    snapshot_state, state_lock, state_version
+)
+
+def test_concurrent_mark_changed_loses_no_bumps():
+    # Switch threads as often as possible to provoke lost read-modify-writes
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        before = state_version(['race'])[1]
+        threads = [threading.Thread(target=lambda: [mark_changed('race') for _ in range(5000)])
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(previous)
+
+    assert state_version(['race'])[1] == before + 8 * 5000
+
+def test_state_version_tracks_topics():
+    before = state_version(['tracked', 'buys'])
+
+    mark_changed('tracked')
+    after = state_version(['tracked', 'buys'])
+    assert after[1] == before[1] + 1 and after[2] == before[2]
+
+    # A reload invalidates every view
+    mark_changed('*')
+    assert state_version(['buys'])[0] == after[0] + 1
+
+def test_state_lock_counts_contention():
+    lock = StateLock('test')
+    held = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with lock:
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait()
+    threading.Timer(0.05, release.set).start()
+    with lock:
+        pass
+    thread.join()
+
+    stats = lock.stats()
+    assert stats['acquisitions'] == 2
+    assert stats['contended'] == 1
+    assert stats['wait_ms_max'] >= 40
+
+def test_state_lock_is_reentrant():
+    lock = StateLock('test')
+    with lock:
+        with lock:
+            pass
+    assert lock.stats()['acquisitions'] == 2
+
+def test_state_lock_groups():
+    assert state_lock('tracked_tokens') is state_lock('tracked_tokens')
+    assert state_lock('whale_performance') is state_lock('performance_events')
+    assert state_lock('alerts_sent') is state_lock('some_new_key')
+
+def test_snapshot_is_a_detached_copy():
+    with state_lock('tracked_tokens'):
+        bot_state['tracked_tokens']['SNAP'] = {'status': 'active', 'buyers': ['w1']}
+    try:
+        snapshot = snapshot_state()
+        bot_state['tracked_tokens']['SNAP']['buyers'].append('w2')
+
+        assert snapshot['tracked_tokens']['SNAP'] == {'status': 'active', 'buyers': ['w1']}
+        assert set(snapshot) == set(bot_state)
+    finally:
+        bot_state['tracked_tokens'].pop('SNAP', None)
+
+def test_flush_writes_a_loadable_file(tmp_path):
+    path = str(tmp_path / 'bot_state.json')
+    bot_state['alerts_sent'] += 1
+    set_state_file(path)
+    try:
+        flush_bot_state()
+    finally:
+        set_state_file(None)
+
+    saved = load_file(path)
+    assert saved['alerts_sent'] == bot_state['alerts_sent']
+    assert not os.path.exists(path + '.tmp')
+    assert state.state_metrics()['persistence']['writes'] >= 1
+
+def test_save_is_a_no_op_without_a_state_file():
+    requests_before = state.state_metrics()['persistence']['requests']
+    state.save_bot_state()
+    time.sleep(0.01)
+    assert state.state_metrics()['persistence']['requests'] == requests_before
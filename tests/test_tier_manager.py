@@ -0,0 +1,84 @@
+"""
+Dirty-set tier evaluation: only whales whose performance changed are
+re-evaluated, and moves land in the shared whale store in one batch
+"""
+
+import pytest
+
+import tier_manager
+from features import update_whale_performance
+from state import bot_state
+from tier_manager import drain_dirty_whales, evaluate_whale_tier, update_whale_tiers
+from whale_store import WhaleStore, write_store
+
+STAR = '0x' + 'd1' * 20
+DUD = '0x' + 'd2' * 20
+QUIET = '0x' + 'd3' * 20
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / 'whales.bin')
+    write_store([{'address': a, 'chain': 'base', 'tier': 3, 'check_interval': 600}
+                 for a in (STAR, DUD, QUIET)], path)
+    store = WhaleStore(path)
+    monkeypatch.setattr(tier_manager, 'get_whale_store', lambda: store)
+    yield store
+    store.close()
+
+@pytest.fixture(autouse=True)
+def fresh_performance():
+    """Give the performance index its own data, then hand the session's back"""
+    saved = {key: bot_state.get(key) for key in ('whale_performance', 'performance_events', 'tier_changes')}
+    bot_state.update(whale_performance={}, performance_events=[], tier_changes=[])
+    drain_dirty_whales()
+    yield
+    drain_dirty_whales()
+    bot_state.update(saved)
+
+def calls(whale, gains):
+    for gain in gains:
+        update_whale_performance(whale, gain)
+
+def test_performance_updates_mark_whales_dirty():
+    calls(STAR, [150])
+    assert drain_dirty_whales() == {STAR}
+    assert drain_dirty_whales() == set()
+
+def test_rules_need_enough_calls():
+    calls(STAR, [200] * 4)
+    assert evaluate_whale_tier(STAR) is None
+
+    calls(STAR, [200] * 6)
+    assert evaluate_whale_tier(STAR) == 1
+
+    calls(DUD, [-50] * 5)
+    assert evaluate_whale_tier(DUD) == 4
+
+def test_only_dirty_whales_move(store):
+    calls(STAR, [200] * 10)
+    calls(DUD, [-50] * 5)
+    # QUIET qualifies for Tier 1 too but has not changed since the last evaluation
+    calls(QUIET, [200] * 10)
+    drain_dirty_whales()
+    calls(STAR, [200])
+    calls(DUD, [-50])
+
+    assert update_whale_tiers() == 2
+
+    assert store.tier_of(STAR) == 1 and store.tier_of(DUD) == 4
+    assert store.tier_of(QUIET) == 3
+    assert {(c['whale'], c['old_tier'], c['new_tier']) for c in bot_state['tier_changes']} == \
+        {(STAR, 3, 1), (DUD, 3, 4)}
+    assert update_whale_tiers() == 0
+
+def test_full_evaluation_covers_every_whale_with_data(store):
+    calls(QUIET, [200] * 10)
+    drain_dirty_whales()
+
+    assert update_whale_tiers(full=True) == 1
+    assert store.tier_of(QUIET) == 1
+    assert bot_state['tier_changes'][0]['reason'].startswith('Promoted')
+
+def test_unknown_whales_are_skipped(store):
+    calls('0x' + 'ee' * 20, [200] * 10)
+    assert update_whale_tiers() == 0
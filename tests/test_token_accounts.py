@@ -0,0 +1,107 @@
+"""
+Sliced base64 token accounts: struct decoding, cached mint decimals, and
+wallet reads that match the jsonParsed form
+"""
+
+import base64
+
+import pytest
+
+import features
+from fake_providers import SOLANA_TOKEN_DECIMALS, b58encode, token_account
+from features import get_solana_tokens, parse_solana_tokens
+from token_accounts import (
+    ACCOUNT_SLICE, MintDecimals, account_request, decode_accounts, holdings_from_accounts
+)
+
+WHALE = b58encode(bytes([0x44]) * 32)
+SOL = 'So11111111111111111111111111111111111111112'
+
+def mint(i):
+    return b58encode(bytes([0x70 + i]) * 32)
+
+def sliced(pubkey, mint_address, amount):
+    """A sliced account as the RPC returns it"""
+    raw = token_account(mint_address, WHALE, amount)
+    start = ACCOUNT_SLICE['offset']
+    encoded = base64.b64encode(raw[start:start + ACCOUNT_SLICE['length']]).decode()
+    return {'pubkey': pubkey, 'account': {'data': [encoded, 'base64']}}
+
+def test_account_request_asks_for_the_mint_and_amount_slice():
+    request = account_request(WHALE)
+
+    assert request['params'][0] == WHALE
+    assert request['params'][2] == {'encoding': 'base64', 'dataSlice': {'offset': 0, 'length': 72}}
+
+def test_decode_reads_mint_and_raw_amount():
+    decoded = decode_accounts([sliced('acct1', mint(1), 1_234_567), sliced('acct2', mint(2), 0)])
+
+    assert decoded == [('acct1', mint(1), 1_234_567), ('acct2', mint(2), 0)]
+
+def test_holdings_skip_empty_blacklisted_and_unknown_mints():
+    decoded = [('a1', mint(1), 2_500_000), ('a2', mint(2), 0), ('a3', SOL, 10 ** 9), ('a4', mint(3), 5)]
+    decimals = {mint(1): 6, mint(2): 6, SOL: 9}
+
+    assert holdings_from_accounts(decoded, decimals) == [
+        {'address': mint(1), 'balance': 2.5, 'account': 'a1', 'decimals': 6}
+    ]
+
+# ============================================================
+# Mint Decimals
+# ============================================================
+
+def test_mint_decimals_are_fetched_once(world, providers):
+    mints = [mint(4), mint(5)]
+    for m in mints:
+        world.add_holding(WHALE, 'solana', m, 1_000)
+    cache = MintDecimals()
+    before = providers['helius'].counts.get('getMultipleAccounts', 0)
+
+    assert cache.get_many(mints) == {m: SOLANA_TOKEN_DECIMALS for m in mints}
+    assert cache.get_many(mints + [mint(4)]) == {m: SOLANA_TOKEN_DECIMALS for m in mints}
+
+    assert providers['helius'].counts['getMultipleAccounts'] == before + 1
+    assert cache.lookups == 2 and len(cache) == 2
+
+def test_missing_mint_is_left_out_and_retried(world):
+    cache = MintDecimals()
+    unknown = mint(6)
+
+    assert cache.get_many([unknown]) == {}
+    world.add_holding(WHALE, 'solana', unknown, 1_000)
+    assert cache.get_many([unknown]) == {unknown: SOLANA_TOKEN_DECIMALS}
+
+# ============================================================
+# Wallet Reads
+# ============================================================
+
+def test_sliced_read_matches_json_parsed(world, providers, monkeypatch):
+    world.add_holding(WHALE, 'solana', mint(7), 3_000_000)
+    sliced_tokens = get_solana_tokens(WHALE)
+
+    monkeypatch.setattr(features, 'SOLANA_SLICED_ACCOUNTS', False)
+    parsed_tokens = get_solana_tokens(WHALE)
+
+    key = lambda t: t['address']
+    assert sorted(sliced_tokens, key=key) == sorted(parsed_tokens, key=key)
+    assert {'address': mint(7), 'balance': 3.0, 'account': world.token_account_address(WHALE, mint(7)),
+            'decimals': SOLANA_TOKEN_DECIMALS} in sliced_tokens
+
+def test_recorded_sliced_response_replays_without_rpc():
+    data = {'result': {'value': [sliced('acct', mint(8), 4_000_000)]}, 'mint_decimals': {mint(8): 6}}
+
+    assert parse_solana_tokens(data) == [{'address': mint(8), 'balance': 4.0, 'account': 'acct', 'decimals': 6}]
+
+def test_decoding_failure_falls_back_to_json_parsed(world, providers, monkeypatch):
+    world.add_holding(WHALE, 'solana', mint(9), 1_000_000)
+
+    def broken(accounts):
+        raise ValueError('unexpected account layout')
+
+    monkeypatch.setattr(features, 'decode_accounts', broken)
+    before = providers['helius'].counts.get('getTokenAccountsByOwner', 0)
+
+    tokens = get_solana_tokens(WHALE)
+
+    assert any(t['address'] == mint(9) and t['balance'] == pytest.approx(1.0) for t in tokens)
+    assert providers['helius'].counts['getTokenAccountsByOwner'] == before + 2
@@ -0,0 +1,127 @@
+"""
+Token scheduler: due-time heap, retirement rules and reactivation on a new buy
+"""
+
+import pytest
+
+import clock
+from alert_coalescer import AlertCoalescer, set_alert_coalescer
+from config import TRACKER_MIN_INTERVAL, TRACKING_MAX_AGE_HOURS
+from features import track_token_buy
+from state import bot_state
+from token_scheduler import (
+    TokenScheduler, get_token_scheduler, refresh_interval, retire_token, retirement_reason
+)
+
+START = 1_700_000_000.0
+WHALE = 'SchedWhale111111111111111111111111111111111'
+OTHER_WHALE = 'SchedWhale222222222222222222222222222222222'
+
+@pytest.fixture
+def sim():
+    sim = clock.SimulatedClock(START)
+    clock.set_time_source(sim)
+    yield sim
+    clock.set_time_source(None)
+
+@pytest.fixture
+def token():
+    token = 'SchedToken11111111111111111111111111111111'
+    # Multi-buy alerts go straight to the fake Telegram
+    previous = set_alert_coalescer(AlertCoalescer(window=0, background=False))
+    yield token
+    set_alert_coalescer(previous)
+    bot_state['tracked_tokens'].pop(token, None)
+    for whale in (WHALE, OTHER_WHALE):
+        bot_state['whale_token_balances'].pop(f"{whale}_{token}", None)
+    get_token_scheduler().unschedule(token)
+
+def buy(token, whale=WHALE):
+    track_token_buy(token, whale, 0.001, 1_000_000, 'SCHED', 'solana', 10.0)
+    return bot_state['tracked_tokens'][token]
+
+# ============================================================
+# Due-Time Heap
+# ============================================================
+
+def test_pop_due_returns_only_due_tokens(sim):
+    scheduler = TokenScheduler({})
+    scheduler.schedule('late', START + 30)
+    scheduler.schedule('early', START + 10)
+
+    assert scheduler.pop_due() == []
+    assert scheduler.seconds_until_next_due(60) == 10
+
+    sim.advance_to(START + 20)
+    assert scheduler.pop_due() == ['early']
+    assert len(scheduler) == 1
+
+def test_reschedule_supersedes_the_old_entry(sim):
+    scheduler = TokenScheduler({})
+    scheduler.schedule('t', START + 10)
+    scheduler.schedule('t', START + 100)
+
+    sim.advance_to(START + 50)
+    assert scheduler.pop_due() == []
+
+    sim.advance_to(START + 100)
+    assert scheduler.pop_due() == ['t']
+
+def test_unscheduled_token_never_comes_due(sim):
+    scheduler = TokenScheduler({})
+    scheduler.schedule('t', START + 10)
+    scheduler.unschedule('t')
+
+    sim.advance_to(START + 20)
+    assert scheduler.pop_due() == []
+    assert scheduler.seconds_until_next_due(60) == 60
+
+def test_only_active_tokens_are_loaded(sim):
+    scheduler = TokenScheduler({
+        'a': {'status': 'active', 'last_check_time': START, 'first_alert_time': START},
+        'c': {'status': 'closed', 'last_check_time': START, 'first_alert_time': START},
+    })
+    assert set(scheduler.due) == {'a'}
+
+def test_volatile_tokens_refresh_at_the_minimum(sim):
+    data = {'first_alert_time': START - 30 * 24 * 3600, 'volatility': 25}
+    assert refresh_interval(data) == TRACKER_MIN_INTERVAL
+
+# ============================================================
+# Retirement
+# ============================================================
+
+def test_retirement_reasons(sim):
+    assert retirement_reason({'first_alert_time': START}) is None
+    assert retirement_reason({'first_alert_time': START - TRACKING_MAX_AGE_HOURS * 3600 - 1}) == 'max_age'
+    assert retirement_reason({'first_alert_time': START, 'highest_price': 1.0, 'current_price': 0.05}) == 'drawdown'
+    assert retirement_reason({'first_alert_time': START, 'whales_bought': ['a', 'b'],
+                              'exited_whales': ['b', 'a']}) == 'full_exit'
+    assert retirement_reason({'first_alert_time': START, 'whales_bought': ['a', 'b'],
+                              'exited_whales': ['a']}) is None
+
+def test_rebuy_reactivates_a_retired_token(sim, token):
+    data = buy(token)
+    data.update(current_price=0.00005, highest_price=0.002, exited_whales=[WHALE])
+    retire_token(token, data, 'full_exit')
+    get_token_scheduler().unschedule(token)
+
+    sim.advance_to(START + 3600)
+    buy(token)
+
+    assert data['status'] == 'active'
+    assert 'closed_time' not in data and 'closed_reason' not in data
+    assert data['first_alert_time'] == data['last_check_time'] == START + 3600
+    assert data['exited_whales'] == []
+    # Neither the old drawdown nor the old exit retires it again
+    assert retirement_reason(data) is None
+    assert token in get_token_scheduler().due
+
+def test_buy_into_an_active_token_keeps_its_history(sim, token):
+    data = buy(token)
+
+    sim.advance_to(START + 600)
+    buy(token, OTHER_WHALE)
+
+    assert data['first_alert_time'] == START
+    assert data['whales_bought'] == [WHALE, OTHER_WHALE]
@@ -0,0 +1,92 @@
+"""
+Materialized views and the response cache: reuse until a topic they read changes
+"""
+
+import pytest
+
+import views
+from state import bot_state, mark_changed, state_lock
+from views import MaterializedView, ResponseCache, tracked_ranking
+from whale_store import WhaleStore, write_store
+
+def counting_view(topics):
+    builds = []
+    view = MaterializedView(topics, lambda: builds.append(1) or len(builds))
+    return view, builds
+
+def test_view_rebuilds_only_when_its_topics_change():
+    view, builds = counting_view(['tracked'])
+
+    assert view.get() == 1
+    assert view.get() == 1
+    mark_changed('buys')
+    assert view.get() == 1
+
+    mark_changed('tracked')
+    assert view.get() == 2
+    # A state reload invalidates everything
+    mark_changed('*')
+    assert view.get() == 3
+    assert view.rebuilds == 3
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / 'whales.bin')
+    write_store([{'address': '0x' + 'f1' * 20, 'chain': 'base', 'tier': 2, 'check_interval': 120}], path)
+    store = WhaleStore(path)
+    monkeypatch.setattr(views, 'get_whale_store', lambda: store)
+    yield store
+    store.close()
+
+def test_whale_views_follow_the_store(store):
+    view = MaterializedView(['whales'], views._build_whale_counts)
+    assert view.get()['tiers'] == {2: 1}
+
+    store.set_tier('0x' + 'f1' * 20, 1)
+    assert view.get()['tiers'] == {1: 1}
+
+    # Another process rewriting the file changes the inode
+    other = WhaleStore(store.path)
+    try:
+        other.add({'address': '0x' + 'f2' * 20, 'chain': 'base', 'tier': 3, 'check_interval': 600})
+    finally:
+        other.close()
+    assert view.get()['total'] == 2
+    assert view.rebuilds == 3
+
+def test_tracked_ranking_lists_active_tokens_by_gain():
+    tokens = {'V1': 30, 'V2': 120, 'V3': 500}
+    with state_lock('tracked_tokens'):
+        for token, gain in tokens.items():
+            bot_state['tracked_tokens'][token] = {'status': 'active', 'current_gain': gain}
+        bot_state['tracked_tokens']['V3']['status'] = 'closed'
+    mark_changed('tracked')
+    try:
+        ranked = [addr for addr, _ in tracked_ranking.get() if addr in tokens]
+        assert ranked == ['V2', 'V1']
+    finally:
+        for token in tokens:
+            bot_state['tracked_tokens'].pop(token)
+        mark_changed('tracked')
+
+def test_response_cache_hits_until_invalidated():
+    cache = ResponseCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"reply {len(renders)}"
+
+    assert cache.get('/stats', ['tracked'], render) == 'reply 1'
+    assert cache.get('/stats', ['tracked'], render) == 'reply 1'
+    mark_changed('tracked')
+    assert cache.get('/stats', ['tracked'], render) == 'reply 2'
+    assert cache.report() == {'/stats': {'hits': 1, 'misses': 2}}
+
+def test_error_replies_are_not_cached():
+    cache = ResponseCache()
+    replies = iter(['❌ Price source unavailable', '✅ ok'])
+
+    assert cache.get('/prices', ['tracked'], lambda: next(replies)).startswith('❌')
+    assert cache.get('/prices', ['tracked'], lambda: next(replies)) == '✅ ok'
+    assert cache.report()['/prices']['misses'] == 2
@@ -0,0 +1,112 @@
+"""
+Webhook intake against the fake Telegram: secret check, redelivery,
+leadership and the setWebhook failure fallback
+"""
+
+import socket
+
+import pytest
+
+import webhook
+from fake_providers import post_update
+from state import bot_state
+
+SECRET = 'test-secret'
+
+class RecordingRunner:
+    """Stands in for the command pool; records what would have run"""
+
+    def __init__(self):
+        self.commands = []
+
+    def submit(self, text, user_id, chat_id):
+        self.commands.append((text, user_id, chat_id))
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def telegram(providers):
+    telegram = providers['telegram']
+    telegram.webhook = None
+    telegram.webhook_error = None
+    telegram.pending_updates = []
+    yield telegram
+    telegram.webhook = None
+    telegram.pending_updates = []
+
+@pytest.fixture
+def receiver(telegram):
+    bot_state['last_update_id'] = telegram.update_id
+    port = free_port()
+    receiver = webhook.WebhookReceiver(f"http://127.0.0.1:{port}/telegram", SECRET,
+                                       host='127.0.0.1', port=port, runner=RecordingRunner())
+    assert receiver.start()
+    yield receiver
+    receiver.stop()
+
+def test_start_registers_webhook(receiver, telegram):
+    assert telegram.webhook == {'url': receiver.url, 'secret': SECRET}
+
+def test_delivered_command_is_dispatched(receiver, telegram):
+    update = telegram.push_command('/stats', user_id=7, chat_id=9)
+
+    assert telegram.pending_updates == []
+    assert receiver.runner.commands == [('/stats', 7, 9)]
+    assert receiver.received == 1
+    assert bot_state['last_update_id'] == update['update_id']
+
+def test_wrong_secret_is_rejected(receiver, telegram):
+    update = {'update_id': telegram.update_id + 1,
+              'message': {'text': '/pause', 'from': {'id': 1}, 'chat': {'id': 1}}}
+
+    assert post_update(receiver.url, update, 'wrong-secret') == 403
+    assert post_update(receiver.url, update) == 403
+    assert receiver.rejected == 2
+    assert receiver.runner.commands == []
+
+def test_duplicate_update_is_dropped(receiver, telegram):
+    update = telegram.push_command('/stats')
+
+    # Telegram retries after a timeout: accepted again, but not run twice
+    assert post_update(receiver.url, update, SECRET) == 200
+    assert receiver.runner.commands == [('/stats', 1, 1)]
+
+def test_non_leader_returns_503(receiver, telegram, monkeypatch):
+    monkeypatch.setattr(webhook, 'is_alerting_leader', lambda: False)
+
+    telegram.push_command('/stats')
+
+    assert receiver.runner.commands == []
+    assert len(telegram.pending_updates) == 1
+    assert '503' in telegram.webhook_error['last_error_message']
+    assert not receiver.healthy()
+
+def test_unknown_path_is_404(receiver):
+    assert post_update(receiver.url.replace('/telegram', '/other'), {'update_id': 1}, SECRET) == 404
+
+def test_start_webhook_falls_back_when_set_webhook_fails(telegram, monkeypatch):
+    respond = telegram.respond
+
+    def reject_set_webhook(path, body):
+        if path.endswith('/setWebhook'):
+            return 400, {'ok': False, 'description': 'Bad Request: bad webhook'}
+        return respond(path, body)
+
+    monkeypatch.setattr(telegram, 'respond', reject_set_webhook)
+    monkeypatch.setattr(webhook, 'TELEGRAM_WEBHOOK_URL', f"http://127.0.0.1:{webhook.WEBHOOK_PORT}/telegram")
+
+    assert webhook.start_webhook() is None
+    assert telegram.webhook is None
+
+    # The port is released and getUpdates keeps working for long polling
+    with socket.socket() as sock:
+        sock.bind((webhook.WEBHOOK_HOST, webhook.WEBHOOK_PORT))
+    telegram.push_command('/stats')
+    assert len(telegram.pending_updates) == 1
+
+def test_start_webhook_is_off_without_url(monkeypatch):
+    monkeypatch.setattr(webhook, 'TELEGRAM_WEBHOOK_URL', None)
+    assert webhook.start_webhook() is None
@@ -0,0 +1,69 @@
+"""
+Tier classifier: partial-selection cut points agree with the full sort
+(ties included) on both the numpy and pure Python paths
+"""
+
+import pytest
+
+import whale_classifier
+from config import TIER_CONFIG
+from whale_classifier import TierClassifier, classify_by_sort, cut_sizes, synthetic_whales
+
+@pytest.fixture(params=['numpy', 'python'])
+def path(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(whale_classifier, 'np', None)
+    elif whale_classifier.np is None:
+        pytest.skip('numpy not installed')
+    return request.param
+
+@pytest.mark.parametrize('size', [7, 100, 2500])
+def test_classify_matches_the_sort(path, size):
+    whales = synthetic_whales(size, seed=size)
+    reference = [dict(w) for w in whales]
+    classify_by_sort(reference)
+
+    counts = TierClassifier().classify(whales)
+
+    assert [w['tier'] for w in whales] == [w['tier'] for w in reference]
+    assert sum(counts.values()) == size
+
+def test_ties_on_a_cut_split_like_a_stable_sort(path):
+    # Ten identical scores straddle the Tier 1 cut of a 20-whale list
+    whales = [{'address': f"T{i}", 'win_count': 5, 'win_rate': 50} for i in range(10)]
+    whales += [{'address': f"L{i}", 'win_count': 1, 'win_rate': 1} for i in range(10)]
+    reference = [dict(w) for w in whales]
+    classify_by_sort(reference)
+
+    TierClassifier().classify(whales)
+
+    assert [w['tier'] for w in whales] == [w['tier'] for w in reference]
+    assert [w['tier'] for w in whales[:10]] == [1, 1, 2, 2, 2, 2, 3, 3, 3, 3]
+
+def test_classify_sets_interval_and_priority():
+    whale = {'address': 'W', 'win_count': 40, 'win_rate': 100}
+    TierClassifier().classify([whale] + synthetic_whales(50))
+
+    assert whale['tier'] == 1
+    assert whale['check_interval'] == TIER_CONFIG[1]['interval']
+    assert whale['priority'] == 'high'
+
+def test_insert_places_against_cached_cuts():
+    classifier = TierClassifier().fit(synthetic_whales(1000))
+
+    assert classifier.insert({'address': 'top', 'win_count': 40, 'win_rate': 100}) == 1
+    assert classifier.insert({'address': 'idle', 'win_count': 0, 'win_rate': 0}) == 4
+    assert classifier.counts[1] == 1 and classifier.counts[4] == 1
+
+def test_refit_is_due_after_enough_inserts():
+    classifier = TierClassifier().fit(synthetic_whales(1000))
+    for i in range(50):
+        classifier.insert({'address': f"N{i}", 'win_count': 1})
+    assert not classifier.stale
+
+    classifier.insert({'address': 'one-more', 'win_count': 1})
+    assert classifier.stale
+
+def test_cut_sizes_are_cumulative():
+    assert cut_sizes(100) == [10, 30, 80]
+    assert cut_sizes(5) == [0, 1, 3]
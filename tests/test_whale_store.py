@@ -0,0 +1,92 @@
+"""
+Binary whale store: round trips, in-place tier writes seen through other
+mappings, rewrites picked up on refresh, and the JSON-newer rebuild
+"""
+
+import os
+import time
+
+import pytest
+
+from config import TIER_CONFIG
+from codec import dump_file
+from whale_store import WhaleStore, export_json, import_json, json_is_newer, write_store
+
+WHALES = [
+    {'address': '0x' + 'a1' * 20, 'chain': 'base', 'tier': 1, 'check_interval': 30, 'label': 'fund', 'win_rate': 0.7},
+    {'address': 'So1anaWhaLe' + '1' * 32, 'chain': 'solana', 'tier': 2, 'check_interval': 120},
+    {'address': 'bc1q' + 'x' * 38, 'chain': 'bitcoin', 'tier': 3, 'check_interval': 600, 'note': 'ünïcode'},
+]
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'whales.bin')
+    write_store(WHALES, path)
+    return path
+
+@pytest.fixture
+def store(path):
+    store = WhaleStore(path)
+    yield store
+    store.close()
+
+def test_round_trip_keeps_hot_and_cold_fields(store):
+    assert len(store) == 3
+    assert sorted(store.export_records(), key=lambda w: w['address']) == \
+        sorted(WHALES, key=lambda w: w['address'])
+    # Chains outside the fixed set keep their name in the heap
+    assert store.get(WHALES[2]['address'])['chain'] == 'bitcoin'
+    assert store.get(WHALES[0]['address'], cold=False) == {
+        'address': WHALES[0]['address'], 'chain': 'base', 'tier': 1, 'check_interval': 30}
+
+def test_filters_by_tier_and_chain(store):
+    assert [w['address'] for w in store.whales(tier=2)] == [WHALES[1]['address']]
+    assert [w['address'] for w in store.whales(chain='bitcoin')] == [WHALES[2]['address']]
+    assert store.tier_counts() == {1: 1, 2: 1, 3: 1}
+
+def test_tier_writes_are_seen_by_other_mappings(store, path):
+    other = WhaleStore(path)
+    try:
+        generation = other.generation
+        assert store.set_tiers({WHALES[1]['address']: 1, 'unknown': 1}) == 1
+
+        assert other.tier_of(WHALES[1]['address']) == 1
+        assert other.get(WHALES[1]['address'])['check_interval'] == TIER_CONFIG[1]['interval']
+        assert other.generation == generation + 1
+    finally:
+        other.close()
+
+def test_add_and_remove_reach_other_processes_on_refresh(store, path):
+    other = WhaleStore(path)
+    try:
+        new = {'address': '0x' + 'b2' * 20, 'chain': 'base', 'tier': 3, 'check_interval': 600}
+        assert store.add(new) and not store.add(new)
+        assert store.remove(WHALES[0]['address']) and not store.remove(WHALES[0]['address'])
+
+        assert other.refresh()
+        assert new['address'] in other and WHALES[0]['address'] not in other
+        assert other.generation == store.generation == 2
+        assert not other.refresh()
+    finally:
+        other.close()
+
+def test_json_import_export_and_newer_check(tmp_path):
+    json_path = str(tmp_path / 'whales.json')
+    store_path = str(tmp_path / 'whales.bin')
+    dump_file(WHALES, json_path)
+
+    assert import_json(json_path, store_path) == 3
+    assert not json_is_newer(json_path, store_path)
+
+    later = time.time() + 10
+    os.utime(json_path, (later, later))
+    assert json_is_newer(json_path, store_path)
+
+    assert export_json(store_path, json_path) == 3
+    assert not json_is_newer(json_path, str(tmp_path / 'missing.bin'))
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not-a-store.bin'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        WhaleStore(str(path))
@@ -3,88 +3,126 @@ Automatic tier promotion/demotion system
 Whales move between tiers based on performance
 """
 
-import json
-import time
+import threading
 from datetime import datetime
-from state import bot_state, save_bot_state
-from config import WHALE_LIST_FILE
+import clock
+from state import bot_state, save_bot_state, state_lock
+from config import TIER_RULES, TIER_FALLBACK, TIER_MIN_CALLS
+from whale_store import get_whale_store
+from performance_index import get_performance_index
 
-def evaluate_whale_tier(whale_address):
+# Whales whose performance changed since the last evaluation
+_dirty_whales = set()
+_dirty_lock = threading.Lock()
+
+def mark_whale_dirty(whale_address):
+    """Queue a whale for the next tier evaluation"""
+    with _dirty_lock:
+        _dirty_whales.add(whale_address)
+
+def drain_dirty_whales():
+    global _dirty_whales
+    with _dirty_lock:
+        dirty, _dirty_whales = _dirty_whales, set()
+    return dirty
+
+def evaluate_whale_tier(whale_address, rules=None):
     """Evaluate if whale should be promoted or demoted"""
     
-    perf = bot_state.get('whale_performance', {})
-    
-    if whale_address not in perf:
-        return None
-    
-    stats = perf[whale_address]
+    stats = get_performance_index().stats(whale_address)
     
-    if stats['tokens_tracked'] < 5:
+    if stats is None or stats['calls'] < TIER_MIN_CALLS:
         return None
     
-    success_rate = (stats['successful_calls'] / stats['tokens_tracked']) * 100
-    avg_gain = stats['total_gain'] / stats['tokens_tracked']
+    for rule in (rules or TIER_RULES):
+        if (stats['success_rate'] >= rule['min_success_rate']
+                and stats['avg_gain'] >= rule['min_avg_gain']
+                and stats['calls'] >= rule['min_calls']):
+            return rule['tier']
     
-    if success_rate >= 60 and avg_gain >= 50 and stats['tokens_tracked'] >= 10:
-        return 1
-    elif success_rate >= 50 and avg_gain >= 30 and stats['tokens_tracked'] >= 5:
-        return 2
-    elif success_rate >= 40 and avg_gain >= 10:
-        return 3
-    else:
-        return 4
+    return TIER_FALLBACK
 
-def update_whale_tiers():
-    """Check all whales and update tiers based on performance"""
+def tier_change_record(whale_address, current_tier, recommended_tier):
+    print(f"  {'⬆️' if recommended_tier < current_tier else '⬇️'} Whale {whale_address[:8]}... moved: Tier {current_tier} → {recommended_tier}")
     
-    with open(WHALE_LIST_FILE, 'r') as f:
-        whales = json.load(f)
+    return {
+        'whale': whale_address,
+        'old_tier': current_tier,
+        'new_tier': recommended_tier,
+        'timestamp': datetime.fromtimestamp(clock.now()).strftime("%Y-%m-%d %H:%M"),
+        'reason': get_tier_change_reason(whale_address, current_tier, recommended_tier)
+    }
+
+def apply_tier_updates(whales, rules=None):
+    """Re-evaluate a whale list in place and return the tier change records"""
     
-    changes = 0
-    tier_changes = bot_state.get('tier_changes', [])
+    change_records = []
     
     for whale in whales:
         address = whale['address']
         current_tier = whale.get('tier', 3)
         
-        recommended_tier = evaluate_whale_tier(address)
+        recommended_tier = evaluate_whale_tier(address, rules)
         
         if recommended_tier and recommended_tier != current_tier:
             whale['tier'] = recommended_tier
-            
-            change_record = {
-                'whale': address,
-                'old_tier': current_tier,
-                'new_tier': recommended_tier,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'reason': get_tier_change_reason(address, current_tier, recommended_tier)
-            }
-            
-            tier_changes.append(change_record)
-            changes += 1
-            
-            print(f"  {'⬆️' if recommended_tier < current_tier else '⬇️'} Whale {address[:8]}... moved: Tier {current_tier} → {recommended_tier}")
+            change_records.append(tier_change_record(address, current_tier, recommended_tier))
+    
+    return change_records
+
+def update_whale_tiers(full=False):
+    """
+    Re-evaluate whales whose performance changed and move them in place
+    
+    Only the dirty set is evaluated (full=True covers every whale with
+    performance data, e.g. after a restart or leadership change). Moves are
+    written to the whale store in one batch and pushed to shard workers.
+    """
+    
+    dirty = drain_dirty_whales()
+    if full:
+        dirty |= set(bot_state.get('whale_performance', {}))
+    
+    if not dirty:
+        return 0
+    
+    store = get_whale_store()
+    updates = {}
+    change_records = []
+    
+    for address in dirty:
+        current_tier = store.tier_of(address)
+        if current_tier is None:
+            continue
+        
+        recommended_tier = evaluate_whale_tier(address)
+        
+        if recommended_tier and recommended_tier != current_tier:
+            updates[address] = recommended_tier
+            change_records.append(tier_change_record(address, current_tier, recommended_tier))
+    
+    changes = len(change_records)
     
     if changes > 0:
-        with open(WHALE_LIST_FILE, 'w') as f:
-            json.dump(whales, f, indent=2)
+        # Single-byte writes in the mapped store instead of rewriting the list
+        # (shard workers and cluster nodes pick them up from the store)
+        store.set_tiers(updates)
         
-        bot_state['tier_changes'] = tier_changes[-100:]
+        with state_lock('tier_changes'):
+            tier_changes = bot_state.get('tier_changes', []) + change_records
+            bot_state['tier_changes'] = tier_changes[-100:]
         save_bot_state()
         
-        print(f"✅ Updated {changes} whale tiers")
+        print(f"✅ Updated {changes} whale tiers ({len(dirty)} evaluated)")
     
     return changes
 
 def get_tier_change_reason(whale_address, old_tier, new_tier):
     """Generate reason for tier change"""
     
-    perf = bot_state.get('whale_performance', {}).get(whale_address, {})
-    
-    success_rate = (perf['successful_calls'] / perf['tokens_tracked'] * 100) if perf.get('tokens_tracked', 0) > 0 else 0
-    avg_gain = perf['total_gain'] / perf['tokens_tracked'] if perf.get('tokens_tracked', 0) > 0 else 0
+    stats = get_performance_index().stats(whale_address) or {'success_rate': 0, 'avg_gain': 0}
     
     if new_tier < old_tier:
-        return f"Promoted: {success_rate:.0f}% SR, {avg_gain:+.0f}% avg"
+        return f"Promoted: {stats['success_rate']:.0f}% SR, {stats['avg_gain']:+.0f}% avg"
     else:
-        return f"Demoted: {success_rate:.0f}% SR, {avg_gain:+.0f}% avg"
+        return f"Demoted: {stats['success_rate']:.0f}% SR, {stats['avg_gain']:+.0f}% avg"
@@ -0,0 +1,160 @@
+"""
+SPL token account decoding
+Wallet holdings are fetched as base64 with a dataSlice covering just the
+mint and amount, decoded with struct, and scaled by decimals from a
+cached mint table instead of jsonParsed's nested objects
+"""
+
+import base64
+import json
+import struct
+import sys
+import threading
+import time
+
+from config import BLACKLIST_TOKENS
+from rpc import b58encode, get_multiple_accounts
+
+TOKEN_PROGRAM_ID = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+
+# mint (32) | owner (32) | amount (u64 LE): the slice we request
+ACCOUNT_SLICE = {'offset': 0, 'length': 72}
+ACCOUNT_LAYOUT = struct.Struct('<32s32xQ')
+
+# Mint accounts keep decimals at byte 44
+MINT_DECIMALS_OFFSET = 44
+
+# base58 is the slow part of decoding; the same mints recur across wallets
+MINT_NAME_CACHE_SIZE = 200_000
+
+# ============================================================
+# Mint Decimals
+# ============================================================
+
+class MintDecimals:
+    """Decimals per mint; mints are immutable, so each is looked up once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.known = {}
+        self.lookups = 0
+
+    def get_many(self, mints):
+        """{mint: decimals}, fetching unknown mints in batched 1-byte reads (raises RpcError)"""
+        with self.lock:
+            missing = [mint for mint in dict.fromkeys(mints) if mint not in self.known]
+
+        if missing:
+            accounts = get_multiple_accounts(missing, offset=MINT_DECIMALS_OFFSET, length=1)
+            with self.lock:
+                self.lookups += len(missing)
+                for mint, raw in zip(missing, accounts):
+                    if raw:
+                        self.known[mint] = raw[0]
+
+        with self.lock:
+            return {mint: self.known[mint] for mint in mints if mint in self.known}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.known)
+
+_mint_decimals = MintDecimals()
+
+def get_mint_decimals():
+    return _mint_decimals
+
+# ============================================================
+# Decoding
+# ============================================================
+
+def account_request(wallet_address):
+    """getTokenAccountsByOwner payload for the sliced base64 form"""
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getTokenAccountsByOwner",
+        "params": [
+            wallet_address,
+            {"programId": TOKEN_PROGRAM_ID},
+            {"encoding": "base64", "dataSlice": ACCOUNT_SLICE}
+        ]
+    }
+
+_mint_names = {}
+
+def mint_name(raw):
+    name = _mint_names.get(raw)
+    if name is None:
+        if len(_mint_names) >= MINT_NAME_CACHE_SIZE:
+            _mint_names.clear()
+        name = _mint_names[raw] = b58encode(raw)
+    return name
+
+def decode_accounts(accounts):
+    """[(pubkey, mint, raw amount)] from sliced base64 accounts"""
+    decoded = []
+    for account in accounts:
+        mint, amount = ACCOUNT_LAYOUT.unpack(base64.b64decode(account['account']['data'][0]))
+        decoded.append((account['pubkey'], mint_name(mint), amount))
+    return decoded
+
+def holdings_from_accounts(decoded, decimals):
+    """Non-zero, non-blacklisted holdings in the shape parse_solana_tokens returns"""
+    tokens = []
+    for pubkey, mint, amount in decoded:
+        if amount == 0 or mint in BLACKLIST_TOKENS or mint not in decimals:
+            continue
+        tokens.append({
+            'address': mint,
+            'balance': amount / 10 ** decimals[mint],
+            'account': pubkey,
+            'decimals': decimals[mint]
+        })
+    return tokens
+
+# ============================================================
+# Benchmark (payload size and parse time vs jsonParsed)
+# ============================================================
+
+def run_benchmark(sizes, wallets=50):
+    from fake_providers import FakeWorld, FakeHelius
+    from features import parse_solana_tokens
+
+    print("🪙 Wallet decoding: jsonParsed vs base64 + dataSlice")
+    for size in sizes:
+        helius = FakeHelius(FakeWorld(tokens_per_wallet=size))
+        owners = [b58encode(bytes([i + 1]) * 32) for i in range(wallets)]
+
+        parsed_bodies = []
+        sliced_bodies = []
+        for owner in owners:
+            request = account_request(owner)
+            sliced_bodies.append(json.dumps(helius.respond('/', request)[1]).encode())
+            request['params'][2] = {'encoding': 'jsonParsed'}
+            parsed_bodies.append(json.dumps(helius.respond('/', request)[1]).encode())
+
+        # Decimals and mint names are cached after the first sight of a mint, as in the running bot
+        decimals = {}
+        for body in sliced_bodies:
+            for _, mint, _ in decode_accounts(json.loads(body)['result']['value']):
+                decimals[mint] = 6
+
+        started = time.perf_counter()
+        for body in parsed_bodies:
+            parse_solana_tokens(json.loads(body))
+        parsed_us = (time.perf_counter() - started) * 1e6 / wallets
+
+        started = time.perf_counter()
+        for body in sliced_bodies:
+            holdings_from_accounts(decode_accounts(json.loads(body)['result']['value']), decimals)
+        sliced_us = (time.perf_counter() - started) * 1e6 / wallets
+
+        parsed_kb = sum(map(len, parsed_bodies)) / wallets / 1024
+        sliced_kb = sum(map(len, sliced_bodies)) / wallets / 1024
+        print(f"  {size:>4} accounts | payload: {parsed_kb:7.1f}KB -> {sliced_kb:6.1f}KB "
+              f"({parsed_kb / sliced_kb:.1f}x) | parse: {parsed_us:7.0f}µs -> {sliced_us:6.0f}µs "
+              f"({parsed_us / sliced_us:.1f}x)")
+
+if __name__ == '__main__':
+    run_benchmark([int(arg) for arg in sys.argv[1:]] or [10, 50, 200])
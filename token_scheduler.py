@@ -0,0 +1,155 @@
+"""
+Due-time scheduling and lifecycle expiry for tracked tokens
+The performance tracker only touches tokens whose refresh is due
+"""
+
+import heapq
+import threading
+
+import clock
+from config import (
+    PRICE_MILESTONES,
+    TRACKER_CADENCE,
+    TRACKER_MIN_INTERVAL,
+    TRACKER_MAX_INTERVAL,
+    TRACKING_MAX_AGE_HOURS,
+    TRACKING_MAX_DRAWDOWN
+)
+from state import bot_state, mark_changed, state_lock
+
+# ============================================================
+# Cadence and Retirement Rules
+# ============================================================
+
+def refresh_interval(data, now=None):
+    """Seconds until the next price check, decaying with age and tightening with volatility"""
+    now = clock.now() if now is None else now
+    age = now - data.get('first_alert_time', now)
+
+    interval = TRACKER_MAX_INTERVAL
+    for max_age, seconds in TRACKER_CADENCE:
+        if age < max_age:
+            interval = seconds
+            break
+
+    volatility = data.get('volatility', 0)
+    if volatility >= 20:
+        interval = TRACKER_MIN_INTERVAL
+    elif volatility >= 5:
+        interval /= 2
+
+    # Check more often when the next milestone is close
+    gain = data.get('current_gain', 0)
+    pending = [m for m in PRICE_MILESTONES if not data.get('alerts_sent', {}).get(str(m))]
+    if pending and min(pending) - gain <= 10:
+        interval /= 2
+
+    return max(TRACKER_MIN_INTERVAL, interval)
+
+def retirement_reason(data, now=None):
+    """Why a tracked token should stop being refreshed (None keeps it active)"""
+    now = clock.now() if now is None else now
+
+    if now - data.get('first_alert_time', now) > TRACKING_MAX_AGE_HOURS * 3600:
+        return 'max_age'
+
+    highest = data.get('highest_price') or 0
+    current = data.get('current_price') or 0
+    if highest > 0 and (highest - current) / highest * 100 >= TRACKING_MAX_DRAWDOWN:
+        return 'drawdown'
+
+    whales = set(data.get('whales_bought', []))
+    if whales and whales <= set(data.get('exited_whales', [])):
+        return 'full_exit'
+
+    return None
+
+def retire_token(token_address, data, reason):
+    """Move a token out of the active set"""
+    with state_lock('tracked_tokens'):
+        data['status'] = 'closed'
+        data['closed_reason'] = reason
+        data['closed_time'] = clock.now()
+    mark_changed('tracked')
+    print(f"  🏁 Retired {data.get('symbol', token_address[:8])} ({reason}, max gain {data.get('max_gain', 0):+.1f}%)")
+
+def reactivate_token(token_address, data):
+    """Bring a retired token back when a whale buys into it again"""
+    with state_lock('tracked_tokens'):
+        reason = data.pop('closed_reason', None)
+        data.pop('closed_time', None)
+        data['status'] = 'active'
+        # Age and drawdown restart from the new buy so it is not retired again at once
+        data['first_alert_time'] = data['last_check_time'] = clock.now()
+        data['highest_price'] = data.get('current_price') or data.get('highest_price')
+    mark_changed('tracked')
+    print(f"  🔁 Reactivated {data.get('symbol', token_address[:8])} (was {reason or 'closed'})")
+
+# ============================================================
+# Due-Time Heap
+# ============================================================
+
+class TokenScheduler:
+    """Min-heap of (due_time, token) with lazy deletion of superseded entries"""
+
+    def __init__(self, tracked):
+        self.tracked = tracked
+        self.lock = threading.Lock()
+        self.heap = []
+        self.due = {}
+        now = clock.now()
+        for token_address, data in tracked.items():
+            if data.get('status') == 'active':
+                self.schedule(token_address, data.get('last_check_time', now) + refresh_interval(data, now))
+
+    def schedule(self, token_address, due_time):
+        with self.lock:
+            self.due[token_address] = due_time
+            heapq.heappush(self.heap, (due_time, token_address))
+
+    def reschedule(self, token_address, data):
+        self.schedule(token_address, clock.now() + refresh_interval(data))
+
+    def unschedule(self, token_address):
+        with self.lock:
+            self.due.pop(token_address, None)
+
+    def pop_due(self, now=None):
+        """Remove and return every token whose refresh is due"""
+        now = clock.now() if now is None else now
+        ready = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                due_time, token_address = heapq.heappop(self.heap)
+                if self.due.get(token_address) != due_time:
+                    continue
+                del self.due[token_address]
+                ready.append(token_address)
+        return ready
+
+    def seconds_until_next_due(self, max_wait):
+        with self.lock:
+            while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+                heapq.heappop(self.heap)
+            if not self.heap:
+                return max_wait
+            return min(max_wait, max(0, self.heap[0][0] - clock.now()))
+
+    def __len__(self):
+        return len(self.due)
+
+# ============================================================
+# Shared Instance
+# ============================================================
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_token_scheduler():
+    """Scheduler bound to the current bot_state['tracked_tokens'] (rebuilt after a state reload)"""
+    global _scheduler
+    with _scheduler_lock:
+        tracked = bot_state.setdefault('tracked_tokens', {})
+        if _scheduler is None or _scheduler.tracked is not tracked:
+            _scheduler = TokenScheduler(tracked)
+        return _scheduler
@@ -4,16 +4,34 @@ Contains helper functions for API calls, filtering, and messaging
 """
 
 import requests
-import time
 from config import (
     TELEGRAM_BOT_TOKEN, 
     TELEGRAM_CHAT_ID, 
     TELEGRAM_GROUP_ID,
     BLACKLIST_TOKENS,
-    HELIUS_API_KEY,
-    ALCHEMY_API_KEY
+    HELIUS_RPC_URL,
+    ALCHEMY_RPC_URL,
+    DEXSCREENER_API_URL,
+    TELEGRAM_API_URL
 )
+from codec import response_json
 from state import bot_state, save_bot_state
+from recorder import record_response
+import clock
+
+# Optional overrides used by the replay engine (None = live providers)
+_alert_sink = None
+_token_info_source = None
+
+def set_alert_sink(sink):
+    """Route alerts to sink(message, chat_id) instead of Telegram"""
+    global _alert_sink
+    _alert_sink = sink
+
+def set_token_info_source(source):
+    """Serve raw DexScreener responses from source(token_address) instead of HTTP"""
+    global _token_info_source
+    _token_info_source = source
 
 # ============================================================
 # Telegram Functions
@@ -21,11 +39,15 @@ from state import bot_state, save_bot_state
 
 def send_telegram_message(message, chat_id=None):
     """Send message to Telegram"""
+    if _alert_sink is not None:
+        _alert_sink(message, chat_id)
+        return True
+    
     if not TELEGRAM_BOT_TOKEN:
         return False
     
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         
         # If chat_id provided, send to that chat
         if chat_id:
@@ -91,53 +113,67 @@ def send_telegram_alert(message):
 def get_token_info(token_address, chain):
     """Get token info from DexScreener"""
     try:
-        url = f"https://api.dexscreener.com/latest/dex/tokens/{token_address}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        if _token_info_source is not None:
+            data = _token_info_source(token_address)
+        else:
+            url = f"{DEXSCREENER_API_URL}/latest/dex/tokens/{token_address}"
+            response = requests.get(url, timeout=10)
+            data = response_json(response)
+            record_response('dexscreener', chain, token_address, data)
         
-        if data.get('pairs'):
-            # Sort by liquidity and get best pair
-            pairs = sorted(
-                data['pairs'], 
-                key=lambda x: x.get('liquidity', {}).get('usd', 0), 
-                reverse=True
-            )
-            pair = pairs[0]
-            
-            fdv = pair.get('fdv', 0)
-            market_cap = pair.get('marketCap', fdv)
-            price = float(pair.get('priceUsd', 0))
-            liquidity = pair.get('liquidity', {}).get('usd', 0)
-            volume_24h = pair.get('volume', {}).get('h24', 0)
-            price_change_5m = pair.get('priceChange', {}).get('m5', 0)
-            price_change_1h = pair.get('priceChange', {}).get('h1', 0)
-            
-            txns = pair.get('txns', {}).get('h24', {})
-            buys = txns.get('buys', 0)
-            sells = txns.get('sells', 0)
-            
-            pair_created_at = pair.get('pairCreatedAt', 0)
-            
-            return {
-                'name': pair.get('baseToken', {}).get('name', 'Unknown'),
-                'symbol': pair.get('baseToken', {}).get('symbol', 'UNK'),
-                'price': price,
-                'market_cap': market_cap,
-                'liquidity': liquidity,
-                'volume_24h': volume_24h,
-                'dex': pair.get('dexId', 'Unknown'),
-                'url': pair.get('url', ''),
-                'price_change_5m': price_change_5m,
-                'price_change_1h': price_change_1h,
-                'chain_id': pair.get('chainId', chain),
-                'txns_24h': {'buys': buys, 'sells': sells},
-                'pair_created_at': pair_created_at
-            }
+        return parse_token_info(data, chain)
     except Exception as e:
         pass
     
     return None
 
+def parse_token_info(data, chain):
+    """Extract the best pair's stats from a DexScreener tokens response"""
+    if not data or not data.get('pairs'):
+        return None
+    
+    # Sort by liquidity and get best pair
+    pairs = sorted(
+        data['pairs'], 
+        key=lambda x: x.get('liquidity', {}).get('usd', 0), 
+        reverse=True
+    )
+    pair = pairs[0]
+    
+    fdv = pair.get('fdv', 0)
+    market_cap = pair.get('marketCap', fdv)
+    price = float(pair.get('priceUsd', 0))
+    liquidity = pair.get('liquidity', {}).get('usd', 0)
+    volume_24h = pair.get('volume', {}).get('h24', 0)
+    price_change_5m = pair.get('priceChange', {}).get('m5', 0)
+    price_change_1h = pair.get('priceChange', {}).get('h1', 0)
+    
+    txns = pair.get('txns', {}).get('h24', {})
+    buys = txns.get('buys', 0)
+    sells = txns.get('sells', 0)
+    
+    pair_created_at = pair.get('pairCreatedAt', 0)
+    
+    return {
+        'name': pair.get('baseToken', {}).get('name', 'Unknown'),
+        'symbol': pair.get('baseToken', {}).get('symbol', 'UNK'),
+        'price': price,
+        'market_cap': market_cap,
+        'liquidity': liquidity,
+        'volume_24h': volume_24h,
+        'dex': pair.get('dexId', 'Unknown'),
+        'url': pair.get('url', ''),
+        'price_change_5m': price_change_5m,
+        'price_change_1h': price_change_1h,
+        'chain_id': pair.get('chainId', chain),
+        'txns_24h': {'buys': buys, 'sells': sells},
+        'pair_created_at': pair_created_at,
+        # Pool discovery for the on-chain price oracle
+        'pair_address': pair.get('pairAddress'),
+        'pair_labels': pair.get('labels', []),
+        'quote_address': pair.get('quoteToken', {}).get('address')
+    }
+
 # ============================================================
 # Filter Functions
 # ============================================================
@@ -201,7 +237,7 @@ def passes_filters(token_info):
     # Token age check
     pair_created = token_info.get('pair_created_at', 0)
     if pair_created > 0:
-        age_hours = (time.time() - pair_created / 1000) / 3600
+        age_hours = (clock.now() - pair_created / 1000) / 3600
         if age_hours < filters['min_age_hours']:
             return False, f"Too new ({age_hours:.1f}h old)"
     
@@ -213,7 +249,7 @@ def passes_filters(token_info):
 
 def get_solana_tokens(wallet_address):
     """Get all tokens held by a Solana wallet"""
-    url = f"https://mainnet.helius-rpc.com/?api-key={HELIUS_API_KEY}"
+    url = HELIUS_RPC_URL
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
@@ -227,7 +263,7 @@ def get_solana_tokens(wallet_address):
     
     try:
         response = requests.post(url, json=payload, timeout=10)
-        data = response.json()
+        data = response_json(response)
         
         tokens = []
         if 'result' in data and 'value' in data['result']:
@@ -245,7 +281,7 @@ def get_solana_tokens(wallet_address):
 
 def get_base_tokens(wallet_address):
     """Get all tokens held by a Base wallet"""
-    url = f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
+    url = ALCHEMY_RPC_URL
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
@@ -256,7 +292,7 @@ def get_base_tokens(wallet_address):
     
     try:
         response = requests.post(url, json=payload, headers=headers, timeout=10)
-        data = response.json()
+        data = response_json(response)
         
         tokens = []
         if 'result' in data and 'tokenBalances' in data['result']:
@@ -0,0 +1,107 @@
+"""
+Materialized views and response cache for read-only commands
+Views are rebuilt only when the state topics (or whale store) they read
+have changed; rendered command responses are cached the same way
+"""
+
+import threading
+
+from state import bot_state, state_version, state_lock
+from whale_store import get_whale_store
+
+# ============================================================
+# Versions
+# ============================================================
+
+def current_version(topics):
+    """Version tuple for topics; 'whales' follows the whale store file and generation"""
+    version = state_version([t for t in topics if t != 'whales'])
+    if 'whales' in topics:
+        store = get_whale_store()
+        store.refresh()
+        version += (store.inode, store.generation)
+    return version
+
+class MaterializedView:
+    """Value computed by build() and reused until its topics change"""
+
+    def __init__(self, topics, build):
+        self.topics = tuple(topics)
+        self.build = build
+        self.lock = threading.Lock()
+        self.version = None
+        self.value = None
+        self.rebuilds = 0
+
+    def get(self):
+        version = current_version(self.topics)
+        with self.lock:
+            if version != self.version:
+                self.value = self.build()
+                self.version = version
+                self.rebuilds += 1
+            return self.value
+
+# ============================================================
+# Views
+# ============================================================
+
+def _build_whale_counts():
+    counts = {'total': 0, 'chains': {}, 'tiers': {}, 'tier_chains': {}}
+    for whale in get_whale_store().whales():
+        tier, chain = whale['tier'], whale['chain']
+        counts['total'] += 1
+        counts['chains'][chain] = counts['chains'].get(chain, 0) + 1
+        counts['tiers'][tier] = counts['tiers'].get(tier, 0) + 1
+        counts['tier_chains'][(tier, chain)] = counts['tier_chains'].get((tier, chain), 0) + 1
+    return counts
+
+def _build_tracked_ranking():
+    with state_lock('tracked_tokens'):
+        active = [
+            (addr, data) for addr, data in bot_state.get('tracked_tokens', {}).items()
+            if data.get('status') == 'active'
+        ]
+    active.sort(key=lambda x: x[1].get('current_gain', 0), reverse=True)
+    return active
+
+# Whale totals by chain, tier and (tier, chain)
+whale_counts = MaterializedView(['whales'], _build_whale_counts)
+
+# Active tracked tokens, top gainers first
+tracked_ranking = MaterializedView(['tracked'], _build_tracked_ranking)
+
+# ============================================================
+# Response Cache
+# ============================================================
+
+class ResponseCache:
+    """Rendered responses per command, valid while their topics are unchanged"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {}
+
+    def get(self, key, topics, render):
+        version = current_version(topics)
+        with self.lock:
+            stats = self.stats.setdefault(key, {'hits': 0, 'misses': 0})
+            entry = self.entries.get(key)
+            if entry and entry[0] == version:
+                stats['hits'] += 1
+                return entry[1]
+            stats['misses'] += 1
+
+        response = render()
+        # Error replies are not worth keeping
+        if not response.startswith('❌'):
+            with self.lock:
+                self.entries[key] = (version, response)
+        return response
+
+    def report(self):
+        with self.lock:
+            return {key: dict(stats) for key, stats in self.stats.items()}
+
+response_cache = ResponseCache()
@@ -0,0 +1,185 @@
+"""
+Telegram webhook intake
+A local HTTP(S) receiver that Telegram posts updates to, verified with the
+secret token header and fed into the same command path as long polling.
+The command listener falls back to getUpdates when it cannot be used.
+"""
+
+import hmac
+import json
+import secrets
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+
+from config import (
+    TELEGRAM_API_URL,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_WEBHOOK_URL,
+    TELEGRAM_WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_CERT_FILE,
+    WEBHOOK_KEY_FILE
+)
+from state import save_bot_state
+from cluster import is_alerting_leader
+from command_runner import get_command_runner, dispatch_update
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+# ============================================================
+# HTTP Handler
+# ============================================================
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Accepts POSTed updates on the receiver's path"""
+
+    receiver = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        receiver = self.receiver
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if urlparse(self.path).path != receiver.path:
+            self._reply(404)
+            return
+
+        if not hmac.compare_digest(self.headers.get(SECRET_HEADER, ''), receiver.secret):
+            receiver.rejected += 1
+            self._reply(403)
+            return
+
+        # A node that lost leadership lets Telegram retry against the new leader
+        if not is_alerting_leader():
+            self._reply(503)
+            return
+
+        try:
+            update = json.loads(raw)
+        except ValueError:
+            self._reply(400)
+            return
+
+        receiver.received += 1
+        receiver.last_update_at = time.time()
+        if dispatch_update(update, receiver.runner):
+            save_bot_state()
+        self._reply(200)
+
+    def do_GET(self):
+        self._reply(405)
+
+# ============================================================
+# Receiver
+# ============================================================
+
+class WebhookReceiver:
+    """Local server plus the setWebhook registration that points Telegram at it"""
+
+    def __init__(self, url, secret=None, host=WEBHOOK_HOST, port=WEBHOOK_PORT,
+                 cert_file=WEBHOOK_CERT_FILE, key_file=WEBHOOK_KEY_FILE, runner=None):
+        self.url = url
+        self.path = urlparse(url).path or '/'
+        # Telegram allows 1-256 characters from A-Z, a-z, 0-9, _ and -
+        self.secret = secret or secrets.token_urlsafe(32)
+        self.host = host
+        self.port = port
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.runner = runner or get_command_runner()
+        self.server = None
+        self.registered_at = 0
+        self.last_update_at = 0
+        self.received = 0
+        self.rejected = 0
+
+    def _api(self, method, payload=None):
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{method}"
+        response = requests.post(url, json=payload or {}, timeout=10)
+        data = response.json()
+        if response.status_code != 200 or not data.get('ok'):
+            raise RuntimeError(f"{method} failed: {data.get('description', response.status_code)}")
+        return data.get('result')
+
+    def start(self):
+        """Bind the server and register the webhook; False (and nothing running) on failure"""
+        try:
+            handler = type('BoundWebhookHandler', (WebhookHandler,), {'receiver': self})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+            if self.cert_file and self.key_file:
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+                context.load_cert_chain(self.cert_file, self.key_file)
+                self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        except Exception as e:
+            print(f"  ⚠️ Webhook server could not start on {self.host}:{self.port}: {e}")
+            self.server = None
+            return False
+
+        try:
+            self._api('setWebhook', {
+                'url': self.url,
+                'secret_token': self.secret,
+                'allowed_updates': ['message']
+            })
+        except Exception as e:
+            print(f"  ⚠️ setWebhook failed: {e}")
+            self.stop(unregister=False)
+            return False
+
+        self.registered_at = time.time()
+        print(f"✅ Webhook receiving updates on {self.host}:{self.port}{self.path}")
+        return True
+
+    def healthy(self):
+        """False when Telegram reports delivery errors since our last update, or the URL moved"""
+        try:
+            info = self._api('getWebhookInfo')
+        except Exception as e:
+            print(f"  ⚠️ getWebhookInfo failed: {e}")
+            return False
+
+        if info.get('url') != self.url:
+            return False
+
+        last_error = info.get('last_error_date', 0)
+        if last_error >= int(max(self.registered_at, self.last_update_at)) and info.get('pending_update_count', 0) > 0:
+            print(f"  ⚠️ Webhook delivery failing: {info.get('last_error_message', 'unknown error')}")
+            return False
+
+        return True
+
+    def stop(self, unregister=True):
+        """Shut the server down; unregister so getUpdates works again"""
+        if unregister:
+            try:
+                # Keep pending updates so polling picks them up
+                self._api('deleteWebhook', {'drop_pending_updates': False})
+            except Exception as e:
+                print(f"  ⚠️ deleteWebhook failed: {e}")
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+def start_webhook():
+    """Start webhook intake if configured; the receiver, or None to keep polling"""
+    if not TELEGRAM_WEBHOOK_URL or not TELEGRAM_BOT_TOKEN:
+        return None
+    receiver = WebhookReceiver(TELEGRAM_WEBHOOK_URL, TELEGRAM_WEBHOOK_SECRET)
+    return receiver if receiver.start() else None
@@ -0,0 +1,231 @@
+"""
+Whale tier classification
+Scores whales with array math, finds the tier cut points by partial
+selection instead of a full sort, and places new whales incrementally
+against the cached cut points
+"""
+
+import heapq
+import random
+import sys
+import threading
+import time
+
+from config import TIER_CONFIG, TIER_FRACTIONS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TIER_PRIORITY = {1: 'high', 2: 'medium', 3: 'low', 4: 'dormant'}
+
+# ============================================================
+# Scoring and Cut Points
+# ============================================================
+
+def score_whales(whales):
+    """win_rate * win_count + win_count * 10 for every whale (numpy array when available)"""
+    win_counts = [w.get('win_count', 0) or 0 for w in whales]
+    win_rates = [w.get('win_rate', 0) or 0 for w in whales]
+    if np is not None:
+        counts = np.asarray(win_counts, dtype=np.float64)
+        return np.asarray(win_rates, dtype=np.float64) * counts + counts * 10
+    return [rate * count + count * 10 for rate, count in zip(win_rates, win_counts)]
+
+def score_whale(whale):
+    count = whale.get('win_count', 0) or 0
+    return (whale.get('win_rate', 0) or 0) * count + count * 10
+
+def cut_sizes(total, fractions=TIER_FRACTIONS):
+    """How many whales rank above each tier boundary"""
+    sizes = []
+    covered = 0
+    for fraction in fractions:
+        covered += int(total * fraction)
+        sizes.append(covered)
+    return sizes
+
+def kth_largest(scores, ks):
+    """The k-th largest score (1-based) for each k, without sorting everything"""
+    n = len(scores)
+    if np is not None:
+        ordered = np.partition(scores, [n - k for k in ks])
+        return [float(ordered[n - k]) for k in ks]
+
+    # One heap pass for the cuts in the top half, one for the bottom half
+    top = [k for k in ks if k <= n // 2]
+    bottom = [n - k + 1 for k in ks if k > n // 2]
+    largest = heapq.nlargest(max(top), scores) if top else []
+    smallest = heapq.nsmallest(max(bottom), scores) if bottom else []
+    return [largest[k - 1] if k <= n // 2 else smallest[n - k] for k in ks]
+
+def cut_points(scores, fractions=TIER_FRACTIONS):
+    """
+    (threshold, tie_quota) per boundary: whales scoring above the threshold
+    rank inside it, plus the first tie_quota whales scoring exactly on it.
+    """
+    sizes = cut_sizes(len(scores), fractions)
+    selected = dict(zip([k for k in sizes if k], kth_largest(scores, [k for k in sizes if k])))
+
+    cuts = []
+    for size in sizes:
+        if size == 0:
+            cuts.append((float('inf'), 0))
+            continue
+        threshold = selected[size]
+        if np is not None:
+            above = int((scores > threshold).sum())
+        else:
+            above = sum(1 for s in scores if s > threshold)
+        cuts.append((threshold, size - above))
+    return cuts
+
+def assign_tiers(scores, cuts):
+    """Tier per score, matching a stable descending sort sliced at the cut sizes"""
+    if np is not None:
+        tiers = np.ones(len(scores), dtype=np.int8)
+        for threshold, quota in cuts:
+            on_cut = scores == threshold
+            within = (scores > threshold) | (on_cut & (np.cumsum(on_cut) <= quota))
+            tiers += ~within
+        return tiers.tolist()
+
+    thresholds = {threshold for threshold, _ in cuts}
+    seen = {}
+    tiers = []
+    for score in scores:
+        tie_index = 0
+        if score in thresholds:
+            tie_index = seen.get(score, 0)
+            seen[score] = tie_index + 1
+        tier = 1
+        for threshold, quota in cuts:
+            if score > threshold or (score == threshold and tie_index < quota):
+                break
+            tier += 1
+        tiers.append(tier)
+    return tiers
+
+def apply_tier(whale, tier):
+    whale['tier'] = tier
+    whale['check_interval'] = TIER_CONFIG[tier]['interval']
+    whale['priority'] = TIER_PRIORITY[tier]
+
+# ============================================================
+# Classifier
+# ============================================================
+
+class TierClassifier:
+    """Cut points fitted on a whale list plus incremental placement of new whales"""
+
+    def __init__(self, fractions=TIER_FRACTIONS):
+        self.fractions = fractions
+        self.thresholds = []
+        self.counts = {tier: 0 for tier in TIER_CONFIG}
+        self.fitted_size = 0
+        self.inserted = 0
+
+    def classify(self, whales):
+        """Assign tier/check_interval/priority to every whale in place"""
+        scores = score_whales(whales)
+        cuts = cut_points(scores, self.fractions)
+        tiers = assign_tiers(scores, cuts)
+
+        self.thresholds = [threshold for threshold, _ in cuts]
+        self.counts = {tier: 0 for tier in TIER_CONFIG}
+        for whale, tier in zip(whales, tiers):
+            apply_tier(whale, tier)
+            self.counts[tier] += 1
+        self.fitted_size = len(whales)
+        self.inserted = 0
+        return self.counts
+
+    def fit(self, whales):
+        """Cache cut points from existing scores without touching tiers"""
+        scores = score_whales(whales)
+        self.thresholds = [threshold for threshold, _ in cut_points(scores, self.fractions)]
+        self.fitted_size = len(whales)
+        self.inserted = 0
+        return self
+
+    def tier_for(self, whale):
+        """Tier a whale would get against the cached cut points (ties rank higher)"""
+        score = score_whale(whale)
+        return 1 + sum(1 for threshold in self.thresholds if score < threshold)
+
+    def insert(self, whale):
+        """Classify one new whale in O(tiers) and apply it"""
+        tier = self.tier_for(whale)
+        apply_tier(whale, tier)
+        self.counts[tier] = self.counts.get(tier, 0) + 1
+        self.inserted += 1
+        return tier
+
+    @property
+    def stale(self):
+        """True once enough whales were inserted that the cut points should be refit"""
+        return self.inserted > max(10, self.fitted_size * 0.05)
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """Classifier fitted on the current whale store (refit when stale)"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None or _classifier.stale:
+            from whale_store import get_whale_store
+            _classifier = TierClassifier().fit(get_whale_store().export_records())
+        return _classifier
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def synthetic_whales(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {'address': f"W{i:043d}", 'chain': 'solana',
+         'win_count': rng.randint(0, 40), 'win_rate': rng.randint(0, 100)}
+        for i in range(count)
+    ]
+
+def classify_by_sort(whales, fractions=TIER_FRACTIONS):
+    """The original approach (Python scoring, full sort, slice) for comparison"""
+    for whale in whales:
+        whale['performance_score'] = score_whale(whale)
+    ranked = sorted(whales, key=lambda x: x.get('performance_score', 0), reverse=True)
+    sizes = cut_sizes(len(ranked), fractions)
+    for i, whale in enumerate(ranked):
+        apply_tier(whale, 1 + sum(1 for size in sizes if i >= size))
+        del whale['performance_score']
+    return ranked
+
+def run_benchmark(sizes):
+    print(f"🐋 Classifier benchmark ({'numpy' if np is not None else 'pure Python'} path)")
+    for size in sizes:
+        whales = synthetic_whales(size)
+        reference = [dict(w) for w in whales]
+
+        started = time.perf_counter()
+        classify_by_sort(reference)
+        sort_ms = (time.perf_counter() - started) * 1000
+
+        classifier = TierClassifier()
+        started = time.perf_counter()
+        classifier.classify(whales)
+        select_ms = (time.perf_counter() - started) * 1000
+
+        extra = synthetic_whales(1000, seed=size)
+        started = time.perf_counter()
+        for whale in extra:
+            classifier.insert(whale)
+        insert_us = (time.perf_counter() - started) * 1e6 / len(extra)
+
+        same = all(a['tier'] == b['tier'] for a, b in zip(whales, reference))
+        print(f"  {size:>7,} whales | sort: {sort_ms:8.1f}ms | select: {select_ms:8.1f}ms | "
+              f"insert: {insert_us:6.1f}µs/whale | identical: {'✅' if same else '❌'}")
+
+if __name__ == '__main__':
+    run_benchmark([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,350 @@
+"""
+Compact binary whale list
+Columnar file with a fixed-width address table, chain/tier/interval arrays
+and a string heap for the cold fields monitoring never reads. Loaded via
+mmap so tier changes are written in place instead of rewriting the list.
+
+Layout (little endian):
+    header     magic, version, address width, count, generation, section offsets
+    addresses  count * ADDRESS_WIDTH bytes, NUL padded
+    chains     count * u8 (index into CHAINS, OTHER_CHAIN keeps the name in the heap)
+    tiers      count * u8
+    intervals  count * u32 check interval in seconds
+    cold       count * (u64 offset, u32 length) into the heap
+    heap       UTF-8 JSON objects of the remaining fields
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from config import WHALE_LIST_FILE, WHALE_STORE_FILE, TIER_CONFIG
+from codec import dumps, loads, load_file, dump_file
+
+MAGIC = b'WHLS'
+VERSION = 1
+ADDRESS_WIDTH = 48
+CHAINS = ('solana', 'base')
+OTHER_CHAIN = 255
+HOT_FIELDS = ('address', 'chain', 'tier', 'check_interval')
+
+# magic, version, address width, count, generation,
+# chains, tiers, intervals, cold, heap offsets, heap length
+HEADER = struct.Struct('<4sHHIIQQQQQQ')
+GENERATION_OFFSET = 12
+COLD_ENTRY = struct.Struct('<QI')
+
+# ============================================================
+# Encoding
+# ============================================================
+
+def _layout(count):
+    """Section offsets for a file holding count whales"""
+    addresses = HEADER.size
+    chains = addresses + count * ADDRESS_WIDTH
+    tiers = chains + count
+    intervals = tiers + count
+    cold = intervals + count * 4
+    heap = cold + count * COLD_ENTRY.size
+    return addresses, chains, tiers, intervals, cold, heap
+
+def encode_whales(whales, generation=0):
+    """Serialize a whale list (the JSON format) to the binary layout"""
+    count = len(whales)
+    addresses, chains, tiers, intervals, cold, heap = _layout(count)
+
+    address_table = bytearray(count * ADDRESS_WIDTH)
+    chain_column = bytearray(count)
+    tier_column = bytearray(count)
+    interval_column = bytearray(count * 4)
+    cold_table = bytearray(count * COLD_ENTRY.size)
+    heap_parts = []
+    heap_length = 0
+
+    for row, whale in enumerate(whales):
+        address = whale['address'].encode('ascii')
+        if len(address) > ADDRESS_WIDTH:
+            raise ValueError(f"Address longer than {ADDRESS_WIDTH} bytes: {whale['address']}")
+
+        tier = whale.get('tier', 3)
+        address_table[row * ADDRESS_WIDTH:row * ADDRESS_WIDTH + len(address)] = address
+        chain_column[row] = CHAINS.index(whale['chain']) if whale['chain'] in CHAINS else OTHER_CHAIN
+        tier_column[row] = tier
+        struct.pack_into('<I', interval_column, row * 4,
+                         int(whale.get('check_interval', TIER_CONFIG.get(tier, TIER_CONFIG[3])['interval'])))
+
+        cold_fields = {k: v for k, v in whale.items() if k not in HOT_FIELDS}
+        if chain_column[row] == OTHER_CHAIN:
+            cold_fields['chain'] = whale['chain']
+        blob = dumps(cold_fields) if cold_fields else b''
+        COLD_ENTRY.pack_into(cold_table, row * COLD_ENTRY.size, heap_length, len(blob))
+        heap_parts.append(blob)
+        heap_length += len(blob)
+
+    header = HEADER.pack(MAGIC, VERSION, ADDRESS_WIDTH, count, generation,
+                         chains, tiers, intervals, cold, heap, heap_length)
+    return b''.join([header, address_table, chain_column, tier_column,
+                     interval_column, cold_table] + heap_parts)
+
+def write_store(whales, path, generation=0):
+    """Atomically write a whale list to a binary store file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_whales(whales, generation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# ============================================================
+# Store
+# ============================================================
+
+class WhaleStore:
+    """
+    Memory-mapped view of a binary whale list.
+
+    Hot columns (address, chain, tier, interval) are read straight from the
+    map; cold fields are decoded from the heap only when asked for. Tier
+    changes are single-byte writes into the shared map, so every process
+    that has the file mapped sees them without reloading. Adding or removing
+    whales rewrites the file; other processes pick that up on refresh().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.file = None
+        self.map = None
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.inode = os.fstat(self.file.fileno()).st_ino
+
+        (magic, version, width, self.count, _, self.chains_at, self.tiers_at,
+         self.intervals_at, self.cold_at, self.heap_at, _) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or width != ADDRESS_WIDTH:
+            raise ValueError(f"{self.path} is not a version {VERSION} whale store")
+
+        table = self.map[HEADER.size:HEADER.size + self.count * ADDRESS_WIDTH]
+        self.rows = {
+            table[row * ADDRESS_WIDTH:(row + 1) * ADDRESS_WIDTH].rstrip(b'\0').decode('ascii'): row
+            for row in range(self.count)
+        }
+        self.addresses = list(self.rows)
+
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.file.close()
+                self.map = None
+
+    def refresh(self):
+        """Remap if another process replaced the file (add/remove); True when it changed"""
+        with self.lock:
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                return False
+            if inode == self.inode:
+                return False
+            self.close()
+            self._open()
+            return True
+
+    @property
+    def generation(self):
+        """Bumped on every change, including in-place tier writes by other processes"""
+        return struct.unpack_from('<I', self.map, GENERATION_OFFSET)[0]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, address):
+        return address in self.rows
+
+    # Reads -------------------------------------------------------
+
+    def _hot(self, address, row):
+        chain = self.map[self.chains_at + row]
+        return {
+            'address': address,
+            'chain': CHAINS[chain] if chain != OTHER_CHAIN else self._cold(row)['chain'],
+            'tier': self.map[self.tiers_at + row],
+            'check_interval': struct.unpack_from('<I', self.map, self.intervals_at + row * 4)[0]
+        }
+
+    def _cold(self, row):
+        offset, length = COLD_ENTRY.unpack_from(self.map, self.cold_at + row * COLD_ENTRY.size)
+        if not length:
+            return {}
+        start = self.heap_at + offset
+        return loads(self.map[start:start + length])
+
+    def tier_of(self, address):
+        with self.lock:
+            row = self.rows.get(address)
+            return None if row is None else self.map[self.tiers_at + row]
+
+    def whales(self, tier=None, chain=None):
+        """Hot records (address, chain, tier, check_interval), optionally filtered"""
+        with self.lock:
+            self.refresh()
+            tiers = self.map[self.tiers_at:self.tiers_at + self.count]
+            chains = self.map[self.chains_at:self.chains_at + self.count]
+            chain_code = (CHAINS.index(chain) if chain in CHAINS else OTHER_CHAIN) if chain else None
+            records = [
+                self._hot(address, row)
+                for address, row in self.rows.items()
+                if (tier is None or tiers[row] == tier)
+                and (chain_code is None or chains[row] == chain_code)
+            ]
+            if chain_code == OTHER_CHAIN:
+                records = [w for w in records if w['chain'] == chain]
+            return records
+
+    def tier_counts(self):
+        with self.lock:
+            self.refresh()
+            counts = {}
+            for tier in self.map[self.tiers_at:self.tiers_at + self.count]:
+                counts[tier] = counts.get(tier, 0) + 1
+            return counts
+
+    def get(self, address, cold=True):
+        """Full record for one whale (None if unknown)"""
+        with self.lock:
+            row = self.rows.get(address)
+            if row is None:
+                return None
+            record = self._hot(address, row)
+            if cold:
+                record.update(self._cold(row))
+            return record
+
+    def export_records(self):
+        """Every whale in the original JSON shape"""
+        with self.lock:
+            self.refresh()
+            return [dict(self._cold(row), **self._hot(address, row)) for address, row in self.rows.items()]
+
+    # Writes ------------------------------------------------------
+
+    def _bump_generation(self):
+        struct.pack_into('<I', self.map, GENERATION_OFFSET, (self.generation + 1) & 0xFFFFFFFF)
+
+    def set_tiers(self, updates):
+        """Write {address: tier} changes in place and return how many were applied"""
+        with self.lock:
+            self.refresh()
+            applied = 0
+            for address, tier in updates.items():
+                row = self.rows.get(address)
+                if row is None:
+                    continue
+                self.map[self.tiers_at + row] = tier
+                struct.pack_into('<I', self.map, self.intervals_at + row * 4, TIER_CONFIG[tier]['interval'])
+                applied += 1
+            if applied:
+                self._bump_generation()
+                self.map.flush()
+            return applied
+
+    def set_tier(self, address, tier):
+        return self.set_tiers({address: tier}) == 1
+
+    def _rewrite(self, whales):
+        generation = (self.generation + 1) & 0xFFFFFFFF
+        self.close()
+        write_store(whales, self.path, generation)
+        self._open()
+
+    def add(self, whale):
+        """Append a whale (rewrites the file); False if already present"""
+        with self.lock:
+            self.refresh()
+            if whale['address'] in self.rows:
+                return False
+            self._rewrite(self.export_records() + [whale])
+            return True
+
+    def remove(self, address):
+        """Drop a whale (rewrites the file); False if unknown"""
+        with self.lock:
+            self.refresh()
+            if address not in self.rows:
+                return False
+            self._rewrite([w for w in self.export_records() if w['address'] != address])
+            return True
+
+# ============================================================
+# Import / Export
+# ============================================================
+
+def import_json(json_path=WHALE_LIST_FILE, store_path=WHALE_STORE_FILE):
+    """Build the binary store from a JSON whale list"""
+    whales = load_file(json_path)
+    write_store(whales, store_path)
+    return len(whales)
+
+def export_json(store_path=WHALE_STORE_FILE, json_path=WHALE_LIST_FILE):
+    """Write the store back out in the JSON whale-list format"""
+    store = WhaleStore(store_path)
+    try:
+        whales = store.export_records()
+    finally:
+        store.close()
+    dump_file(whales, json_path)
+    return len(whales)
+
+# ============================================================
+# Shared Instance
+# ============================================================
+
+_store = None
+_store_lock = threading.Lock()
+
+def json_is_newer(json_path=WHALE_LIST_FILE, store_path=WHALE_STORE_FILE):
+    """True when the JSON list was edited after the binary store was last written"""
+    try:
+        return os.path.getmtime(json_path) > os.path.getmtime(store_path)
+    except OSError:
+        return False
+
+def get_whale_store():
+    """The process-wide store, imported from the JSON list on first use or when the list is newer"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if not os.path.exists(WHALE_STORE_FILE):
+                count = import_json()
+                print(f"📦 Built {WHALE_STORE_FILE} from {WHALE_LIST_FILE} ({count} whales)")
+            elif json_is_newer():
+                # A hand-edited list wins; runtime changes not exported back to it are replaced
+                count = import_json()
+                print(f"⚠️ {WHALE_LIST_FILE} is newer than {WHALE_STORE_FILE} - rebuilt the store from it ({count} whales)")
+            _store = WhaleStore(WHALE_STORE_FILE)
+        return _store
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export', 'stats'):
+        print("Usage: python whale_store.py import|export|stats [json_path] [store_path]")
+        sys.exit(1)
+
+    action = sys.argv[1]
+    json_path = sys.argv[2] if len(sys.argv) > 2 else WHALE_LIST_FILE
+    store_path = sys.argv[3] if len(sys.argv) > 3 else WHALE_STORE_FILE
+
+    if action == 'import':
+        print(f"✅ Imported {import_json(json_path, store_path)} whales into {store_path}")
+    elif action == 'export':
+        print(f"✅ Exported {export_json(store_path, json_path)} whales to {json_path}")
+    else:
+        store = WhaleStore(store_path)
+        print(f"📦 {store_path}: {len(store)} whales, {os.path.getsize(store_path):,} bytes, "
+              f"generation {store.generation}")
+        print(f"   Tiers: {dict(sorted(store.tier_counts().items()))}")